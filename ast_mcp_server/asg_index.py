@@ -0,0 +1,878 @@
+"""
+Server-side ASG graph index for the MCP server.
+
+Instead of downloading a whole ASG and traversing it client-side, clients
+can have the server build and keep an ASG in memory (index_asg) and then
+ask neighborhood questions about single nodes. Each index holds CSR
+(compressed sparse row) adjacency per edge type in both directions, so a
+neighbor lookup costs O(degree), and answers only describe the nodes they
+return.
+"""
+# MCP服务器端的ASG图索引模块。
+# 客户端无需下载整个ASG后自行遍历，可以让服务器构建ASG并保存在内存中（index_asg），再针对单个节点查询其邻域。
+# 每个索引按边类型保存正向和反向的CSR（压缩稀疏行）邻接表，查找邻居的代价为O(度数)，结果只描述返回的节点。
+
+import threading
+from array import array
+from bisect import bisect_left
+from collections import Counter, OrderedDict, deque
+from itertools import accumulate
+from typing import Dict, Iterable, List, Optional, Tuple
+from tree_sitter import Node, Tree
+
+from .asg_model import CompactASG, parse_node_id
+from .edits import diff_edits, edited_copy
+from .enhanced_tools import build_enhanced_subtree, make_asg_builder
+from .languages import CLASS, DEFINITION_KINDS, FUNCTION, get_language_plugin
+from .parser_pool import parser_pool
+from .tools import get_language, parse_code_to_tree
+from .tree_store import find_node_by_handle, get_source_hash, tree_store
+from .visitors import TreeWalker
+
+# Maximum number of indexed ASGs kept in memory
+DEFAULT_MAX_GRAPHS = 16
+# 内存中最多保留的ASG索引数量。
+
+# Default maximum number of nodes returned by a query
+DEFAULT_RESULT_LIMIT = 100
+# 查询默认返回的最大节点数。
+
+# Edge directions accepted by the neighborhood queries
+DIRECTIONS = ("out", "in", "both")
+# 邻域查询支持的边方向。
+
+# Node types that define a callable, used to find the caller of a call site
+DEFINITION_NODE_TYPES = DEFINITION_KINDS
+# 定义可调用对象的节点类型，用于确定调用点所在的调用者。
+
+# Edge types that link a call site to what it calls
+CALL_EDGE_TYPES = ("calls", "calls_import")
+# 将调用点连接到被调用对象的边类型。
+
+
+def build_csr(node_count: int, sources: Iterable[int], targets: Iterable[int]) -> Tuple[array, array]:
+    """
+    Build CSR adjacency from parallel source/target arrays.
+
+    Args:
+        node_count: Number of nodes
+        sources: Source node id of each edge
+        targets: Target node id of each edge
+
+    Returns:
+        (offsets, adjacent): the neighbors of node i are
+        adjacent[offsets[i]:offsets[i + 1]], in edge order
+    """
+    # 由并行的源/目标数组构建CSR邻接表：节点i的邻居为adjacent[offsets[i]:offsets[i + 1]]，保持边的原有顺序。
+    sources = list(sources)
+    targets = list(targets)
+    counts = [0] * (node_count + 1)
+    for source in sources:
+        counts[source + 1] += 1
+    offsets = array("I", accumulate(counts))
+    # 统计每个节点的出度并求前缀和。
+
+    adjacent = array("I", [0]) * len(targets)
+    position = offsets[:-1]
+    for source, target in zip(sources, targets):
+        adjacent[position[source]] = target
+        position[source] += 1
+    return offsets, adjacent
+    # 按计数排序把每条边的目标放入其源节点的区段。
+
+
+def subtree_ends(parent: array) -> array:
+    """
+    Get the end of each node's subtree from a preorder parent column.
+
+    Returns:
+        An array where the subtree of node i is the index range [i, end[i])
+    """
+    # 由先序的父节点列计算每个节点子树的终点：节点i的子树为下标区间[i, end[i])。
+    node_count = len(parent)
+    ends = array("I", range(1, node_count + 1))
+    for index in range(node_count - 1, 0, -1):
+        if ends[index] > ends[parent[index]]:
+            ends[parent[index]] = ends[index]
+    return ends
+
+
+class ASGIndex:
+    """
+    An ASG with CSR adjacency per semantic edge type, in both directions.
+
+    Containment needs no adjacency of its own: nodes are in preorder, so
+    the children of a node are found by jumping over subtrees. An index
+    built from a tree also keeps the tree and its source, so that update_asg
+    can reparse a new version incrementally and rebuild only the edited
+    function.
+    """
+    # 按语义边类型保存正向和反向CSR邻接表的ASG。
+    # 包含关系不需要单独的邻接表：节点按先序存放，跳过子树即可找到子节点。
+    # 从语法树构建的索引还保存语法树及其源码，update_asg可据此增量解析新版本，只重建被编辑的函数。
+
+    def __init__(
+        self,
+        asg: CompactASG,
+        handle: str,
+        tree: Optional[Tree] = None,
+        source_bytes: Optional[bytes] = None,
+        named_only: bool = False
+    ):
+        self.asg = asg
+        self.handle = handle
+        self.tree = tree
+        self.source_bytes = source_bytes
+        self.named_only = named_only
+        self.subtree_end = subtree_ends(asg.parent)
+        # 节点按先序存放，节点i的子树为下标区间[i, subtree_end[i])。
+        self.index_edges()
+
+    def index_edges(self) -> None:
+        """Count the edges by type and drop the adjacency, rebuilt on first use (after an update)."""
+        # 按类型统计边数并丢弃邻接表，邻接表在首次使用时重新构建（用于更新之后）。
+        asg = self.asg
+        type_counts = Counter(asg.edge_type)
+        self.edge_counts = {"contains": asg.node_count - 1} if asg.node_count > 1 else {}
+        self.edge_counts.update((asg.edge_types[type_id], count) for type_id, count in sorted(type_counts.items()))
+        self._forward = None
+        self._reverse = None
+        self._call_graph = None
+        self._call_sites = None
+
+    def _build_adjacency(self) -> None:
+        asg = self.asg
+        node_count = asg.node_count
+        edges_by_type: Dict[str, Tuple[List[int], List[int]]] = {}
+        for source, target, type_id in zip(asg.edge_source, asg.edge_target, asg.edge_type):
+            sources, targets = edges_by_type.setdefault(asg.edge_types[type_id], ([], []))
+            sources.append(source)
+            targets.append(target)
+        # 按边类型分组。
+
+        self._forward = {}
+        self._reverse = {}
+        for edge_type, (sources, targets) in edges_by_type.items():
+            self._forward[edge_type] = build_csr(node_count, sources, targets)
+            self._reverse[edge_type] = build_csr(node_count, targets, sources)
+        # 为每种边类型构建正向和反向CSR。
+
+    @property
+    def forward(self) -> Dict[str, Tuple[array, array]]:
+        """CSR adjacency of each semantic edge type, from source to target."""
+        if self._forward is None:
+            self._build_adjacency()
+        return self._forward
+
+    @property
+    def reverse(self) -> Dict[str, Tuple[array, array]]:
+        """CSR adjacency of each semantic edge type, from target to source."""
+        if self._reverse is None:
+            self._build_adjacency()
+        return self._reverse
+
+    def replace_subtree(self, start: int, sub: CompactASG, outer_edges: List[Tuple[int, int, str]]) -> bool:
+        """
+        Replace the subtree rooted at a node with a new version, patching the index.
+
+        Args:
+            start: Node id of the root of the replaced subtree
+            sub: ASG of the new subtree (see enhanced_tools.build_enhanced_subtree)
+            outer_edges: Edges from the new subtree to nodes outside it, with
+                        their ids from before the replacement
+
+        Returns:
+            Whether the subtree was replaced (see CompactASG.replace_subtree)
+        """
+        # 用新版本替换以某节点为根的子树，并修补索引。
+        asg = self.asg
+        end = self.subtree_end[start]
+        if not asg.replace_subtree(start, end, sub):
+            return False
+        delta = sub.node_count - (end - start)
+        for source, target, edge_type in outer_edges:
+            asg.add_edge(source + start, target + delta if target >= end else target, edge_type)
+        # 加入新子树指向外部节点的边，外部节点按替换后的下标平移。
+
+        subtree_end = self.subtree_end
+        ancestor = asg.parent[start]
+        while ancestor >= 0:
+            subtree_end[ancestor] += delta
+            ancestor = asg.parent[ancestor]
+        subtree_end[start:end] = array("I", map(start.__add__, subtree_ends(sub.parent)))
+        tail = start + sub.node_count
+        if delta:
+            subtree_end[tail:] = array("I", map(delta.__add__, subtree_end[tail:]))
+        # 修补子树终点：祖先随子树大小变化，新子树按其自身计算，后续节点整体平移。
+
+        self.index_edges()
+        return True
+
+    def find_node(self, node: str) -> Optional[int]:
+        """
+        Find a node by its public "type_startByte_endByte" ID or its index.
+
+        Nodes are in preorder, so start bytes never decrease and a binary
+        search finds the candidates.
+        """
+        # 按公开ID或下标查找节点。节点按先序排列，起始字节单调不减，因此可用二分查找定位候选节点。
+        node = str(node)
+        if node.isdigit():
+            index = int(node)
+            return index if index < self.asg.node_count else None
+        parsed = parse_node_id(node)
+        if parsed is None:
+            return None
+        node_type, start_byte, end_byte = parsed
+        asg = self.asg
+        index = bisect_left(asg.start_byte, start_byte)
+        while index < asg.node_count and asg.start_byte[index] == start_byte:
+            if asg.end_byte[index] == end_byte and asg.node_types[asg.type[index]] == node_type:
+                return index
+            index += 1
+        return None
+
+    def describe(self, index: int) -> Dict:
+        """Summarize a node: its index, ID, type, position and inlined text."""
+        # 概述一个节点：下标、ID、类型、位置和内联文本（如有）。
+        asg = self.asg
+        summary = {
+            "index": index,
+            "id": asg.node_id(index),
+            "type": asg.node_types[asg.type[index]],
+            "start_line": asg.start_line[index],
+            "start_col": asg.start_col[index],
+            "end_line": asg.end_line[index],
+            "end_col": asg.end_col[index]
+        }
+        text = asg.text[index]
+        if text is not None:
+            summary["text"] = text
+        return summary
+
+    def children(self, index: int) -> array:
+        """Get the children of a node, jumping over their subtrees."""
+        # 获取节点的子节点：依次跳过各子节点的子树。
+        children = array("I")
+        child = index + 1
+        end = self.subtree_end[index]
+        while child < end:
+            children.append(child)
+            child = self.subtree_end[child]
+        return children
+
+    def adjacent(self, index: int, edge_type: str, direction: str = "out") -> array:
+        """Get the neighbors of a node along one edge type, in O(degree)."""
+        # 获取节点沿某种边类型的邻居，代价为O(度数)。
+        if edge_type == "contains":
+            if direction == "out":
+                return self.children(index)
+            parent = self.asg.parent[index]
+            return array("I", [parent] if parent >= 0 else [])
+        # 包含关系由子树区间和父节点列得到。
+        csr = (self.forward if direction == "out" else self.reverse).get(edge_type)
+        if csr is None:
+            return array("I")
+        offsets, adjacent = csr
+        return adjacent[offsets[index]:offsets[index + 1]]
+
+    def enclosing_definition(self, index: int) -> Optional[int]:
+        """Get the nearest definition node containing a node (excluding itself)."""
+        # 获取包含该节点的最近的定义节点（不含自身）。
+        asg = self.asg
+        index = asg.parent[index]
+        while index >= 0:
+            if asg.node_types[asg.type[index]] in DEFINITION_NODE_TYPES:
+                return index
+            index = asg.parent[index]
+        return None
+
+    def neighbors(
+        self,
+        index: int,
+        edge_types: Optional[List[str]] = None,
+        direction: str = "out",
+        depth: int = 1,
+        limit: int = DEFAULT_RESULT_LIMIT
+    ) -> Tuple[List[Dict], bool]:
+        """
+        Breadth-first neighborhood of a node.
+
+        Returns:
+            The reached nodes (with their depth, the edge type and direction
+            they were reached by, and the node they were reached from), and
+            whether the result was cut off at limit
+        """
+        # 广度优先获取节点的邻域，返回到达的节点（含深度、经过的边类型和方向、来源节点）以及是否因limit被截断。
+        if edge_types is None:
+            edge_types = list(self.edge_counts)
+        directions = ("out", "in") if direction == "both" else (direction,)
+        results = []
+        visited = {index}
+        queue = deque([(index, 0)])
+        while queue:
+            current, current_depth = queue.popleft()
+            if current_depth >= depth:
+                continue
+            for edge_type in edge_types:
+                for edge_direction in directions:
+                    for neighbor in self.adjacent(current, edge_type, edge_direction):
+                        if neighbor in visited:
+                            continue
+                        if len(results) >= limit:
+                            return results, True
+                        visited.add(neighbor)
+                        summary = self.describe(neighbor)
+                        summary.update(depth=current_depth + 1, edge=edge_type, direction=edge_direction, via=current)
+                        results.append(summary)
+                        queue.append((neighbor, current_depth + 1))
+        return results, False
+
+    def call_sites(self, index: int, direction: str) -> List[Tuple[int, int, str]]:
+        """
+        Get the call edges into a definition, or out of the call sites inside it.
+
+        Returns:
+            (call site, called node, edge type) triples
+        """
+        # 获取指向某定义的调用边（in），或其子树内调用点发出的调用边（out）。
+        sites = []
+        if direction == "in":
+            for edge_type in CALL_EDGE_TYPES:
+                sites.extend((site, index, edge_type) for site in self.adjacent(index, edge_type, "in"))
+            return sites
+        site_ids, callees, edge_types = self.call_site_index()
+        first = bisect_left(site_ids, index)
+        last = bisect_left(site_ids, self.subtree_end[index], first)
+        for position in range(first, last):
+            sites.append((site_ids[position], callees[position], CALL_EDGE_TYPES[edge_types[position]]))
+        return sites
+        # 调用边按调用点排序，子树[index, subtree_end[index])内的调用点是其中连续的一段，二分查找即可，不必扫描子树的每个节点。
+
+    def call_site_index(self) -> Tuple[array, array, array]:
+        """
+        Get the call edges sorted by call site, built on first use.
+
+        Returns:
+            (call sites, called nodes, edge types as positions in
+            CALL_EDGE_TYPES), in the same order as the edges
+        """
+        # 获取按调用点排序的调用边（首次使用时构建），同一调用点的边按类型和原有顺序排列。
+        if self._call_sites is None:
+            asg = self.asg
+            ranks = {
+                asg.edge_types.index(edge_type): rank
+                for rank, edge_type in enumerate(CALL_EDGE_TYPES)
+                if edge_type in asg.edge_types
+            }
+            edges = sorted(
+                (source, ranks[type_id], position, target)
+                for position, (source, target, type_id) in enumerate(zip(asg.edge_source, asg.edge_target, asg.edge_type))
+                if type_id in ranks
+            )
+            self._call_sites = (
+                array("I", [edge[0] for edge in edges]),
+                array("I", [edge[3] for edge in edges]),
+                array("B", [edge[1] for edge in edges])
+            )
+        return self._call_sites
+
+    def call_graph(self) -> Dict[str, Tuple[array, array]]:
+        """
+        Get the call graph between definitions, built on first use.
+
+        A "calls" edge from a call site becomes an edge from the definition
+        enclosing the call site (or the root, for module-level calls) to
+        the called definition.
+        """
+        # 获取定义之间的调用图（首次使用时构建）。
+        # 调用点的calls边转换为从包含调用点的定义（模块级调用时为根节点）到被调用定义的边。
+        if self._call_graph is None:
+            offsets, adjacent = self.forward.get("calls", (None, array("I")))
+            callers = []
+            callees = []
+            if offsets is not None:
+                for site in range(self.asg.node_count):
+                    for callee in adjacent[offsets[site]:offsets[site + 1]]:
+                        caller = self.enclosing_definition(site)
+                        callers.append(self.asg.root if caller is None else caller)
+                        callees.append(callee)
+            node_count = self.asg.node_count
+            self._call_graph = {
+                "out": build_csr(node_count, callers, callees),
+                "in": build_csr(node_count, callees, callers)
+            }
+        return self._call_graph
+
+    def reachable(
+        self,
+        index: int,
+        direction: str = "out",
+        max_depth: Optional[int] = None,
+        limit: int = DEFAULT_RESULT_LIMIT
+    ) -> Tuple[List[Dict], bool]:
+        """
+        Definitions transitively called by (out) or calling (in) a definition.
+
+        Returns:
+            The reached definitions with their call depth, and whether the
+            result was cut off at limit
+        """
+        # 获取某定义传递调用到的（out）或传递调用它的（in）所有定义，返回带调用深度的结果以及是否被截断。
+        offsets, adjacent = self.call_graph()[direction]
+        results = []
+        visited = {index}
+        queue = deque([(index, 0)])
+        while queue:
+            current, depth = queue.popleft()
+            if max_depth is not None and depth >= max_depth:
+                continue
+            for neighbor in adjacent[offsets[current]:offsets[current + 1]]:
+                if neighbor in visited:
+                    continue
+                if len(results) >= limit:
+                    return results, True
+                visited.add(neighbor)
+                summary = self.describe(neighbor)
+                summary["depth"] = depth + 1
+                results.append(summary)
+                queue.append((neighbor, depth + 1))
+        return results, False
+
+
+class ASGIndexStore:
+    """Thread-safe LRU store of ASG indexes keyed by handle."""
+    # 以句柄为键、线程安全的LRU ASG索引存储。
+
+    def __init__(self, max_graphs: int = DEFAULT_MAX_GRAPHS):
+        self.max_graphs = max_graphs
+        self._lock = threading.Lock()
+        self._graphs = OrderedDict()  # Maps handle -> ASGIndex
+
+    def put(self, index: ASGIndex) -> str:
+        """Store an index and return its handle; the least recently used index is evicted when full."""
+        # 保存索引并返回其句柄；超过容量时淘汰最久未使用的索引。
+        with self._lock:
+            self._graphs[index.handle] = index
+            self._graphs.move_to_end(index.handle)
+            while len(self._graphs) > self.max_graphs:
+                self._graphs.popitem(last=False)
+        return index.handle
+
+    def get(self, handle: str) -> Optional[ASGIndex]:
+        """Get an index by handle, or None if it is not in memory."""
+        # 按句柄获取索引，不在内存中时返回None。
+        with self._lock:
+            index = self._graphs.get(handle)
+            if index is not None:
+                self._graphs.move_to_end(handle)
+            return index
+
+    def replace(self, old_handle: str, index: ASGIndex) -> str:
+        """Store an updated index under its new handle, dropping its old handle."""
+        # 以新句柄保存更新后的索引，并移除旧句柄。
+        with self._lock:
+            self._graphs.pop(old_handle, None)
+        return self.put(index)
+
+    def clear(self) -> None:
+        """Remove all indexes."""
+        # 清空所有索引。
+        with self._lock:
+            self._graphs.clear()
+
+
+# Shared ASG index store used by the graph tools
+asg_index_store = ASGIndexStore()
+# 图查询工具共用的ASG索引存储。
+
+
+def get_asg_handle(source_bytes: bytes, named_only: bool = False) -> str:
+    """Get the handle of the ASG of a source (its hash, marked when named_only)."""
+    # 获取源码ASG的句柄：源码哈希，仅具名节点时加上标记。
+    code_hash = get_source_hash(source_bytes)
+    return f"{code_hash}-named" if named_only else code_hash
+
+
+def build_index(tree: Tree, source_bytes: bytes, language: str, named_only: bool = False) -> ASGIndex:
+    """
+    Build the enhanced ASG of a parsed tree and index it (without storing it).
+
+    The ASG is built in 'spans' text mode: identifiers and literals keep
+    their text, and other text can be read via source://{code_hash}/{start}-{end}.
+    """
+    # 构建语法树的增强版ASG并建立索引（不保存）。ASG使用spans文本模式，只有标识符和字面量保留文本。
+    builder = make_asg_builder({"tree": tree, "source_bytes": source_bytes, "language": language}, "spans")
+    TreeWalker(named_only).add(builder).walk(tree.root_node)
+    asg = builder.build()
+    return ASGIndex(asg, get_asg_handle(source_bytes, named_only), tree, source_bytes, named_only)
+
+
+def summarize_index(index: ASGIndex) -> Dict:
+    """Summarize an indexed ASG: its handle, node count and edge counts by type."""
+    # 概述已索引的ASG：句柄、节点数和按类型统计的边数。
+    asg = index.asg
+    return {
+        "handle": index.handle,
+        "language": asg.language,
+        "code_hash": asg.code_hash,
+        "node_count": asg.node_count,
+        "edge_counts": index.edge_counts,
+        "root": index.describe(asg.root)
+    }
+
+
+def index_code(
+    code: str,
+    language: Optional[str] = None,
+    filename: Optional[str] = None,
+    named_only: bool = False
+) -> Dict:
+    """
+    Build the enhanced ASG of some code and keep it indexed in memory.
+
+    Args:
+        code: Source code to analyze
+        language: Programming language identifier (optional)
+        filename: Source file name (optional, used for language detection)
+        named_only: Whether to include only named nodes
+
+    Returns:
+        Dictionary with the handle and a summary of the indexed graph
+    """
+    # 构建代码的增强版ASG并在内存中建立索引。
+    parsed = parse_code_to_tree(code, language, filename)
+    if "error" in parsed:
+        return parsed
+    index = build_index(parsed["tree"], parsed["source_bytes"], parsed["language"], named_only)
+    asg_index_store.put(index)
+    return summarize_index(index)
+
+
+def find_update_root(index: ASGIndex, tree: Tree, start_byte: int, end_byte: int) -> Tuple[Optional[Node], bool]:
+    """
+    Find the subtree of a new tree that update_asg can rebuild on its own.
+
+    The subtree must contain every node touching the changed bytes. For
+    languages with semantic edges it is the outermost function containing
+    them, whose names only resolve inside it or at module level; a method
+    is rebuilt inside its class scope, or with its whole class when the
+    language's methods see the names bound in the class body. For other
+    languages, it is the innermost definition.
+
+    Returns:
+        The subtree's root (None if the whole ASG must be rebuilt) and
+        whether it is inside a class body
+    """
+    # 在新语法树中找出update_asg可单独重建的子树。
+    # 子树须包含所有与变更字节相邻或重叠的节点。对有语义边的语言，取包含变更的最外层函数，其中的名称只在函数内部或模块级解析；
+    # 方法在其类作用域中重建，若该语言的方法可见类体中的名称（如Java）则重建整个类。其他语言取最内层的定义。
+    low = max(start_byte - 1, 0)
+    high = min(end_byte + 1, tree.root_node.end_byte)
+    node = tree.root_node.descendant_for_byte_range(low, high)
+    # 向两侧各扩展一个字节，使恰好在变更边界开始或结束的节点也位于子树中。
+
+    root = None
+    in_class = False
+    plugin = get_language_plugin(index.asg.language)
+    if plugin is None or index.asg.symbols is None:
+        while node is not None and node.type not in DEFINITION_NODE_TYPES:
+            node = node.parent
+        return node, False
+    # 没有语义边时取最内层的定义。
+
+    flags = plugin.flags
+    class_members_in_scope = plugin.spec.class_members_in_scope
+    while node is not None:
+        kind_flags = flags[node.kind_id]
+        if kind_flags & FUNCTION or (kind_flags & CLASS and class_members_in_scope and root is not None):
+            root = node
+            in_class = False
+        elif kind_flags & CLASS and root is not None:
+            in_class = True
+        node = node.parent
+    return root, in_class
+
+
+def update_index(index: ASGIndex, code: str) -> Tuple[ASGIndex, Optional[Dict]]:
+    """
+    Update an indexed ASG to a new version of its code.
+
+    The new code is reparsed incrementally from the stored tree. When the
+    change lies inside one function (see find_update_root), only that
+    function's nodes and semantic edges are rebuilt and spliced into the
+    ASG; otherwise the whole ASG is rebuilt from the new tree.
+
+    Args:
+        index: The indexed ASG (updated in place when possible)
+        code: The new source code
+
+    Returns:
+        The updated index and a summary of the rebuilt subtree (None if
+        the whole ASG was rebuilt)
+    """
+    # 将已索引的ASG更新到代码的新版本。
+    # 基于保存的语法树增量解析新代码；变更位于单个函数内时，只重建该函数的节点和语义边并拼接进ASG，否则从新语法树重建整个ASG。
+    asg = index.asg
+    language = asg.language
+    source_bytes = code.encode("utf-8")
+    edits = diff_edits(index.source_bytes, source_bytes)
+    if not edits:
+        return index, {"node": index.describe(asg.root), "node_count": 0}
+    # 代码未变时无需更新。
+
+    old_tree = edited_copy(index.tree, edits)
+    with parser_pool.parser(language, get_language(language)) as parser:
+        tree = parser.parse(source_bytes, old_tree)
+    # 将编辑应用到旧语法树的副本上，再增量解析新代码。
+
+    start_byte = edits[0]["start_byte"]
+    end_byte = edits[-1]["new_end_byte"]
+    for changed in old_tree.changed_ranges(tree):
+        start_byte = min(start_byte, changed.start_byte)
+        end_byte = max(end_byte, changed.end_byte)
+    root, in_class = find_update_root(index, tree, start_byte, end_byte)
+    # 变更区域包括编辑本身和语法结构发生变化的范围。
+
+    start = None
+    if root is not None:
+        byte_delta = sum(edit["new_end_byte"] - edit["old_end_byte"] for edit in edits)
+        old_id = f"{root.type}_{root.start_byte}_{root.end_byte - byte_delta}"
+        start = index.find_node(old_id)
+        if start is not None and asg.symbols is not None:
+            old_root = find_node_by_handle(index.tree.root_node, old_id)
+            old_name = old_root.child_by_field_name("name") if old_root is not None else None
+            new_name = root.child_by_field_name("name")
+            global_id = asg.node_types.index("global_statement") if "global_statement" in asg.node_types else None
+            if (
+                old_name is None or new_name is None or old_name.text != new_name.text
+                or (global_id is not None and global_id in asg.type[start:index.subtree_end[start]])
+            ):
+                start = None
+    # 在旧ASG中找到对应的子树；定义改名或（Python）含global声明时会改变模块级绑定，需重建整个ASG。
+
+    if start is not None:
+        code_hash = tree_store.put(tree, source_bytes, language)
+        sub, outer_edges = build_enhanced_subtree(
+            root, source_bytes, language, index.named_only, "spans", code_hash, asg.symbols, in_class
+        )
+        if "global_statement" not in sub.node_types and index.replace_subtree(start, sub, outer_edges):
+            asg.code_hash = code_hash
+            index.tree = tree
+            index.source_bytes = source_bytes
+            index.handle = get_asg_handle(source_bytes, index.named_only)
+            return index, {"node": index.describe(start), "node_count": sub.node_count}
+    # 构建新子树并替换；无法替换时回退到完整重建。
+
+    return build_index(tree, source_bytes, language, index.named_only), None
+
+
+def update_code(handle: str, code: str) -> Dict:
+    """
+    Update the indexed ASG with a handle to a new version of its code.
+
+    Args:
+        handle: Handle returned by index_asg (or by a previous update)
+        code: The new source code
+
+    Returns:
+        Dictionary with the new handle, a summary of the graph and the
+        rebuilt subtree ("updated", null if the whole graph was rebuilt)
+    """
+    # 将某句柄对应的已索引ASG更新到代码的新版本，返回新句柄、图概要和被重建的子树。
+    index = asg_index_store.get(handle)
+    if index is None:
+        return {"error": f"No indexed ASG found for {handle}. Build it with index_asg first."}
+    try:
+        index, updated = update_index(index, code)
+    except Exception as e:
+        return {"error": f"Error updating the ASG: {e}"}
+    asg_index_store.replace(handle, index)
+    summary = summarize_index(index)
+    summary["updated"] = updated
+    return summary
+
+
+def resolve_node(handle: str, node: str) -> Tuple[Optional[ASGIndex], Optional[int], Optional[Dict]]:
+    """Look up an indexed ASG and one of its nodes, or return an error dictionary."""
+    # 查找已索引的ASG及其中的节点，失败时返回错误字典。
+    index = asg_index_store.get(handle)
+    if index is None:
+        return None, None, {"error": f"No indexed ASG found for {handle}. Build it with index_asg first."}
+    node_index = index.find_node(node)
+    if node_index is None:
+        return index, None, {"error": f"Node {node} not found in the ASG"}
+    return index, node_index, None
+
+
+def register_graph_tools(mcp_server):
+    """Register the ASG graph index tools with the MCP server."""
+    # 向MCP服务器注册ASG图索引工具。
+
+    @mcp_server.tool()
+    def index_asg(
+        code: str,
+        language: Optional[str] = None,
+        filename: Optional[str] = None,
+        named_only: bool = False
+    ) -> Dict:
+        """
+        Build the enhanced ASG of some code and keep it indexed on the server.
+
+        Returns a handle for asg_neighbors, asg_callers, asg_callees and
+        asg_reachable, instead of the whole graph.
+
+        Args:
+            code: The source code to analyze
+            language: The programming language (e.g., 'python', 'javascript')
+                     If not provided, the tool will attempt to detect it
+            filename: Optional filename to help with language detection
+            named_only: If true, drop anonymous nodes (punctuation, keywords)
+
+        Returns:
+            A dictionary with the handle, node count and edge counts by type
+        """
+        # 构建增强版ASG并在服务器端建立索引，只返回句柄和概要，而不是整个图。
+        return index_code(code, language, filename, named_only)
+
+    @mcp_server.tool()
+    def update_asg(handle: str, code: str) -> Dict:
+        """
+        Update an indexed ASG to a new version of its code.
+
+        The code is reparsed incrementally, and when the change lies inside
+        one function only that function is rebuilt, so a small edit in a
+        large file costs about as much as the edited function.
+
+        Args:
+            handle: Handle returned by index_asg or by a previous update_asg
+            code: The full new source code
+
+        Returns:
+            A dictionary with the new handle (the old one is dropped), the
+            node and edge counts, and the rebuilt subtree ("updated", null
+            if the whole graph had to be rebuilt)
+        """
+        # 将已索引的ASG更新到代码的新版本；变更位于单个函数内时只重建该函数。
+        return update_code(handle, code)
+
+    @mcp_server.tool()
+    def asg_neighbors(
+        handle: str,
+        node: str,
+        edge_types: Optional[List[str]] = None,
+        direction: str = "out",
+        depth: int = 1,
+        limit: int = DEFAULT_RESULT_LIMIT
+    ) -> Dict:
+        """
+        Get the neighborhood of a node in an indexed ASG.
+
+        Args:
+            handle: Handle returned by index_asg
+            node: Node ID ("type_startByte_endByte") or node index
+            edge_types: Edge types to follow (e.g. ['calls', 'references']);
+                       all types, including 'contains', if not provided
+            direction: 'out' (default), 'in' or 'both'
+            depth: Number of hops to follow (default 1)
+            limit: Maximum number of nodes to return (default 100)
+
+        Returns:
+            A dictionary with the node and the reached neighbors
+        """
+        # 获取已索引ASG中某节点的邻域。
+        if direction not in DIRECTIONS:
+            return {"error": f"Invalid direction: {direction} (expected one of {', '.join(DIRECTIONS)})"}
+        if depth < 1 or limit < 1:
+            return {"error": "depth and limit must be positive integers"}
+        index, node_index, error = resolve_node(handle, node)
+        if error:
+            return error
+        neighbors, truncated = index.neighbors(node_index, edge_types, direction, depth, limit)
+        return {"node": index.describe(node_index), "neighbors": neighbors, "truncated": truncated}
+
+    @mcp_server.tool()
+    def asg_callers(handle: str, node: str, limit: int = DEFAULT_RESULT_LIMIT) -> Dict:
+        """
+        Get the call sites that call a definition in an indexed ASG.
+
+        Args:
+            handle: Handle returned by index_asg
+            node: ID or index of the called definition (or import)
+            limit: Maximum number of call sites to return (default 100)
+
+        Returns:
+            A dictionary with each call site and the definition containing it
+            (null for module-level calls)
+        """
+        # 获取调用某定义的所有调用点及其所在的定义（模块级调用时为null）。
+        index, node_index, error = resolve_node(handle, node)
+        if error:
+            return error
+        sites = index.call_sites(node_index, "in")
+        callers = []
+        for site, _, edge_type in sites[:limit]:
+            caller = index.enclosing_definition(site)
+            callers.append({
+                "call_site": index.describe(site),
+                "caller": index.describe(caller) if caller is not None else None,
+                "edge": edge_type
+            })
+        return {"node": index.describe(node_index), "callers": callers, "truncated": len(sites) > limit}
+
+    @mcp_server.tool()
+    def asg_callees(handle: str, node: str, limit: int = DEFAULT_RESULT_LIMIT) -> Dict:
+        """
+        Get what the call sites inside a node call, in an indexed ASG.
+
+        Args:
+            handle: Handle returned by index_asg
+            node: ID or index of a definition (or any node, such as the root)
+            limit: Maximum number of calls to return (default 100)
+
+        Returns:
+            A dictionary with each call site and the definition or import it calls
+        """
+        # 获取某节点（通常是定义）内部的调用点所调用的定义或import。
+        index, node_index, error = resolve_node(handle, node)
+        if error:
+            return error
+        sites = index.call_sites(node_index, "out")
+        callees = [
+            {"call_site": index.describe(site), "callee": index.describe(callee), "edge": edge_type}
+            for site, callee, edge_type in sites[:limit]
+        ]
+        return {"node": index.describe(node_index), "callees": callees, "truncated": len(sites) > limit}
+
+    @mcp_server.tool()
+    def asg_reachable(
+        handle: str,
+        node: str,
+        direction: str = "out",
+        max_depth: Optional[int] = None,
+        limit: int = DEFAULT_RESULT_LIMIT
+    ) -> Dict:
+        """
+        Get the definitions transitively reachable from a definition in the call graph.
+
+        Args:
+            handle: Handle returned by index_asg
+            node: ID or index of a definition (the root stands for module-level code)
+            direction: 'out' (default) for everything it calls, directly or
+                      not, or 'in' for everything that calls it
+            max_depth: Maximum call depth (optional, no limit by default)
+            limit: Maximum number of definitions to return (default 100)
+
+        Returns:
+            A dictionary with the reached definitions and their call depth
+        """
+        # 获取调用图中从某定义出发传递可达的所有定义（out为其调用的，in为调用它的）。
+        if direction not in ("out", "in"):
+            return {"error": f"Invalid direction: {direction} (expected 'out' or 'in')"}
+        if limit < 1 or (max_depth is not None and max_depth < 1):
+            return {"error": "max_depth and limit must be positive integers"}
+        index, node_index, error = resolve_node(handle, node)
+        if error:
+            return error
+        reachable, truncated = index.reachable(node_index, direction, max_depth, limit)
+        return {"node": index.describe(node_index), "reachable": reachable, "truncated": truncated}
@@ -0,0 +1,512 @@
+"""
+Compact in-memory model for Abstract Semantic Graphs.
+
+ASG builders work with dense integer node ids instead of the public
+"type_startByte_endByte" string IDs. Node attributes are stored in
+array-backed columns, node types, edge types and field names are interned
+into tables, and edges are parallel integer arrays. The public formats
+(one dict per node and edge, or the columnar format) are produced only at
+the output boundary, by to_dict and to_columnar.
+
+In 'spans' text mode only identifiers and literals keep their text; other
+nodes carry just their spans, and their text can be read from the
+source://{code_hash}/{start}-{end} resource.
+"""
+# 抽象语义图（ASG）的紧凑内存模型。
+# ASG构建过程使用连续的整数节点ID，而不是公开格式中的"type_startByte_endByte"字符串ID。
+# 节点属性按列存放在数组中，节点类型、边类型和字段名驻留在表中，边为并行的整数数组。
+# 只在输出时由to_dict和to_columnar生成公开格式（每节点/每边一个字典，或列式格式）。
+# spans文本模式下只有标识符和字面量保留文本，其余节点只带位置范围，文本可通过source://{code_hash}/{start}-{end}资源读取。
+
+from array import array
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+# Position columns of every node, in add_node argument order
+POSITION_COLUMNS = ("start_byte", "end_byte", "start_line", "start_col", "end_line", "end_col")
+# 每个节点的位置列，顺序与add_node的参数一致。
+
+# Node text modes of an ASG: 'full' keeps every node's text, 'spans' only
+# the text of identifiers and literals (other nodes are read via source://)
+ASG_TEXT_MODES = ("full", "spans")
+# ASG的节点文本模式：full保留所有节点的文本；spans只保留标识符和字面量的文本，其余节点通过source://读取。
+
+# Containment encodings of an ASG: 'edges' emits a "contains" edge per
+# child node, 'parent' gives each node its parent index instead
+CONTAINMENT_MODES = ("edges", "parent")
+# ASG包含关系的输出方式：edges为每个子节点生成一条contains边；parent改为在每个节点上给出父节点下标。
+
+# Literal node types whose text is kept in 'spans' mode. Identifiers
+# ("*identifier") and Java-style "*_literal" types are matched by suffix;
+# string fragments are left out since their string node carries the text.
+LITERAL_NODE_TYPES = frozenset({
+    "string", "concatenated_string", "template_string", "integer", "float", "number",
+    "true", "false", "none", "null", "undefined", "regex",
+})
+# spans模式下保留文本的字面量节点类型。标识符和Java风格的*_literal按后缀匹配；
+# 字符串片段不保留，因为所在的字符串节点已带有文本。
+
+
+def parse_node_id(node_id: str) -> Optional[Tuple[str, int, int]]:
+    """Split a public "type_startByte_endByte" node ID into (type, start_byte, end_byte)."""
+    # 将公开的"type_startByte_endByte"节点ID拆分为(类型, 起始字节, 结束字节)。
+    try:
+        node_type, start, end = node_id.rsplit("_", 2)
+        return node_type, int(start), int(end)
+    except (AttributeError, ValueError):
+        return None
+
+
+def check_asg_options(text_mode: str = "full", containment: str = "edges") -> Optional[str]:
+    """Validate ASG output options, returning an error message or None."""
+    # 校验ASG输出选项，出错时返回错误信息，否则返回None。
+    if text_mode not in ASG_TEXT_MODES:
+        return f"Invalid text mode: {text_mode} (expected one of {', '.join(ASG_TEXT_MODES)})"
+    if containment not in CONTAINMENT_MODES:
+        return f"Invalid containment: {containment} (expected one of {', '.join(CONTAINMENT_MODES)})"
+    return None
+
+
+@lru_cache(maxsize=None)
+def inlines_text(node_type: str) -> bool:
+    """Whether nodes of a type keep their text in 'spans' mode (identifiers and literals)."""
+    # 判断某类型的节点在spans模式下是否保留文本（标识符和字面量）。
+    return node_type in LITERAL_NODE_TYPES or node_type.endswith("identifier") or node_type.endswith("_literal")
+
+
+class CompactASG:
+    """
+    An ASG with integer node ids, columnar node storage and parallel edge arrays.
+
+    Nodes are stored in preorder. Containment is kept implicitly as a parent
+    column (with the field name of each child) rather than as edges; the
+    edge arrays only hold semantic edges. "contains" edges are generated
+    at the output boundary unless the 'parent' containment mode is used.
+    """
+    # 使用整数节点ID、列式节点存储和并行边数组的ASG。
+    # 节点按先序存放；包含关系以父节点列（及子节点的字段名）隐式保存，而不是作为边，边数组只保存语义边。
+    # 除非使用parent包含模式，"contains"边只在输出时生成。
+
+    __slots__ = (
+        "language", "root", "text_mode", "code_hash",
+        "node_types", "_node_type_ids", "type", "text", "parent", "fields", "_field_ids", "field",
+        "start_byte", "end_byte", "start_line", "start_col", "end_line", "end_col",
+        "edge_types", "_edge_type_ids", "edge_source", "edge_target", "edge_type", "symbols",
+    )
+
+    def __init__(self, language: str, text_mode: str = "full", code_hash: Optional[str] = None):
+        self.language = language
+        self.root = 0
+        self.text_mode = text_mode
+        self.code_hash = code_hash  # Hash of the source, for source:// text slices in 'spans' mode
+        self.node_types: List[str] = []  # Interned node type names
+        self._node_type_ids: Dict[str, int] = {}
+        self.type = array("I")  # Node type id of each node
+        self.text: List[Optional[str]] = []  # Text of each node (None if omitted)
+        self.parent = array("i")  # Parent node id of each node, -1 for the root
+        self.fields: List[str] = []  # Interned field names
+        self._field_ids: Dict[str, int] = {}
+        self.field = array("i")  # Field id of each node in its parent, -1 if it has none
+        for column in POSITION_COLUMNS:
+            setattr(self, column, array("I"))
+        self.edge_types: List[str] = []  # Interned edge type names
+        self._edge_type_ids: Dict[str, int] = {}
+        self.edge_source = array("I")
+        self.edge_target = array("I")
+        self.edge_type = array("H")
+        # 节点列和语义边列；父节点列中-1表示根节点，字段列中-1表示没有字段名。
+        self.symbols: Optional[Dict[str, Tuple[int, str]]] = None  # Module-level name -> (defining node id, kind)
+        # 模块级名称的最终绑定，供增量更新解析子树中逃逸到模块作用域的名称。
+
+    @property
+    def node_count(self) -> int:
+        return len(self.type)
+
+    @property
+    def edge_count(self) -> int:
+        """Number of semantic edges (containment is not stored as edges)."""
+        return len(self.edge_source)
+
+    def add_node(
+        self,
+        node_type: str,
+        start_byte: int,
+        end_byte: int,
+        start_line: int,
+        start_col: int,
+        end_line: int,
+        end_col: int,
+        text: Optional[str] = None,
+        parent: int = -1,
+        field: Optional[str] = None
+    ) -> int:
+        """
+        Add a node and return its integer id (its index in the node columns).
+
+        Nodes must be added in preorder, each after its parent.
+        """
+        # 添加节点并返回其整数ID（即在节点列中的下标）。节点须按先序添加，父节点在前。
+        type_id = self._node_type_id(node_type)
+        field_id = -1 if field is None else self._field_id(field)
+        index = len(self.type)
+        self.type.append(type_id)
+        self.text.append(text)
+        self.parent.append(parent)
+        self.field.append(field_id)
+        self.start_byte.append(start_byte)
+        self.end_byte.append(end_byte)
+        self.start_line.append(start_line)
+        self.start_col.append(start_col)
+        self.end_line.append(end_line)
+        self.end_col.append(end_col)
+        return index
+
+    def _node_type_id(self, node_type: str) -> int:
+        type_id = self._node_type_ids.get(node_type)
+        if type_id is None:
+            type_id = self._node_type_ids[node_type] = len(self.node_types)
+            self.node_types.append(node_type)
+        return type_id
+
+    def _field_id(self, field: str) -> int:
+        field_id = self._field_ids.get(field)
+        if field_id is None:
+            field_id = self._field_ids[field] = len(self.fields)
+            self.fields.append(field)
+        return field_id
+    # 驻留节点类型名和字段名，返回其编号。
+
+    def add_edge(self, source: int, target: int, edge_type: str) -> None:
+        """Add a semantic edge between two node ids."""
+        # 在两个节点ID之间添加语义边。
+        type_id = self._edge_type_ids.get(edge_type)
+        if type_id is None:
+            type_id = self._edge_type_ids[edge_type] = len(self.edge_types)
+            self.edge_types.append(edge_type)
+        self.edge_source.append(source)
+        self.edge_target.append(target)
+        self.edge_type.append(type_id)
+
+    def subtree_end(self, index: int) -> int:
+        """Get the end of the preorder index range [index, end) of a node's subtree."""
+        # 获取节点子树在先序下标中的区间终点：子树为[index, end)。
+        end = index + 1
+        parent = self.parent
+        node_count = len(parent)
+        while end < node_count and parent[end] >= index:
+            end += 1
+        return end
+        # 先序中子树之后第一个节点的父节点位于子树之前。
+
+    def replace_subtree(self, start: int, end: int, sub: "CompactASG") -> bool:
+        """
+        Replace the subtree of nodes [start, end) with the nodes of another ASG.
+
+        sub holds the new version of the subtree, rooted at its node 0 and
+        positioned in the new source; its semantic edges are copied. Nodes
+        after the subtree move by the change in its size and end position,
+        and its ancestors' ends move too. Semantic edges from the old
+        subtree are dropped. The replacement is refused, leaving the ASG
+        unchanged, if an edge from outside points inside the old subtree
+        (other than at its root) or if a later node starts on the line
+        where the old subtree ends (its columns would move).
+
+        Args:
+            start: Node id of the root of the replaced subtree
+            end: End of the subtree's node range (see subtree_end)
+            sub: ASG of the new subtree
+
+        Returns:
+            Whether the subtree was replaced
+        """
+        # 用另一个ASG的节点替换节点区间[start, end)构成的子树。
+        # sub是该子树的新版本，根为其0号节点，位置基于新源码，其语义边一并复制。
+        # 子树之后的节点按子树大小和结束位置的变化平移，祖先节点的结束位置也随之平移；旧子树发出的语义边被删除。
+        # 如果有外部的边指向旧子树内部（根节点除外），或后续节点与旧子树结束于同一行（列会变化），则拒绝替换并保持ASG不变。
+        node_count = self.node_count
+        old_end_line = self.end_line[start]
+        if end < node_count and self.start_line[end] == old_end_line:
+            return False
+        for source, target in zip(self.edge_source, self.edge_target):
+            if start < target < end and not start <= source < end:
+                return False
+        # 检查能否替换。
+
+        delta = sub.node_count - (end - start)
+        byte_delta = sub.end_byte[0] - self.end_byte[start]
+        line_delta = sub.end_line[0] - old_end_line
+        col_delta = sub.end_col[0] - self.end_col[start]
+
+        ancestor = self.parent[start]
+        while ancestor >= 0:
+            if self.end_line[ancestor] == old_end_line:
+                self.end_col[ancestor] += col_delta
+            self.end_line[ancestor] += line_delta
+            self.end_byte[ancestor] += byte_delta
+            ancestor = self.parent[ancestor]
+        # 祖先节点的结束位置随子树一起移动；与子树结束于同一行的祖先，其结束列也随之移动。
+
+        for column, column_delta in (
+            ("start_byte", byte_delta), ("end_byte", byte_delta),
+            ("start_line", line_delta), ("end_line", line_delta)
+        ):
+            values = getattr(self, column)
+            if column_delta and end < node_count:
+                values[end:] = array(values.typecode, map(column_delta.__add__, values[end:]))
+        if delta:
+            self.parent[end:] = array("i", [parent + delta if parent >= end else parent for parent in self.parent[end:]])
+        # 平移后续节点的位置和指向后续节点的父节点下标。
+
+        root_parent = self.parent[start]
+        root_field = self.field[start]
+        type_map = [self._node_type_id(node_type) for node_type in sub.node_types]
+        field_map = [self._field_id(field) for field in sub.fields]
+        self.type[start:end] = array("I", [type_map[type_id] for type_id in sub.type])
+        self.text[start:end] = sub.text
+        self.parent[start:end] = array("i", [parent + start for parent in sub.parent])
+        self.parent[start] = root_parent
+        self.field[start:end] = array("i", [field_map[field_id] if field_id >= 0 else -1 for field_id in sub.field])
+        self.field[start] = root_field
+        for column in POSITION_COLUMNS:
+            getattr(self, column)[start:end] = getattr(sub, column)
+        # 写入新子树的节点列，其根节点沿用旧根的父节点和字段名。
+
+        def moved(index: int) -> int:
+            return index + delta if index >= end else index
+
+        edges = [
+            (moved(source), moved(target), type_id)
+            for source, target, type_id in zip(self.edge_source, self.edge_target, self.edge_type)
+            if not start <= source < end
+        ]
+        self.edge_source = array("I", [source for source, _, _ in edges])
+        self.edge_target = array("I", [target for _, target, _ in edges])
+        self.edge_type = array("H", [type_id for _, _, type_id in edges])
+        for source, target, type_id in zip(sub.edge_source, sub.edge_target, sub.edge_type):
+            self.add_edge(source + start, target + start, sub.edge_types[type_id])
+        # 删除旧子树发出的边，平移其余边的端点，再加入新子树的边。
+
+        if self.symbols:
+            self.symbols = {name: (moved(index), kind) for name, (index, kind) in self.symbols.items()}
+        return True
+
+    def node_id(self, index: int) -> str:
+        """Get the public "type_startByte_endByte" ID of a node."""
+        # 获取节点的公开ID（type_startByte_endByte）。
+        return f"{self.node_types[self.type[index]]}_{self.start_byte[index]}_{self.end_byte[index]}"
+
+    def add_source_info(self, result: Dict) -> None:
+        """Add the text mode and source hash to an output dictionary in 'spans' mode."""
+        # spans模式下在输出中加入文本模式和源码哈希，用于通过source://{code_hash}/{start}-{end}读取文本。
+        if self.text_mode != "full":
+            result["text_mode"] = self.text_mode
+            if self.code_hash is not None:
+                result["code_hash"] = self.code_hash
+
+    def to_dict(self, node_lookup: bool = False, containment: str = "edges") -> Dict:
+        """
+        Convert to the public format with one dictionary per node and edge.
+
+        Args:
+            node_lookup: Whether to include "node_lookup", mapping node IDs to node indices
+            containment: 'edges' (default) to emit a "contains" edge per child node,
+                         or 'parent' to give each node the index of its parent
+                         (None for the root) and its field name instead, so
+                         that "edges" only holds semantic edges
+
+        Returns:
+            Dictionary with "language", "nodes", "edges" and "root"
+        """
+        # 转换为每个节点、每条边一个字典的公开格式。
+        # containment为parent时，每个节点带父节点下标（根节点为None）和字段名，edges只包含语义边。
+        node_types = self.node_types
+        ids = [
+            f"{node_types[type_id]}_{start}_{end}"
+            for type_id, start, end in zip(self.type, self.start_byte, self.end_byte)
+        ]
+        nodes = [
+            {
+                "id": node_id,
+                "type": node_types[type_id],
+                "text": text,
+                "start_byte": start_byte,
+                "end_byte": end_byte,
+                "start_line": start_line,
+                "start_col": start_col,
+                "end_line": end_line,
+                "end_col": end_col
+            }
+            for node_id, type_id, text, start_byte, end_byte, start_line, start_col, end_line, end_col in zip(
+                ids, self.type, self.text, self.start_byte, self.end_byte,
+                self.start_line, self.start_col, self.end_line, self.end_col
+            )
+        ]
+        # 每个节点的公开ID只在这里生成一次。
+        if self.text_mode == "spans":
+            for node in nodes:
+                if node["text"] is None:
+                    del node["text"]
+        # spans模式下不带文本的节点省略text字段。
+
+        fields = self.fields
+        edges = []
+        if containment == "parent":
+            for node, parent, field_id in zip(nodes, self.parent, self.field):
+                node["parent"] = parent if parent >= 0 else None
+                if field_id >= 0:
+                    node["field"] = fields[field_id]
+        else:
+            for index in range(1, len(ids)):
+                edge = {"source": ids[self.parent[index]], "target": ids[index], "type": "contains"}
+                field_id = self.field[index]
+                if field_id >= 0:
+                    edge["field"] = fields[field_id]
+                edges.append(edge)
+        # 包含关系：写入节点的parent字段，或生成带字段名的contains边。
+
+        edge_types = self.edge_types
+        edges.extend(
+            {"source": ids[source], "target": ids[target], "type": edge_types[type_id]}
+            for source, target, type_id in zip(self.edge_source, self.edge_target, self.edge_type)
+        )
+        # 将语义边数组转换为边字典。
+
+        result = {
+            "language": self.language,
+            "nodes": nodes,
+            "edges": edges,
+            "root": ids[self.root] if ids else None
+        }
+        if containment == "parent":
+            result["containment"] = containment
+        self.add_source_info(result)
+        if node_lookup:
+            result["node_lookup"] = {node_id: index for index, node_id in enumerate(ids)}
+        return result
+
+    def to_columnar(self, containment: str = "edges") -> Dict:
+        """
+        Convert to the columnar format.
+
+        Nodes are referred to by index. Node types, edge types and node
+        texts are interned into tables, node positions are parallel
+        columns, and edges are three parallel columns ("edge_source",
+        "edge_target" and "edge_type"), plus "edge_field" with an
+        "edge_fields" table when edges carry field names.
+
+        Args:
+            containment: 'edges' (default) to emit containment as "contains"
+                         edges, or 'parent' for "parent" and "field" node
+                         columns (as in the columnar AST) with only semantic
+                         edges in the edge columns
+
+        Returns:
+            Dictionary with the interned tables and parallel columns
+        """
+        # 转换为列式格式：节点以下标引用，节点类型、边类型和节点文本驻留在表中，节点位置为并行列，边为源、目标、类型三列（带字段名时另有字段列）。
+        # containment为parent时，包含关系以parent和field节点列表示（与列式AST相同），边列只包含语义边。
+        text_ids: Dict[str, int] = {}
+        texts = []
+        for text in self.text:
+            if text is None:
+                texts.append(-1)
+                continue
+            text_id = text_ids.get(text)
+            if text_id is None:
+                text_id = text_ids[text] = len(text_ids)
+            texts.append(text_id)
+        # 驻留节点文本。
+
+        result = {
+            "format": "columnar",
+            "language": self.language,
+            "node_count": self.node_count,
+            "root": self.root,
+            "node_types": list(self.node_types),
+            "type": self.type.tolist()
+        }
+        if containment == "parent":
+            result["containment"] = containment
+            result["parent"] = self.parent.tolist()
+            if self.fields:
+                result["fields"] = list(self.fields)
+                result["field"] = self.field.tolist()
+        for column in POSITION_COLUMNS:
+            result[column] = getattr(self, column).tolist()
+        self.add_source_info(result)
+        result["texts"] = list(text_ids)
+        result["text"] = texts
+
+        if containment == "parent":
+            result["edge_types"] = list(self.edge_types)
+            result["edge_source"] = self.edge_source.tolist()
+            result["edge_target"] = self.edge_target.tolist()
+            result["edge_type"] = self.edge_type.tolist()
+            return result
+        # parent模式下边列只包含语义边。
+
+        child_count = max(self.node_count - 1, 0)
+        has_contains = child_count > 0
+        offset = 1 if has_contains else 0
+        result["edge_types"] = (["contains"] if has_contains else []) + list(self.edge_types)
+        result["edge_source"] = self.parent.tolist()[1:] + self.edge_source.tolist()
+        result["edge_target"] = list(range(1, child_count + 1)) + self.edge_target.tolist()
+        result["edge_type"] = [0] * child_count + [type_id + offset for type_id in self.edge_type]
+        if self.fields:
+            result["edge_fields"] = list(self.fields)
+            result["edge_field"] = self.field.tolist()[1:] + [-1] * self.edge_count
+        return result
+        # 默认模式下先由父节点列生成contains边，再接上语义边（类型编号顺延）。
+
+
+def compact_asg_from_ast(
+    ast: Dict,
+    language: str,
+    text_mode: str = "full",
+    code_hash: Optional[str] = None
+) -> Tuple[CompactASG, Dict[Tuple[str, int, int], int]]:
+    """
+    Build the nodes and containment of an ASG from a dictionary AST.
+
+    Args:
+        ast: Root node of an AST from parse_code_to_ast
+        language: Language identifier of the AST
+        text_mode: Node text to keep ('full' or 'spans', see ASG_TEXT_MODES)
+        code_hash: Hash of the source the AST was parsed from (optional)
+
+    Returns:
+        The ASG and a lookup from (type, start_byte, end_byte) to node id,
+        for attaching edges that refer to nodes by their public IDs
+    """
+    # 从字典形式的AST构建ASG的节点和包含关系。
+    # 同时返回(类型, 起始字节, 结束字节)到节点ID的查找表，用于添加以公开ID引用节点的边。
+    asg = CompactASG(language, text_mode, code_hash)
+    full_text = text_mode == "full"
+    index_of: Dict[Tuple[str, int, int], int] = {}
+    stack = [(ast, -1)]
+    while stack:
+        node, parent = stack.pop()
+        start_point = node["start_point"]
+        end_point = node["end_point"]
+        index = asg.add_node(
+            node["type"], node["start_byte"], node["end_byte"],
+            start_point["row"], start_point["column"], end_point["row"], end_point["column"],
+            node.get("text") if full_text or inlines_text(node["type"]) else None,
+            parent, node.get("field")
+        )
+        index_of.setdefault((node["type"], node["start_byte"], node["end_byte"]), index)
+        children = node.get("children")
+        if children:
+            stack.extend((child, index) for child in reversed(children))
+    # 用显式栈按先序遍历，添加节点及其父节点和字段名（具名模式下）。
+    return asg, index_of
+
+
+def add_edges_by_id(asg: CompactASG, index_of: Dict[Tuple[str, int, int], int], edges: List[Dict]) -> None:
+    """Add edges given as {"source", "target", "type"} dicts with public node IDs."""
+    # 添加以公开节点ID表示的边（{"source", "target", "type"}字典），跳过指向未知节点的边。
+    for edge in edges:
+        source = index_of.get(parse_node_id(edge["source"]))
+        target = index_of.get(parse_node_id(edge["target"]))
+        if source is not None and target is not None:
+            asg.add_edge(source, target, edge["type"])
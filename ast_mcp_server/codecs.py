@@ -0,0 +1,166 @@
+"""
+Serialization codecs for cached resources and tool responses.
+
+Cached ASTs and ASGs can be large, and JSON is slow to write and parse at
+that size. This module provides a small pluggable codec layer: JSON is
+always available, and compact binary codecs (MessagePack, CBOR) are used
+when their optional packages are installed.
+"""
+# 缓存资源和工具响应的序列化编解码器模块。
+# 缓存的AST和ASG可能很大，JSON在这种规模下读写都较慢。
+# 本模块提供可插拔的编解码层：JSON始终可用，安装了可选依赖时使用更紧凑的二进制编码（MessagePack、CBOR）。
+
+import base64
+import importlib
+import importlib.util
+import json
+import os
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+
+@lru_cache(maxsize=None)
+def module_installed(module_name: str) -> bool:
+    """Check whether an optional package is installed, without importing it."""
+    # 检查可选依赖是否已安装，但不导入它。
+    return importlib.util.find_spec(module_name) is not None
+# 可选依赖在首次编解码时才导入，未安装时对应编解码器不可用。
+
+# Environment variable selecting the codec used for cache files
+CACHE_CODEC_ENV = "AST_MCP_CACHE_CODEC"
+# 用于选择缓存文件编解码器的环境变量。
+
+
+class JsonCodec:
+    """JSON codec, always available."""
+    # JSON编解码器，始终可用。
+
+    name = "json"
+    extension = "json"
+    package = None  # Package to install for the codec (none needed)
+
+    @staticmethod
+    def available() -> bool:
+        return True
+
+    @staticmethod
+    def dumps(data: Any) -> bytes:
+        return json.dumps(data, separators=(",", ":")).encode("utf-8")
+
+    @staticmethod
+    def loads(payload: bytes) -> Any:
+        return json.loads(payload)
+
+
+class MsgpackCodec:
+    """MessagePack codec, requires the msgpack package."""
+    # MessagePack编解码器，需要安装msgpack。
+
+    name = "msgpack"
+    extension = "msgpack"
+    package = "msgpack"
+
+    @staticmethod
+    def available() -> bool:
+        return module_installed("msgpack")
+
+    @staticmethod
+    def dumps(data: Any) -> bytes:
+        return importlib.import_module("msgpack").packb(data, use_bin_type=True)
+
+    @staticmethod
+    def loads(payload: bytes) -> Any:
+        return importlib.import_module("msgpack").unpackb(payload, raw=False, strict_map_key=False)
+
+
+class CborCodec:
+    """CBOR codec, requires the cbor2 package."""
+    # CBOR编解码器，需要安装cbor2。
+
+    name = "cbor"
+    extension = "cbor"
+    package = "cbor2"
+
+    @staticmethod
+    def available() -> bool:
+        return module_installed("cbor2")
+
+    @staticmethod
+    def dumps(data: Any) -> bytes:
+        return importlib.import_module("cbor2").dumps(data)
+
+    @staticmethod
+    def loads(payload: bytes) -> Any:
+        return importlib.import_module("cbor2").loads(payload)
+
+
+# Codecs by name, in order of preference for the cache
+CODECS = {
+    codec.name: codec
+    for codec in (MsgpackCodec, CborCodec, JsonCodec)
+}
+# 按名称索引的编解码器，顺序即缓存的优先顺序。
+
+
+def available_codecs() -> List[str]:
+    """Get the names of the codecs whose dependencies are installed."""
+    # 获取依赖已安装、可以使用的编解码器名称。
+    return [name for name, codec in CODECS.items() if codec.available()]
+
+
+def get_codec(name: Optional[str] = None):
+    """
+    Get a codec by name.
+
+    Args:
+        name: Codec name ('json', 'msgpack' or 'cbor'). If not provided, the
+              codec named by AST_MCP_CACHE_CODEC is used, or else the first
+              available binary codec, falling back to JSON.
+
+    Returns:
+        The codec class
+
+    Raises:
+        ValueError: If the codec is unknown or its package is not installed
+    """
+    # 按名称获取编解码器。
+    # 未指定名称时依次使用环境变量AST_MCP_CACHE_CODEC指定的编解码器、首个可用的二进制编解码器，最后回退到JSON。
+    if name is None:
+        name = os.environ.get(CACHE_CODEC_ENV)
+        if name is None:
+            return CODECS[available_codecs()[0]]
+
+    codec = CODECS.get(name.lower())
+    if codec is None:
+        raise ValueError(f"Unknown codec: {name} (expected one of {', '.join(CODECS)})")
+    if not codec.available():
+        raise ValueError(f"Codec {name} is not available. Install the '{codec.package}' package to use it.")
+    return codec
+
+
+def encode_response(data: Dict, encoding: str = "json") -> Dict:
+    """
+    Encode a tool response with the codec the client opted into.
+
+    JSON responses are returned unchanged. For binary codecs the payload is
+    wrapped as {"encoding": name, "data": base64 string}.
+
+    Args:
+        data: The tool response
+        encoding: Codec name requested by the client
+
+    Returns:
+        The response, encoded if a binary codec was requested
+    """
+    # 按客户端选择的编解码器编码工具响应。
+    # JSON直接返回原结果；二进制编码时包装为{"encoding": 名称, "data": base64字符串}。
+    if encoding == "json" or "error" in data:
+        return data
+    try:
+        codec = get_codec(encoding)
+    except ValueError as e:
+        return {"error": str(e)}
+    return {
+        "encoding": codec.name,
+        "data": base64.b64encode(codec.dumps(data)).decode("ascii")
+    }
@@ -0,0 +1,398 @@
+"""
+Source edits for incremental parsing.
+
+tree-sitter reparses a changed source incrementally when the previous tree
+is first told where the source changed (Tree.edit): only the parts of the
+tree around the edit are rebuilt. This module derives those edits from the
+old and new source buffers (one per changed region, so that changes in
+separate places of a file are reparsed separately), or from editor-style
+(line, character) range edits through a line index of the source.
+"""
+# 增量解析所用的源码编辑模块。
+# 先通过Tree.edit告知旧语法树源码的变更位置，tree-sitter即可增量地重新解析，只重建编辑附近的部分。
+# 本模块根据新旧源码缓冲区推导出这些编辑（每个变更区域一个，使文件中不同位置的修改分别重新解析），
+# 或借助源码的行索引根据编辑器风格的(行, 字符)范围编辑推导出编辑。
+
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from itertools import accumulate
+from typing import Dict, List, Tuple
+from tree_sitter import Tree
+
+# Units of the character offsets in (line, character) positions, as in the
+# Language Server Protocol: UTF-16 code units (the LSP default), bytes or code points
+POSITION_ENCODINGS = ("utf-16", "utf-8", "utf-32")
+# (行, 字符)位置中字符偏移的单位，与语言服务器协议相同：UTF-16码元（LSP默认）、字节或码点。
+
+# Changed regions up to this size (in bytes) are not split into hunks
+SINGLE_HUNK_LIMIT = 4096
+# Hunks separated by fewer bytes than this are merged
+MIN_HUNK_GAP = 64
+# Maximum number of hunks an edit between two buffers is split into
+MAX_HUNKS = 16
+# 不超过该大小（字节）的变更区域不再拆分为区块；间隔小于MIN_HUNK_GAP字节的区块会合并；两个缓冲区之间的编辑最多拆分为MAX_HUNKS个区块。
+
+
+def common_prefix_length(old: bytes, new: bytes) -> int:
+    """Length of the longest common prefix of two buffers."""
+    # 两个缓冲区最长公共前缀的长度。
+    low, high = 0, min(len(old), len(new))
+    while low < high:
+        middle = (low + high + 1) // 2
+        if old[low:middle] == new[low:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+    # 二分查找，每步只比较尚未确认的一段，总比较量与缓冲区长度成线性关系。
+
+
+def common_suffix_length(old: bytes, new: bytes, limit: int) -> int:
+    """Length of the longest common suffix of two buffers, at most limit."""
+    # 两个缓冲区最长公共后缀的长度，不超过limit。
+    old_length, new_length = len(old), len(new)
+    low, high = 0, limit
+    while low < high:
+        middle = (low + high + 1) // 2
+        if old[old_length - middle:old_length - low] == new[new_length - middle:new_length - low]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def diff_hunks(old: bytes, new: bytes) -> List[Tuple[int, int, int, int]]:
+    """
+    Find the regions that differ between two source buffers.
+
+    Everything between the common prefix and the common suffix changed.
+    When that middle part is large, it is split further with a line diff
+    anchored on lines that occur exactly once in both versions (as in
+    patience diff), so that edits in separate places of a file become
+    separate hunks. Hunks closer than MIN_HUNK_GAP bytes are merged, and at
+    most MAX_HUNKS are returned.
+
+    Args:
+        old: The previous UTF-8 source
+        new: The new UTF-8 source
+
+    Returns:
+        List of (old start, old end, new start, new end) byte ranges in
+        ascending order, empty if the buffers are equal
+    """
+    # 找出两个源码缓冲区之间不同的区域。公共前缀与公共后缀之间的部分都视为变更；
+    # 该部分较大时，再以在两个版本中都只出现一次的行为锚点（同patience diff）做行级比较，使文件中不同位置的编辑成为不同的区块。
+    # 间隔小于MIN_HUNK_GAP字节的区块会合并，最多返回MAX_HUNKS个区块。
+    if old == new:
+        return []
+    start = common_prefix_length(old, new)
+    suffix = common_suffix_length(old, new, min(len(old), len(new)) - start)
+    old_end = len(old) - suffix
+    new_end = len(new) - suffix
+    if max(old_end, new_end) - start <= SINGLE_HUNK_LIMIT:
+        return [(start, old_end, start, new_end)]
+    # 中间部分较小时直接作为单个区块。
+
+    old_lines = old[start:old_end].splitlines(keepends=True)
+    new_lines = new[start:new_end].splitlines(keepends=True)
+    old_offsets = list(accumulate(map(len, old_lines), initial=start))
+    new_offsets = list(accumulate(map(len, new_lines), initial=start))
+    # 各行（含行尾符）相对于整个缓冲区的起始偏移。
+
+    hunks = []
+    for old_first, old_last, new_first, new_last in line_hunks(old_lines, new_lines):
+        hunk_old_start, hunk_old_end = old_offsets[old_first], old_offsets[old_last]
+        hunk_new_start, hunk_new_end = new_offsets[new_first], new_offsets[new_last]
+        old_part, new_part = old[hunk_old_start:hunk_old_end], new[hunk_new_start:hunk_new_end]
+        prefix = common_prefix_length(old_part, new_part)
+        trim = common_suffix_length(old_part, new_part, min(len(old_part), len(new_part)) - prefix)
+        if old_part != new_part:
+            hunks.append((hunk_old_start + prefix, hunk_old_end - trim, hunk_new_start + prefix, hunk_new_end - trim))
+    # 将行范围转换为字节范围，并去掉区块内首尾相同的字节，使单个字符的修改得到最小的区块。
+
+    return merge_hunks(hunks) if hunks else [(start, old_end, start, new_end)]
+
+
+def line_hunks(old_lines: List[bytes], new_lines: List[bytes]) -> List[Tuple[int, int, int, int]]:
+    """
+    Diff two lists of lines, anchoring on lines unique in both (patience diff).
+
+    Returns:
+        List of (old first, old last, new first, new last) line ranges
+        (last exclusive) that differ, in ascending order
+    """
+    # 对两组行做比较，以在两边都唯一的行为锚点（patience diff），返回不同的行范围（不含末尾）。
+    hunks = []
+    pending = [(0, len(old_lines), 0, len(new_lines))]
+    while pending:
+        old_low, old_high, new_low, new_high = pending.pop()
+        while old_low < old_high and new_low < new_high and old_lines[old_low] == new_lines[new_low]:
+            old_low += 1
+            new_low += 1
+        while old_low < old_high and new_low < new_high and old_lines[old_high - 1] == new_lines[new_high - 1]:
+            old_high -= 1
+            new_high -= 1
+        if old_low == old_high and new_low == new_high:
+            continue
+        # 去掉首尾相同的行；两边都为空时没有差异。
+
+        anchors = unique_line_anchors(old_lines, new_lines, old_low, old_high, new_low, new_high)
+        if not anchors:
+            hunks.append((old_low, old_high, new_low, new_high))
+            continue
+        # 没有锚点时整个范围作为一个区块。
+
+        previous_old, previous_new = old_low, new_low
+        for old_index, new_index in anchors:
+            if old_index != previous_old or new_index != previous_new:
+                pending.append((previous_old, old_index, previous_new, new_index))
+            previous_old, previous_new = old_index + 1, new_index + 1
+        pending.append((previous_old, old_high, previous_new, new_high))
+        # 锚点之间的非空各段继续比较。
+    hunks.sort()
+    return hunks
+
+
+def unique_line_anchors(
+    old_lines: List[bytes], new_lines: List[bytes], old_low: int, old_high: int, new_low: int, new_high: int
+) -> List[Tuple[int, int]]:
+    """Get the longest in-order sequence of (old index, new index) pairs of lines occurring once in each range."""
+    # 获取在两边范围内都只出现一次的行所组成的最长保序(旧行号, 新行号)序列。
+    old_range, new_range = old_lines[old_low:old_high], new_lines[new_low:new_high]
+    old_counts, new_counts = Counter(old_range), Counter(new_range)
+    old_index = dict(zip(old_range, range(old_low, old_high)))
+    pairs = [
+        (old_index[line], index) for index, line in enumerate(new_range, new_low)
+        if new_counts[line] == 1 and old_counts[line] == 1
+    ]
+    pairs.sort()
+    new_indices = [new_index for _, new_index in pairs]
+    if new_indices == sorted(new_indices):
+        return pairs
+    # 找出在两边都恰好出现一次的行，按旧行号排序；没有行移动时它们的新行号已经递增，全部都是锚点。
+
+    tails = []  # tails[k]: new index ending the best increasing sequence of length k + 1
+    tail_pairs = []
+    previous = [None] * len(pairs)
+    for position, (_, new_index) in enumerate(pairs):
+        length = bisect_left(tails, new_index)
+        if length == len(tails):
+            tails.append(new_index)
+            tail_pairs.append(position)
+        else:
+            tails[length] = new_index
+            tail_pairs[length] = position
+        previous[position] = tail_pairs[length - 1] if length else None
+    # 按新行号求最长递增子序列（耐心排序），即两边顺序一致的最多锚点。
+
+    anchors = []
+    position = tail_pairs[-1] if tail_pairs else None
+    while position is not None:
+        anchors.append(pairs[position])
+        position = previous[position]
+    anchors.reverse()
+    return anchors
+
+
+def merge_hunks(hunks: List[Tuple[int, int, int, int]]) -> List[Tuple[int, int, int, int]]:
+    """Merge hunks closer than MIN_HUNK_GAP bytes, keeping at most MAX_HUNKS (split at the widest gaps)."""
+    # 合并间隔小于MIN_HUNK_GAP字节的区块，最多保留MAX_HUNKS个（在间隔最大处分开）。
+    gaps = [hunks[index + 1][0] - hunks[index][1] for index in range(len(hunks) - 1)]
+    splits = {index for index, gap in enumerate(gaps) if gap >= MIN_HUNK_GAP}
+    if len(splits) >= MAX_HUNKS:
+        splits = set(sorted(splits, key=lambda index: gaps[index], reverse=True)[:MAX_HUNKS - 1])
+    merged = [hunks[0]]
+    for index in range(1, len(hunks)):
+        if index - 1 in splits:
+            merged.append(hunks[index])
+        else:
+            old_start, _, new_start, _ = merged[-1]
+            merged[-1] = (old_start, hunks[index][1], new_start, hunks[index][3])
+    return merged
+
+
+def diff_edits(old: bytes, new: bytes) -> List[Dict]:
+    """
+    Find the edits turning one source buffer into another.
+
+    The edits are the hunks of diff_hunks, in ascending order, in the form
+    Tree.edit expects when they are applied one after another: each one's
+    positions are relative to the source with the previous ones applied.
+    Points are found by counting the newlines between consecutive edits,
+    so the whole conversion scans the new source once.
+
+    Args:
+        old: The previous UTF-8 source
+        new: The new UTF-8 source
+
+    Returns:
+        List of Tree.edit arguments (start_byte, old_end_byte, new_end_byte
+        and the matching points), empty if the buffers are equal
+    """
+    # 找出把一个源码缓冲区变为另一个的编辑：diff_hunks的各区块按升序排列，并转换为依次调用Tree.edit所需的形式，
+    # 每个编辑的位置都相对于已应用之前编辑的源码。位置通过统计相邻编辑之间的换行符得到，整个转换只扫描新源码一次。
+    edits = []
+    row, line_start, offset = 0, 0, 0  # Point of the last converted offset in the new source
+    for old_start, old_end, new_start, new_end in diff_hunks(old, new):
+        newlines = new.count(b"\n", offset, new_start)
+        if newlines:
+            row += newlines
+            line_start = new.rfind(b"\n", offset, new_start) + 1
+        start_point = (row, new_start - line_start)
+        # 在已应用之前编辑的源码中，编辑起点之前的内容与新源码相同，因此起点位置按新源码计算。
+
+        removed = old[old_start:old_end]
+        removed_newlines = removed.count(b"\n")
+        if removed_newlines:
+            old_end_point = (row + removed_newlines, len(removed) - removed.rfind(b"\n") - 1)
+        else:
+            old_end_point = (row, start_point[1] + len(removed))
+        # 被替换文本的结束位置由起点加上被替换的内容得到。
+
+        newlines = new.count(b"\n", new_start, new_end)
+        if newlines:
+            row += newlines
+            line_start = new.rfind(b"\n", new_start, new_end) + 1
+        offset = new_end
+        edits.append({
+            "start_byte": new_start,
+            "old_end_byte": new_start + old_end - old_start,
+            "new_end_byte": new_end,
+            "start_point": start_point,
+            "old_end_point": old_end_point,
+            "new_end_point": (row, new_end - line_start)
+        })
+    return edits
+
+
+def edited_copy(tree: Tree, edits: List[Dict]) -> Tree:
+    """Get a copy of a tree with edits from diff_edits applied, leaving the tree itself unchanged."""
+    # 获取依次应用了diff_edits所得编辑的语法树副本，原语法树保持不变。
+    edited = tree.copy()
+    for edit in edits:
+        edited.edit(**edit)
+    return edited
+
+
+def changed_ranges(old_tree: Tree, new_tree: Tree) -> List[Dict]:
+    """
+    Get the ranges whose syntactic structure differs between two trees.
+
+    Args:
+        old_tree: The previous tree, with the edits already applied
+        new_tree: The tree reparsed from it
+
+    Returns:
+        List of ranges with start/end bytes and points
+    """
+    # 获取两棵语法树之间语法结构发生变化的范围；旧语法树须已应用编辑。
+    return [
+        {
+            "start_byte": changed.start_byte,
+            "end_byte": changed.end_byte,
+            "start_point": {"row": changed.start_point[0], "column": changed.start_point[1]},
+            "end_point": {"row": changed.end_point[0], "column": changed.end_point[1]}
+        }
+        for changed in old_tree.changed_ranges(new_tree)
+    ]
+
+
+class LineIndex:
+    """
+    Byte offsets of the line starts of a source buffer.
+
+    Converts between byte offsets and (row, column) points, and between
+    editor positions and byte offsets. An edit only shifts the line starts
+    after it, so the index is updated in place instead of rebuilt.
+    """
+    # 源码缓冲区各行起始的字节偏移。用于在字节偏移与(行, 列)位置、编辑器位置与字节偏移之间转换；
+    # 编辑只会平移其后的行起始位置，因此原地更新索引而不必重建。
+
+    __slots__ = ("starts",)
+
+    def __init__(self, source: bytes):
+        self.starts = list(accumulate((len(line) + 1 for line in source.split(b"\n")), initial=0))
+        self.starts.pop()
+        # 每行起始偏移为之前各行长度（含换行符）之和；最后一个累加值是缓冲区末尾之后的位置，不是行起始。
+
+    def point(self, offset: int) -> Tuple[int, int]:
+        """Get the (row, column) point of a byte offset, with the column in bytes."""
+        # 获取字节偏移对应的(行, 列)位置，列以字节计。
+        row = bisect_right(self.starts, offset) - 1
+        return row, offset - self.starts[row]
+
+    def offset(self, source: bytes, line: int, character: int, encoding: str = "utf-16") -> int:
+        """
+        Get the byte offset of an editor position.
+
+        As in the Language Server Protocol, a line past the end means the
+        end of the source, and a character past the end of its line means
+        the end of the line.
+
+        Args:
+            source: The UTF-8 source the index was built for
+            line: Line number (0-based)
+            character: Offset in the line, in units of the encoding
+            encoding: 'utf-16' (default), 'utf-8' (bytes) or 'utf-32' (code points)
+
+        Returns:
+            The byte offset in the source
+        """
+        # 获取编辑器位置对应的字节偏移。与语言服务器协议相同，超出末行表示源码末尾，超出行尾的字符偏移表示行尾。
+        if line >= len(self.starts):
+            return len(source)
+        start = self.starts[line]
+        end = self.starts[line + 1] - 1 if line + 1 < len(self.starts) else len(source)
+        if end > start and source[end - 1] == 0x0D:
+            end -= 1
+        # 行尾不含换行符（包括\r\n中的\r）。
+
+        text = source[start:end]
+        if encoding == "utf-8" or text.isascii():
+            return start + min(character, len(text))
+        # ASCII行中各种编码的字符偏移都等于字节偏移。
+
+        if encoding == "utf-32":
+            prefix = text.decode("utf-8")[:character]
+        else:
+            prefix = text.decode("utf-8").encode("utf-16-le")[:2 * character].decode("utf-16-le", "ignore")
+        return start + len(prefix.encode("utf-8"))
+        # 截取该行前character个字符（或UTF-16码元，落在代理对中间时舍去半个字符），其UTF-8长度即列的字节偏移。
+
+    def replace(self, start_byte: int, old_end_byte: int, new_text: bytes) -> None:
+        """Update the index for the bytes from start_byte to old_end_byte being replaced by new_text."""
+        # 将start_byte到old_end_byte之间的字节替换为new_text后更新索引。
+        starts = self.starts
+        first = bisect_right(starts, start_byte)
+        last = bisect_right(starts, old_end_byte)
+        delta = len(new_text) - (old_end_byte - start_byte)
+        inserted = list(accumulate((len(line) + 1 for line in new_text.split(b"\n")), initial=start_byte))[1:-1]
+        starts[first:] = inserted + [line_start + delta for line_start in starts[last:]]
+        # 被替换字节中的换行符所开始的行被移除，换上新文本中的行；其后各行起始位置平移长度差。
+
+
+def apply_range_edit(source: bytes, lines: LineIndex, start_byte: int, old_end_byte: int, new_text: bytes) -> Tuple[bytes, Dict]:
+    """
+    Replace a byte range of a source, updating its line index.
+
+    Args:
+        source: The UTF-8 source
+        lines: The line index of the source (updated in place)
+        start_byte: Start of the replaced range
+        old_end_byte: End of the replaced range
+        new_text: The UTF-8 replacement text
+
+    Returns:
+        The new source and the matching Tree.edit arguments
+    """
+    # 替换源码中的一段字节范围并更新行索引，返回新源码和对应的Tree.edit参数。
+    edit = {
+        "start_byte": start_byte,
+        "old_end_byte": old_end_byte,
+        "new_end_byte": start_byte + len(new_text),
+        "start_point": lines.point(start_byte),
+        "old_end_point": lines.point(old_end_byte)
+    }
+    lines.replace(start_byte, old_end_byte, new_text)
+    edit["new_end_point"] = lines.point(edit["new_end_byte"])
+    return source[:start_byte] + new_text + source[old_end_byte:], edit
@@ -8,144 +8,124 @@ optimizations for handling large codebases.
 # 增强版AST/ASG分析工具，适用于MCP服务器。
 # 本模块提供了更好的作用域处理、更完整的边检测和大规模代码库的性能优化。
 
-from typing import Dict, List, Optional, Union, Any, Set, Tuple
-import os
+from typing import Dict, List, Optional, Union, Any, Tuple
 import json
-from tree_sitter import Language, Parser, Node, Tree, TreeCursor
-from collections import defaultdict
+from tree_sitter import Node, Tree
 
 from .tools import (
-    PARSERS_DIR, LANGUAGES_LIB, LANGUAGE_MAP, 
-    detect_language, node_to_dict, parser, languages,
-    init_parsers
+    LANGUAGE_MAP, StructureVisitor,
+    detect_language, init_parsers, get_language, parse_code_to_tree, empty_code_structure
 )
+from .serialization import Projection, cursor_to_dict, make_text_slicer
+from .codecs import encode_response
+from .parser_pool import parser_pool
+from .visitors import TreeWalker, DictTreeWalker, NodeAccess, DictNodeAccess
+from .symbols import (
+    OuterBinding, make_scope_resolver, java_positional_fields, javascript_positional_fields, python_positional_fields
+)
+from .languages import LANGUAGE_SPECS, get_language_plugin
+from .asg_model import CompactASG, check_asg_options, compact_asg_from_ast, add_edges_by_id, inlines_text
+from .tree_store import tree_store
+from .edits import changed_ranges, diff_edits, edited_copy
+from .sessions import update_session
+from .tree_diff import diff_trees
+from .symbol_diff import collect_definitions, diff_definitions
+from .positions import ancestors_of, node_at_point, node_info
 
-# Types of control flow nodes in Python
-PYTHON_CONTROL_FLOW_NODES = {
-    "if_statement", "for_statement", "while_statement", 
-    "try_statement", "with_statement", "match_statement"
+# Positional field lookups for dictionary ASTs serialized without field names, by language
+POSITIONAL_FIELDS = {
+    "python": python_positional_fields,
+    "javascript": javascript_positional_fields,
+    "typescript": javascript_positional_fields,
+    "java": java_positional_fields
 }
+# 按语言索引的位置字段查找函数，用于未带字段名序列化的字典AST。
 
-# Types of nodes that create new scopes in Python
-PYTHON_SCOPE_NODES = {
-    "function_definition", "class_definition",
-    "for_statement", "while_statement", "with_statement"
-}
 
-class ScopeManager:
-    """Manages scope hierarchy for semantic analysis."""
-    # 管理语义分析中的作用域层级。
-    
-    def __init__(self):
-        self.scopes = {}  # Maps scope_id to parent_scope_id
-        self.variables = defaultdict(dict)  # Maps scope_id -> {var_name: var_id}
-        self.functions = {}  # Maps func_name to func_id
-        self.classes = {}    # Maps class_name to class_id
-        self.imports = {}    # Maps import_name to import_id
-        self.global_scope = "global"
-        self.control_flow = []  # Stack of control flow nodes
-        
-    def enter_scope(self, scope_id: str, parent_scope_id: Optional[str] = None) -> str:
-        """
-        Enter a new scope.
-        
-        Args:
-            scope_id: ID of the new scope
-            parent_scope_id: ID of the parent scope (None for global scope)
-            
-        Returns:
-            The scope_id for chaining
-        """
-        # 进入一个新作用域。
-        # scope_id：新作用域的ID；parent_scope_id：父作用域ID（全局作用域时为None）
-        if parent_scope_id is None:
-            parent_scope_id = self.global_scope
-            
-        self.scopes[scope_id] = parent_scope_id
-        return scope_id
-    
-    def get_parent_scope(self, scope_id: str) -> Optional[str]:
-        """Get the parent scope of the given scope."""
-        # 获取给定作用域的父作用域。
-        return self.scopes.get(scope_id)
-    
-    def add_variable(self, var_name: str, var_id: str, scope_id: str) -> None:
-        """Add a variable to the current scope."""
-        # 向当前作用域添加变量。
-        self.variables[scope_id][var_name] = var_id
-    
-    def add_function(self, func_name: str, func_id: str) -> None:
-        """Add a function definition."""
-        # 添加函数定义。
-        self.functions[func_name] = func_id
-    
-    def add_class(self, class_name: str, class_id: str) -> None:
-        """Add a class definition."""
-        # 添加类定义。
-        self.classes[class_name] = class_id
-    
-    def add_import(self, import_name: str, import_id: str) -> None:
-        """Add an import definition."""
-        # 添加import定义。
-        self.imports[import_name] = import_id
-    
-    def find_variable(self, var_name: str, scope_id: str) -> Optional[str]:
-        """
-        Find a variable in the scope hierarchy.
-        Looks in current scope first, then parent scopes.
-        
-        Args:
-            var_name: Name of the variable to find
-            scope_id: ID of the scope to start the search from
-            
-        Returns:
-            The variable ID if found, None otherwise
-        """
-        # 在作用域层级中查找变量，先查当前作用域，再查父作用域。
-        current_scope = scope_id
-        
-        while current_scope is not None:
-            if var_name in self.variables[current_scope]:
-                return self.variables[current_scope][var_name]
-            
-            # Move up to parent scope
-            current_scope = self.get_parent_scope(current_scope)
-        
-        return None
+def parse_tree_incremental(
+    code: str,
+    language: Optional[str] = None,
+    filename: Optional[str] = None,
+    previous_tree: Optional[Tree] = None,
+    old_code: Optional[str] = None,
+    code_id: Optional[str] = None
+) -> Dict:
+    """
+    Parse code into a native tree, incrementally when a previous version is known.
+
+    The previous version is either previous_tree with its source old_code,
+    or the document session of code_id (which is then updated to the new
+    code). The edits between the two versions are inferred from the two
+    buffers (see edits.diff_edits) and applied to a copy of the previous
+    tree with Tree.edit, and only the code around them is reparsed.
+
+    Args:
+        code: Source code to parse
+        language: Programming language identifier (optional)
+        filename: Source file name (optional, used for language detection)
+        previous_tree: Tree parsed from old_code (optional)
+        old_code: Source previous_tree was parsed from (required with previous_tree)
+        code_id: Document session identifier (optional, see sessions)
+
+    Returns:
+        Dictionary with the normalized language, the Tree ("tree"), the UTF-8
+        source ("source_bytes") and, when parsed incrementally, the ranges
+        whose syntactic structure changed ("changed_ranges"), or an error
+    """
+    # 将代码解析为原生语法树；已知旧版本时增量解析。
+    # 旧版本来自previous_tree及其源码old_code，或code_id对应的文档会话（会话随之更新到新代码）。
+    # 两个版本之间的编辑由新旧缓冲区推导得出，通过Tree.edit应用到旧语法树的副本上，只重新解析编辑附近的代码。
+    if code_id is not None:
+        session, changed, error = update_session(code_id, code, language, filename)
+        if error:
+            return error
+        return {
+            "language": session.language,
+            "tree": session.tree,
+            "source_bytes": session.source_bytes,
+            "changed_ranges": changed
+        }
+    # 使用文档会话中保存的语法树和源码。
+
+    if previous_tree is None or old_code is None:
+        return parse_code_to_tree(code, language, filename)
+    # 没有旧版本时全量解析。
+
+    # Check that the parsers are available (grammars are loaded on first use)
+    if not init_parsers():
+        return {"error": "Tree-sitter language parsers not available. Run build_parsers.py first."}
+    # 检查解析器是否可用，语法在首次使用时才加载。
     
-    def find_function(self, func_name: str) -> Optional[str]:
-        """Find a function by name."""
-        # 通过名称查找函数。
-        return self.functions.get(func_name)
-    
-    def find_class(self, class_name: str) -> Optional[str]:
-        """Find a class by name."""
-        # 通过名称查找类。
-        return self.classes.get(class_name)
-    
-    def find_import(self, import_name: str) -> Optional[str]:
-        """Find an import by name."""
-        # 通过名称查找import。
-        return self.imports.get(import_name)
-    
-    def enter_control_flow(self, node_id: str) -> None:
-        """Push a control flow node onto the stack."""
-        # 将控制流节点压入栈中。
-        self.control_flow.append(node_id)
-    
-    def exit_control_flow(self) -> Optional[str]:
-        """Pop a control flow node from the stack."""
-        # 从栈中弹出控制流节点。
-        if self.control_flow:
-            return self.control_flow.pop()
-        return None
+    # Detect language if not provided
+    if not language:
+        language = detect_language(code, filename)
+    # 未指定语言时自动检测。
     
-    def get_current_control_flow(self) -> Optional[str]:
-        """Get the current control flow node."""
-        # 获取当前控制流节点。
-        if self.control_flow:
-            return self.control_flow[-1]
-        return None
+    # Normalize language identifier
+    language = LANGUAGE_MAP.get(language.lower(), language.lower())
+    # 规范化语言标识符。
+    
+    # Check if language is supported, loading its grammar on first use
+    grammar = get_language(language)
+    if grammar is None:
+        return {"error": f"Unsupported language: {language}"}
+    # 检查语言是否受支持，首次使用时加载其语法。
+    
+    try:
+        source_bytes = bytes(code, 'utf-8')
+        old_tree = edited_copy(previous_tree, diff_edits(bytes(old_code, 'utf-8'), source_bytes))
+        with parser_pool.parser(language, grammar) as parser:
+            tree = parser.parse(source_bytes, old_tree)
+        # 将推导出的编辑应用到旧语法树的副本上，再从解析器池借出解析器增量解析。
+    except Exception as e:
+        return {"error": f"Error parsing code: {e}"}
+    
+    return {
+        "language": language,
+        "tree": tree,
+        "source_bytes": source_bytes,
+        "changed_ranges": changed_ranges(old_tree, tree)
+    }
 
 
 def parse_code_to_ast_incremental(
@@ -154,14 +134,18 @@ def parse_code_to_ast_incremental(
     filename: Optional[str] = None,
     previous_tree: Optional[Tree] = None,
     old_code: Optional[str] = None,
-    include_children: bool = True
+    include_children: bool = True,
+    text_mode: str = "full",
+    positions: str = "both",
+    named_only: bool = False,
+    code_id: Optional[str] = None
 ) -> Dict:
     """
     Parse code into an AST incrementally using Tree-sitter.
     
-    This is an optimized version that can use a previous tree to
-    only parse the changed parts of the code, which is much faster
-    for large files with small changes.
+    This is an optimized version that can use a previous tree (or the
+    document session of code_id) to only parse the changed parts of the
+    code, which is much faster for large files with small changes.
     
     Args:
         code: Source code to parse
@@ -170,85 +154,49 @@ def parse_code_to_ast_incremental(
         previous_tree: Previously parsed tree (optional, for incremental parsing)
         old_code: Previous version of the code (required if previous_tree is provided)
         include_children: Whether to include child nodes in the result
+        text_mode: Node text to include ('full', 'none', 'leaves-only' or 'truncated:N')
+        positions: Position fields to include ('both', 'bytes' or 'points')
+        named_only: Whether to include only named nodes, with field names
+        code_id: Document session identifier (optional); the session holds
+                 the previous version and is updated to this one
         
     Returns:
-        Dictionary representation of the AST, with additional metadata
-        for incremental parsing
+        Dictionary representation of the AST, with the changed ranges when
+        parsed incrementally
     """
     # 使用Tree-sitter增量解析代码为AST。
-    # 如果提供了previous_tree，仅解析变更部分，适合大文件的小改动。
-    # Initialize parsers if not done already
-    if not languages and not init_parsers():
-        return {"error": "Tree-sitter language parsers not available. Run build_parsers.py first."}
-    # 初始化解析器，如未初始化则先初始化。
-    
-    # Detect language if not provided
-    if not language:
-        language = detect_language(code, filename)
-    # 未指定语言时自动检测。
-    
-    # Normalize language identifier
-    language = LANGUAGE_MAP.get(language.lower(), language.lower())
-    # 规范化语言标识符。
+    # 如果提供了previous_tree或文档会话，仅解析变更部分，适合大文件的小改动。
+    try:
+        projection = Projection(text_mode, positions)
+    except ValueError as e:
+        return {"error": str(e)}
+    # 解析投影选项。
     
-    # Check if language is supported
-    if language not in languages:
-        return {"error": f"Unsupported language: {language}"}
-    # 检查语言是否受支持。
+    parsed = parse_tree_incremental(code, language, filename, previous_tree, old_code, code_id)
+    if "error" in parsed:
+        return parsed
+    # 解析为原生语法树，可能采用增量方式。
     
     try:
-        # Set the parser language
-        parser.set_language(languages[language])
-        # 设置解析器语言。
-        
-        # Parse the code, potentially incrementally
-        source_bytes = bytes(code, 'utf-8')
-        # 解析代码，可能采用增量方式。
-        
-        if previous_tree and old_code:
-            old_source_bytes = bytes(old_code, 'utf-8')
-            tree = parser.parse(source_bytes, previous_tree)
-            # 增量解析，基于旧树。
-            
-            # Calculate which nodes changed
-            changed_ranges = []
-            for edit in tree.get_changed_ranges(previous_tree):
-                changed_ranges.append({
-                    "start_byte": edit.start_byte,
-                    "end_byte": edit.end_byte,
-                    "start_point": {"row": edit.start_point[0], "column": edit.start_point[1]},
-                    "end_point": {"row": edit.end_point[0], "column": edit.end_point[1]}
-                })
-            # 计算变更范围。
-        else:
-            tree = parser.parse(source_bytes)
-            changed_ranges = None  # No previous tree to compare with
-            # 无旧树时全量解析。
-        
         # Convert to dictionary
-        root_node = tree.root_node
-        ast = node_to_dict(root_node, source_bytes, include_children)
+        root_node = parsed["tree"].root_node
+        ast = cursor_to_dict(root_node, parsed["source_bytes"], include_children, projection, named_only=named_only)
         # 转换为字典结构。
-        
-        result = {
-            "language": language,
-            "ast": ast,
-            "tree_object": tree  # Keep the tree object for later incremental parsing
-        }
-        # 返回包含语言、AST和树对象的结果。
-        
-        if changed_ranges:
-            result["changed_ranges"] = changed_ranges
-        # 如有变更范围则一并返回。
-        
-        return result
-        
     except Exception as e:
-        return {"error": f"Error parsing code: {e}"}
+        return {"error": f"Error converting AST: {e}"}
     # 捕获异常并返回错误信息。
+    
+    result = {
+        "language": parsed["language"],
+        "ast": ast
+    }
+    if parsed.get("changed_ranges"):
+        result["changed_ranges"] = parsed["changed_ranges"]
+    return result
+    # 返回语言和AST；如有变更范围则一并返回。原生语法树不可序列化，不放入结果。
 
 
-def create_enhanced_asg_from_ast(ast_data: Dict) -> Dict:
+def create_enhanced_asg_from_ast(ast_data: Dict, text_mode: str = "full", containment: str = "edges") -> Dict:
     """
     Create an enhanced Abstract Semantic Graph (ASG) from an AST.
     
@@ -257,6 +205,11 @@ def create_enhanced_asg_from_ast(ast_data: Dict) -> Dict:
     
     Args:
         ast_data: AST data from parse_code_to_ast
+        text_mode: Node text to keep: 'full' (default) or 'spans' (only
+                  identifiers and literals; other text is read via
+                  source://{code_hash}/{start}-{end} when ast_data has a code_hash)
+        containment: 'edges' (default, one "contains" edge per child node) or
+                    'parent' (a parent index on each node; edges are only semantic)
         
     Returns:
         Dictionary representation of the enhanced ASG
@@ -264,398 +217,486 @@ def create_enhanced_asg_from_ast(ast_data: Dict) -> Dict:
     # 从AST生成增强版ASG，包含更完整的边检测和作用域处理。
     if "error" in ast_data:
         return ast_data
+    error = check_asg_options(text_mode, containment)
+    if error:
+        return {"error": error}
     
     ast = ast_data["ast"]
     language = ast_data["language"]
     
-    # Extract nodes and edges from the AST
-    nodes = []
-    edges = []
-    node_ids = {}  # Map of {node_id: node_index} for quick lookups
+    # Extract nodes and containment edges from the AST into the compact model
+    asg, index_of = compact_asg_from_ast(ast, language, text_mode, ast_data.get("code_hash"))
+    # 将节点和包含边提取到紧凑模型中。
     
-    def extract_nodes(node, parent_id=None):
-        node_id = f"{node['type']}_{node['start_byte']}_{node['end_byte']}"
-        # 生成节点唯一ID。
-        
-        # Create a node object with metadata
-        node_index = len(nodes)
-        node_obj = {
-            "id": node_id,
-            "type": node["type"],
-            "text": node["text"],
-            "start_byte": node["start_byte"],
-            "end_byte": node["end_byte"],
-            "start_line": node["start_point"]["row"],
-            "start_col": node["start_point"]["column"],
-            "end_line": node["end_point"]["row"],
-            "end_col": node["end_point"]["column"]
-        }
-        # 构建节点对象，包含元数据。
-        nodes.append(node_obj)
-        node_ids[node_id] = node_index
-        
-        # Add edge to parent if exists
-        if parent_id:
-            edges.append({
-                "source": parent_id,
-                "target": node_id,
-                "type": "contains"
-            })
-        # 如有父节点则添加包含关系边。
-        
-        # Process children
-        if "children" in node:
-            for child in node["children"]:
-                extract_nodes(child, node_id)
-        # 递归处理子节点。
-                
-        return node_id
-    
-    # Start extraction from the root
-    root_id = extract_nodes(ast)
-    
-    # Add semantic edges based on language-specific rules
-    if language == "python":
-        add_enhanced_python_semantic_edges(ast, edges)
-    elif language in ["javascript", "typescript"]:
-        add_enhanced_js_ts_semantic_edges(ast, edges)
-    # 按语言类型添加语义边。
-    
-    # Add additional metadata to the ASG
-    return {
-        "language": language,
-        "nodes": nodes,
-        "edges": edges,
-        "root": root_id,
-        "node_lookup": node_ids,  # Helps with quick node lookup by ID
-    }
-    # 返回ASG结构，包括节点、边、根节点ID和节点查找表。
+    # Add semantic edges from the language's spec
+    semantic_edges = []
+    add_enhanced_semantic_edges(ast, language, semantic_edges)
+    add_edges_by_id(asg, index_of, semantic_edges)
+    # 按语言描述添加语义边。
+    
+    # Convert to the public format, with a lookup table of node IDs
+    return asg.to_dict(node_lookup=True, containment=containment)
+    # 返回ASG结构，包括节点、边、根节点ID和节点查找表（便于按ID快速查找节点）。
 
 
-def add_enhanced_python_semantic_edges(ast: Dict, edges: List[Dict]):
+def add_enhanced_semantic_edges(ast: Dict, language: str, edges: List[Dict]):
     """
-    Add enhanced Python-specific semantic edges to the ASG.
+    Add enhanced semantic edges to the ASG, following the language's spec.
     
     This version provides more complete edge detection, including:
-    - Proper scope hierarchy and variable resolution
+    - Names resolved with the language's scoping rules (see symbols.SymbolTable)
     - Control flow edges between blocks
     - Data flow edges showing variable dependencies
     
     Args:
-        ast: The Python AST
+        ast: The AST
+        language: Normalized language identifier (languages without a spec get no edges)
         edges: List to store the detected edges
     """
-    # 为ASG添加增强版Python语义边，包括作用域、控制流和数据流。
-    scope_manager = ScopeManager()
-    current_scope = scope_manager.global_scope
-    
-    # First pass: find all definitions (functions, classes, variables)
-    def find_enhanced_definitions(node, scope=None):
-        nonlocal current_scope
-        old_scope = current_scope
-        node_id = f"{node['type']}_{node['start_byte']}_{node['end_byte']}"
-        # 第一遍遍历，查找所有定义（函数、类、变量）。
-        
-        # Check for scope-creating nodes
-        if node["type"] in PYTHON_SCOPE_NODES:
-            # Create new scope for this node
-            current_scope = scope_manager.enter_scope(node_id, current_scope)
-        # 检查是否为创建作用域的节点。
-        
-        # Check for definitions
-        if node["type"] == "function_definition":
-            # Get function name
-            for child in node.get("children", []):
-                if child["type"] == "identifier":
-                    func_name = child["text"]
-                    func_id = node_id
-                    scope_manager.add_function(func_name, func_id)
-                    # 添加函数定义。
-                    
-                    # Add parameters to function scope
-                    for param_child in node.get("children", []):
-                        if param_child["type"] == "parameters":
-                            for param in param_child.get("children", []):
-                                if param["type"] == "identifier":
-                                    param_name = param["text"]
-                                    param_id = f"{param['type']}_{param['start_byte']}_{param['end_byte']}"
-                                    scope_manager.add_variable(param_name, param_id, current_scope)
-                    # 将参数添加到函数作用域。
-                    
-                    break
-        
-        elif node["type"] == "class_definition":
-            # Get class name
-            for child in node.get("children", []):
-                if child["type"] == "identifier":
-                    class_name = child["text"]
-                    class_id = node_id
-                    scope_manager.add_class(class_name, class_id)
-                    # 添加类定义。
-                    
-                    break
-        
-        elif node["type"] == "assignment":
-            # Handle variable assignments
-            # The left side is the target (variable being defined)
-            targets = []
-            values = []
-            # 处理变量赋值，左侧为目标变量。
-            
-            # Split children into targets and values
-            for i, child in enumerate(node.get("children", [])):
-                if child["type"] == "=" and i > 0:
-                    # Everything before '=' is a target
-                    targets = node["children"][:i]
-                    # Everything after '=' is a value
-                    values = node["children"][i+1:]
-                    break
-            # 拆分目标和赋值部分。
-            
-            # Process targets (variables being assigned)
-            for target in targets:
-                if target["type"] == "identifier":
-                    var_name = target["text"]
-                    var_id = f"{target['type']}_{target['start_byte']}_{target['end_byte']}"
-                    scope_manager.add_variable(var_name, var_id, current_scope)
-                # 处理变量名。
-                
-                # Handle tuple unpacking
-                elif target["type"] == "tuple" or target["type"] == "list":
-                    for element in target.get("children", []):
-                        if element["type"] == "identifier":
-                            var_name = element["text"]
-                            var_id = f"{element['type']}_{element['start_byte']}_{element['end_byte']}"
-                            scope_manager.add_variable(var_name, var_id, current_scope)
-                    # 处理元组或列表解包。
-        
-        elif node["type"] == "import_statement" or node["type"] == "import_from_statement":
-            # Track imported modules and functions
-            for child in node.get("children", []):
-                if child["type"] == "dotted_name" or child["type"] == "identifier":
-                    import_name = child["text"]
-                    import_id = f"{child['type']}_{child['start_byte']}_{child['end_byte']}"
-                    scope_manager.add_import(import_name, import_id)
-            # 记录import。
+    # 按语言描述为ASG添加增强版语义边，包括作用域、控制流和数据流。
+    # 与原生语法树使用同一个访问者，对字典AST只遍历一次。
+    if language not in LANGUAGE_SPECS:
+        return
+    semantic_edges = []
+    visitor = SemanticVisitor(DictNodeAccess(POSITIONAL_FIELDS.get(language)), semantic_edges, language)
+    DictTreeWalker().add(visitor).walk(ast)
+    visitor.resolve()
+    edges.extend(
+        {"source": source, "target": target, "type": edge_type}
+        for source, target, edge_type in semantic_edges
+    )
+
+
+class SemanticVisitor:
+    """
+    Collects enhanced semantic edges during a TreeWalker walk.
+    
+    Control flow edges are recorded as the walk enters each control flow
+    node of the language's spec. Names are resolved in the same walk by
+    the language's scope resolver (symbols.make_scope_resolver), which
+    patches references to names defined later in the file once they are
+    bound.
+    """
+    # 在TreeWalker遍历过程中收集增强版语义边。
+    # 进入语言描述中的控制流节点时记录控制流边；名称由该语言的作用域解析器在同一次遍历中解析，
+    # 对后面才定义的名称的引用在其绑定时回填。
+    
+    def __init__(self, access, edges: List[Tuple[Any, Any, str]], language: str):
+        self.access = access  # Node accessor (visitors.NodeAccess or visitors.DictNodeAccess)
+        self.edges = edges  # (source handle, target handle, edge type)
+        self.spec = LANGUAGE_SPECS[language]
+        self.resolver = make_scope_resolver(access, language)
+    
+    def register(self, walker: TreeWalker) -> None:
+        walker.on_enter(self.spec.control_flow, self.enter_control_flow)
+        walker.add(self.resolver)
+    
+    def enter_control_flow(self, node, depth: int) -> None:
+        access = self.access
+        bodies = self.spec.bodies
+        
+        # Add control flow edge from this node to its body
+        for child in access.children(node):
+            if access.type(child) in bodies:
+                self.edges.append((access.ref(node), access.ref(child), "control_flow"))
+                break
+        # 添加从控制流节点指向其代码块的控制流边。
+    
+    def resolve(self) -> None:
+        """Add the call and reference edges of the resolved names once the walk is done."""
+        # 遍历结束后，添加已解析名称的调用边和引用边。
+        self.edges.extend(self.resolver.edges())
+
+
+class EnhancedASGBuilder:
+    """
+    Builds an enhanced ASG from a native syntax tree during a TreeWalker walk.
+    
+    Produces the same graph as create_enhanced_asg_from_ast, but nodes,
+    containment edges and semantic edges are all collected in the one walk,
+    which other visitors (such as structure analysis) can share.
+    """
+    # 在TreeWalker遍历过程中从原生语法树构建增强版ASG。
+    # 结果与create_enhanced_asg_from_ast相同，但节点、包含边和语义边都在同一次遍历中收集，
+    # 该遍历还可以与其他访问者（如结构分析）共享。
+    
+    def __init__(
+        self,
+        source_bytes: bytes,
+        language: str,
+        text_mode: str = "full",
+        code_hash: Optional[str] = None
+    ):
+        self.text = make_text_slicer(source_bytes)
+        self.full_text = text_mode == "full"  # Otherwise only identifiers and literals keep their text
+        self.asg = CompactASG(language, text_mode, code_hash)
+        self.index_of = {}  # Maps tree-sitter node.id -> ASG node id
+        self.semantic_edges = []  # (source node.id, target node.id, edge type)
+        self.parents = []  # ASG node ids of the nodes entered but not left yet
+        self.outer_edges = []  # (source node id, outer ASG node id, edge type), see build
+        self.walker = None
+        self.semantic = None
+        if language in LANGUAGE_SPECS:
+            self.semantic = SemanticVisitor(NodeAccess(self.text), self.semantic_edges, language)
+    
+    def register(self, walker: TreeWalker) -> None:
+        self.walker = walker
+        walker.on_enter(None, self.enter_node)
+        walker.on_exit(None, self.exit_node)
+        if self.semantic is not None:
+            walker.add(self.semantic)
+    
+    def enter_node(self, node: Node, depth: int) -> None:
+        start_byte = node.start_byte
+        end_byte = node.end_byte
+        start_point = node.start_point
+        end_point = node.end_point
+        node_type = node.type
+        index = self.asg.add_node(
+            node_type, start_byte, end_byte,
+            start_point[0], start_point[1], end_point[0], end_point[1],
+            self.text(start_byte, end_byte) if self.full_text or inlines_text(node_type) else None,
+            self.parents[-1] if self.parents else -1,
+            self.walker.field_name if self.walker.named_only else None
+        )
+        self.index_of[node.id] = index
+        self.parents.append(index)
+        # 添加节点及其父节点（具名模式下带字段名），记录tree-sitter节点到ASG整数节点ID的映射。
+    
+    def exit_node(self, node: Node, depth: int) -> None:
+        self.parents.pop()
+    
+    def build(self) -> CompactASG:
+        """
+        Get the compact ASG once the walk is done.
         
-        # Check for control flow nodes
-        if node["type"] in PYTHON_CONTROL_FLOW_NODES:
-            scope_manager.enter_control_flow(node_id)
-            # 进入控制流节点。
-            
-            # Add control flow edges between blocks
-            body_node = None
-            for child in node.get("children", []):
-                if child["type"] == "block":
-                    body_node = child
-                    break
+        Edges to OuterBinding handles (bindings outside a subtree walked on
+        its own) are kept in outer_edges as (source node id, outer node id,
+        edge type) instead of being added.
+        """
+        # 遍历结束后获取紧凑ASG。指向OuterBinding句柄（单独遍历子树时子树外的绑定）的边不加入ASG，而是保存在outer_edges中。
+        if self.semantic is not None:
+            self.semantic.resolve()
+            index_of = self.index_of
+            for source, target, edge_type in self.semantic_edges:
+                source_index = index_of.get(source)
+                if source_index is None:
+                    continue
+                if type(target) is OuterBinding:
+                    self.outer_edges.append((source_index, target.index, edge_type))
+                    continue
+                target_index = index_of.get(target)
+                if target_index is not None:
+                    self.asg.add_edge(source_index, target_index, edge_type)
+            self.semantic_edges.clear()
+            # 将语义边的端点映射为ASG节点ID后加入。
             
-            if body_node:
-                # Add control flow edge from this node to its body
-                edges.append({
-                    "source": node_id,
-                    "target": f"{body_node['type']}_{body_node['start_byte']}_{body_node['end_byte']}",
-                    "type": "control_flow"
-                })
-                # 添加控制流边。
-        
-        # Process all children recursively
-        for child in node.get("children", []):
-            find_enhanced_definitions(child, current_scope)
-        # 递归处理所有子节点。
-        
-        # Exit any control flow blocks we entered
-        if node["type"] in PYTHON_CONTROL_FLOW_NODES:
-            scope_manager.exit_control_flow()
-            # 退出控制流节点。
-        
-        # Restore previous scope if we created a new one
-        if node["type"] in PYTHON_SCOPE_NODES:
-            current_scope = old_scope
-            # 恢复上一个作用域。
-    
-    # Second pass: find all references and connect the edges
-    def find_enhanced_references(node, scope=None):
-        nonlocal current_scope
-        old_scope = current_scope
-        node_id = f"{node['type']}_{node['start_byte']}_{node['end_byte']}"
-        # 第二遍遍历，查找所有引用并连接边。
-        
-        # Update scope if needed
-        if node["type"] in PYTHON_SCOPE_NODES:
-            current_scope = node_id
-        # 如有需要，更新当前作用域。
+            if self.asg.symbols is None:
+                self.asg.symbols = {
+                    name: (index_of[handle], kind)
+                    for name, (handle, kind) in self.semantic.resolver.module_bindings().items()
+                    if handle in index_of
+                }
+            # 记录模块级名称的最终绑定，供增量更新使用。
+        return self.asg
+
+
+def make_asg_builder(parsed: Dict, text_mode: str) -> EnhancedASGBuilder:
+    """
+    Create the ASG builder for a parse_code_to_tree result.
+    
+    In 'spans' mode the tree is kept in the tree store, so the texts left
+    out of the ASG can be read from source://{code_hash}/{start}-{end}.
+    """
+    # 为parse_code_to_tree的结果创建ASG构建器。spans模式下将语法树存入tree_store，以便通过source://读取省略的文本。
+    code_hash = None
+    if text_mode != "full":
+        code_hash = tree_store.put(parsed["tree"], parsed["source_bytes"], parsed["language"])
+    return EnhancedASGBuilder(parsed["source_bytes"], parsed["language"], text_mode, code_hash)
+
+
+def build_enhanced_asg(
+    code: str,
+    language: Optional[str] = None,
+    filename: Optional[str] = None,
+    named_only: bool = False,
+    text_mode: str = "full"
+) -> Union[CompactASG, Dict]:
+    """
+    Build an enhanced ASG from code in the compact internal model.
+    
+    Args:
+        code: Source code to analyze
+        language: Programming language identifier (optional)
+        filename: Source file name (optional, used for language detection)
+        named_only: Whether to include only named nodes, with field names
+        text_mode: Node text to keep: 'full' (default) or 'spans'
         
-        # Look for references to functions, variables, etc.
-        if node["type"] == "call":
-            # Find the function name (first child is usually the function being called)
-            func_node = None
-            for child in node.get("children", []):
-                if child["type"] == "identifier":
-                    func_node = child
-                    break
-            
-            if func_node:
-                func_name = func_node["text"]
-                caller_id = f"{func_node['type']}_{func_node['start_byte']}_{func_node['end_byte']}"
-                # 查找函数名。
-                
-                # Look for the function definition
-                func_id = scope_manager.find_function(func_name)
-                if func_id:
-                    edges.append({
-                        "source": caller_id,
-                        "target": func_id,
-                        "type": "calls"
-                    })
-                    # 添加函数调用边。
-                
-                # Check if it's an imported function
-                import_id = scope_manager.find_import(func_name)
-                if import_id:
-                    edges.append({
-                        "source": caller_id,
-                        "target": import_id,
-                        "type": "calls_import"
-                    })
-                    # 添加import调用边。
+    Returns:
+        The CompactASG, or an error dictionary
+    """
+    # 直接从代码单遍构建紧凑内部模型表示的增强版ASG，出错时返回错误字典。
+    parsed = parse_code_to_tree(code, language, filename)
+    if "error" in parsed:
+        return parsed
+    
+    builder = make_asg_builder(parsed, text_mode)
+    TreeWalker(named_only).add(builder).walk(parsed["tree"].root_node)
+    return builder.build()
+
+
+def build_enhanced_subtree(
+    node: Node,
+    source_bytes: bytes,
+    language: str,
+    named_only: bool = False,
+    text_mode: str = "full",
+    code_hash: Optional[str] = None,
+    symbols: Optional[Dict[str, Tuple[int, str]]] = None,
+    in_class: bool = False
+) -> Tuple[CompactASG, List[Tuple[int, int, str]]]:
+    """
+    Build the enhanced ASG of one subtree, to replace it in an existing ASG.
+    
+    For languages with semantic edges, the subtree should be a top-level
+    definition as found by asg_index.find_update_root: names it does not
+    bind are resolved against the module-level bindings of the existing ASG.
+    
+    Args:
+        node: Root of the subtree in the new tree
+        source_bytes: The UTF-8 source of the new tree
+        language: Normalized language identifier
+        named_only: Whether to include only named nodes, with field names
+        text_mode: Node text to keep: 'full' (default) or 'spans'
+        code_hash: Hash of the new source (for 'spans' mode)
+        symbols: Module-level bindings of the existing ASG (CompactASG.symbols)
+        in_class: Whether the subtree is inside a class body
         
-        elif node["type"] == "identifier":
-            # Check if this is a variable reference (not a definition)
-            parent_type = None
-            if node.get("parent"):
-                parent_type = node["parent"]["type"]
-            # 检查是否为变量引用。
-            
-            # Skip if this is a definition (handled in the first pass)
-            if parent_type not in ["function_definition", "class_definition", "parameter"]:
-                var_name = node["text"]
-                var_id = node_id
-                # 跳过定义部分。
-                
-                # Look for the variable definition
-                ref_id = scope_manager.find_variable(var_name, current_scope)
-                if ref_id and ref_id != var_id:  # Don't link to self
-                    edges.append({
-                        "source": var_id,
-                        "target": ref_id,
-                        "type": "references"
-                    })
-                    # 添加变量引用边。
+    Returns:
+        The subtree's ASG (rooted at its node 0) and its edges to nodes of
+        the existing ASG, as (subtree node id, existing node id, edge type)
+    """
+    # 构建单个子树的增强版ASG，用于替换现有ASG中的该子树。
+    # 对有语义边的语言，子树应为find_update_root找到的顶层定义，其中未绑定的名称按现有ASG的模块级绑定解析。
+    builder = EnhancedASGBuilder(source_bytes, language, text_mode, code_hash)
+    walker = TreeWalker(named_only).add(builder)
+    resolver = getattr(builder.semantic, "resolver", None)
+    if resolver is not None:
+        resolver.open_outer_scopes(symbols or {}, in_class)
+    walker.walk(node)
+    if resolver is not None:
+        resolver.close_outer_scopes(symbols or {}, in_class)
+    return builder.build(), builder.outer_edges
+
+
+def create_enhanced_asg(
+    code: str,
+    language: Optional[str] = None,
+    filename: Optional[str] = None,
+    named_only: bool = False,
+    text_mode: str = "full",
+    containment: str = "edges"
+) -> Dict:
+    """
+    Create an enhanced ASG directly from code in a single tree walk.
+    
+    Args:
+        code: Source code to analyze
+        language: Programming language identifier (optional)
+        filename: Source file name (optional, used for language detection)
+        named_only: Whether to include only named nodes, with field names on containment edges
+        text_mode: Node text to keep: 'full' (default) or 'spans' (only identifiers and literals)
+        containment: 'edges' (default) or 'parent' (parent index on each node instead of "contains" edges)
         
-        # Process all children recursively
-        for child in node.get("children", []):
-            find_enhanced_references(child, current_scope)
-        # 递归处理所有子节点。
+    Returns:
+        Dictionary representation of the enhanced ASG (with a code_hash in 'spans' mode)
+    """
+    # 直接从代码单遍构建增强版ASG，不经过字典形式的AST。
+    error = check_asg_options(text_mode, containment)
+    if error:
+        return {"error": error}
+    asg = build_enhanced_asg(code, language, filename, named_only, text_mode)
+    if isinstance(asg, dict):
+        return asg
+    return asg.to_dict(node_lookup=True, containment=containment)
+
+
+def analyze_code_with_asg(
+    code: str,
+    language: Optional[str] = None,
+    filename: Optional[str] = None,
+    named_only: bool = False,
+    text_mode: str = "full",
+    containment: str = "edges"
+) -> Dict:
+    """
+    Analyze code structure and build the enhanced ASG in one shared tree walk.
+    
+    Args:
+        code: Source code to analyze
+        language: Programming language identifier (optional)
+        filename: Source file name (optional, used for language detection)
+        named_only: Whether the ASG includes only named nodes
+        text_mode: Node text the ASG keeps: 'full' (default) or 'spans'
+        containment: 'edges' (default) or 'parent' (parent index on each node instead of "contains" edges)
         
-        # Restore previous scope if we created a new one
-        if node["type"] in PYTHON_SCOPE_NODES:
-            current_scope = old_scope
-            # 恢复上一个作用域。
+    Returns:
+        Dictionary with the language, the structure analysis and the enhanced ASG
+    """
+    # 在同一次遍历中完成代码结构分析和增强版ASG构建。
+    error = check_asg_options(text_mode, containment)
+    if error:
+        return {"error": error}
+    parsed = parse_code_to_tree(code, language, filename)
+    if "error" in parsed:
+        return parsed
+    
+    language = parsed["language"]
+    source_bytes = parsed["source_bytes"]
+    root = parsed["tree"].root_node
+    
+    walker = TreeWalker(named_only)
+    builder = make_asg_builder(parsed, text_mode)
+    walker.add(builder)
+    plugin = get_language_plugin(language)
+    analyzer = StructureVisitor(plugin, source_bytes) if plugin is not None else None
+    if analyzer is not None:
+        walker.add(analyzer)
+    walker.walk(root)
+    # 结构分析和ASG构建共用一次遍历。
+    
+    structure = empty_code_structure(language, code)
+    if analyzer is not None:
+        analyzer.update_structure(root, structure)
     
-    # Run both passes
-    find_enhanced_definitions(ast)
-    find_enhanced_references(ast)
-    # 先查定义再查引用。
+    return {
+        "language": language,
+        "analysis": structure,
+        "asg": builder.build().to_dict(node_lookup=True, containment=containment)
+    }
 
 
-def add_enhanced_js_ts_semantic_edges(ast: Dict, edges: List[Dict]):
+def generate_ast_diff(parsed_old: Dict, parsed_new: Dict, named_only: bool = False) -> Dict:
     """
-    Add enhanced JavaScript/TypeScript-specific semantic edges to the ASG.
+    Generate a structural diff between two parsed versions of some code.
     
-    Similar to the Python version, but adapted for JS/TS syntax.
+    Instead of both trees, the result holds an edit script (see
+    tree_diff): the inserted, deleted, updated and moved nodes with their
+    spans, so its size is proportional to the change rather than the file.
     
     Args:
-        ast: The JS/TS AST
-        edges: List to store the detected edges
+        parsed_old: Old version, as returned by parse_code_to_tree
+        parsed_new: New version, as returned by parse_code_to_tree or
+                   parse_tree_incremental (whose changed ranges are kept)
+        named_only: Whether to report only named nodes
+        
+    Returns:
+        Dictionary with the edit script, a summary of it and the ranges
+        whose syntactic structure changed
     """
-    # 为ASG添加增强版JS/TS语义边，方法类似Python但适配JS/TS语法。
-    pass
+    # 生成两个已解析版本之间的结构化差异。结果不包含两棵语法树，而是编辑脚本：被插入、删除、更新和移动的节点及其范围，
+    # 大小与变更成正比，而不是与文件大小成正比。
+    changed = parsed_new.get("changed_ranges")
+    if changed is None:
+        changed = changed_ranges(
+            edited_copy(parsed_old["tree"], diff_edits(parsed_old["source_bytes"], parsed_new["source_bytes"])),
+            parsed_new["tree"]
+        )
+    # 新版本不是增量解析得到的时，先将两份源码之间的编辑应用到旧语法树的副本上，再计算变更范围。
+    
+    try:
+        script, summary = diff_trees(
+            parsed_old["tree"].root_node, parsed_old["source_bytes"],
+            parsed_new["tree"].root_node, parsed_new["source_bytes"],
+            named_only
+        )
+    except Exception as e:
+        return {"error": f"Error diffing trees: {e}"}
+    
+    return {
+        "language": parsed_new["language"],
+        "changed_ranges": changed,
+        "edit_script": script,
+        "summary": summary
+    }
+    # 返回编辑脚本及相关元数据。
 
 
-def generate_ast_diff(
-    ast_old: Dict, 
-    ast_new: Dict, 
-    source_old: str, 
-    source_new: str
+def diff_code(
+    old_code: str,
+    new_code: str,
+    language: Optional[str] = None,
+    filename: Optional[str] = None,
+    named_only: bool = False
 ) -> Dict:
     """
-    Generate a diff between two ASTs, showing only the changed nodes.
+    Parse two versions of code and diff their syntax trees.
     
-    This is useful for incremental updates, where only the changed parts
-    of the AST need to be processed, saving time and memory for large files.
+    The new version is parsed incrementally from the old one.
     
     Args:
-        ast_old: Old AST data
-        ast_new: New AST data
-        source_old: Old source code
-        source_new: New source code
+        old_code: Previous version of the code
+        new_code: New version of the code
+        language: Programming language identifier (optional)
+        filename: Source file name (optional, used for language detection)
+        named_only: Whether to report only named nodes
         
     Returns:
-        Dictionary with the changed nodes and metadata
+        Dictionary with the edit script and metadata (see generate_ast_diff)
     """
-    # 生成两个AST的差异，仅显示变更节点，适合增量更新。
-    # If we don't have tree objects, parse both files (can't use incremental parsing)
-    if "tree_object" not in ast_old or "tree_object" not in ast_new:
-        return {
-            "error": "Both ASTs must have tree_object property for diffing"
-        }
-    # 若无tree对象则无法增量diff。
-    
-    old_tree = ast_old["tree_object"]
-    new_tree = ast_new["tree_object"]
-    
-    # Get changed ranges from Tree-sitter
-    old_source_bytes = bytes(source_old, 'utf-8')
-    new_source_bytes = bytes(source_new, 'utf-8')
-    # 获取变更范围。
-    
-    # Get the changed ranges
-    changed_ranges = []
-    for edit in new_tree.get_changed_ranges(old_tree):
-        changed_ranges.append({
-            "start_byte": edit.start_byte,
-            "end_byte": edit.end_byte,
-            "start_point": {"row": edit.start_point[0], "column": edit.start_point[1]},
-            "end_point": {"row": edit.end_point[0], "column": edit.end_point[1]}
-        })
-    # 记录变更区间。
-    
-    # Find nodes in the new AST that are in the changed ranges
-    changed_nodes = []
-    
-    def find_nodes_in_range(node, ranges):
-        # Check if this node is in any of the changed ranges
-        node_start = node["start_byte"]
-        node_end = node["end_byte"]
-        # 检查节点是否在变更区间内。
-        
-        for r in ranges:
-            # If there's any overlap between the node and the range
-            if not (node_end <= r["start_byte"] or node_start >= r["end_byte"]):
-                changed_nodes.append(node)
-                return True
-        # 若有重叠则视为变更节点。
+    # 解析两份代码并比较其语法树；新版本基于旧版本增量解析。
+    parsed_old = parse_code_to_tree(old_code, language, filename)
+    if "error" in parsed_old:
+        return parsed_old
+    parsed_new = parse_tree_incremental(new_code, parsed_old["language"], filename, parsed_old["tree"], old_code)
+    if "error" in parsed_new:
+        return parsed_new
+    # 解析旧代码，再基于旧语法树增量解析新代码。
+    
+    return generate_ast_diff(parsed_old, parsed_new, named_only)
+
+
+def diff_code_symbols(
+    old_code: str,
+    new_code: str,
+    language: Optional[str] = None,
+    filename: Optional[str] = None
+) -> Dict:
+    """
+    Parse two versions of code and list the functions and classes that changed.
+    
+    Definitions are compared by their normalized tokens, so changes to
+    whitespace or comments alone do not count as modifications.
+    
+    Args:
+        old_code: Previous version of the code
+        new_code: New version of the code
+        language: Programming language identifier (optional)
+        filename: Source file name (optional, used for language detection)
         
-        # If node is not changed, check its children
-        for child in node.get("children", []):
-            if find_nodes_in_range(child, ranges):
-                return True
-        # 若节点未变更则递归检查子节点。
-        return False
+    Returns:
+        Dictionary with the language, the changed definitions and a
+        summary (see symbol_diff.diff_definitions)
+    """
+    # 解析两份代码并列出发生变更的函数和类；定义按规范化词法单元比较，仅空白或注释的变化不算修改。
+    parsed_old = parse_code_to_tree(old_code, language, filename)
+    if "error" in parsed_old:
+        return parsed_old
+    plugin = get_language_plugin(parsed_old["language"])
+    if plugin is None:
+        return {"error": f"Symbol diff is not supported for {parsed_old['language']}"}
+    parsed_new = parse_tree_incremental(new_code, parsed_old["language"], filename, parsed_old["tree"], old_code)
+    if "error" in parsed_new:
+        return parsed_new
+    # 解析旧代码，再基于旧语法树增量解析新代码；没有语言描述的语言不支持符号级差异。
     
-    # Start from the root
-    find_nodes_in_range(ast_new["ast"], changed_ranges)
-    # 从根节点开始查找变更节点。
+    try:
+        old_definitions = collect_definitions(parsed_old["tree"].root_node, parsed_old["source_bytes"], plugin)
+        new_definitions = collect_definitions(parsed_new["tree"].root_node, parsed_new["source_bytes"], plugin)
+    except Exception as e:
+        return {"error": f"Error collecting definitions: {e}"}
     
-    return {
-        "language": ast_new["language"],
-        "changed_ranges": changed_ranges,
-        "changed_nodes": changed_nodes,
-        "old_ast": ast_old["ast"],
-        "new_ast": ast_new["ast"]
-    }
-    # 返回变更节点及相关元数据。
+    return {"language": parsed_new["language"], **diff_definitions(old_definitions, new_definitions)}
 
 
 def get_node_by_position(
@@ -708,34 +749,49 @@ def register_enhanced_tools(mcp_server):
         code: str, 
         old_code: Optional[str] = None,
         language: Optional[str] = None, 
-        filename: Optional[str] = None
+        filename: Optional[str] = None,
+        text_mode: str = "full",
+        positions: str = "both",
+        named_only: bool = False,
+        code_id: Optional[str] = None
     ) -> Dict:
         """
         Parse code into an AST with incremental parsing support.
         
-        This tool can use the previous version of the code to only parse
-        the parts that changed, which is much faster for large files.
+        With a code_id, the server keeps the document's syntax tree between
+        calls (see open_document), and each new version is parsed
+        incrementally from the previous one, so only the parts that changed
+        are reparsed. This is much faster for large files.
         
         Args:
             code: New source code to parse
-            old_code: Previous version of the code (optional)
+            old_code: Previous version of the code (optional, for diff
+                     information when no code_id is given)
             language: Programming language (e.g., 'python', 'javascript')
                      If not provided, the tool will attempt to detect it
             filename: Optional filename to help with language detection
+            text_mode: Node text to include: 'full' (default), 'none',
+                      'leaves-only' or 'truncated:N' (first N characters)
+            positions: Position fields to include: 'both' (default),
+                      'bytes' or 'points'
+            named_only: If true, drop anonymous nodes (punctuation, keywords)
+                       and label children with their field names
+            code_id: Optional document identifier (e.g. file path); the
+                    previous version is taken from its session
             
         Returns:
             A dictionary containing the AST and language information,
-            along with diff information if old_code was provided
+            along with the changed ranges if a previous version was known
         """
-        # 支持增量解析的AST工具，可加速大文件的小幅变更解析。
-        # If old_code is provided, try to use it for incremental parsing
+        # 支持增量解析的AST工具：指定code_id时服务器在两次调用之间保留文档的语法树，新版本基于旧版本增量解析。
+        # Without a session, the old code has to be parsed once to get a tree
         previous_tree = None
-        if old_code:
-            # First parse the old code to get a tree
-            old_result = parse_code_to_ast_incremental(old_code, language, filename)
-            if "error" not in old_result and "tree_object" in old_result:
-                previous_tree = old_result["tree_object"]
-        # 如有旧代码，先解析旧树以支持增量。
+        if old_code and code_id is None:
+            parsed_old = parse_code_to_tree(old_code, language, filename)
+            if "error" not in parsed_old:
+                previous_tree = parsed_old["tree"]
+                language = parsed_old["language"]
+        # 没有会话时只能先解析旧代码得到旧树。
         
         # Parse the new code, potentially using the previous tree
         return parse_code_to_ast_incremental(
@@ -743,7 +799,11 @@ def register_enhanced_tools(mcp_server):
             language, 
             filename, 
             previous_tree, 
-            old_code
+            old_code,
+            text_mode=text_mode,
+            positions=positions,
+            named_only=named_only,
+            code_id=code_id
         )
         # 解析新代码，可能用到旧树。
     
@@ -751,7 +811,11 @@ def register_enhanced_tools(mcp_server):
     def generate_enhanced_asg(
         code: str, 
         language: Optional[str] = None, 
-        filename: Optional[str] = None
+        filename: Optional[str] = None,
+        encoding: str = "json",
+        named_only: bool = False,
+        text_mode: str = "full",
+        containment: str = "edges"
     ) -> Dict:
         """
         Generate an enhanced Abstract Semantic Graph (ASG) from code.
@@ -764,46 +828,120 @@ def register_enhanced_tools(mcp_server):
             language: The programming language (e.g., 'python', 'javascript')
                      If not provided, the tool will attempt to detect it
             filename: Optional filename to help with language detection
+            encoding: Response encoding: 'json' (default), or 'msgpack'/'cbor'
+                     to receive {"encoding", "data"} with base64 binary data
+            named_only: If true, drop anonymous nodes (punctuation, keywords)
+                       and label containment edges with field names
+            text_mode: 'full' (default, every node carries its text) or 'spans'
+                      (only identifiers and literals carry text; read other
+                      text via source://{code_hash}/{start}-{end})
+            containment: 'edges' (default, one "contains" edge per child node)
+                        or 'parent' (each node carries its parent's index and
+                        field; edges only hold semantic relations)
             
         Returns:
             A dictionary containing the enhanced ASG with nodes, edges, and metadata
         """
-        # 生成增强版ASG，包含更完整的作用域、控制流和数据流信息。
-        ast_data = parse_code_to_ast_incremental(code, language, filename)
-        return create_enhanced_asg_from_ast(ast_data)
+        # 生成增强版ASG，包含更完整的作用域、控制流和数据流信息；可选二进制编码、仅具名节点和只带位置范围的节点。
+        return encode_response(create_enhanced_asg(code, language, filename, named_only, text_mode, containment), encoding)
+    
+    @mcp_server.tool()
+    def analyze_with_asg(
+        code: str,
+        language: Optional[str] = None,
+        filename: Optional[str] = None,
+        encoding: str = "json",
+        named_only: bool = False,
+        text_mode: str = "full",
+        containment: str = "edges"
+    ) -> Dict:
+        """
+        Analyze code structure and generate the enhanced ASG in one pass.
+        
+        Returns the same information as analyze_code plus generate_enhanced_asg,
+        but parses the code once and walks the syntax tree once.
+        
+        Args:
+            code: The source code to analyze
+            language: The programming language (e.g., 'python', 'javascript')
+                     If not provided, the tool will attempt to detect it
+            filename: Optional filename to help with language detection
+            encoding: Response encoding: 'json' (default), or 'msgpack'/'cbor'
+                     to receive {"encoding", "data"} with base64 binary data
+            named_only: If true, the ASG drops anonymous nodes and labels
+                       containment edges with field names
+            text_mode: 'full' (default) or 'spans' (only identifiers and
+                      literals in the ASG carry text)
+            containment: 'edges' (default) or 'parent' (ASG nodes carry their
+                        parent's index instead of "contains" edges)
+            
+        Returns:
+            A dictionary with the structure analysis and the enhanced ASG
+        """
+        # 一次解析、一次遍历，同时返回代码结构分析和增强版ASG。
+        return encode_response(analyze_code_with_asg(code, language, filename, named_only, text_mode, containment), encoding)
     
     @mcp_server.tool()
     def diff_ast(
         old_code: str, 
         new_code: str, 
         language: Optional[str] = None, 
-        filename: Optional[str] = None
+        filename: Optional[str] = None,
+        named_only: bool = False
     ) -> Dict:
         """
-        Compare two versions of code and return only the changed AST nodes.
+        Compare two versions of code and return a structural edit script.
         
-        This is useful for incremental updates, where only the changed parts
-        need to be analyzed, saving time and memory for large files.
+        Nodes of the two syntax trees are matched (identical subtrees
+        first, then nodes whose children match), and the result lists only
+        the inserted, deleted, updated and moved nodes with their spans,
+        so its size follows the change rather than the file.
         
         Args:
             old_code: Previous version of the code
             new_code: New version of the code
             language: Programming language (e.g., 'python', 'javascript')
             filename: Optional filename to help with language detection
+            named_only: If true, report only named nodes; changes to
+                       punctuation, operators or keywords are reported as
+                       updates of the enclosing named node
             
         Returns:
-            A dictionary with the changed nodes and metadata
+            A dictionary with the edit script ("edit_script": actions with
+            "action" insert/delete/update/move, "type" and "old"/"new"
+            spans), a summary and the changed ranges
+        """
+        # 比较两份代码，返回结构化编辑脚本：只列出被插入、删除、更新和移动的节点及其范围。
+        return diff_code(old_code, new_code, language, filename, named_only)
+    
+    @mcp_server.tool()
+    def diff_symbols(
+        old_code: str, 
+        new_code: str, 
+        language: Optional[str] = None, 
+        filename: Optional[str] = None
+    ) -> Dict:
         """
-        # 比较两份代码，仅返回变更的AST节点，适合增量分析。
-        ast_old = parse_code_to_ast_incremental(old_code, language, filename)
-        ast_new = parse_code_to_ast_incremental(new_code, language, filename)
+        Compare two versions of code at the level of functions and classes.
         
-        if "error" in ast_old:
-            return ast_old
-        if "error" in ast_new:
-            return ast_new
+        Lists the definitions that were added, removed, modified or moved
+        (reordered, moved to another scope or renamed), by qualified name
+        such as "Class.method". Whitespace and comments are ignored, and a
+        definition counts as modified only when its own code changed, not
+        when only a nested definition did.
         
-        return generate_ast_diff(ast_old, ast_new, old_code, new_code)
+        Args:
+            old_code: Previous version of the code
+            new_code: New version of the code
+            language: Programming language (e.g., 'python', 'javascript')
+            filename: Optional filename to help with language detection
+            
+        Returns:
+            A dictionary with the changes ("change" added/removed/modified/
+            moved, "name", "type" and old/new line ranges) and a summary
+        """
+        # 在函数和类的层面比较两份代码，列出被添加、删除、修改或移动的定义；忽略空白和注释。
+        return diff_code_symbols(old_code, new_code, language, filename)
     
     @mcp_server.tool()
     def find_node_at_position(
@@ -811,39 +949,45 @@ def register_enhanced_tools(mcp_server):
         line: int, 
         column: int, 
         language: Optional[str] = None, 
-        filename: Optional[str] = None
+        filename: Optional[str] = None,
+        named_only: bool = False
     ) -> Dict:
         """
         Find the AST node at a specific position in the code.
         
         This is useful for pinpointing a specific location in the code,
         for example to find what function or variable is at the cursor position.
+        Only the node and its ancestors are returned. For repeated lookups
+        in the same document, open it with open_document and use
+        node_at_position or nodes_at_positions instead of reparsing it.
         
         Args:
             code: The source code
             line: Line number (0-based)
-            column: Column number (0-based)
+            column: Column number (0-based, in bytes as in tree-sitter points)
             language: Programming language (e.g., 'python', 'javascript')
             filename: Optional filename to help with language detection
+            named_only: If true, find the smallest named node and list only
+                       named ancestors
             
         Returns:
-            The node at the given position, or an error if not found
+            The node (ID, type, range and text) and its ancestors from the
+            root down, or an error if the position is outside the code
         """
-        # 查找代码中特定位置的AST节点，常用于定位光标处的元素。
-        ast_data = parse_code_to_ast_incremental(code, language, filename)
-        
-        if "error" in ast_data:
-            return ast_data
+        # 查找代码中特定位置的AST节点，常用于定位光标处的元素；只返回该节点及其祖先。
+        parsed = parse_code_to_tree(code, language, filename)
+        if "error" in parsed:
+            return parsed
         
-        node = get_node_by_position(ast_data, line, column)
-        
-        if node:
-            return {
-                "node": node,
-                "language": ast_data["language"]
-            }
-        else:
+        root = parsed["tree"].root_node
+        if not root.start_point <= (line, column) <= root.end_point:
             return {
                 "error": f"No node found at position {line}:{column}"
             }
-        # 返回节点或错误信息。
+        node = node_at_point(root, line, column, named_only)
+        return {
+            "node": node_info(node, parsed["source_bytes"]),
+            "ancestors": [node_info(ancestor, parsed["source_bytes"], with_text=False) for ancestor in ancestors_of(root, node, named_only)],
+            "language": parsed["language"]
+        }
+        # 在原生语法树上查找节点，返回节点及其祖先或错误信息。
@@ -0,0 +1,176 @@
+"""
+Lazy loading of tree-sitter grammars.
+
+Each language's grammar module is imported and its Language built the first
+time that language is used, so startup cost does not grow with the number
+of configured grammars. Loading is safe when several requests need the
+same language at once. An optional background warm-up preloads a list of
+languages and primes a parser for each before the first request arrives.
+"""
+# tree-sitter语法的延迟加载模块。
+# 每种语言的语法模块在首次使用该语言时才导入并构建Language，启动开销不随配置的语法数量增长。
+# 多个请求同时首次使用同一语言时加载也是安全的。
+# 可选的后台预热线程会在第一个请求到来前预加载指定语言，并为每种语言预先创建解析器。
+
+import importlib
+import importlib.util
+import os
+import sys
+import threading
+from typing import Dict, Iterable, List, Optional
+from tree_sitter import Language
+
+from .parser_pool import parser_pool
+
+# Grammar modules by language identifier
+LANGUAGE_MODULES = {
+    "python": "tree_sitter_python",
+    "javascript": "tree_sitter_javascript",
+    "java": "tree_sitter_java",
+    "typescript": "tree_sitter_typescript",
+}
+# 支持的语言模块映射表。
+
+# Grammar functions for modules that export several grammars (default: language)
+LANGUAGE_FUNCTIONS = {
+    "typescript": "language_typescript",
+}
+# 导出多个语法的模块中对应语言的函数名（默认为language）。
+
+# Path to the parsers availability marker
+PARSERS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "parsers")
+PARSERS_AVAILABLE_FILE = os.path.join(PARSERS_DIR, "parsers_available.txt")
+# 解析器目录及可用性标记文件路径。
+
+# Environment variable listing the languages to preload in the background (comma separated)
+WARM_UP_ENV = "AST_MCP_WARMUP_LANGUAGES"
+# 列出需要在后台预加载的语言的环境变量（逗号分隔）。
+
+# Loaded grammars by language identifier, filled in on first use of each language
+languages: Dict[str, Language] = {}
+# 已加载的语法，每种语言首次使用时填入。
+
+_lock = threading.Lock()
+_language_locks: Dict[str, threading.Lock] = {}  # Maps language -> lock held while loading it
+_failed = set()  # Languages whose grammar module could not be loaded
+_available: Optional[List[str]] = None  # Installed languages, found without importing them
+_parsers_available = False
+# 加载状态：每种语言一把加载锁、加载失败的语言，以及（无需导入即可确定的）已安装语言列表。
+
+
+def init_parsers() -> bool:
+    """
+    Check that the tree-sitter parsers are available.
+
+    Grammars are no longer imported here; each one is loaded on first use
+    by get_language.
+
+    Returns:
+        True if the parsers are marked as available by build_parsers.py
+    """
+    # 检查tree-sitter解析器是否可用。此处不再导入语法，每种语法在首次使用时由get_language加载。
+    global _parsers_available
+    if not _parsers_available:
+        _parsers_available = os.path.exists(PARSERS_AVAILABLE_FILE)
+    return _parsers_available
+
+
+def available_languages() -> List[str]:
+    """Get the languages whose grammar modules are installed, without importing them."""
+    # 获取语法模块已安装的语言（不导入模块）。
+    global _available
+    if _available is None:
+        _available = [
+            lang_name for lang_name, module_name in LANGUAGE_MODULES.items()
+            if importlib.util.find_spec(module_name) is not None
+        ]
+    return [lang_name for lang_name in _available if lang_name not in _failed]
+
+
+def get_language(lang_name: str) -> Optional[Language]:
+    """
+    Get the grammar for a language, loading it on first use.
+
+    Concurrent first requests for the same language load it only once;
+    other languages are not blocked meanwhile.
+
+    Args:
+        lang_name: Normalized language identifier
+
+    Returns:
+        The Language, or None if the language is unknown or fails to load
+    """
+    # 获取语言的语法，首次使用时加载。
+    # 同一语言的并发首次请求只加载一次，加载期间不阻塞其他语言。
+    language = languages.get(lang_name)
+    if language is not None:
+        return language
+    module_name = LANGUAGE_MODULES.get(lang_name)
+    if module_name is None or lang_name in _failed:
+        return None
+    # 已加载时直接返回；未知语言或加载失败过的语言返回None。
+
+    with _lock:
+        language_lock = _language_locks.setdefault(lang_name, threading.Lock())
+    with language_lock:
+        language = languages.get(lang_name)
+        if language is not None:
+            return language
+        # 等锁期间其他线程可能已完成加载。
+
+        try:
+            module = importlib.import_module(module_name)
+            language = Language(getattr(module, LANGUAGE_FUNCTIONS.get(lang_name, "language"))())
+        except ImportError:
+            print(f"Module {module_name} not found. Some language support may be limited.", file=sys.stderr)
+        except Exception as e:
+            print(f"Error initializing {lang_name} language: {e}", file=sys.stderr)
+        if language is None:
+            _failed.add(lang_name)
+            return None
+        languages[lang_name] = language
+        return language
+    # 动态导入语言的tree-sitter模块并构建Language，失败时记录以免重复尝试。
+    # 加载发生在工具调用期间，而标准输出是MCP的stdio通道，因此错误信息写到标准错误。
+
+
+def warm_up(lang_names: Iterable[str]) -> List[str]:
+    """
+    Load the grammars for some languages and prime a pooled parser for each.
+
+    Args:
+        lang_names: Normalized language identifiers
+
+    Returns:
+        The languages that were loaded successfully
+    """
+    # 加载指定语言的语法，并为每种语言在解析器池中预先创建解析器。
+    loaded = []
+    for lang_name in lang_names:
+        language = get_language(lang_name)
+        if language is not None:
+            parser_pool.prime(lang_name, language)
+            loaded.append(lang_name)
+    return loaded
+
+
+def start_warm_up(lang_names: Optional[Iterable[str]] = None) -> Optional[threading.Thread]:
+    """
+    Start warming up grammars in a background daemon thread.
+
+    Args:
+        lang_names: Languages to preload. If not provided, the comma-separated
+                    list in AST_MCP_WARMUP_LANGUAGES is used.
+
+    Returns:
+        The started thread, or None if there is nothing to warm up
+    """
+    # 在后台守护线程中预热语法。未指定语言时使用环境变量AST_MCP_WARMUP_LANGUAGES中的列表。
+    if lang_names is None:
+        lang_names = os.environ.get(WARM_UP_ENV, "").split(",")
+    lang_names = [name.strip().lower() for name in lang_names if name.strip()]
+    if not lang_names:
+        return None
+    thread = threading.Thread(target=warm_up, args=(lang_names,), name="grammar-warm-up", daemon=True)
+    thread.start()
+    return thread
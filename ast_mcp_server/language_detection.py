@@ -0,0 +1,361 @@
+"""
+Bounded-cost programming language detection.
+
+Detection looks at the file extension, a shebang line and editor modelines
+first. Otherwise it scores the candidate languages with a single regular
+expression pass over a bounded window (the start and end of the code), so
+the cost does not grow with the file size. When the scores are ambiguous
+the leading candidates are checked with a trial parse of the window, and
+the one producing the fewest error nodes wins. Results are memoized by the
+hash of the window.
+"""
+# 成本有界的编程语言检测模块。
+# 优先依据文件扩展名、shebang行和编辑器modeline判断；否则在有界窗口（代码开头和结尾）上
+# 用一次正则扫描为各候选语言打分，成本不随文件大小增长。
+# 得分不明确时，对窗口做试解析，错误节点最少的候选语言胜出。结果按窗口哈希缓存。
+
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+from tree_sitter import Language
+
+from .grammars import get_language
+from .parser_pool import parser_pool
+from .serialization import iter_preorder
+
+# Number of characters examined at the start and at the end of the code
+PREFIX_WINDOW = 4096
+SUFFIX_WINDOW = 1024
+# 检测时查看的代码开头和结尾字符数。
+
+# Number of lines at each end of the code searched for modelines
+MODELINE_LINES = 5
+# 在代码两端各搜索modeline的行数。
+
+# Language returned when nothing identifies the code
+DEFAULT_LANGUAGE = "python"
+# 无法识别时返回的默认语言。
+
+# Trial parses are used when the runner-up scores at least this fraction of the winner
+AMBIGUOUS_SCORE_RATIO = 0.75
+# 第二名得分达到第一名的该比例时，视为不明确并进行试解析。
+
+# A trial parse with at most this fraction of error nodes confirms a language
+MAX_ERROR_RATIO = 0.02
+# 试解析时错误节点比例不超过该值即确认语言。
+
+# Maximum number of detection results kept in the cache
+DETECTION_CACHE_SIZE = 256
+# 检测结果缓存的最大条目数。
+
+# Language identifiers by file extension
+EXTENSION_MAP = {
+    "py": "python", "pyw": "python", "pyi": "python",
+    "js": "javascript", "mjs": "javascript", "cjs": "javascript", "jsx": "javascript",
+    "ts": "typescript", "mts": "typescript", "cts": "typescript",
+    "tsx": "tsx",
+    "go": "go",
+    "rs": "rust",
+    "c": "c", "h": "c",
+    "cc": "cpp", "cpp": "cpp", "cxx": "cpp", "hpp": "cpp", "hh": "cpp", "hxx": "cpp",
+    "java": "java",
+}
+# 按文件扩展名索引的语言标识符。
+
+# Language identifiers by shebang interpreter (version suffixes are stripped)
+INTERPRETER_MAP = {
+    "python": "python", "pypy": "python",
+    "node": "javascript", "nodejs": "javascript", "bun": "javascript",
+    "deno": "typescript", "ts-node": "typescript", "tsx": "typescript",
+    "go": "go",
+    "rust-script": "rust",
+}
+# 按shebang解释器索引的语言标识符（忽略版本号后缀）。
+
+# Language identifiers by modeline name (vim filetype or emacs mode)
+MODELINE_MAP = {
+    "python": "python", "py": "python",
+    "javascript": "javascript", "js": "javascript", "js2": "javascript",
+    "typescript": "typescript", "ts": "typescript",
+    "go": "go", "golang": "go",
+    "rust": "rust",
+    "c": "c",
+    "cpp": "cpp", "c++": "cpp",
+    "java": "java",
+}
+# 按modeline名称（vim filetype或emacs mode）索引的语言标识符。
+
+# Scoring signals: (regular expression, {language: weight}), matched per line
+SIGNALS: List[Tuple[str, Dict[str, float]]] = [
+    (r"^[ \t]*def[ \t]+\w+[ \t]*\(.*\)[^:\n]*:", {"python": 3}),
+    (r"^[ \t]*class[ \t]+\w+[ \t]*(?:\([^)\n]*\))?[ \t]*:", {"python": 3}),
+    (r"^[ \t]*from[ \t]+[\w.]+[ \t]+import[ \t]", {"python": 3}),
+    (r"^[ \t]*import[ \t]+[\w.]+(?:[ \t]+as[ \t]+\w+)?[ \t]*$", {"python": 2}),
+    (r"^[ \t]*(?:elif\b.*|else|try|finally|except\b.*)[ \t]*:[ \t]*$", {"python": 2}),
+    (r"\bself\.\w+", {"python": 1}),
+    (r"\b(?:None|True|False)\b", {"python": 1}),
+    (r"^[ \t]*import\b.*\bfrom[ \t]+['\"]", {"javascript": 3, "typescript": 3}),
+    (r"^[ \t]*export[ \t]+(?:default|const|function|class)\b", {"javascript": 2, "typescript": 2}),
+    (r"\b(?:const|let|var)[ \t]+\w+[ \t]*=", {"javascript": 1, "typescript": 1, "rust": 0.5}),
+    (r"\bfunction\b[ \t]*\w*[ \t]*\(", {"javascript": 2, "typescript": 2}),
+    (r"=>", {"javascript": 1, "typescript": 1}),
+    (r"\brequire\([ \t]*['\"]", {"javascript": 3}),
+    (r"\bmodule\.exports\b", {"javascript": 3}),
+    (r"\b(?:console\.log|document\.|window\.)", {"javascript": 2, "typescript": 1}),
+    (r"===|!==", {"javascript": 1, "typescript": 1}),
+    (r"[\w)][ \t]*:[ \t]*(?:string|number|boolean|any|unknown|void)\b", {"typescript": 3}),
+    (r"^[ \t]*(?:export[ \t]+)?(?:interface|type)[ \t]+\w+[ \t]*(?:<[^>\n]*>)?[ \t]*[={]", {"typescript": 3, "java": 0.5}),
+    (r"^package[ \t]+\w+[ \t]*$", {"go": 4}),
+    (r"^[ \t]*func\b", {"go": 3}),
+    (r":=", {"go": 2}),
+    (r"\bfmt\.\w+", {"go": 2}),
+    (r"^[ \t]*(?:pub(?:\([\w:]+\))?[ \t]+)?fn[ \t]+\w+", {"rust": 3}),
+    (r"\blet[ \t]+mut\b", {"rust": 3}),
+    (r"^[ \t]*use[ \t]+\w+(?:::\w+)+", {"rust": 3}),
+    (r"^[ \t]*impl\b", {"rust": 3}),
+    (r"\b\w+!\(", {"rust": 2}),
+    (r"->", {"rust": 1, "cpp": 0.5, "c": 0.5, "python": 0.5}),
+    (r"^[ \t]*#[ \t]*include[ \t]*\"", {"c": 2, "cpp": 2}),
+    (r"^[ \t]*#[ \t]*include[ \t]*<\w+\.h>", {"c": 3, "cpp": 1}),
+    (r"^[ \t]*#[ \t]*include[ \t]*<\w+>", {"cpp": 3}),
+    (r"\b(?:printf|malloc|free|sizeof)[ \t]*\(", {"c": 2, "cpp": 1}),
+    (r"\bint[ \t]+main[ \t]*\(", {"c": 2, "cpp": 2}),
+    (r"\bstd::", {"cpp": 3}),
+    (r"\btemplate[ \t]*<", {"cpp": 3}),
+    (r"^[ \t]*using[ \t]+namespace\b", {"cpp": 3}),
+    (r"^[ \t]*package[ \t]+[\w.]+;", {"java": 4}),
+    (r"^[ \t]*import[ \t]+(?:static[ \t]+)?[\w.]+(?:\.\*)?;", {"java": 3}),
+    (r"\bpublic[ \t]+(?:static[ \t]+)?(?:final[ \t]+)?(?:class|interface|enum|void|int|String)\b", {"java": 3}),
+    (r"\bSystem\.(?:out|err)\.", {"java": 3}),
+    (r"@Override\b", {"java": 2}),
+    (r";[ \t]*$", {"javascript": 0.5, "typescript": 0.5, "java": 0.5, "c": 0.5, "cpp": 0.5, "rust": 0.5}),
+]
+# 打分信号：(正则表达式, {语言: 权重})，按行匹配。
+
+SIGNAL_WEIGHTS = {f"s{i}": weights for i, (_, weights) in enumerate(SIGNALS)}
+# 每个信号命名分组对应的权重。
+
+# Languages that the signals can identify
+SIGNAL_LANGUAGES = tuple(sorted({language for _, weights in SIGNALS for language in weights}))
+# 信号能够识别的语言。
+
+MODELINE_PATTERN = re.compile(
+    r"(?:\bvim?|\bex):.*?\b(?:ft|filetype|syntax)[ \t]*=[ \t]*([\w+-]+)"
+    r"|-\*-(.*?)-\*-"
+)
+# vim modeline（ft/filetype/syntax）和emacs模式行（-*- ... -*-）的正则。
+
+
+@lru_cache(maxsize=None)
+def signal_pattern() -> re.Pattern:
+    """Get all signals combined into one pattern with a named group per signal (compiled on first use)."""
+    # 将所有信号合并为一个正则，每个信号对应一个命名分组，一次扫描即可完成打分；首次使用时才编译。
+    return re.compile(
+        "|".join(f"(?P<s{i}>{pattern})" for i, (pattern, _) in enumerate(SIGNALS)),
+        re.MULTILINE
+    )
+
+
+def get_window(code: str) -> str:
+    """
+    Get the part of the code that detection looks at.
+
+    Code longer than the window is cut to whole lines at its start and end.
+    """
+    # 获取检测时查看的代码部分；超出窗口长度的代码截取开头和结尾的完整行。
+    if len(code) <= PREFIX_WINDOW + SUFFIX_WINDOW:
+        return code
+    prefix = code[:PREFIX_WINDOW]
+    prefix = prefix[:prefix.rfind("\n") + 1] or prefix
+    suffix = code[-SUFFIX_WINDOW:]
+    suffix = suffix[suffix.find("\n") + 1:] or suffix
+    return prefix + suffix
+
+
+def language_from_extension(filename: Optional[str]) -> Optional[str]:
+    """Get the language for a file name's extension, if it is known."""
+    # 根据文件扩展名获取语言，未知时返回None。
+    if not filename or "." not in filename:
+        return None
+    return EXTENSION_MAP.get(filename.rsplit(".", 1)[-1].lower())
+
+
+def language_from_shebang(window: str) -> Optional[str]:
+    """Get the language named by a #! interpreter line, if any."""
+    # 根据#!解释器行获取语言。
+    if not window.startswith("#!"):
+        return None
+    words = window[2:window.find("\n")].split() if "\n" in window else window[2:].split()
+    if words and words[0].rsplit("/", 1)[-1] == "env":
+        words = [word for word in words[1:] if not word.startswith("-") and "=" not in word]
+    if not words:
+        return None
+    interpreter = words[0].rsplit("/", 1)[-1].rstrip("0123456789.")
+    return INTERPRETER_MAP.get(interpreter)
+    # 处理"/usr/bin/env [-S] 解释器"形式，去掉解释器名称中的版本号。
+
+
+def language_from_modeline(window: str) -> Optional[str]:
+    """Get the language named by a vim or emacs modeline in the first or last lines."""
+    # 根据开头或结尾几行中的vim或emacs modeline获取语言。
+    lines = window.splitlines()
+    if len(lines) > 2 * MODELINE_LINES:
+        lines = lines[:MODELINE_LINES] + lines[-MODELINE_LINES:]
+    for line in lines:
+        match = MODELINE_PATTERN.search(line)
+        if not match:
+            continue
+        name = match.group(1)
+        if name is None:
+            # Emacs: "-*- mode: python -*-", "-*- python -*-" or other variables only
+            emacs = match.group(2)
+            mode = re.search(r"\bmode:[ \t]*([\w+-]+)", emacs, re.IGNORECASE)
+            if mode:
+                name = mode.group(1)
+            elif ":" not in emacs:
+                name = emacs.strip()
+        if name:
+            language = MODELINE_MAP.get(name.lower().removesuffix("-mode"))
+            if language:
+                return language
+    return None
+
+
+def score_languages(window: str, candidates: Tuple[str, ...]) -> Dict[str, float]:
+    """
+    Score the candidate languages with one regular expression pass over the window.
+
+    Args:
+        window: The text to score (see get_window)
+        candidates: Language identifiers to score
+
+    Returns:
+        Dictionary mapping each candidate to its score
+    """
+    # 对窗口做一次正则扫描，为各候选语言打分。
+    scores = dict.fromkeys(candidates, 0.0)
+    for match in signal_pattern().finditer(window):
+        for language, weight in SIGNAL_WEIGHTS[match.lastgroup].items():
+            if language in scores:
+                scores[language] += weight
+    return scores
+
+
+def error_ratio(window_bytes: bytes, language_name: str, language: Language) -> float:
+    """Trial-parse a window and return the fraction of its nodes that are errors."""
+    # 试解析窗口，返回错误节点（ERROR或缺失节点）所占比例。
+    with parser_pool.parser(language_name, language) as parser:
+        root = parser.parse(window_bytes).root_node
+    if not root.has_error:
+        return 0.0
+    errors = sum(1 for node, _ in iter_preorder(root) if node.is_error or node.is_missing)
+    return errors / root.descendant_count
+
+
+class LanguageDetector:
+    """Detects languages of code buffers, memoizing results by window hash."""
+    # 检测代码语言，并按窗口哈希缓存检测结果。
+
+    def __init__(self, cache_size: int = DETECTION_CACHE_SIZE):
+        self.cache_size = cache_size
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()  # Maps (window hash, extension, candidates, verify) -> language
+
+    def detect(
+        self,
+        code: str,
+        filename: Optional[str] = None,
+        candidates: Optional[Sequence[str]] = None,
+        verify: Optional[bool] = None
+    ) -> str:
+        """
+        Detect the programming language of code.
+
+        Args:
+            code: Source code
+            filename: Source file name (optional)
+            candidates: Language identifiers with an installed grammar. Only
+                        these languages are scored and trial-parsed (their
+                        grammars are loaded on demand); if empty, all
+                        languages known to the signals are scored.
+            verify: True to always confirm the winner with a trial parse,
+                    False to never trial-parse, None (default) to trial-parse
+                    only when the scores are ambiguous
+
+        Returns:
+            The detected language identifier
+        """
+        # 检测代码的编程语言。
+        # 仅对候选语言（已安装语法）打分和试解析；verify为None时只在得分不明确时试解析。
+        language = language_from_extension(filename)
+        if language:
+            return language
+        # 已知扩展名直接决定语言。
+
+        window = get_window(code)
+        candidates = tuple(candidates or SIGNAL_LANGUAGES)
+        key = (hashlib.md5(window.encode("utf-8", "surrogatepass")).hexdigest(), candidates, verify)
+        with self._lock:
+            language = self._cache.get(key)
+            if language is not None:
+                self._cache.move_to_end(key)
+                return language
+        # 命中缓存时直接返回。
+
+        language = self._detect_window(window, candidates, verify)
+        with self._lock:
+            self._cache[key] = language
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return language
+
+    def _detect_window(
+        self,
+        window: str,
+        candidates: Tuple[str, ...],
+        verify: Optional[bool]
+    ) -> str:
+        language = language_from_shebang(window) or language_from_modeline(window)
+        if language:
+            return language
+        # shebang和modeline直接决定语言。
+
+        scores = score_languages(window, candidates)
+        default_first = sorted(candidates, key=lambda name: name != DEFAULT_LANGUAGE)
+        ranked = sorted(default_first, key=lambda name: -scores[name])
+        # 按得分排序，得分相同时默认语言优先，其余保持候选顺序。
+
+        best = ranked[0] if ranked else DEFAULT_LANGUAGE
+        runner_up = scores[ranked[1]] if len(ranked) > 1 else 0.0
+        ambiguous = scores.get(best, 0.0) == 0.0 or runner_up >= AMBIGUOUS_SCORE_RATIO * scores[best]
+        if verify is False or (verify is None and not ambiguous):
+            return best
+        # 得分明确（或不要求验证）时直接返回最高分语言。
+
+        window_bytes = window.encode("utf-8", "surrogatepass")
+        best_ratio = None
+        for name in ranked:
+            grammar = get_language(name)
+            if grammar is None:
+                continue
+            ratio = error_ratio(window_bytes, name, grammar)
+            if ratio <= MAX_ERROR_RATIO:
+                return name
+            if best_ratio is None or ratio < best_ratio:
+                best, best_ratio = name, ratio
+        return best
+        # 按得分顺序试解析，第一个错误比例足够低的语言胜出；否则取错误比例最低的语言。
+
+    def clear(self) -> None:
+        """Remove all cached detection results."""
+        # 清空检测结果缓存。
+        with self._lock:
+            self._cache.clear()
+
+
+# Shared detector used by the tools
+language_detector = LanguageDetector()
+# 工具共用的语言检测器。
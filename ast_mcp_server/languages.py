@@ -0,0 +1,240 @@
+"""
+Table-driven language plugins.
+
+Each supported language is described by a LanguageSpec: plain data naming
+the node kinds that open scopes, carry control flow, define functions and
+classes or import modules, plus the few fields the analyses read. The
+structure analysis and the enhanced ASG's semantic edges are written once
+against these specs, so supporting another language means adding a spec
+rather than another traversal.
+
+When a language is first used, its spec is resolved against the loaded
+grammar into a table of category flags indexed by tree-sitter's numeric
+node kind id, so classifying a native node is one array lookup on
+node.kind_id instead of string comparisons.
+"""
+# 表驱动的语言插件模块。
+# 每种支持的语言由一个LanguageSpec描述：纯数据，列出创建作用域、承载控制流、定义函数和类或导入模块的节点类型，以及分析需要读取的少数字段。
+# 结构分析和增强版ASG的语义边只针对这些描述编写一次，因此支持新语言只需增加一个描述，而不是再写一套遍历。
+# 语言首次使用时，其描述会针对已加载的语法解析为按tree-sitter数字节点类型ID索引的类别标志表，
+# 对原生节点分类只需按node.kind_id查一次数组，而无需比较字符串。
+
+import threading
+from collections import defaultdict
+from typing import Dict, FrozenSet, NamedTuple, Optional, Tuple
+from tree_sitter import Language, Node
+
+from .grammars import get_language
+
+# Node kind categories, as bit flags
+SCOPE = 1
+CONTROL_FLOW = 2
+FUNCTION = 4
+CLASS = 8
+IMPORT = 16
+BODY = 32
+IDENTIFIER = 64
+COMMENT = 128
+# 节点类型类别（位标志）。
+
+# Size of the kind id tables: kind ids are 16-bit, and ERROR nodes have kind id 65535
+KIND_ID_LIMIT = 1 << 16
+# 节点类型ID表的大小：类型ID为16位，ERROR节点的类型ID为65535。
+
+
+class LanguageSpec(NamedTuple):
+    """
+    Node kinds and fields describing how a language is analyzed.
+
+    The fields from declarators to class_members_in_scope are only read by
+    the generic name resolver (symbols.LexicalScopeResolver); languages
+    with their own resolver can leave them empty. The last fields are read
+    by the symbol diff (symbol_diff).
+    """
+    # 描述如何分析一种语言的节点类型和字段。declarators到class_members_in_scope的字段只由通用名称解析器读取，
+    # 有专用解析器的语言可以留空；最后几个字段由符号差异（symbol_diff）读取。
+
+    functions: FrozenSet[str]  # Named function and method definitions
+    classes: FrozenSet[str]  # Class-like definitions
+    imports: FrozenSet[str]  # Import statements
+    scopes: FrozenSet[str]  # Nodes opening a scope (including the functions and classes)
+    control_flow: FrozenSet[str]  # Branches and loops, linked to their body and counted as nesting
+    bodies: FrozenSet[str]  # Blocks a control_flow edge points to
+    identifiers: FrozenSet[str]  # Name nodes that can be bound and referenced
+    parameters: Dict[str, Optional[str]]  # Parameter kind -> field holding its name (None: the node itself)
+    import_names: FrozenSet[str]  # Children of an import naming the imported module
+    declarators: FrozenSet[str] = frozenset()  # Variable declarations with "name" and "value" fields
+    calls: Dict[str, str] = {}  # Call kind -> field holding the callee
+    members: Dict[str, str] = {}  # Member access kind -> field naming the member
+    import_bindings: FrozenSet[str] = frozenset()  # Import parts whose last identifier child is bound
+    qualified_names: FrozenSet[str] = frozenset()  # Dotted names searched for the bound identifier
+    class_members_in_scope: bool = False  # Whether methods see the names bound in their class body
+    comments: FrozenSet[str] = frozenset({"comment"})  # Comment kinds, ignored when comparing definitions
+    definition_wrappers: FrozenSet[str] = frozenset()  # Parents holding part of a definition (e.g. its decorators)
+
+
+PYTHON_SPEC = LanguageSpec(
+    functions=frozenset({"function_definition"}),
+    classes=frozenset({"class_definition"}),
+    imports=frozenset({"import_statement", "import_from_statement"}),
+    scopes=frozenset({
+        "function_definition", "lambda", "class_definition",
+        "list_comprehension", "set_comprehension", "dictionary_comprehension", "generator_expression"
+    }),
+    control_flow=frozenset({
+        "if_statement", "for_statement", "while_statement",
+        "try_statement", "with_statement", "match_statement"
+    }),
+    bodies=frozenset({"block"}),
+    identifiers=frozenset({"identifier"}),
+    parameters={"identifier": None},
+    import_names=frozenset({"dotted_name"}),
+    definition_wrappers=frozenset({"decorated_definition"})
+)
+# Python的描述；名称由symbols.PythonScopeResolver按Python的作用域规则解析。
+
+JAVASCRIPT_SPEC = LanguageSpec(
+    functions=frozenset({"function_declaration", "generator_function_declaration", "method_definition"}),
+    classes=frozenset({"class_declaration"}),
+    imports=frozenset({"import_statement"}),
+    scopes=frozenset({
+        "function_declaration", "generator_function_declaration", "method_definition", "class_declaration",
+        "function_expression", "generator_function", "arrow_function",
+        "statement_block", "for_statement", "for_in_statement"
+    }),
+    control_flow=frozenset({
+        "if_statement", "for_statement", "for_in_statement", "while_statement",
+        "do_statement", "try_statement", "switch_statement"
+    }),
+    bodies=frozenset({"statement_block", "switch_body"}),
+    identifiers=frozenset({"identifier"}),
+    parameters={"identifier": None, "assignment_pattern": "left"},
+    import_names=frozenset({"string"}),
+    declarators=frozenset({"variable_declarator"}),
+    calls={"call_expression": "function"},
+    import_bindings=frozenset({"import_clause", "import_specifier", "namespace_import"})
+)
+# JavaScript的描述：块和for语句也创建作用域（let/const），方法名是属性名，不绑定为变量。
+
+TYPESCRIPT_SPEC = JAVASCRIPT_SPEC._replace(
+    classes=frozenset({"class_declaration", "abstract_class_declaration", "interface_declaration"}),
+    scopes=JAVASCRIPT_SPEC.scopes | {"abstract_class_declaration", "interface_declaration"},
+    identifiers=frozenset({"identifier", "type_identifier"}),
+    parameters={"identifier": None, "required_parameter": "pattern", "optional_parameter": "pattern"}
+)
+# TypeScript的描述：在JavaScript的基础上增加抽象类和接口，类名是类型标识符，参数带类型注解。
+
+JAVA_SPEC = LanguageSpec(
+    functions=frozenset({"method_declaration", "constructor_declaration"}),
+    classes=frozenset({"class_declaration", "interface_declaration", "enum_declaration", "record_declaration"}),
+    imports=frozenset({"import_declaration"}),
+    scopes=frozenset({
+        "method_declaration", "constructor_declaration",
+        "class_declaration", "interface_declaration", "enum_declaration", "record_declaration",
+        "lambda_expression", "block", "for_statement", "enhanced_for_statement", "catch_clause"
+    }),
+    control_flow=frozenset({
+        "if_statement", "for_statement", "enhanced_for_statement", "while_statement", "do_statement",
+        "try_statement", "try_with_resources_statement", "switch_expression"
+    }),
+    bodies=frozenset({"block", "switch_block"}),
+    identifiers=frozenset({"identifier"}),
+    parameters={"identifier": None, "formal_parameter": "name"},
+    import_names=frozenset({"scoped_identifier", "identifier"}),
+    declarators=frozenset({"variable_declarator", "enhanced_for_statement"}),
+    calls={"method_invocation": "name"},
+    members={"field_access": "field"},
+    import_bindings=frozenset({"import_declaration"}),
+    qualified_names=frozenset({"scoped_identifier"}),
+    class_members_in_scope=True,
+    comments=frozenset({"line_comment", "block_comment"})
+)
+# Java的描述：方法可直接调用同一类中的其他方法，因此类体中的名称对方法可见。
+
+# Language specs by language identifier
+LANGUAGE_SPECS: Dict[str, LanguageSpec] = {
+    "python": PYTHON_SPEC,
+    "javascript": JAVASCRIPT_SPEC,
+    "typescript": TYPESCRIPT_SPEC,
+    "java": JAVA_SPEC,
+}
+# 按语言标识符索引的语言描述。
+
+# Node kinds defining a function or class in any supported language
+DEFINITION_KINDS = frozenset().union(*(spec.functions | spec.classes for spec in LANGUAGE_SPECS.values()))
+# 任一支持语言中定义函数或类的节点类型。
+
+
+class LanguagePlugin:
+    """
+    A LanguageSpec resolved against a loaded grammar.
+
+    flags maps every node kind id to its category flags (SCOPE, FUNCTION,
+    ...), so flags[node.kind_id] classifies a native node.
+    """
+    # 针对已加载语法解析后的LanguageSpec。flags将每个节点类型ID映射到其类别标志，flags[node.kind_id]即可对原生节点分类。
+
+    def __init__(self, name: str, spec: LanguageSpec, language: Language):
+        self.name = name
+        self.spec = spec
+        self.language = language
+        self.flags = bytearray(KIND_ID_LIMIT)
+
+        kind_ids = defaultdict(list)  # Maps node kind -> its ids
+        for kind_id in range(language.node_kind_count):
+            if language.node_kind_is_named(kind_id):
+                kind_ids[language.node_kind_for_id(kind_id)].append(kind_id)
+        # Language.id_for_node_kind只返回一个ID，而别名节点类型（如Python的block）有多个ID，因此扫描全部类型ID。
+
+        for flag, kinds in self.categories(spec):
+            for kind in kinds:
+                for kind_id in kind_ids.get(kind, ()):
+                    self.flags[kind_id] |= flag
+        # 将描述中的每个节点类型解析为其全部类型ID并标记类别；语法中不存在的类型被忽略。
+
+    @staticmethod
+    def categories(spec: LanguageSpec) -> Tuple[Tuple[int, FrozenSet[str]], ...]:
+        """Get the (category flag, node kinds) pairs of a spec."""
+        # 获取描述中的(类别标志, 节点类型)对。
+        return (
+            (SCOPE, spec.scopes), (CONTROL_FLOW, spec.control_flow),
+            (FUNCTION, spec.functions), (CLASS, spec.classes), (IMPORT, spec.imports),
+            (BODY, spec.bodies), (IDENTIFIER, spec.identifiers), (COMMENT, spec.comments),
+        )
+
+    def kind_flags(self, node: Node) -> int:
+        """Get the category flags of a native node."""
+        # 获取原生节点的类别标志。
+        return self.flags[node.kind_id]
+
+
+_plugins: Dict[str, LanguagePlugin] = {}  # Maps language -> resolved plugin
+_plugins_lock = threading.Lock()
+
+
+def get_language_plugin(lang_name: str) -> Optional[LanguagePlugin]:
+    """
+    Get the plugin of a language, resolving its spec on first use.
+
+    Args:
+        lang_name: Normalized language identifier
+
+    Returns:
+        The LanguagePlugin, or None if the language has no spec or its
+        grammar cannot be loaded
+    """
+    # 获取语言的插件，首次使用时解析其描述；语言没有描述或语法无法加载时返回None。
+    plugin = _plugins.get(lang_name)
+    if plugin is not None:
+        return plugin
+    spec = LANGUAGE_SPECS.get(lang_name)
+    if spec is None:
+        return None
+    language = get_language(lang_name)
+    if language is None:
+        return None
+    with _plugins_lock:
+        plugin = _plugins.get(lang_name)
+        if plugin is None:
+            plugin = _plugins[lang_name] = LanguagePlugin(lang_name, spec, language)
+    return plugin
@@ -0,0 +1,162 @@
+"""
+Parser pool for the AST MCP server.
+
+Creating a tree-sitter Parser and assigning its language on every request is
+wasteful, and sharing a single module-level parser between concurrent tool
+calls is unsafe. This module keeps a bounded pool of parsers per language
+with a thread-local fast path, so each parse checks a ready parser out and
+returns it when done.
+"""
+# MCP服务器的解析器池模块。
+# 每次请求都新建Parser并设置语言代价较高，而在并发工具调用间共享同一个解析器又不安全。
+# 本模块按语言维护有界的解析器池，并提供线程本地快速路径：解析前借出解析器，用完归还。
+
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Iterator, List
+from tree_sitter import Language, Parser
+
+# Maximum number of idle parsers kept per language in the shared pool
+DEFAULT_POOL_SIZE = 4
+# 共享池中每种语言最多保留的空闲解析器数量。
+
+
+class ParserPool:
+    """Bounded, thread-safe pool of tree-sitter parsers keyed by language."""
+    # 按语言划分的有界、线程安全的tree-sitter解析器池。
+
+    def __init__(self, max_size: int = DEFAULT_POOL_SIZE):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._idle: Dict[str, List[Parser]] = defaultdict(list)  # Maps language -> idle parsers
+        self._local = threading.local()  # Per-thread parsers, checked without locking
+
+    def _thread_state(self):
+        """Get the thread-local parser cache and busy set."""
+        # 获取当前线程的解析器缓存及占用集合。
+        state = self._local
+        if not hasattr(state, "parsers"):
+            state.parsers = {}  # Maps language -> parser owned by this thread
+            state.busy = set()  # Languages whose thread-local parser is checked out
+        return state
+
+    def checkout(self, language_name: str, language: Language) -> Parser:
+        """
+        Check out a parser configured for the given language.
+
+        The calling thread's own parser is used when it is free; otherwise a
+        parser is taken from the shared pool, or created if the pool is empty.
+
+        Args:
+            language_name: Normalized language identifier (e.g. 'python')
+            language: The tree-sitter Language object for that identifier
+
+        Returns:
+            A Parser ready to parse code in the given language
+        """
+        # 借出一个已设置好语言的解析器。
+        # 优先使用当前线程自己的解析器；若其正被占用，则从共享池获取，池空时新建。
+        state = self._thread_state()
+        local_parser = state.parsers.get(language_name)
+        if local_parser is not None and language_name not in state.busy:
+            state.busy.add(language_name)
+            return local_parser
+        # 线程本地快速路径，无需加锁。
+
+        with self._lock:
+            idle = self._idle[language_name]
+            if idle:
+                return idle.pop()
+        # 从共享池中取出空闲解析器。
+
+        return Parser(language)
+        # 池中没有空闲解析器时新建一个。
+
+    def checkin(self, language_name: str, parser: Parser) -> None:
+        """
+        Return a parser previously obtained from checkout.
+
+        Args:
+            language_name: Language identifier the parser was checked out for
+            parser: The parser to return
+        """
+        # 归还之前借出的解析器。
+        state = self._thread_state()
+        local_parser = state.parsers.get(language_name)
+        if local_parser is parser:
+            state.busy.discard(language_name)
+            return
+        # 归还线程本地解析器时只需清除占用标记。
+
+        if local_parser is None:
+            state.parsers[language_name] = parser
+            return
+        # 当前线程尚无该语言的解析器时，将其留作线程本地解析器。
+
+        with self._lock:
+            idle = self._idle[language_name]
+            if len(idle) < self.max_size:
+                idle.append(parser)
+        # 放回共享池；池已满时直接丢弃。
+
+    def discard(self, language_name: str, parser: Parser) -> None:
+        """Drop a parser that may be in an inconsistent state after an error."""
+        # 丢弃出错后可能处于不一致状态的解析器。
+        state = self._thread_state()
+        if state.parsers.get(language_name) is parser:
+            del state.parsers[language_name]
+            state.busy.discard(language_name)
+
+    @contextmanager
+    def parser(self, language_name: str, language: Language) -> Iterator[Parser]:
+        """
+        Context manager that checks a parser out and returns it afterwards.
+
+        Args:
+            language_name: Normalized language identifier (e.g. 'python')
+            language: The tree-sitter Language object for that identifier
+
+        Yields:
+            A Parser ready to parse code in the given language
+        """
+        # 借出解析器并在使用结束后自动归还的上下文管理器。
+        parser = self.checkout(language_name, language)
+        try:
+            yield parser
+        except BaseException:
+            self.discard(language_name, parser)
+            raise
+        # 出错时丢弃解析器，避免复用不一致的状态。
+        self.checkin(language_name, parser)
+
+    def prime(self, language_name: str, language: Language, count: int = 1) -> None:
+        """
+        Create parsers ahead of time and add them to the shared pool.
+
+        Used by background warm-up, so the parsers go to the shared pool
+        rather than to the calling thread.
+
+        Args:
+            language_name: Normalized language identifier (e.g. 'python')
+            language: The tree-sitter Language object for that identifier
+            count: Number of idle parsers to have ready (capped at max_size)
+        """
+        # 预先创建解析器并放入共享池。供后台预热使用，因此放入共享池而不是当前线程。
+        with self._lock:
+            missing = min(count, self.max_size) - len(self._idle[language_name])
+        parsers = [Parser(language) for _ in range(missing)]
+        with self._lock:
+            idle = self._idle[language_name]
+            idle.extend(parsers[:self.max_size - len(idle)])
+
+    def clear(self) -> None:
+        """Drop all idle parsers held by the shared pool."""
+        # 清空共享池中的所有空闲解析器。
+        with self._lock:
+            self._idle.clear()
+
+
+# Shared pool used by all parse entry points
+parser_pool = ParserPool()
+# 所有解析入口共用的解析器池。
@@ -0,0 +1,114 @@
+"""
+Position lookup on native tree-sitter trees.
+
+Finds the node at a position with tree-sitter's descendant_for_*_range,
+which descends from the root through the one child containing the
+position, and builds the node's ancestor chain the same way
+(Node.child_with_descendant), so a lookup costs the depth of the node
+rather than the size of the tree and nothing else is serialized.
+"""
+# 原生tree-sitter语法树上的位置查找模块。
+# 用tree-sitter的descendant_for_*_range查找位置处的节点，它从根节点起只进入包含该位置的子节点；
+# 节点的祖先链以同样方式（Node.child_with_descendant）构建，因此一次查找的开销取决于节点深度而非语法树大小，且不序列化其他节点。
+
+from typing import Dict, List, Sequence, Tuple
+from tree_sitter import Node
+
+from .tree_diff import node_id, node_span
+
+# Number of characters of node text included in lookup results
+MAX_NODE_TEXT = 200
+# 查找结果中包含的节点文本的最大字符数。
+
+
+def node_at_point(root: Node, row: int, column: int, named_only: bool = False) -> Node:
+    """Get the smallest node (or named node) spanning a (row, byte column) point."""
+    # 获取包含某行列位置（列按字节计）的最小节点（或命名节点）。
+    point = (row, column)
+    if named_only:
+        return root.named_descendant_for_point_range(point, point)
+    return root.descendant_for_point_range(point, point)
+
+
+def node_at_byte(root: Node, offset: int, named_only: bool = False) -> Node:
+    """Get the smallest node (or named node) spanning a byte offset."""
+    # 获取包含某字节偏移的最小节点（或命名节点）。
+    if named_only:
+        return root.named_descendant_for_byte_range(offset, offset)
+    return root.descendant_for_byte_range(offset, offset)
+
+
+def ancestors_of(root: Node, node: Node, named_only: bool = False) -> List[Node]:
+    """Get the ancestors of a node from the root down, descending through the child that contains it."""
+    # 从根节点向下获取节点的祖先，每一步只进入包含该节点的子节点。
+    ancestors = []
+    current = root
+    while current is not None and current != node:
+        if current.is_named or not named_only:
+            ancestors.append(current)
+        current = current.child_with_descendant(node)
+    return ancestors
+
+
+def node_info(node: Node, source_bytes: bytes, with_text: bool = True) -> Dict:
+    """Describe a node by its ID, type and range, and optionally its text (truncated to MAX_NODE_TEXT characters)."""
+    # 以ID、类型和范围描述节点，可选包含其文本（截断为MAX_NODE_TEXT个字符）。
+    info = {"id": node_id(node), "type": node.type, **node_span(node)}
+    if with_text:
+        end_byte = min(node.end_byte, node.start_byte + MAX_NODE_TEXT * 4)
+        text = source_bytes[node.start_byte:end_byte].decode("utf-8", "replace")
+        info["text"] = text[:MAX_NODE_TEXT]
+        if len(text) > MAX_NODE_TEXT or end_byte < node.end_byte:
+            info["truncated"] = True
+        # 最多解码MAX_NODE_TEXT个字符所需的字节（UTF-8每字符至多4字节），不必解码大节点的全部文本。
+    return info
+
+
+def describe_nodes(
+    root: Node,
+    source_bytes: bytes,
+    nodes: Sequence[Node],
+    include_ancestors: bool = True,
+    named_only: bool = False
+) -> Tuple[Dict[str, Dict], List[Dict]]:
+    """
+    Describe the nodes found for a batch of positions.
+
+    Every distinct node (found or ancestor) is described once in a table
+    keyed by node ID, and each position refers to it by ID, so ancestors
+    shared by many positions are not repeated. Ancestor chains of nodes
+    found more than once are computed once.
+
+    Args:
+        root: Root node of the tree
+        source_bytes: The UTF-8 source of the tree
+        nodes: The node found for each position
+        include_ancestors: Whether to include each node's ancestor chain
+        named_only: Whether ancestor chains include only named nodes
+
+    Returns:
+        (table of node descriptions by ID, one {"node", "ancestors"} entry
+        of node IDs per position, ancestors from the root down)
+    """
+    # 描述一批位置处找到的节点：每个不同节点（找到的节点或祖先）在以ID为键的表中只描述一次，各位置以ID引用，
+    # 因此多个位置共享的祖先不会重复；同一节点的祖先链只计算一次。
+    table = {}
+    chains = {}  # Maps node ID -> ancestor IDs
+    results = []
+    for node in nodes:
+        found_id = node_id(node)
+        if "text" not in table.get(found_id, ()):
+            table[found_id] = node_info(node, source_bytes)
+        entry = {"node": found_id}
+        if include_ancestors:
+            chain = chains.get(found_id)
+            if chain is None:
+                chain = chains[found_id] = []
+                for ancestor in ancestors_of(root, node, named_only):
+                    ancestor_id = node_id(ancestor)
+                    if ancestor_id not in table:
+                        table[ancestor_id] = node_info(ancestor, source_bytes, with_text=False)
+                    chain.append(ancestor_id)
+            entry["ancestors"] = chain
+        results.append(entry)
+    return table, results
@@ -0,0 +1,162 @@
+"""
+Tree-sitter query tools for the MCP server.
+
+This module lets clients run tree-sitter S-expression queries directly on
+the native syntax tree and receive only the captured nodes, instead of
+downloading the whole AST and filtering it themselves. Compiled queries are
+kept in an LRU cache keyed by (language, pattern).
+"""
+# MCP服务器的tree-sitter查询工具模块。
+# 客户端可以直接在原生语法树上执行tree-sitter S表达式查询，只接收被捕获的节点，
+# 无需下载整个AST后自行过滤。编译后的查询按(语言, 模式)缓存在LRU中。
+
+from functools import lru_cache
+from typing import Dict, List, Optional
+from tree_sitter import Query, QueryCursor, QueryError
+
+from .tools import get_language, parse_code_to_tree
+from .serialization import Projection, cursor_to_dict
+
+# Maximum number of compiled queries kept in the cache
+QUERY_CACHE_SIZE = 128
+# 缓存中最多保留的已编译查询数量。
+
+# Default maximum number of matches returned by query_ast
+DEFAULT_MAX_MATCHES = 1000
+# query_ast默认返回的最大匹配数。
+
+
+@lru_cache(maxsize=QUERY_CACHE_SIZE)
+def compile_query(language: str, pattern: str) -> Query:
+    """
+    Compile a tree-sitter query, reusing a cached compilation when possible.
+
+    Args:
+        language: Normalized language identifier (must be supported)
+        pattern: Query source in tree-sitter S-expression syntax
+
+    Returns:
+        The compiled Query
+
+    Raises:
+        QueryError: If the pattern is invalid for the language
+    """
+    # 编译tree-sitter查询；相同(语言, 模式)的查询直接复用缓存中的编译结果。
+    return Query(get_language(language), pattern)
+
+
+def query_code(
+    code: str,
+    pattern: str,
+    language: Optional[str] = None,
+    filename: Optional[str] = None,
+    max_matches: int = DEFAULT_MAX_MATCHES,
+    text_mode: str = "full",
+    positions: str = "both"
+) -> Dict:
+    """
+    Run a tree-sitter query on code and return the matches with their captures.
+
+    Args:
+        code: Source code to query
+        pattern: Query source in tree-sitter S-expression syntax
+        language: Programming language identifier (optional)
+        filename: Source file name (optional, used for language detection)
+        max_matches: Maximum number of matches to return
+        text_mode: Capture text to include ('full', 'none', 'leaves-only' or 'truncated:N')
+        positions: Position fields to include ('both', 'bytes' or 'points')
+
+    Returns:
+        Dictionary with the language and the list of matches
+    """
+    # 在代码上执行tree-sitter查询，返回各匹配及其捕获的节点。
+    try:
+        projection = Projection(text_mode, positions)
+    except ValueError as e:
+        return {"error": str(e)}
+    # 解析投影选项。
+
+    parsed = parse_code_to_tree(code, language, filename)
+    if "error" in parsed:
+        return parsed
+    language = parsed["language"]
+    source_bytes = parsed["source_bytes"]
+    # 解析为原生语法树。
+
+    try:
+        query = compile_query(language, pattern)
+    except QueryError as e:
+        return {"error": f"Invalid query: {e}"}
+    # 编译（或从缓存获取）查询。
+
+    cursor = QueryCursor(query)
+    matches: List[Dict] = []
+    truncated = False
+    for pattern_index, captures in cursor.matches(parsed["tree"].root_node):
+        if len(matches) >= max_matches:
+            truncated = True
+            break
+        captured = [
+            (node.start_byte, capture_name, node)
+            for capture_name, nodes in captures.items()
+            for node in nodes
+        ]
+        captured.sort(key=lambda item: item[:2])
+        match_captures = []
+        for _, capture_name, node in captured:
+            capture = cursor_to_dict(node, source_bytes, False, projection)
+            capture["name"] = capture_name
+            match_captures.append(capture)
+        matches.append({
+            "pattern": pattern_index,
+            "captures": match_captures
+        })
+    # 收集匹配结果，每个捕获只输出该节点本身（不含子节点），超过上限时截断。
+
+    return {
+        "language": language,
+        "match_count": len(matches),
+        "truncated": truncated,
+        "matches": matches
+    }
+
+
+def register_query_tools(mcp_server):
+    """Register the query tools with the MCP server."""
+    # 向MCP服务器注册查询工具。
+
+    @mcp_server.tool()
+    def query_ast(
+        code: str,
+        query: str,
+        language: Optional[str] = None,
+        filename: Optional[str] = None,
+        max_matches: int = DEFAULT_MAX_MATCHES,
+        text_mode: str = "full",
+        positions: str = "both"
+    ) -> Dict:
+        """
+        Find AST nodes matching a tree-sitter query pattern.
+
+        The query runs directly on the syntax tree and only the captured
+        nodes are returned, which is far smaller than the full AST.
+        Example query for Python function names:
+            (function_definition name: (identifier) @name)
+
+        Args:
+            code: The source code to search
+            query: Tree-sitter S-expression query with @captures
+            language: The programming language (e.g., 'python', 'javascript')
+                     If not provided, the tool will attempt to detect it
+            filename: Optional filename to help with language detection
+            max_matches: Maximum number of matches to return (default 1000)
+            text_mode: Capture text to include: 'full' (default), 'none',
+                      'leaves-only' or 'truncated:N' (first N characters)
+            positions: Position fields to include: 'both' (default),
+                      'bytes' or 'points'
+
+        Returns:
+            A dictionary with the matches, each listing its captured nodes
+        """
+        # 查找匹配tree-sitter查询模式的AST节点，只返回被捕获的节点。
+        return query_code(code, query, language, filename, max_matches, text_mode, positions)
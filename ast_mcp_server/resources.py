@@ -8,55 +8,202 @@ through the Model Context Protocol.
 # 本模块通过Model Context Protocol定义了提供代码结构和语义信息的资源。
 
 import os
-import json
+import sys
 from typing import Dict, Optional, List, Any
 import tempfile
 import hashlib
-from .tools import parse_code_to_ast, create_asg_from_ast, analyze_code_structure
+import re
+from .tools import parse_code_to_ast, create_asg_from_ast, analyze_code_structure, expand_ast_node
+from .tree_store import tree_store
+from .asg_model import parse_node_id
+from .codecs import CODECS, available_codecs, get_codec
 
 # Directory to store cached ASTs and ASGs
 CACHE_DIR = os.path.join(tempfile.gettempdir(), "ast_mcp_cache")
-os.makedirs(CACHE_DIR, exist_ok=True)
+_cache_dir_ready = False
 # 用于存储AST和ASG缓存的目录，使用系统临时目录。
-# 若目录不存在则自动创建。
+# 目录在首次写入缓存时才创建，导入模块时不访问文件系统。
 
-def get_cache_path(code_hash: str, resource_type: str) -> str:
-    """Get the cache file path for a given code hash and resource type."""
-    # 获取指定代码哈希和资源类型的缓存文件路径。
-    return os.path.join(CACHE_DIR, f"{code_hash}_{resource_type}.json")
+def ensure_cache_dir() -> str:
+    """Create the cache directory if needed and return its path."""
+    # 按需创建缓存目录并返回其路径。
+    global _cache_dir_ready
+    if not _cache_dir_ready:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        _cache_dir_ready = True
+    return CACHE_DIR
+
+def get_cache_path(code_hash: str, resource_type: str, codec=None) -> str:
+    """Get the cache file path for a given code hash, resource type and codec."""
+    # 获取指定代码哈希、资源类型和编解码器的缓存文件路径。
+    if codec is None:
+        codec = get_codec()
+    return os.path.join(CACHE_DIR, f"{code_hash}_{resource_type}.{codec.extension}")
 
 def get_code_hash(code: str) -> str:
     """Generate a hash for the code to use as a cache key."""
     # 生成代码的哈希值，用作缓存键。
     return hashlib.md5(code.encode('utf-8')).hexdigest()
 
+# Default output options of cached ASTs and ASGs; results with other options are cached as views
+AST_VIEW_DEFAULTS = {"text_mode": "full", "positions": "both", "max_depth": None}
+ASG_VIEW_DEFAULTS = {"text_mode": "full", "containment": "edges"}
+# 缓存的AST和ASG的默认输出选项；使用其他选项的结果作为视图单独缓存。
+
+# View names are used in file names and URIs
+VIEW_NAME_PATTERN = re.compile(r"^[A-Za-z0-9_=,.-]+$")
+# 视图名用于文件名和URI中，只允许安全字符。
+
+def view_name(defaults: Dict, **options) -> Optional[str]:
+    """
+    Name the non-default output options of a cached resource.
+    
+    Args:
+        defaults: Default value of each option, in a fixed order
+        options: The options used
+        
+    Returns:
+        A name such as 'text_mode=none,max_depth=1', or None when all options are defaults
+    """
+    # 为缓存资源的非默认输出选项命名；全部为默认值时返回None。
+    parts = [
+        f"{key}={str(options[key]).replace(':', '.')}"
+        for key, default in defaults.items() if options.get(key, default) != default
+    ]
+    return ",".join(parts) if parts else None
+
+def view_resource_type(resource_type: str, view: Optional[str]) -> str:
+    """Get the cache resource type of a view of a resource (the resource type itself for the default view)."""
+    # 获取资源某个视图的缓存资源类型（默认视图即资源类型本身）。
+    return f"{resource_type}@{view}" if view else resource_type
+
+def view_uri(scheme: str, code_hash: str, view: Optional[str]) -> str:
+    """Get the URI of a view of a cached resource, e.g. ast://{code_hash}/view/{view}."""
+    # 获取缓存资源某个视图的URI。
+    return f"{scheme}://{code_hash}/view/{view}" if view else f"{scheme}://{code_hash}"
+
+def load_view(code_hash: str, resource_type: str, view: str) -> Optional[Dict]:
+    """Load a cached view of a resource, or None if it is not cached (or the view name is invalid)."""
+    # 读取资源的缓存视图；未缓存或视图名无效时返回None。
+    if not VIEW_NAME_PATTERN.match(view):
+        return None
+    return load_cached_resource(code_hash, view_resource_type(resource_type, view))
+
 def cache_resource(code: str, resource_type: str, data: Dict) -> None:
     """Cache a resource for faster retrieval."""
     # 缓存资源，加快后续检索速度。
     code_hash = get_code_hash(code)
-    cache_path = get_cache_path(code_hash, resource_type)
     
     try:
-        with open(cache_path, 'w') as f:
-            json.dump(data, f)
+        codec = get_codec()
+        ensure_cache_dir()
+        with open(get_cache_path(code_hash, resource_type, codec), 'wb') as f:
+            f.write(codec.dumps(data))
     except Exception as e:
-        print(f"Error caching resource: {e}")
-    # 写入缓存文件，若失败则打印错误。
+        print(f"Error caching resource: {e}", file=sys.stderr)
+    # 用当前编解码器写入缓存文件，若失败则将错误打印到标准错误（标准输出是MCP的stdio通道）。
+
+def load_cached_resource(code_hash: str, resource_type: str) -> Optional[Dict]:
+    """
+    Load a cached resource by code hash.
+    
+    The file written with the current codec is tried first, then files
+    written with any other available codec (e.g. JSON caches from before
+    the codec was changed).
+    
+    Args:
+        code_hash: Hash of the code the resource belongs to
+        resource_type: Type of the resource (e.g. 'ast', 'asg')
+        
+    Returns:
+        The cached data, or None if it is not cached
+    """
+    # 按代码哈希读取缓存资源。
+    # 先尝试当前编解码器写入的文件，再尝试其它可用编解码器写入的文件（如切换前留下的JSON缓存）。
+    preferred = get_codec()
+    codecs = [preferred] + [CODECS[name] for name in available_codecs() if name != preferred.name]
+    for codec in codecs:
+        cache_path = get_cache_path(code_hash, resource_type, codec)
+        if os.path.exists(cache_path):
+            with open(cache_path, 'rb') as f:
+                return codec.loads(f.read())
+    return None
 
 def get_cached_resource(code: str, resource_type: str) -> Optional[Dict]:
     """Get a cached resource if available."""
     # 获取已缓存的资源（如存在）。
-    code_hash = get_code_hash(code)
-    cache_path = get_cache_path(code_hash, resource_type)
+    try:
+        return load_cached_resource(get_code_hash(code), resource_type)
+    except Exception as e:
+        print(f"Error reading cached resource: {e}", file=sys.stderr)
+    # 若缓存存在则读取，否则返回None。
+    return None
+
+# Depth limit used when a subtree resource URI does not specify one
+DEFAULT_SUBTREE_DEPTH = 2
+# 子树资源URI未指定深度时使用的默认深度。
+
+def get_subtree(code_hash: str, handle: str, depth: int = DEFAULT_SUBTREE_DEPTH) -> Dict:
+    """
+    Expand a stub node, re-parsing the cached source if the tree was evicted.
     
-    if os.path.exists(cache_path):
+    Args:
+        code_hash: Hash of the code containing the node
+        handle: Handle of the stub node to expand
+        depth: Depth limit below the expanded node
+        
+    Returns:
+        The expanded subtree, or an error
+    """
+    # 展开存根节点；若语法树已被移出内存，则从缓存的源码重新解析。
+    if tree_store.get(code_hash) is None:
         try:
-            with open(cache_path, 'r') as f:
-                return json.load(f)
+            source = load_cached_resource(code_hash, "source")
+            if source is not None:
+                parse_code_to_ast(source["code"], source["language"], max_depth=0)
         except Exception as e:
-            print(f"Error reading cached resource: {e}")
-    # 若缓存文件存在则读取，否则返回None。
-    return None
+            return {"error": f"Error reading cached source: {e}"}
+    # 内存中没有语法树时，尝试用缓存的源码重建。
+    
+    return expand_ast_node(code_hash, handle, depth)
+
+def get_source_slice(code_hash: str, start_byte: int, end_byte: int) -> Dict:
+    """
+    Get the source text between two byte offsets of a parsed or cached source.
+    
+    The source is taken from the in-memory tree store, or from the cached
+    source file if the tree was evicted.
+    
+    Args:
+        code_hash: Hash of the source code
+        start_byte: Start byte offset (inclusive)
+        end_byte: End byte offset (exclusive)
+        
+    Returns:
+        Dictionary with the offsets and the text, or an error
+    """
+    # 按字节偏移截取源码文本。优先使用内存中的语法树存储，语法树被移出内存时读取缓存的源码。
+    stored = tree_store.get(code_hash)
+    if stored is not None:
+        source_bytes = stored.source_bytes
+    else:
+        try:
+            source = load_cached_resource(code_hash, "source")
+        except Exception as e:
+            return {"error": f"Error reading cached source: {e}"}
+        if source is None:
+            return {"error": f"Source not found for {code_hash}. Generate the ASG with text_mode='spans' first."}
+        source_bytes = source["code"].encode('utf-8')
+    # 获取源码字节。
+    
+    if not 0 <= start_byte <= end_byte <= len(source_bytes):
+        return {"error": f"Invalid byte range {start_byte}-{end_byte} (source is {len(source_bytes)} bytes)"}
+    return {
+        "code_hash": code_hash,
+        "start_byte": start_byte,
+        "end_byte": end_byte,
+        "text": source_bytes[start_byte:end_byte].decode('utf-8', errors='replace')
+    }
 
 def register_resources(mcp_server):
     """Register all resources with the MCP server."""
@@ -78,14 +225,13 @@ def register_resources(mcp_server):
         """
         # 提供指定代码哈希的AST资源。
         # 若缓存不存在则提示需先生成AST。
-        cache_path = get_cache_path(code_hash, "ast")
+        try:
+            data = load_cached_resource(code_hash, "ast")
+        except Exception as e:
+            return {"error": f"Error reading cached AST: {e}"}
         
-        if os.path.exists(cache_path):
-            try:
-                with open(cache_path, 'r') as f:
-                    return json.load(f)
-            except Exception as e:
-                return {"error": f"Error reading cached AST: {e}"}
+        if data is not None:
+            return data
         
         return {"error": "AST not found. Please use parse_to_ast tool first."}
     
@@ -105,17 +251,68 @@ def register_resources(mcp_server):
         """
         # 提供指定代码哈希的ASG资源。
         # 若缓存不存在则提示需先生成ASG。
-        cache_path = get_cache_path(code_hash, "asg")
+        try:
+            data = load_cached_resource(code_hash, "asg")
+        except Exception as e:
+            return {"error": f"Error reading cached ASG: {e}"}
         
-        if os.path.exists(cache_path):
-            try:
-                with open(cache_path, 'r') as f:
-                    return json.load(f)
-            except Exception as e:
-                return {"error": f"Error reading cached ASG: {e}"}
+        if data is not None:
+            return data
         
         return {"error": "ASG not found. Please use generate_asg tool first."}
     
+    @mcp_server.resource("ast://{code_hash}/view/{view}")
+    def ast_view_resource(code_hash: str, view: str) -> Dict:
+        """
+        Resource that provides an AST cached with non-default output options.
+        
+        parse_and_cache returns this URI when called with text_mode,
+        positions or max_depth; ast://{code_hash} always holds the full AST.
+        
+        Args:
+            code_hash: Hash of the code to retrieve the AST for
+            view: Name of the output options, as in the returned URI
+            
+        Returns:
+            The cached AST data
+        """
+        # 提供使用非默认输出选项缓存的AST；ast://{code_hash}始终是完整AST。
+        try:
+            data = load_view(code_hash, "ast", view)
+        except Exception as e:
+            return {"error": f"Error reading cached AST: {e}"}
+        
+        if data is not None:
+            return data
+        
+        return {"error": "AST not found. Please use parse_and_cache tool first."}
+    
+    @mcp_server.resource("asg://{code_hash}/view/{view}")
+    def asg_view_resource(code_hash: str, view: str) -> Dict:
+        """
+        Resource that provides an ASG cached with non-default output options.
+        
+        generate_and_cache_asg returns this URI when called with text_mode
+        or containment; asg://{code_hash} always holds the default graph.
+        
+        Args:
+            code_hash: Hash of the code to retrieve the ASG for
+            view: Name of the output options, as in the returned URI
+            
+        Returns:
+            The cached ASG data
+        """
+        # 提供使用非默认输出选项缓存的ASG；asg://{code_hash}始终是默认形式的图。
+        try:
+            data = load_view(code_hash, "asg", view)
+        except Exception as e:
+            return {"error": f"Error reading cached ASG: {e}"}
+        
+        if data is not None:
+            return data
+        
+        return {"error": "ASG not found. Please use generate_and_cache_asg tool first."}
+    
     @mcp_server.resource("analysis://{code_hash}")
     def analysis_resource(code_hash: str) -> Dict:
         """
@@ -132,14 +329,13 @@ def register_resources(mcp_server):
         """
         # 提供指定代码哈希的结构分析资源。
         # 若缓存不存在则提示需先生成分析。
-        cache_path = get_cache_path(code_hash, "analysis")
+        try:
+            data = load_cached_resource(code_hash, "analysis")
+        except Exception as e:
+            return {"error": f"Error reading cached analysis: {e}"}
         
-        if os.path.exists(cache_path):
-            try:
-                with open(cache_path, 'r') as f:
-                    return json.load(f)
-            except Exception as e:
-                return {"error": f"Error reading cached analysis: {e}"}
+        if data is not None:
+            return data
         
         return {"error": "Analysis not found. Please use analyze_code tool first."}
     
@@ -157,36 +353,39 @@ def register_resources(mcp_server):
             The node details
         """
         # 提供指定AST节点的详细信息。
-        # 先获取AST缓存，再递归查找目标节点。
+        # 先获取AST缓存，再查找目标节点。
         # 若AST不存在则提示需先生成。
         # 若节点未找到则返回错误。
-        # 递归查找节点时，节点ID格式为 type_startByte_endByte。
+        # 查找节点时，节点ID格式为 type_startByte_endByte。
         # 该方法适合用于定位和展示AST的具体节点信息。
         # Get the full AST
-        cache_path = get_cache_path(code_hash, "ast")
-        
-        if not os.path.exists(cache_path):
-            return {"error": "AST not found. Please use parse_to_ast tool first."}
-        
         try:
-            with open(cache_path, 'r') as f:
-                ast_data = json.load(f)
+            ast_data = load_cached_resource(code_hash, "ast")
+            if ast_data is None:
+                return {"error": "AST not found. Please use parse_to_ast tool first."}
             
             # Find the node by its ID
-            def find_node(node, target_id):
-                # Generate this node's ID
-                current_id = f"{node['type']}_{node['start_byte']}_{node['end_byte']}"
+            def find_node(root, target_id):
+                target = parse_node_id(target_id)
+                if target is None:
+                    return None
+                target_type, target_start, target_end = target
                 
-                if current_id == target_id:
-                    return node
-                
-                # Search in children
-                for child in node.get("children", []):
-                    result = find_node(child, target_id)
-                    if result:
-                        return result
+                # Only descend into nodes whose byte range contains the target
+                stack = [root]
+                while stack:
+                    node = stack.pop()
+                    if node["start_byte"] == target_start and node["end_byte"] == target_end and node["type"] == target_type:
+                        return node
+                    children = node.get("children")
+                    if children:
+                        stack.extend(
+                            child for child in reversed(children)
+                            if child["start_byte"] <= target_start and target_end <= child["end_byte"]
+                        )
                 
                 return None
+            # 节点ID只解析一次，沿字节范围包含目标的子节点向下查找，不再为每个节点拼接ID字符串。
             
             node = find_node(ast_data["ast"], node_id)
             
@@ -198,3 +397,67 @@ def register_resources(mcp_server):
         except Exception as e:
             return {"error": f"Error retrieving AST node: {e}"}
         # 若读取或查找节点出错则返回错误信息。
+    
+    @mcp_server.resource("ast://{code_hash}/subtree/{handle}")
+    def ast_subtree_resource(code_hash: str, handle: str) -> Dict:
+        """
+        Resource that expands a stub node from a depth-limited AST.
+        
+        The handle comes from a stub node returned by parse_to_ast or
+        parse_and_cache with max_depth. The subtree is limited to the
+        default depth; use ast://{code_hash}/subtree/{handle}/{depth}
+        to choose another one.
+        
+        Args:
+            code_hash: Hash of the code containing the node
+            handle: Handle of the stub node to expand
+            
+        Returns:
+            The expanded subtree
+        """
+        # 展开限制深度AST中的存根节点，使用默认深度。
+        return get_subtree(code_hash, handle)
+    
+    @mcp_server.resource("ast://{code_hash}/subtree/{handle}/{depth}")
+    def ast_subtree_depth_resource(code_hash: str, handle: str, depth: str) -> Dict:
+        """
+        Resource that expands a stub node to the given depth.
+        
+        Args:
+            code_hash: Hash of the code containing the node
+            handle: Handle of the stub node to expand
+            depth: Depth limit below the expanded node
+            
+        Returns:
+            The expanded subtree
+        """
+        # 按指定深度展开存根节点。
+        try:
+            depth_limit = int(depth)
+        except ValueError:
+            return {"error": f"Invalid depth: {depth}"}
+        return get_subtree(code_hash, handle, depth_limit)
+    
+    @mcp_server.resource("source://{code_hash}/{start}-{end}")
+    def source_slice_resource(code_hash: str, start: str, end: str) -> Dict:
+        """
+        Resource that provides the source text of a byte span.
+        
+        Used with ASGs generated with text_mode='spans', whose nodes carry
+        only their byte spans: the text of a node is
+        source://{code_hash}/{start_byte}-{end_byte}.
+        
+        Args:
+            code_hash: Hash of the source code
+            start: Start byte offset
+            end: End byte offset
+            
+        Returns:
+            The offsets and the source text between them
+        """
+        # 提供字节范围内的源码文本，用于读取spans模式ASG中省略的节点文本。
+        try:
+            start_byte, end_byte = int(start), int(end)
+        except ValueError:
+            return {"error": f"Invalid byte range: {start}-{end}"}
+        return get_source_slice(code_hash, start_byte, end_byte)
@@ -0,0 +1,405 @@
+"""
+AST serializers for the MCP server.
+
+This module converts native tree-sitter trees into the dictionary schema
+returned by the AST tools. The serializers walk the tree with a TreeCursor
+and an explicit stack, so they visit every node exactly once, never recurse
+and work on arbitrarily deep inputs.
+"""
+# MCP服务器的AST序列化模块。
+# 本模块将tree-sitter原生语法树转换为AST工具返回的字典结构。
+# 序列化器使用TreeCursor和显式栈遍历语法树，每个节点只访问一次，不使用递归，可处理任意深度的输入。
+
+from typing import Callable, Dict, Iterator, Optional, Tuple
+from tree_sitter import Node, TreeCursor
+
+from .tree_store import get_node_handle
+
+# Text modes accepted by Projection ('truncated:N' keeps the first N characters)
+TEXT_MODES = ("full", "none", "leaves-only", "truncated:N")
+# Position field selections accepted by Projection
+POSITION_FIELDS = ("both", "bytes", "points")
+# 投影支持的文本模式和位置字段选项。
+
+
+class Projection:
+    """
+    Selects which fields each serialized AST node carries.
+
+    Text modes:
+        full: every node carries its full source text (default)
+        none: no node carries text
+        leaves-only: only nodes without children carry text
+        truncated:N: every node carries at most the first N characters
+
+    Position fields:
+        both: byte offsets and row/column points (default)
+        bytes: only start_byte/end_byte
+        points: only start_point/end_point
+    """
+    # 选择序列化后的每个AST节点包含哪些字段。
+
+    def __init__(self, text_mode: str = "full", positions: str = "both"):
+        self.text_limit = None
+        if text_mode.startswith("truncated:"):
+            try:
+                self.text_limit = int(text_mode.split(":", 1)[1])
+            except ValueError:
+                raise ValueError(f"Invalid text mode: {text_mode}")
+            if self.text_limit < 0:
+                raise ValueError(f"Invalid text mode: {text_mode}")
+            text_mode = "truncated"
+        elif text_mode not in TEXT_MODES:
+            raise ValueError(f"Invalid text mode: {text_mode} (expected one of {', '.join(TEXT_MODES)})")
+        # 解析文本模式，truncated:N需要非负整数N。
+
+        if positions not in POSITION_FIELDS:
+            raise ValueError(f"Invalid positions: {positions} (expected one of {', '.join(POSITION_FIELDS)})")
+        # 校验位置字段选项。
+
+        self.text_mode = text_mode
+        self.include_bytes = positions in ("both", "bytes")
+        self.include_points = positions in ("both", "points")
+
+    @property
+    def is_default(self) -> bool:
+        """Whether this projection keeps every field."""
+        # 是否保留全部字段（即默认投影）。
+        return self.text_mode == "full" and self.include_bytes and self.include_points
+
+
+def make_text_slicer(source_bytes: bytes, limit: Optional[int] = None) -> Callable[[int, int], str]:
+    """
+    Build a function returning the source text between two byte offsets.
+
+    ASCII sources are decoded once and sliced as strings, which avoids
+    copying and decoding a bytes slice for every node.
+
+    Args:
+        source_bytes: The UTF-8 encoded source code
+        limit: Maximum number of characters to return (optional)
+
+    Returns:
+        A function mapping (start_byte, end_byte) to the decoded text
+    """
+    # 构建按字节偏移截取源码文本的函数。
+    # 纯ASCII源码只解码一次并按字符串切片，避免为每个节点复制并解码字节切片。
+    # 指定limit时只截取前limit个字符，不解码其余部分。
+    if source_bytes.isascii():
+        source_text = source_bytes.decode('ascii')
+        if limit is None:
+            return lambda start, end: source_text[start:end]
+        return lambda start, end: source_text[start:min(end, start + limit)]
+    if limit is None:
+        return lambda start, end: source_bytes[start:end].decode('utf-8')
+    # A UTF-8 character is at most 4 bytes; drop a partial trailing character
+    return lambda start, end: source_bytes[start:min(end, start + 4 * limit)].decode('utf-8', errors='ignore')[:limit]
+
+
+def goto_first_child(cursor: TreeCursor, named_only: bool = False) -> bool:
+    """
+    Move a cursor to the first child of its node, optionally skipping anonymous nodes.
+
+    Returns:
+        True if the cursor moved, False if there is no such child (the cursor stays put)
+    """
+    # 将游标移到当前节点的第一个子节点，可选择跳过匿名节点。
+    if not cursor.goto_first_child():
+        return False
+    if named_only and not cursor.node.is_named:
+        if not goto_next_sibling(cursor, named_only):
+            cursor.goto_parent()
+            return False
+    return True
+
+
+def goto_next_sibling(cursor: TreeCursor, named_only: bool = False) -> bool:
+    """
+    Move a cursor to the next sibling of its node, optionally skipping anonymous nodes.
+
+    Returns:
+        True if the cursor moved to a sibling, False if there is none
+    """
+    # 将游标移到下一个兄弟节点，可选择跳过匿名节点。
+    while cursor.goto_next_sibling():
+        if not named_only or cursor.node.is_named:
+            return True
+    return False
+
+
+def iter_preorder(node: Node, named_only: bool = False) -> Iterator[Tuple[Node, int]]:
+    """
+    Iterate over a subtree in preorder using a TreeCursor.
+
+    Args:
+        node: Root node of the subtree
+        named_only: Whether to skip anonymous nodes (and their subtrees)
+
+    Yields:
+        (node, depth) pairs, where the given node has depth 0
+    """
+    # 使用TreeCursor按先序迭代子树，产出(节点, 深度)对，根节点深度为0。
+    cursor = node.walk()
+    depth = 0
+    yield node, 0
+    while True:
+        if goto_first_child(cursor, named_only):
+            depth += 1
+            yield cursor.node, depth
+            continue
+        while not goto_next_sibling(cursor, named_only):
+            if not cursor.goto_parent():
+                return
+            depth -= 1
+        yield cursor.node, depth
+
+
+def cursor_to_dict(
+    node: Node,
+    source_bytes: bytes,
+    include_children: bool = True,
+    projection: Optional[Projection] = None,
+    max_depth: Optional[int] = None,
+    named_only: bool = False
+) -> Dict:
+    """
+    Convert a tree-sitter Node to a dictionary representation using a TreeCursor.
+
+    Produces the same schema as tools.node_to_dict in a single linear pass
+    without recursion or per-node children lists. A projection can drop
+    or shorten node text and select which position fields are emitted.
+
+    With max_depth, nodes at that depth are emitted as stubs: their children
+    are omitted and they carry "stub": true, their "child_count" and a
+    "handle" that can be passed back to expand the subtree later.
+
+    With named_only, anonymous nodes (punctuation and keywords) are skipped
+    and each child carries the tree-sitter "field" name linking it to its
+    parent (e.g. 'name', 'body', 'parameters') when it has one.
+
+    Args:
+        node: Root node of the subtree to convert
+        source_bytes: The UTF-8 encoded source code
+        include_children: Whether to include child nodes in the result
+        projection: Fields to include in each node (optional, defaults to all)
+        max_depth: Depth below the given node at which to stop (optional)
+        named_only: Whether to emit only named nodes, with field names
+
+    Returns:
+        Dictionary representation of the subtree
+    """
+    # 使用TreeCursor将tree-sitter节点转换为字典结构。
+    # 输出与tools.node_to_dict相同，但只做一次线性遍历，不递归，也不为每个节点分配children列表。
+    # 可通过投影去除或截断节点文本，并选择输出哪些位置字段。
+    if projection is None:
+        projection = Projection()
+    text_mode = projection.text_mode
+    include_bytes = projection.include_bytes
+    include_points = projection.include_points
+    text_of = make_text_slicer(source_bytes, projection.text_limit)
+    if named_only:
+        child_count_of = lambda current: current.named_child_count
+    else:
+        child_count_of = lambda current: current.child_count
+    # 只输出具名节点时，子节点数按具名子节点计算。
+
+    def make_dict(current: Node) -> Dict:
+        start_byte = current.start_byte
+        end_byte = current.end_byte
+        result = {"type": current.type}
+        if include_bytes:
+            result["start_byte"] = start_byte
+            result["end_byte"] = end_byte
+        if include_points:
+            start_point = current.start_point
+            end_point = current.end_point
+            result["start_point"] = {
+                "row": start_point[0],
+                "column": start_point[1]
+            }
+            result["end_point"] = {
+                "row": end_point[0],
+                "column": end_point[1]
+            }
+        if text_mode != "none" and (text_mode != "leaves-only" or child_count_of(current) == 0):
+            result["text"] = text_of(start_byte, end_byte)
+        return result
+    # 按投影构建单个节点的字典，不含子节点。
+
+    def make_node(current: Node, depth: int, field_name: Optional[str] = None) -> Dict:
+        result = make_dict(current)
+        if field_name is not None:
+            result["field"] = field_name
+        if depth == max_depth:
+            child_count = child_count_of(current)
+            if child_count > 0:
+                result["stub"] = True
+                result["child_count"] = child_count
+                result["handle"] = get_node_handle(current)
+        return result
+    # 构建节点字典；只输出具名节点时附带字段名；到达深度上限且有子节点时生成带句柄的存根节点。
+
+    if not include_children:
+        return make_dict(node)
+    result = make_node(node, 0)
+
+    cursor = node.walk()
+    field_of = (lambda: cursor.field_name) if named_only else (lambda: None)
+    stack = [result]  # Dictionaries of the nodes on the current cursor path
+    # 栈中保存游标当前路径上各节点的字典，栈长度减一即当前节点深度。
+
+    while True:
+        if (max_depth is None or len(stack) <= max_depth) and goto_first_child(cursor, named_only):
+            child = make_node(cursor.node, len(stack), field_of())
+            stack[-1].setdefault("children", []).append(child)
+            stack.append(child)
+            continue
+        # 有子节点且未达到深度上限时下移到第一个子节点。
+
+        while True:
+            stack.pop()
+            if goto_next_sibling(cursor, named_only):
+                sibling = make_node(cursor.node, len(stack), field_of())
+                stack[-1]["children"].append(sibling)
+                stack.append(sibling)
+                break
+            if not cursor.goto_parent():
+                return result
+        # 当前节点处理完毕后，移到下一个兄弟节点；没有兄弟节点时回到父节点，回到根节点时结束。
+
+
+def cursor_to_columnar(
+    node: Node,
+    source_bytes: bytes,
+    projection: Optional[Projection] = None,
+    named_only: bool = False
+) -> Dict:
+    """
+    Convert a tree-sitter subtree to a columnar (struct-of-arrays) representation.
+
+    Nodes are listed in preorder. Node types are interned into the
+    "node_types" table and each column holds one value per node:
+    "type" (index into node_types), "parent" (node index, -1 for the root),
+    "start_byte"/"end_byte" and "start_row"/"start_col"/"end_row"/"end_col".
+    Unless the projection drops text, node texts are interned into the
+    "texts" table and "text" holds one index per node (-1 for no text).
+    With named_only, anonymous nodes are skipped and field names are
+    interned into "fields" with one index per node in "field" (-1 for none).
+
+    Args:
+        node: Root node of the subtree to convert
+        source_bytes: The UTF-8 encoded source code
+        projection: Fields to include (optional, defaults to all)
+        named_only: Whether to emit only named nodes, with field names
+
+    Returns:
+        Dictionary with the interned tables and parallel columns
+    """
+    # 将tree-sitter子树转换为列式（数组结构）表示。
+    # 节点按先序排列；节点类型驻留在node_types表中，每一列为每个节点保存一个值。
+    # 除非投影去掉了文本，节点文本也驻留在texts表中，text列保存其索引（无文本时为-1）。
+    if projection is None:
+        projection = Projection()
+    text_mode = projection.text_mode
+    include_bytes = projection.include_bytes
+    include_points = projection.include_points
+    text_of = make_text_slicer(source_bytes, projection.text_limit)
+
+    type_ids = {}  # Maps node type -> index in node_types
+    text_ids = {}  # Maps text -> index in texts
+    field_ids = {}  # Maps field name -> index in fields
+    types = []
+    parents = []
+    fields = []
+    start_bytes = []
+    end_bytes = []
+    start_rows = []
+    start_cols = []
+    end_rows = []
+    end_cols = []
+    texts = []
+    # 驻留表和各列。
+
+    def add_node(current: Node, parent_index: int, field_name: Optional[str] = None) -> None:
+        node_type = current.type
+        type_id = type_ids.get(node_type)
+        if type_id is None:
+            type_id = type_ids[node_type] = len(type_ids)
+        types.append(type_id)
+        parents.append(parent_index)
+        if named_only:
+            if field_name is None:
+                fields.append(-1)
+            else:
+                field_id = field_ids.get(field_name)
+                if field_id is None:
+                    field_id = field_ids[field_name] = len(field_ids)
+                fields.append(field_id)
+        start_byte = current.start_byte
+        end_byte = current.end_byte
+        if include_bytes:
+            start_bytes.append(start_byte)
+            end_bytes.append(end_byte)
+        if include_points:
+            start_point = current.start_point
+            end_point = current.end_point
+            start_rows.append(start_point[0])
+            start_cols.append(start_point[1])
+            end_rows.append(end_point[0])
+            end_cols.append(end_point[1])
+        if text_mode != "none":
+            if text_mode != "leaves-only" or (current.named_child_count if named_only else current.child_count) == 0:
+                text = text_of(start_byte, end_byte)
+                text_id = text_ids.get(text)
+                if text_id is None:
+                    text_id = text_ids[text] = len(text_ids)
+                texts.append(text_id)
+            else:
+                texts.append(-1)
+    # 追加一个节点的各列值。
+
+    def walk() -> None:
+        cursor = node.walk()
+        add_node(node, -1)
+        path = [0]  # Indices of the nodes on the current cursor path
+        while True:
+            if goto_first_child(cursor, named_only):
+                path.append(len(types))
+                add_node(cursor.node, path[-2], cursor.field_name)
+                continue
+            while True:
+                path.pop()
+                if goto_next_sibling(cursor, named_only):
+                    path.append(len(types))
+                    add_node(cursor.node, path[-2], cursor.field_name)
+                    break
+                if not cursor.goto_parent():
+                    return
+    # 与cursor_to_dict相同的先序遍历，path保存游标当前路径上各节点的索引。
+
+    walk()
+
+    result = {
+        "format": "columnar",
+        "node_count": len(types),
+        "node_types": list(type_ids),
+        "type": types,
+        "parent": parents
+    }
+    if include_bytes:
+        result["start_byte"] = start_bytes
+        result["end_byte"] = end_bytes
+    if include_points:
+        result["start_row"] = start_rows
+        result["start_col"] = start_cols
+        result["end_row"] = end_rows
+        result["end_col"] = end_cols
+    if text_mode != "none":
+        result["texts"] = list(text_ids)
+        result["text"] = texts
+    if named_only:
+        result["fields"] = list(field_ids)
+        result["field"] = fields
+    return result
+    # 返回驻留表和各列。
+
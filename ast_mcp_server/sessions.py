@@ -0,0 +1,465 @@
+"""
+Document sessions for incremental parsing.
+
+A session keeps the live tree-sitter tree and source of one document,
+keyed by a client-chosen code_id (such as a file path). Editors send range
+edits (apply_edits) instead of the whole document: each edit is applied to
+the source and, through Tree.edit, to the tree, and the document is then
+reparsed incrementally from the edited tree, so a keystroke in a large
+file only costs the reparse around the edit.
+"""
+# 增量解析所用的文档会话模块。
+# 会话以客户端选择的code_id（如文件路径）为键，保存一个文档的tree-sitter语法树和源码。
+# 编辑器只需发送范围编辑（apply_edits）而非整个文档：每个编辑应用到源码上，并通过Tree.edit应用到语法树上，
+# 然后基于编辑后的语法树增量重新解析，大文件中的一次按键只需重新解析编辑附近的部分。
+
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from tree_sitter import Tree
+
+from .edits import POSITION_ENCODINGS, LineIndex, apply_range_edit, changed_ranges, diff_edits, edited_copy
+from .parser_pool import parser_pool
+from .positions import describe_nodes, node_at_byte
+from .tools import LANGUAGE_MAP, get_language, parse_code_to_tree
+
+# Maximum number of document sessions kept in memory
+DEFAULT_MAX_SESSIONS = 32
+# 内存中最多保留的文档会话数量。
+
+
+class DocumentSession:
+    """The live tree and source of a document, updated by its edits."""
+    # 文档的当前语法树和源码，随编辑更新。
+
+    __slots__ = ("code_id", "language", "tree", "source_bytes", "version", "lock", "_lines")
+
+    def __init__(self, code_id: str, language: str, tree: Tree, source_bytes: bytes):
+        self.code_id = code_id
+        self.language = language
+        self.tree = tree
+        self.source_bytes = source_bytes
+        self.version = 0
+        self.lock = threading.Lock()  # Serializes the edits of this document
+        self._lines = None
+
+    def line_index(self) -> LineIndex:
+        """Get the line index of the current source, building it on first use."""
+        # 获取当前源码的行索引，首次使用时构建。
+        if self._lines is None:
+            self._lines = LineIndex(self.source_bytes)
+        return self._lines
+
+    def reparse(self, edited_tree: Tree, source_bytes: bytes, lines: Optional[LineIndex] = None) -> List[Dict]:
+        """
+        Reparse the document incrementally and make the result current.
+
+        Args:
+            edited_tree: A copy of the current tree with the edits applied
+            source_bytes: The new UTF-8 source
+            lines: The line index of the new source, if already known
+
+        Returns:
+            The ranges whose syntactic structure changed
+        """
+        # 增量重新解析文档并将结果设为当前版本，返回语法结构发生变化的范围。
+        with parser_pool.parser(self.language, get_language(self.language)) as parser:
+            tree = parser.parse(source_bytes, edited_tree)
+        self.tree = tree
+        self.source_bytes = source_bytes
+        self._lines = lines
+        self.version += 1
+        return changed_ranges(edited_tree, tree)
+
+    def summary(self, changed: Optional[List[Dict]] = None) -> Dict:
+        """Summarize the session: its version, size, whether it parses cleanly and the changed ranges."""
+        # 概述会话：版本、大小、是否有语法错误以及变更范围。
+        root = self.tree.root_node
+        result = {
+            "code_id": self.code_id,
+            "language": self.language,
+            "version": self.version,
+            "byte_length": len(self.source_bytes),
+            "line_count": root.end_point[0] + 1,
+            "has_error": root.has_error
+        }
+        if changed is not None:
+            result["changed_ranges"] = changed
+        return result
+
+
+class SessionStore:
+    """Thread-safe LRU store of document sessions keyed by code_id."""
+    # 以code_id为键、线程安全的LRU文档会话存储。
+
+    def __init__(self, max_sessions: int = DEFAULT_MAX_SESSIONS):
+        self.max_sessions = max_sessions
+        self._lock = threading.Lock()
+        self._sessions = OrderedDict()  # Maps code_id -> DocumentSession
+
+    def put(self, session: DocumentSession) -> None:
+        """Store a session, replacing any session with the same code_id; the least recently used session is evicted when full."""
+        # 保存会话，替换同一code_id的旧会话；超过容量时淘汰最久未使用的会话。
+        with self._lock:
+            self._sessions[session.code_id] = session
+            self._sessions.move_to_end(session.code_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def get(self, code_id: str) -> Optional[DocumentSession]:
+        """Get a session by code_id, or None if it is not open."""
+        # 按code_id获取会话，未打开时返回None。
+        with self._lock:
+            session = self._sessions.get(code_id)
+            if session is not None:
+                self._sessions.move_to_end(code_id)
+            return session
+
+    def pop(self, code_id: str) -> Optional[DocumentSession]:
+        """Remove and return a session, or None if it is not open."""
+        # 移除并返回会话，未打开时返回None。
+        with self._lock:
+            return self._sessions.pop(code_id, None)
+
+    def clear(self) -> None:
+        """Remove all sessions."""
+        # 清空所有会话。
+        with self._lock:
+            self._sessions.clear()
+
+
+# Shared document session store used by the tools
+document_sessions = SessionStore()
+# 工具共用的文档会话存储。
+
+
+def open_session(
+    code_id: str,
+    code: str,
+    language: Optional[str] = None,
+    filename: Optional[str] = None
+) -> Tuple[Optional[DocumentSession], Optional[Dict]]:
+    """
+    Parse a document and open a session for it, replacing any open session with the same code_id.
+
+    Returns:
+        The session, or None and an error dictionary
+    """
+    # 解析文档并为其打开会话，替换同一code_id的已有会话；失败时返回错误字典。
+    parsed = parse_code_to_tree(code, language, filename)
+    if "error" in parsed:
+        return None, parsed
+    session = DocumentSession(code_id, parsed["language"], parsed["tree"], parsed["source_bytes"])
+    document_sessions.put(session)
+    return session, None
+
+
+def update_session(
+    code_id: str,
+    code: str,
+    language: Optional[str] = None,
+    filename: Optional[str] = None
+) -> Tuple[Optional[DocumentSession], Optional[List[Dict]], Optional[Dict]]:
+    """
+    Bring a document session to a new version of the whole source.
+
+    The edits between the session's source and the new one are derived
+    from the two buffers and the document is reparsed incrementally. Without an
+    open session (or when the language changes), a new session is opened.
+
+    Args:
+        code_id: Document identifier
+        code: The full new source code
+        language: Programming language identifier (optional)
+        filename: Source file name (optional, used for language detection)
+
+    Returns:
+        The session, the changed ranges (None if the document was parsed
+        from scratch) and an error dictionary (None on success)
+    """
+    # 将文档会话更新到完整的新源码：根据新旧缓冲区推导各处编辑并增量重新解析；
+    # 没有已打开的会话（或语言改变）时打开新会话。
+    session = document_sessions.get(code_id)
+    if language is not None and session is not None:
+        if LANGUAGE_MAP.get(language.lower(), language.lower()) != session.language:
+            session = None
+    if session is None:
+        session, error = open_session(code_id, code, language, filename)
+        return session, None, error
+    # 未指定语言时沿用会话的语言，无需再次检测。
+
+    source_bytes = code.encode("utf-8")
+    try:
+        with session.lock:
+            edits = diff_edits(session.source_bytes, source_bytes)
+            if not edits:
+                return session, [], None
+            return session, session.reparse(edited_copy(session.tree, edits), source_bytes), None
+    except Exception as e:
+        return None, None, {"error": f"Error parsing code: {e}"}
+
+
+def parse_range(edit: Dict) -> Optional[Tuple[int, int, int, int]]:
+    """Get the (start line, start character, end line, end character) of an LSP-style edit, or None for a whole-document edit."""
+    # 获取LSP风格编辑的(起始行, 起始字符, 结束行, 结束字符)；替换整个文档的编辑返回None。
+    edit_range = edit.get("range")
+    if edit_range is None:
+        return None
+    start, end = edit_range["start"], edit_range["end"]
+    return int(start["line"]), int(start["character"]), int(end["line"]), int(end["character"])
+
+
+def edit_session(code_id: str, edits: List[Dict], position_encoding: str = "utf-16") -> Dict:
+    """
+    Apply LSP-style range edits to a document session and reparse it incrementally.
+
+    Each edit is {"range": {"start": {"line", "character"}, "end": {...}},
+    "text": ...}, or {"text": ...} to replace the whole document. As in
+    the Language Server Protocol, edits are applied in order, each one to
+    the document produced by the previous ones.
+
+    Args:
+        code_id: Document identifier of an open session
+        edits: The edits to apply
+        position_encoding: Units of the characters in positions: 'utf-16'
+                          (default), 'utf-8' (bytes) or 'utf-32' (code points)
+
+    Returns:
+        Dictionary with the session summary and the changed ranges
+    """
+    # 对文档会话应用LSP风格的范围编辑并增量重新解析。与语言服务器协议相同，编辑按顺序应用，每个编辑作用于前面编辑产生的文档。
+    if position_encoding not in POSITION_ENCODINGS:
+        return {"error": f"Invalid position_encoding: {position_encoding} (expected one of {', '.join(POSITION_ENCODINGS)})"}
+    session = document_sessions.get(code_id)
+    if session is None:
+        return {"error": f"No open document {code_id}. Open it with open_document first."}
+
+    with session.lock:
+        source = session.source_bytes
+        lines = session.line_index()
+        tree = session.tree.copy()
+        try:
+            for edit in edits:
+                new_text = edit.get("text", "").encode("utf-8")
+                edit_range = parse_range(edit)
+                if edit_range is None:
+                    start_byte, old_end_byte = 0, len(source)
+                else:
+                    start_line, start_character, end_line, end_character = edit_range
+                    start_byte = lines.offset(source, start_line, start_character, position_encoding)
+                    old_end_byte = lines.offset(source, end_line, end_character, position_encoding)
+                    if old_end_byte < start_byte:
+                        raise ValueError(f"the range ends before it starts: {edit['range']}")
+                source, input_edit = apply_range_edit(source, lines, start_byte, old_end_byte, new_text)
+                tree.edit(**input_edit)
+        except (KeyError, TypeError, ValueError, AttributeError) as e:
+            session._lines = None
+            return {"error": f"Invalid edit: {e}"}
+        # 依次将每个编辑转换为字节范围，应用到源码、行索引和语法树副本上；编辑无效时会话保持不变，行索引稍后重建。
+
+        try:
+            changed = session.reparse(tree, source, lines)
+        except Exception as e:
+            session._lines = None
+            return {"error": f"Error parsing code: {e}"}
+        return session.summary(changed)
+        # 所有编辑应用完后只重新解析一次。
+
+
+def locate_positions(
+    code_id: str,
+    positions: List[Dict],
+    position_encoding: str = "utf-16",
+    named_only: bool = False,
+    include_ancestors: bool = True
+) -> Dict:
+    """
+    Find the nodes at editor positions in an open document.
+
+    Each position is converted to a byte offset and looked up on the
+    session's live tree, so no serialized tree is built and the cost of
+    a lookup follows the depth of the node.
+
+    Args:
+        code_id: Document identifier of an open session
+        positions: LSP positions, {"line": 3, "character": 4} (0-based)
+        position_encoding: Units of the character offsets: 'utf-16',
+                          'utf-8' or 'utf-32'
+        named_only: Whether to find (and list as ancestors) only named nodes
+        include_ancestors: Whether to include each node's ancestor chain
+
+    Returns:
+        Dictionary with the document's version, the described nodes by
+        ID and one entry per position (see positions.describe_nodes), or
+        an error dictionary
+    """
+    # 在已打开的文档中查找编辑器位置处的节点：每个位置转换为字节偏移后在会话的当前语法树上查找，不构建序列化语法树。
+    if position_encoding not in POSITION_ENCODINGS:
+        return {"error": f"Invalid position_encoding: {position_encoding} (expected one of {', '.join(POSITION_ENCODINGS)})"}
+    session = document_sessions.get(code_id)
+    if session is None:
+        return {"error": f"No open document {code_id}. Open it with open_document first."}
+
+    with session.lock:
+        source, root, version = session.source_bytes, session.tree.root_node, session.version
+        lines = session.line_index()
+        try:
+            offsets = [
+                lines.offset(source, int(position["line"]), int(position["character"]), position_encoding)
+                for position in positions
+            ]
+        except (KeyError, TypeError, ValueError) as e:
+            return {"error": f"Invalid position: {e}"}
+    # 行索引会被编辑就地修改，因此在锁内取得当前版本的源码和语法树并完成位置到字节偏移的转换；
+    # 语法树和源码本身不会被修改，之后的查找不受并发编辑影响。
+    nodes = [node_at_byte(root, offset, named_only) for offset in offsets]
+    table, results = describe_nodes(root, source, nodes, include_ancestors, named_only)
+    return {"code_id": code_id, "version": version, "nodes": table, "results": results}
+    # 返回节点表和每个位置的结果。
+
+
+def register_session_tools(mcp_server):
+    """Register the document session tools with the MCP server."""
+    # 向MCP服务器注册文档会话工具。
+
+    @mcp_server.tool()
+    def open_document(
+        code_id: str,
+        code: str,
+        language: Optional[str] = None,
+        filename: Optional[str] = None
+    ) -> Dict:
+        """
+        Open a document session so the document can be updated with apply_edits.
+
+        The server keeps the document's syntax tree, so later edits only
+        reparse the code around them. Opening a code_id again replaces
+        its session.
+
+        Args:
+            code_id: Identifier chosen for the document (e.g. its file path)
+            code: The full source code
+            language: Programming language (e.g., 'python', 'javascript')
+                     If not provided, the tool will attempt to detect it
+            filename: Optional filename to help with language detection
+
+        Returns:
+            A dictionary with the document's version (0), size and whether
+            it parses without syntax errors
+        """
+        # 打开文档会话，此后可用apply_edits更新文档；服务器保存语法树，后续编辑只重新解析编辑附近的代码。
+        session, error = open_session(code_id, code, language, filename)
+        if error:
+            return error
+        return session.summary()
+
+    @mcp_server.tool()
+    def apply_edits(code_id: str, edits: List[Dict], position_encoding: str = "utf-16") -> Dict:
+        """
+        Apply range edits to an open document and reparse it incrementally.
+
+        Edits use the Language Server Protocol's format and are applied in
+        order, each to the result of the previous ones:
+        {"range": {"start": {"line": 3, "character": 4},
+                   "end": {"line": 3, "character": 7}}, "text": "new"}
+        An edit without a range replaces the whole document.
+
+        Args:
+            code_id: Identifier of a document opened with open_document
+            edits: The edits to apply
+            position_encoding: Units of the character offsets: 'utf-16'
+                              (default, as in LSP), 'utf-8' or 'utf-32'
+
+        Returns:
+            A dictionary with the document's new version, size, whether it
+            parses without syntax errors, and the ranges whose syntactic
+            structure changed
+        """
+        # 对已打开的文档应用LSP格式的范围编辑并增量重新解析，返回新版本号和语法结构发生变化的范围。
+        return edit_session(code_id, edits, position_encoding)
+
+    @mcp_server.tool()
+    def node_at_position(
+        code_id: str,
+        line: int,
+        character: int,
+        position_encoding: str = "utf-16",
+        named_only: bool = False
+    ) -> Dict:
+        """
+        Find the node at a position in an open document, with its ancestors.
+
+        The lookup runs on the document's live syntax tree, so it does not
+        reparse or serialize the document.
+
+        Args:
+            code_id: Identifier of a document opened with open_document
+            line: Line number (0-based)
+            character: Offset in the line (0-based), in units of position_encoding
+            position_encoding: 'utf-16' (default, as in LSP), 'utf-8' or 'utf-32'
+            named_only: If true, find the smallest named node and list
+                       only named ancestors
+
+        Returns:
+            A dictionary with the node (ID, type, range and text) and its
+            ancestors from the root down (ID, type and range)
+        """
+        # 在已打开文档的当前语法树上查找某位置的节点及其祖先，不重新解析或序列化文档。
+        located = locate_positions(code_id, [{"line": line, "character": character}], position_encoding, named_only)
+        if "error" in located:
+            return located
+        nodes = located["nodes"]
+        result = located["results"][0]
+        return {
+            "code_id": code_id,
+            "version": located["version"],
+            "node": nodes[result["node"]],
+            "ancestors": [nodes[ancestor] for ancestor in result["ancestors"]]
+        }
+
+    @mcp_server.tool()
+    def nodes_at_positions(
+        code_id: str,
+        positions: List[Dict],
+        position_encoding: str = "utf-16",
+        named_only: bool = False,
+        include_ancestors: bool = True
+    ) -> Dict:
+        """
+        Find the nodes at many positions of an open document in one call.
+
+        Positions are LSP positions, {"line": 3, "character": 4}. Nodes are
+        described once in "nodes" (keyed by node ID), and "results" holds,
+        for each position in order, the ID of its node and the IDs of its
+        ancestors from the root down, so ancestors shared by many positions
+        are not repeated.
+
+        Args:
+            code_id: Identifier of a document opened with open_document
+            positions: The positions to look up
+            position_encoding: 'utf-16' (default, as in LSP), 'utf-8' or 'utf-32'
+            named_only: If true, find the smallest named nodes and list
+                       only named ancestors
+            include_ancestors: Whether to include the ancestor chains
+
+        Returns:
+            A dictionary with the document's version, "nodes" and "results"
+        """
+        # 一次调用查找已打开文档中多个位置的节点；节点在nodes中按ID只描述一次，results按位置顺序引用节点和祖先的ID。
+        return locate_positions(code_id, positions, position_encoding, named_only, include_ancestors)
+
+    @mcp_server.tool()
+    def close_document(code_id: str) -> Dict:
+        """
+        Close a document session and free its syntax tree.
+
+        Args:
+            code_id: Identifier of an open document
+
+        Returns:
+            A dictionary with the closed code_id, or an error if it was not open
+        """
+        # 关闭文档会话并释放其语法树。
+        if document_sessions.pop(code_id) is None:
+            return {"error": f"No open document {code_id}"}
+        return {"code_id": code_id, "closed": True}
@@ -0,0 +1,142 @@
+"""
+Cold-start measurement for the MCP server.
+
+MCP hosts spawn the server once per session, so its import time is paid on
+every session start. This module imports the server in a fresh interpreter
+with `python -X importtime` and reports how the time splits between the
+modules it imports directly, optionally checking the total against a budget.
+
+Usage:
+    python server.py --measure-startup [--budget-ms N] [--module NAME]
+"""
+# MCP服务器的冷启动测量模块。
+# MCP宿主每个会话启动一次服务器，因此每次会话开始都要付出导入时间。
+# 本模块在新解释器中用`python -X importtime`导入服务器，报告时间在其直接导入的各模块间的分布，
+# 并可选地检查总时间是否超出预算。
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+from typing import Dict, List, Optional
+
+# Module imported to measure the server's cold start
+DEFAULT_MODULE = "server"
+# 测量冷启动时导入的模块。
+
+# Environment variable with the cold-start budget in milliseconds
+STARTUP_BUDGET_ENV = "AST_MCP_STARTUP_BUDGET_MS"
+# 冷启动预算（毫秒）的环境变量。
+
+IMPORT_TIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$")
+# -X importtime输出行的格式：自身耗时 | 累计耗时 | 缩进+模块名（微秒）。
+
+
+def measure_startup(module: str = DEFAULT_MODULE, cwd: Optional[str] = None) -> Dict:
+    """
+    Import a module in a fresh interpreter and break down its import time.
+
+    Args:
+        module: Name of the module to import (default: the server)
+        cwd: Working directory for the interpreter (default: the repository root)
+
+    Returns:
+        Dictionary with the total and self times in milliseconds and the list
+        of modules imported directly by it with their cumulative times
+    """
+    # 在新解释器中导入模块并分解其导入时间。
+    if cwd is None:
+        cwd = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=cwd, capture_output=True, text=True
+    )
+    if process.returncode != 0:
+        return {"error": f"Importing {module} failed:\n{process.stderr[-2000:]}"}
+    # 导入失败时返回错误输出的末尾部分。
+
+    entries = []
+    for line in process.stderr.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            entries.append((len(indent) // 2, name, int(self_us), int(cumulative_us)))
+    # 解析每个模块的嵌套层级、名称、自身耗时和累计耗时。
+
+    # importtime lists modules after their own imports, so the children of
+    # the measured module are the level-1 entries right before it
+    target = None
+    for index in range(len(entries) - 1, -1, -1):
+        if entries[index][0] == 0 and entries[index][1] == module:
+            target = index
+            break
+    if target is None:
+        return {"error": f"No import time reported for {module}"}
+
+    children: List[Dict] = []
+    for level, name, _, cumulative_us in reversed(entries[:target]):
+        if level == 0:
+            break
+        if level == 1:
+            children.append({"module": name, "ms": cumulative_us / 1000})
+    children.sort(key=lambda child: -child["ms"])
+    # 被测模块之前、层级为1的条目即其直接导入的模块，按累计耗时排序。
+
+    _, _, self_us, total_us = entries[target]
+    return {
+        "module": module,
+        "total_ms": total_us / 1000,
+        "self_ms": self_us / 1000,
+        "imports": children
+    }
+
+
+def format_report(report: Dict, budget_ms: Optional[float] = None) -> str:
+    """Format a measure_startup report as a table."""
+    # 将measure_startup的结果格式化为表格。
+    lines = [f"Cold-start import time of {report['module']}: {report['total_ms']:.1f} ms"]
+    if budget_ms is not None:
+        status = "within" if report["total_ms"] <= budget_ms else "OVER"
+        lines.append(f"Budget: {budget_ms:.1f} ms ({status} budget)")
+    lines.append("")
+    lines.append(f"{'ms':>10} {'share':>6}  module")
+    total = report["total_ms"] or 1.0
+    rows = report["imports"] + [{"module": f"{report['module']} (self)", "ms": report["self_ms"]}]
+    for row in rows:
+        lines.append(f"{row['ms']:>10.1f} {100 * row['ms'] / total:>5.1f}%  {row['module']}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Command line entry point for --measure-startup.
+
+    Returns:
+        Exit status: 0, or 1 if the import fails or exceeds the budget
+    """
+    # --measure-startup的命令行入口；导入失败或超出预算时返回1。
+    parser = argparse.ArgumentParser(description="Measure the server's cold-start import time")
+    parser.add_argument("--measure-startup", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--module", default=DEFAULT_MODULE, help="module to import (default: server)")
+    parser.add_argument(
+        "--budget-ms", type=float, default=None,
+        help=f"fail if the total exceeds this many milliseconds (default: ${STARTUP_BUDGET_ENV})"
+    )
+    args = parser.parse_args(argv)
+    budget_ms = args.budget_ms
+    if budget_ms is None and os.environ.get(STARTUP_BUDGET_ENV):
+        budget_ms = float(os.environ[STARTUP_BUDGET_ENV])
+
+    report = measure_startup(args.module)
+    if "error" in report:
+        print(report["error"], file=sys.stderr)
+        return 1
+    print(format_report(report, budget_ms))
+    if budget_ms is not None and report["total_ms"] > budget_ms:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,297 @@
+"""
+Symbol-level diff of two versions of some code.
+
+Answers which functions and classes were added, removed, modified or
+moved, without comparing whole trees. One walk of each tree records the
+normalized token stream of the file (leaf tokens without whitespace or
+comments, plus markers where bodies open and close, so that Python
+indentation still counts) and the definitions in it. With prefix hashes
+over that stream, each definition's own content (its tokens minus its
+name and its nested definitions) is hashed in time proportional to the
+number of nested definitions, so the whole diff is linear in the size of
+the files.
+"""
+# 两个代码版本之间的符号级差异模块。
+# 无需比较整棵语法树，即可回答哪些函数和类被添加、删除、修改或移动。对每棵语法树遍历一次，记录文件的规范化词法单元流
+# （不含空白和注释的叶节点，外加代码体开始和结束处的标记，使Python的缩进仍被计入）及其中的定义。
+# 借助该词法单元流的前缀哈希，每个定义自身内容（其词法单元去掉名称和嵌套定义）的哈希只需与嵌套定义数成正比的时间，
+# 因此整个差异计算与文件大小成线性关系。
+
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+from tree_sitter import Node
+
+from .languages import BODY, CLASS, COMMENT, FUNCTION, LanguagePlugin
+from .visitors import TreeWalker
+
+# Modulus and base of the polynomial prefix hashes (a Mersenne prime)
+HASH_MODULUS = (1 << 61) - 1
+HASH_BASE = 1_000_003
+# 多项式前缀哈希的模数（梅森素数）和基数。
+
+# Token values marking where a body opens and closes
+BODY_OPEN = 1
+BODY_CLOSE = 2
+# 标记代码体开始和结束的词法单元值。
+
+
+class Definition:
+    """A function or class found by DefinitionCollector."""
+    # DefinitionCollector找到的函数或类。
+
+    __slots__ = ("name", "node", "parent", "children", "first", "last", "name_token", "digest")
+
+    def __init__(self, name: str, node: Node, parent: int, first: int, name_token: Optional[int]):
+        self.name = name  # Qualified name, e.g. "Class.method"
+        self.node = node
+        self.parent = parent  # Index of the enclosing definition (-1 at top level)
+        self.children = []  # Indexes of the directly nested definitions
+        self.first = first  # Range of the definition's tokens, set when it is left
+        self.last = first
+        self.name_token = name_token  # Start byte of the name token, when the name is a single token
+        self.digest = 0
+
+
+class DefinitionCollector:
+    """
+    Collects the normalized token stream and the definitions of a tree during a TreeWalker walk.
+
+    After the walk, hash_definitions() sets each definition's digest: the
+    hash of its tokens without its own name token and without the tokens
+    of nested definitions.
+    """
+    # 在TreeWalker遍历过程中收集语法树的规范化词法单元流和定义。
+    # 遍历后由hash_definitions()设置每个定义的摘要：去掉自身名称和嵌套定义的词法单元后的哈希。
+
+    def __init__(self, plugin: LanguagePlugin, source_bytes: bytes):
+        self.spec = plugin.spec
+        self.flags = plugin.flags
+        self.source_bytes = source_bytes
+        self.tokens = []  # Token values
+        self.token_starts = []  # Start byte of each token
+        self.definitions: List[Definition] = []
+        self.open = []  # Indexes of the definitions being walked
+
+    def register(self, walker: TreeWalker) -> None:
+        spec = self.spec
+        walker.on_enter(None, self.enter_node)
+        walker.on_exit(spec.bodies, self.exit_body)
+        walker.on_exit(spec.functions | spec.classes, self.exit_definition)
+
+    def enter_node(self, node: Node, depth: int) -> None:
+        flags = self.flags[node.kind_id]
+        if flags & (FUNCTION | CLASS):
+            self.enter_definition(node)
+        elif flags & BODY:
+            self.add_token(BODY_OPEN, node.start_byte)
+        elif node.child_count == 0 and not flags & COMMENT:
+            token = hash((node.kind_id, self.source_bytes[node.start_byte:node.end_byte]))
+            self.add_token(token % HASH_MODULUS, node.start_byte)
+        # 叶节点（注释除外）按类型和文本计入词法单元流；代码体的开始和结束各计一个标记。
+
+    def add_token(self, value: int, start_byte: int) -> None:
+        self.tokens.append(value)
+        self.token_starts.append(start_byte)
+
+    def exit_body(self, node: Node, depth: int) -> None:
+        self.add_token(BODY_CLOSE, node.end_byte)
+
+    def enter_definition(self, node: Node) -> None:
+        name_node = node.child_by_field_name("name")
+        name = self.source_bytes[name_node.start_byte:name_node.end_byte].decode("utf-8", "replace") if name_node else node.type
+        parent = self.open[-1] if self.open else -1
+        if parent >= 0:
+            name = f"{self.definitions[parent].name}.{name}"
+            self.definitions[parent].children.append(len(self.definitions))
+        # 限定名由外层定义的名称和自身名称以点连接。
+
+        first = len(self.tokens)
+        wrapper = node.parent
+        if wrapper is not None and wrapper.type in self.spec.definition_wrappers:
+            first = bisect_left(self.token_starts, wrapper.start_byte)
+        # 包装节点（如Python的装饰器）中已记录的词法单元也属于该定义。
+
+        name_token = name_node.start_byte if name_node is not None and name_node.child_count == 0 else None
+        self.open.append(len(self.definitions))
+        self.definitions.append(Definition(name, node, parent, first, name_token))
+        if self.flags[node.kind_id] & BODY:
+            self.add_token(BODY_OPEN, node.start_byte)
+
+    def exit_definition(self, node: Node, depth: int) -> None:
+        definition = self.definitions[self.open.pop()]
+        definition.last = len(self.tokens)
+
+    def hash_definitions(self) -> None:
+        """Compute the digest of every definition from prefix hashes of the token stream."""
+        # 利用词法单元流的前缀哈希计算每个定义的摘要。
+        tokens = self.tokens
+        prefix = [0] * (len(tokens) + 1)
+        powers = [1] * (len(tokens) + 1)
+        for index, token in enumerate(tokens):
+            prefix[index + 1] = (prefix[index] * HASH_BASE + token) % HASH_MODULUS
+            powers[index + 1] = powers[index] * HASH_BASE % HASH_MODULUS
+        # prefix[i]为前i个词法单元的多项式哈希，任意区间的哈希可由两个前缀在常数时间内求得。
+
+        definitions = self.definitions
+        for definition in definitions:
+            skipped = []  # (first, last) of the token ranges left out
+            if definition.name_token is not None:
+                name_index = bisect_left(self.token_starts, definition.name_token, definition.first, definition.last)
+                if name_index < definition.last:
+                    skipped.append((name_index, name_index + 1))
+            for child_index in definition.children:
+                child = definitions[child_index]
+                skipped.append((child.first, child.last))
+            skipped.sort()
+            # 去掉自身名称和嵌套定义；嵌套定义的变更单独报告。
+
+            digest = 0
+            position = definition.first
+            for first, last in skipped + [(definition.last, definition.last)]:
+                length = first - position
+                if length > 0:
+                    segment = (prefix[first] - prefix[position] * powers[length]) % HASH_MODULUS
+                    digest = (digest * powers[length] + segment) % HASH_MODULUS
+                position = max(position, last)
+            definition.digest = digest
+            # 依次拼接保留片段的哈希：拼接后的哈希等于前一部分乘以后一片段长度次幂再加后一片段的哈希。
+
+
+def collect_definitions(root: Node, source_bytes: bytes, plugin: LanguagePlugin) -> List[Definition]:
+    """Walk a tree once and return its definitions, with their digests set."""
+    # 遍历语法树一次，返回其中的定义（已设置摘要）。
+    collector = DefinitionCollector(plugin, source_bytes)
+    TreeWalker().add(collector).walk(root)
+    collector.hash_definitions()
+    return collector.definitions
+
+
+def definition_location(definition: Definition) -> Dict:
+    """Get the 1-based line range of a definition, as in analyze_code."""
+    # 获取定义的行范围（从1开始），与analyze_code相同。
+    node = definition.node
+    return {"start_line": node.start_point[0] + 1, "end_line": node.end_point[0] + 1}
+
+
+def out_of_order(pairs: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Get the (old, new) pairs, listed in new order, that are not in a longest run in old order."""
+    # 获取按新顺序排列的(旧, 新)对中，不在按旧顺序递增的最长子序列里的对。
+    tails, tail_indexes = [], []
+    previous = [-1] * len(pairs)
+    for index, (old_index, _) in enumerate(pairs):
+        length = bisect_left(tails, old_index)
+        if length == len(tails):
+            tails.append(old_index)
+            tail_indexes.append(index)
+        else:
+            tails[length] = old_index
+            tail_indexes[length] = index
+        previous[index] = tail_indexes[length - 1] if length else -1
+    in_order = set()
+    index = tail_indexes[-1] if tail_indexes else -1
+    while index != -1:
+        in_order.add(index)
+        index = previous[index]
+    return [pair for index, pair in enumerate(pairs) if index not in in_order]
+
+
+def diff_definitions(old: List[Definition], new: List[Definition]) -> Dict:
+    """
+    Match the definitions of two versions and list what changed.
+
+    Definitions are first paired by qualified name (in order, for names
+    defined more than once). A paired definition is modified when its
+    digest changed, and moved when it changed order among the definitions
+    of the same scope. Unpaired definitions with equal digests are paired
+    next, as definitions that moved to another scope or were renamed; the
+    rest were added or removed.
+
+    Args:
+        old: Definitions of the old version (from collect_definitions)
+        new: Definitions of the new version
+
+    Returns:
+        Dictionary with the changes ("added", "removed", "modified" or
+        "moved", with the name, node type and line ranges) and their
+        counts, including unchanged definitions
+    """
+    # 匹配两个版本的定义并列出变更。先按限定名配对（同名定义按顺序配对）；摘要改变的为修改，在同一作用域的定义中改变顺序的为移动。
+    # 未配对的定义再按摘要配对，视为移到其他作用域或被重命名；其余为添加或删除。
+    old_by_name = defaultdict(list)
+    for index, definition in enumerate(old):
+        old_by_name[definition.name].append(index)
+    pairs = []
+    unpaired_new = []
+    for index, definition in enumerate(new):
+        candidates = old_by_name.get(definition.name)
+        if candidates:
+            pairs.append((candidates.pop(0), index))
+        else:
+            unpaired_new.append(index)
+    # 按限定名配对。
+
+    paired_old = {old_index for old_index, _ in pairs}
+    by_digest = defaultdict(list)
+    for index, definition in enumerate(old):
+        if index not in paired_old:
+            by_digest[definition.digest].append(index)
+    renamed = []
+    added = []
+    for index in unpaired_new:
+        candidates = by_digest.get(new[index].digest)
+        if candidates:
+            renamed.append((candidates.pop(0), index))
+        else:
+            added.append(index)
+    removed = [index for candidates in by_digest.values() for index in candidates]
+    # 未配对的定义按摘要配对，其余为添加或删除。
+
+    by_scope = defaultdict(list)
+    for old_index, new_index in pairs:
+        parent = new[new_index].parent
+        by_scope[new[parent].name if parent >= 0 else None].append((old_index, new_index))
+    moved = set()
+    for scope_pairs in by_scope.values():
+        moved.update(new_index for _, new_index in out_of_order(scope_pairs))
+    # 在同一作用域内，按新顺序排列后不在旧顺序最长递增子序列中的定义视为移动。
+
+    changes = []
+    counts = {"added": len(added), "removed": len(removed), "modified": 0, "moved": len(renamed), "unchanged": 0}
+    for old_index, new_index in pairs:
+        old_definition, new_definition = old[old_index], new[new_index]
+        modified = old_definition.digest != new_definition.digest
+        if not modified and new_index not in moved:
+            counts["unchanged"] += 1
+            continue
+        change = {
+            "change": "modified" if modified else "moved",
+            "name": new_definition.name,
+            "type": new_definition.node.type,
+            "old_location": definition_location(old_definition),
+            "new_location": definition_location(new_definition)
+        }
+        if modified and new_index in moved:
+            change["moved"] = True
+        counts[change["change"]] += 1
+        changes.append(change)
+    for old_index, new_index in renamed:
+        changes.append({
+            "change": "moved",
+            "name": new[new_index].name,
+            "old_name": old[old_index].name,
+            "type": new[new_index].node.type,
+            "old_location": definition_location(old[old_index]),
+            "new_location": definition_location(new[new_index])
+        })
+    for index in added:
+        changes.append({
+            "change": "added", "name": new[index].name, "type": new[index].node.type,
+            "new_location": definition_location(new[index])
+        })
+    for index in removed:
+        changes.append({
+            "change": "removed", "name": old[index].name, "type": old[index].node.type,
+            "old_location": definition_location(old[index])
+        })
+    return {"changes": changes, "summary": counts}
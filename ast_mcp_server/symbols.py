@@ -0,0 +1,888 @@
+"""
+One-pass scope and symbol resolution for the enhanced ASG.
+
+SymbolTable is a flat table of scopes: each scope is an integer id with
+its parent in an array and one dict mapping names to their bindings.
+References are resolved during the same walk that records definitions. A
+name already bound in the current scope resolves at once; otherwise the
+reference waits on the scope and is patched by the scope's first binding
+of that name (a forward reference), or handed to the enclosing scope when
+the scope closes. Each reference therefore costs one dict lookup per
+enclosing scope it passes through, and analysis stays linear in the size
+of the file.
+
+PythonScopeResolver feeds the table with Python's scoping rules: modules,
+functions, lambdas, classes and comprehensions open scopes, class scopes
+are not visible to the scopes nested in them, and names read inside a
+function resolve to the last binding of the enclosing scope, as they are
+looked up when the function runs. LexicalScopeResolver applies the same
+table to the other languages from the node kinds of their LanguageSpec
+(see languages.py).
+"""
+# 增强版ASG的一遍式作用域与符号解析模块。
+# SymbolTable是扁平的作用域表：每个作用域是一个整数ID，父作用域保存在数组中，每个作用域用一个字典映射名称到绑定。
+# 引用在记录定义的同一次遍历中解析：名称已在当前作用域绑定时立即解析；否则引用挂在该作用域上，
+# 由该作用域中此名称的第一次绑定回填（前向引用），或在作用域关闭时交给外层作用域。
+# 因此每个引用在经过的每个外层作用域只需一次字典查找，整体分析与文件大小成线性关系。
+# PythonScopeResolver按Python的作用域规则填充符号表：模块、函数、lambda、类和推导式创建作用域，
+# 类作用域对其内部嵌套的作用域不可见，函数中读取的名称解析为外层作用域的最后一次绑定（因为在函数运行时才查找）。
+# LexicalScopeResolver根据其他语言的LanguageSpec中的节点类型，对它们使用同一个符号表。
+
+from array import array
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from .languages import LANGUAGE_SPECS, LanguageSpec
+from .visitors import TreeWalker
+
+# Scope kinds
+MODULE_SCOPE = 0
+FUNCTION_SCOPE = 1
+CLASS_SCOPE = 2
+COMPREHENSION_SCOPE = 3
+SCOPE_KINDS = ("module", "function", "class", "comprehension")
+# 作用域种类。
+
+# Python node types opening a comprehension scope
+PYTHON_COMPREHENSION_NODES = frozenset({
+    "list_comprehension", "set_comprehension", "dictionary_comprehension", "generator_expression"
+})
+# 创建推导式作用域的Python节点类型。
+
+# Python parameter nodes whose defaults and annotations are evaluated in the enclosing scope
+PYTHON_SIGNATURE_NODES = ("default_parameter", "typed_default_parameter", "typed_parameter")
+# 默认值和注解在外层作用域中求值的Python参数节点。
+
+# Child types naming a JavaScript or TypeScript definition, for positional field lookups
+JAVASCRIPT_NAME_TYPES = ("identifier", "type_identifier", "property_identifier", "private_property_identifier")
+# Child types preceding the pattern of a TypeScript parameter
+JAVASCRIPT_PARAMETER_MODIFIERS = ("accessibility_modifier", "override_modifier", "readonly", "decorator")
+# 按位置查找字段时命名JavaScript或TypeScript定义的子节点类型，以及TypeScript参数中位于参数模式之前的修饰子节点类型。
+
+# Python node types holding assignment targets
+PYTHON_PATTERN_NODES = frozenset({
+    "pattern_list", "tuple_pattern", "list_pattern", "tuple", "list", "expression_list",
+    "parenthesized_expression", "list_splat_pattern", "as_pattern_target"
+})
+# 包含赋值目标的Python节点类型。
+
+# Semantic edge type for a resolved reference, by (usage, binding kind)
+EDGE_TYPES = {
+    ("call", "function"): "calls",
+    ("call", "import"): "calls_import",
+    ("call", "variable"): "references",
+    ("read", "variable"): "references",
+}
+# 按（用法, 绑定种类）确定已解析引用的语义边类型。
+
+
+class OuterBinding(NamedTuple):
+    """Handle of a binding outside a walked subtree, by its node id in an existing ASG."""
+    # 被遍历子树之外的绑定的句柄，以其在现有ASG中的节点ID表示。
+    index: int
+
+
+class SymbolTable:
+    """
+    Flat scope tree with per-scope symbol maps and one-pass reference resolution.
+
+    Definitions and references are opaque handles (tree-sitter node ids or
+    public node IDs); the table only deals with names and scopes.
+    """
+    # 带有各作用域符号映射的扁平作用域树，一遍完成引用解析。
+    # 定义和引用是不透明的句柄（tree-sitter节点id或公开节点ID），符号表只处理名称和作用域。
+
+    def __init__(self):
+        self.scope_parent = array("i")  # Parent scope id of each scope (-1 for the module)
+        self.scope_kind = array("b")    # Kind of each scope (MODULE_SCOPE, ...)
+        self.symbols: List[Dict[str, List]] = []  # Per scope: name -> [first def, first kind, last def, last kind]
+        self.declared: List[Optional[Dict[str, int]]] = []  # Per scope: global/nonlocal name -> scope holding it
+        self.waiting: List[Dict[str, List[int]]] = []   # Per scope: name -> references read before any binding
+        self.deferred: List[Dict[str, List[int]]] = []  # Per scope: name -> references from nested functions
+        self.stack: List[int] = []  # Ids of the open scopes
+        self.outer: Optional[Dict[str, Tuple[int, str]]] = None  # Bindings around the module scope, see open_outer_scopes
+        self.references: List[Tuple[Any, str]] = []  # (reference handle, usage) in the order seen
+        self.targets: List[Optional[Tuple[Any, str]]] = []  # (definition handle, kind) of each reference
+
+    @property
+    def current(self) -> int:
+        """Id of the innermost open scope."""
+        return self.stack[-1]
+
+    def enter_scope(self, kind: int) -> int:
+        """
+        Open a scope nested in the current one.
+
+        Args:
+            kind: Scope kind (MODULE_SCOPE, FUNCTION_SCOPE, CLASS_SCOPE or COMPREHENSION_SCOPE)
+
+        Returns:
+            Id of the new scope
+        """
+        # 打开嵌套在当前作用域中的新作用域；尚未打开模块作用域时（如根节点为ERROR）先打开它。
+        if kind != MODULE_SCOPE and not self.stack:
+            self.enter_scope(MODULE_SCOPE)
+        scope = len(self.scope_kind)
+        self.scope_parent.append(self.stack[-1] if self.stack else -1)
+        self.scope_kind.append(kind)
+        self.symbols.append({})
+        self.declared.append(None)
+        self.waiting.append({})
+        self.deferred.append({})
+        self.stack.append(scope)
+        return scope
+
+    def enclosing_scope(self, skip_comprehensions: bool = False) -> int:
+        """Id of the innermost open scope, optionally skipping comprehension scopes."""
+        # 最内层的已打开作用域，可选择跳过推导式作用域（用于海象运算符的绑定）。
+        if not self.stack:
+            self.enter_scope(MODULE_SCOPE)
+        if skip_comprehensions:
+            for scope in reversed(self.stack):
+                if self.scope_kind[scope] != COMPREHENSION_SCOPE:
+                    return scope
+        return self.stack[-1]
+
+    def enter_enclosing_scope(self) -> None:
+        """
+        Make the scope enclosing the current one current again, until exit_enclosing_scope.
+
+        Used for the parts of a function signature (defaults and
+        annotations) that are evaluated where the function is defined.
+        """
+        # 临时回到当前作用域的外层作用域，直到exit_enclosing_scope；用于在函数定义处求值的签名部分（默认值和注解）。
+        self.stack.append(self.scope_parent[self.current])
+
+    def exit_enclosing_scope(self) -> None:
+        """Return to the scope left by enter_enclosing_scope."""
+        # 回到enter_enclosing_scope之前的作用域。
+        self.stack.pop()
+
+    def visible_parent(self, scope: int) -> int:
+        """Nearest enclosing scope whose names are visible from scope (class scopes are skipped)."""
+        # 从给定作用域可见的最近外层作用域（跳过类作用域）。
+        parent = self.scope_parent[scope]
+        while parent >= 0 and self.scope_kind[parent] == CLASS_SCOPE:
+            parent = self.scope_parent[parent]
+        return parent
+
+    def declare(self, name: str, nonlocal_: bool = False) -> None:
+        """
+        Record a global (or nonlocal) declaration of a name in the current scope.
+
+        Bindings of and references to the name in the current scope then go
+        to the module scope (or to the nearest enclosing function scope).
+        """
+        # 记录当前作用域中对名称的global（或nonlocal）声明；此后该名称在当前作用域中的绑定和引用都转到模块作用域（或最近的外层函数作用域）。
+        if not self.stack:
+            return
+        scope = self.current
+        target = 0
+        if nonlocal_:
+            target = self.visible_parent(scope)
+            while target > 0 and self.scope_kind[target] != FUNCTION_SCOPE:
+                target = self.visible_parent(target)
+        if target == scope or target < 0:
+            return
+        if self.declared[scope] is None:
+            self.declared[scope] = {}
+        self.declared[scope][name] = target
+
+    def bind(self, name: str, definition: Any, kind: str, scope: Optional[int] = None) -> None:
+        """
+        Bind a name in a scope, patching the references waiting for it.
+
+        Args:
+            name: The bound name
+            definition: Handle of the defining node
+            kind: Binding kind ('function', 'class', 'variable' or 'import')
+            scope: Scope to bind in (default: the current scope)
+        """
+        # 在作用域中绑定名称，并回填等待该名称的引用。
+        if scope is None:
+            if not self.stack:
+                self.enter_scope(MODULE_SCOPE)
+            scope = self.stack[-1]
+        declared = self.declared[scope]
+        if declared is not None and name in declared:
+            scope = declared[name]
+        # global/nonlocal声明的名称绑定到其声明的作用域。
+
+        binding = self.symbols[scope].get(name)
+        if binding is not None:
+            binding[2] = definition
+            binding[3] = kind
+            return
+        self.symbols[scope][name] = [definition, kind, definition, kind]
+        waiting = self.waiting[scope].pop(name, None)
+        if waiting:
+            targets = self.targets
+            for reference in waiting:
+                targets[reference] = (definition, kind)
+        # 名称在该作用域的第一次绑定回填此前读取它的引用（前向引用）。
+
+    def reference(self, name: str, handle: Any, usage: str = "read") -> None:
+        """
+        Record a reference to a name from the current scope.
+
+        Args:
+            name: The referenced name
+            handle: Handle of the referencing node
+            usage: How the name is used ('read' or 'call')
+        """
+        # 记录当前作用域中对名称的引用。
+        index = len(self.targets)
+        self.references.append((handle, usage))
+        self.targets.append(None)
+
+        if not self.stack:
+            self.enter_scope(MODULE_SCOPE)
+        scope = self.stack[-1]
+        declared = self.declared[scope]
+        target = scope
+        if declared is not None and name in declared:
+            target = declared[name]
+        # global/nonlocal声明的名称在其声明的作用域中查找。
+
+        binding = self.symbols[target].get(name)
+        if binding is not None:
+            self.targets[index] = (binding[2], binding[3])
+        elif target != scope:
+            self.deferred[target].setdefault(name, []).append(index)
+        else:
+            self.waiting[scope].setdefault(name, []).append(index)
+        # 名称已绑定时解析为最近的绑定，否则等待后续绑定或外层作用域。
+
+    def exit_scope(self) -> int:
+        """
+        Close the current scope, handing its unresolved references to the enclosing scope.
+
+        Returns:
+            Id of the closed scope
+        """
+        # 关闭当前作用域，将其未解析的引用交给外层作用域。
+        scope = self.stack.pop()
+        symbols = self.symbols[scope]
+        parent = self.visible_parent(scope)
+        from_function = self.scope_kind[scope] == FUNCTION_SCOPE
+
+        for name, waiting in self.waiting[scope].items():
+            self._pass_up(name, waiting, parent, from_function)
+        # 从未在本作用域绑定的名称交给外层作用域；函数中的名称在函数运行时才查找。
+
+        targets = self.targets
+        for name, deferred in self.deferred[scope].items():
+            binding = symbols.get(name)
+            if binding is None:
+                self._pass_up(name, deferred, parent, True)
+                continue
+            for reference in deferred:
+                targets[reference] = (binding[2], binding[3])
+        # 来自嵌套函数的引用解析为本作用域的最后一次绑定。
+
+        self.waiting[scope] = {}
+        self.deferred[scope] = {}
+        return scope
+
+    def _pass_up(self, name: str, references: List[int], scope: int, deferred: bool) -> None:
+        if scope < 0:
+            outer = self.outer.get(name) if self.outer else None
+            if outer is not None:
+                target = (OuterBinding(outer[0]), outer[1])
+                for reference in references:
+                    self.targets[reference] = target
+            return
+        # 模块作用域中也未绑定的名称（如内置名称）不解析，除非有现有ASG中的模块级绑定。
+        if deferred:
+            self.deferred[scope].setdefault(name, []).extend(references)
+            return
+        binding = self.symbols[scope].get(name)
+        if binding is None:
+            self.waiting[scope].setdefault(name, []).extend(references)
+            return
+        targets = self.targets
+        for reference in references:
+            targets[reference] = (binding[2], binding[3])
+        # 类体和推导式立即执行，其引用解析为外层作用域当前的绑定。
+
+    def resolved(self) -> Iterator[Tuple[Any, str, Any, str]]:
+        """
+        Iterate over the resolved references in the order they were recorded.
+
+        Yields:
+            (reference handle, usage, definition handle, binding kind) tuples
+        """
+        # 按记录顺序迭代已解析的引用；先关闭仍打开的作用域（根节点不是模块时）。
+        while self.stack:
+            self.exit_scope()
+        for (handle, usage), target in zip(self.references, self.targets):
+            if target is not None:
+                yield handle, usage, target[0], target[1]
+
+
+def python_positional_fields(node_type: str, children: List[Dict], name: str) -> List[Dict]:
+    """
+    Find the children of a dictionary AST node filling a field, by position.
+
+    Used for ASTs serialized without field names (named_only=False), which
+    still keep the anonymous keyword and punctuation nodes.
+    """
+    # 按位置查找字典AST节点中填充某字段的子节点。用于未带字段名序列化的AST（named_only=False）。
+    if not children:
+        return []
+    if name == "name":
+        if node_type in ("function_definition", "class_definition"):
+            return [child for child in children if child["type"] == "identifier"][:1]
+        if node_type in ("import_statement", "import_from_statement"):
+            names = [child for child in children if child["type"] in ("dotted_name", "aliased_import")]
+            if node_type == "import_from_statement" and children[1]["type"] == "dotted_name":
+                names = names[1:]
+            return names
+        # from子句后的第一个dotted_name是模块名，不是导入的名称。
+        return children[:1]
+    if name == "parameters":
+        return [child for child in children if child["type"] in ("parameters", "lambda_parameters")][:1]
+    if name == "return_type":
+        return [child for child in children if child["type"] == "type"][:1]
+    if name == "left":
+        return [child for child in children if child["type"] not in ("for", "async")][:1]
+    if name in ("alias", "attribute"):
+        return children[-1:]
+    if name == "function":
+        return children[:1]
+    if name == "module_name":
+        return [child for child in children if child["type"] in ("dotted_name", "relative_import")][:1]
+    return []
+
+
+def following(children: List[Dict], node_type: str) -> List[Dict]:
+    """Get the child right after the first child of some type, as a field lookup result."""
+    # 获取第一个某类型子节点之后紧邻的子节点（作为字段查找结果）。
+    for index, child in enumerate(children[:-1]):
+        if child["type"] == node_type:
+            return [children[index + 1]]
+    return []
+
+
+def javascript_positional_fields(node_type: str, children: List[Dict], name: str) -> List[Dict]:
+    """
+    Find the children of a JavaScript or TypeScript dictionary AST node filling a field, by position.
+
+    Covers the fields read by LexicalScopeResolver (see python_positional_fields).
+    """
+    # 按位置查找JavaScript或TypeScript字典AST节点中填充某字段的子节点，覆盖LexicalScopeResolver读取的字段。
+    if not children:
+        return []
+    if name == "name":
+        if node_type == "variable_declarator":
+            return children[:1]
+        return [child for child in children if child["type"] in JAVASCRIPT_NAME_TYPES][:1]
+    if name == "value":
+        return following(children, "=")
+    if name == "parameters":
+        return [child for child in children if child["type"] == "formal_parameters"][:1]
+    if name == "parameter":
+        if node_type != "arrow_function" or any(child["type"] == "formal_parameters" for child in children):
+            return []
+        return [child for child in children if child["type"] == "identifier"][:1]
+    if name in ("left", "function"):
+        return children[:1]
+    if name == "pattern":
+        return [child for child in children if child["type"] not in JAVASCRIPT_PARAMETER_MODIFIERS][:1]
+    return []
+
+
+def java_positional_fields(node_type: str, children: List[Dict], name: str) -> List[Dict]:
+    """
+    Find the children of a Java dictionary AST node filling a field, by position.
+
+    Covers the fields read by LexicalScopeResolver (see python_positional_fields).
+    """
+    # 按位置查找Java字典AST节点中填充某字段的子节点，覆盖LexicalScopeResolver读取的字段。
+    if not children:
+        return []
+    if name == "name":
+        if node_type == "variable_declarator":
+            return children[:1]
+        if node_type == "method_invocation":
+            names = [
+                child for index, child in enumerate(children[:-1])
+                if child["type"] == "identifier" and children[index + 1]["type"] == "argument_list"
+            ]
+            return names[:1]
+        # 方法调用的名称是紧挨参数列表的标识符，之前的标识符是调用对象。
+        return [child for child in children if child["type"] == "identifier"][:1]
+    if name == "value":
+        return following(children, ":" if node_type == "enhanced_for_statement" else "=")
+    if name == "parameters":
+        if node_type == "lambda_expression":
+            return children[:1]
+        return [child for child in children if child["type"] == "formal_parameters"][:1]
+    if name == "object":
+        return children[:1] if any(child["type"] == "." for child in children) else []
+    if name == "field":
+        return children[-1:]
+    return []
+
+
+class ScopeResolver:
+    """
+    Base of the name resolvers feeding a SymbolTable during a TreeWalker walk.
+
+    Works on native tree-sitter nodes and on dictionary ASTs through a node
+    accessor (see visitors.NodeAccess and visitors.DictNodeAccess). After
+    the walk, edges() gives the 'calls', 'calls_import' and 'references'
+    edges between the accessor's node handles. Subclasses register the
+    language's binding constructs; identifiers neither bound nor skipped
+    are recorded as references by enter_identifier.
+    """
+    # 在TreeWalker遍历过程中填充SymbolTable的名称解析器基类。
+    # 通过节点访问器同时支持原生tree-sitter节点和字典AST；遍历结束后edges()给出节点句柄之间的调用和引用边。
+    # 子类注册语言的绑定结构；既未绑定也未跳过的标识符由enter_identifier记录为引用。
+
+    def __init__(self, access):
+        self.access = access
+        self.table = SymbolTable()
+        self.bound = set()  # Handles of identifiers in binding positions, skipped as references
+        self.calls = set()  # Handles of identifiers called as functions
+
+    def field(self, node, name: str):
+        children = self.access.fields(node, name)
+        return children[0] if children else None
+
+    def bind(self, identifier, definition, kind: str, scope: Optional[int] = None) -> None:
+        access = self.access
+        self.bound.add(access.ref(identifier))
+        name = access.text(identifier)
+        if name:
+            self.table.bind(name, access.ref(definition), kind, scope)
+
+    def exit_scope(self, node, depth: int) -> None:
+        self.table.exit_scope()
+
+    def enter_identifier(self, node, depth: int) -> None:
+        access = self.access
+        handle = access.ref(node)
+        bound = self.bound
+        if handle in bound:
+            bound.remove(handle)
+            return
+        usage = "read"
+        calls = self.calls
+        if handle in calls:
+            calls.remove(handle)
+            usage = "call"
+        name = access.text(node)
+        if name:
+            self.table.reference(name, handle, usage)
+        # 跳过绑定位置的标识符，其余标识符记录为读取或调用。
+
+    def open_outer_scopes(self, symbols: Dict[str, Tuple[int, str]], in_class: bool = False) -> None:
+        """
+        Open the scopes around a subtree walked on its own (see close_outer_scopes).
+
+        Used to re-resolve one top-level function: names left unbound at
+        module level resolve to the module-level bindings of an existing
+        ASG, as OuterBinding handles, and a class scope is opened if the
+        function is a method.
+
+        Args:
+            symbols: Module-level name -> (ASG node id, kind), see CompactASG.symbols
+            in_class: Whether the subtree is inside a class body
+        """
+        # 为单独遍历的子树打开外层作用域：模块级未绑定的名称解析为现有ASG的模块级绑定（OuterBinding句柄），方法还需打开类作用域。
+        table = self.table
+        table.enter_scope(MODULE_SCOPE)
+        table.outer = symbols
+        if in_class:
+            table.enter_scope(CLASS_SCOPE)
+
+    def close_outer_scopes(self, symbols: Dict[str, Tuple[int, str]], in_class: bool = False) -> None:
+        """Close the scopes opened by open_outer_scopes, resolving the names left to the module."""
+        # 关闭open_outer_scopes打开的作用域；子树在模块级绑定的名称（函数名）改用现有ASG中的最终绑定，再解析留给模块作用域的名称。
+        table = self.table
+        if in_class:
+            table.exit_scope()
+        module_symbols = table.symbols[0]
+        for name in [name for name in module_symbols if name in symbols]:
+            del module_symbols[name]
+        table.exit_scope()
+
+    def module_bindings(self) -> Dict[str, Tuple[Any, str]]:
+        """Get the last binding of each module-level name once the walk is done."""
+        # 遍历结束后获取每个模块级名称的最后一次绑定。
+        if not self.table.symbols:
+            return {}
+        return {name: (binding[2], binding[3]) for name, binding in self.table.symbols[0].items()}
+
+    def edges(self) -> Iterator[Tuple[Any, Any, str]]:
+        """
+        Get the semantic edges of the resolved references once the walk is done.
+
+        Yields:
+            (source handle, target handle, edge type) tuples
+        """
+        # 遍历结束后获取已解析引用的语义边。
+        for handle, usage, definition, kind in self.table.resolved():
+            edge_type = EDGE_TYPES.get((usage, kind))
+            if edge_type is not None:
+                yield handle, definition, edge_type
+
+
+class PythonScopeResolver(ScopeResolver):
+    """
+    Resolves Python names to their bindings during a TreeWalker walk.
+
+    Follows Python's module, function, lambda, class and comprehension
+    scopes, assignment and import bindings, and global/nonlocal
+    declarations.
+    """
+    # 在TreeWalker遍历过程中将Python名称解析到其绑定，遵循Python的模块、函数、lambda、类和推导式作用域，
+    # 赋值和导入绑定以及global/nonlocal声明。
+
+    def __init__(self, access):
+        super().__init__(access)
+        self.pending_bindings = []  # Targets of the open assignments, bound when they close
+        self.pending_functions = []  # Name identifiers of the open functions, bound when they close
+        self.return_types = set()  # Handles of the return annotations of the open functions
+
+    def register(self, walker: TreeWalker) -> None:
+        walker.on_enter("module", self.enter_module)
+        walker.on_enter("function_definition", self.enter_function)
+        walker.on_enter("lambda", self.enter_lambda)
+        walker.on_enter("class_definition", self.enter_class)
+        walker.on_enter(PYTHON_COMPREHENSION_NODES, self.enter_comprehension)
+        walker.on_enter(("assignment", "augmented_assignment", "named_expression"), self.enter_assignment)
+        walker.on_enter(("for_statement", "for_in_clause"), self.enter_for)
+        walker.on_enter("as_pattern", self.enter_as_pattern)
+        walker.on_enter(("import_statement", "import_from_statement"), self.enter_import)
+        walker.on_enter(("global_statement", "nonlocal_statement"), self.enter_declaration)
+        walker.on_enter(("attribute", "keyword_argument"), self.enter_non_reference)
+        walker.on_enter("call", self.enter_call)
+        walker.on_enter("identifier", self.enter_identifier)
+        walker.on_enter(PYTHON_SIGNATURE_NODES, self.enter_signature_part)
+        walker.on_enter("type", self.enter_type)
+        walker.on_exit(PYTHON_SIGNATURE_NODES, self.exit_signature_part)
+        walker.on_exit("type", self.exit_type)
+        walker.on_exit(("assignment", "augmented_assignment", "named_expression"), self.exit_assignment)
+        walker.on_exit(
+            ("module", "function_definition", "lambda", "class_definition") + tuple(PYTHON_COMPREHENSION_NODES),
+            self.exit_scope
+        )
+        walker.on_exit("function_definition", self.exit_function)
+
+    def targets(self, node) -> List:
+        """Identifiers bound by an assignment target pattern."""
+        # 赋值目标模式绑定的标识符。
+        access = self.access
+        found = []
+        stack = [node] if node is not None else []
+        while stack:
+            current = stack.pop()
+            node_type = access.type(current)
+            if node_type == "identifier":
+                found.append(current)
+            elif node_type in PYTHON_PATTERN_NODES:
+                stack.extend(reversed(access.children(current)))
+        # 属性和下标赋值不绑定名称，其中的标识符按普通引用处理。
+        return found
+
+    def enter_module(self, node, depth: int) -> None:
+        self.table.enter_scope(MODULE_SCOPE)
+
+    def enter_function(self, node, depth: int) -> None:
+        name = self.field(node, "name")
+        if name is not None:
+            self.bound.add(self.access.ref(name))
+        self.pending_functions.append(name)
+        return_type = self.field(node, "return_type")
+        if return_type is not None:
+            self.return_types.add(self.access.ref(return_type))
+        self.table.enter_scope(FUNCTION_SCOPE)
+        self.bind_parameters(self.field(node, "parameters"))
+        # 参数绑定在函数自身的作用域；函数名在函数结束时才绑定到外层作用域，
+        # 因为装饰器、默认值和注解在绑定函数名之前求值（函数体中对它的引用在外层作用域关闭时才解析）。
+
+    def exit_function(self, node, depth: int) -> None:
+        name = self.pending_functions.pop()
+        if name is not None:
+            self.bind(name, node, "function")
+
+    def enter_signature_part(self, node, depth: int) -> None:
+        self.table.enter_enclosing_scope()
+
+    def exit_signature_part(self, node, depth: int) -> None:
+        self.table.exit_enclosing_scope()
+    # 默认值和参数注解在定义函数的作用域中求值：遍历带默认值或注解的参数时临时回到外层作用域，参数名本身已在函数作用域中绑定。
+
+    def enter_type(self, node, depth: int) -> None:
+        if self.access.ref(node) in self.return_types:
+            self.table.enter_enclosing_scope()
+
+    def exit_type(self, node, depth: int) -> None:
+        handle = self.access.ref(node)
+        if handle in self.return_types:
+            self.return_types.remove(handle)
+            self.table.exit_enclosing_scope()
+    # 返回值注解同样在外层作用域中求值。
+
+    def enter_lambda(self, node, depth: int) -> None:
+        self.table.enter_scope(FUNCTION_SCOPE)
+        self.bind_parameters(self.field(node, "parameters"))
+
+    def bind_parameters(self, parameters) -> None:
+        if parameters is None:
+            return
+        access = self.access
+        for parameter in access.children(parameters):
+            node_type = access.type(parameter)
+            if node_type in ("default_parameter", "typed_default_parameter"):
+                parameter = self.field(parameter, "name")
+            elif node_type in ("typed_parameter", "list_splat_pattern", "dictionary_splat_pattern"):
+                if node_type == "typed_parameter":
+                    parameter = next(iter(access.children(parameter)), None)
+                    if parameter is not None and access.type(parameter) != "identifier":
+                        node_type = access.type(parameter)
+                if node_type != "typed_parameter":
+                    parameter = next(
+                        (child for child in access.children(parameter) if access.type(child) == "identifier"),
+                        None
+                    )
+            elif node_type != "identifier":
+                continue
+            if parameter is not None:
+                self.bind(parameter, parameter, "variable")
+        # 处理普通、带默认值、带类型注解以及*args/**kwargs（包括带注解的）形式的参数。
+
+    def enter_class(self, node, depth: int) -> None:
+        name = self.field(node, "name")
+        if name is not None:
+            self.bind(name, node, "class")
+        self.table.enter_scope(CLASS_SCOPE)
+
+    def enter_comprehension(self, node, depth: int) -> None:
+        self.table.enter_scope(COMPREHENSION_SCOPE)
+
+    def enter_assignment(self, node, depth: int) -> None:
+        node_type = self.access.type(node)
+        targets = self.targets(self.field(node, "name" if node_type == "named_expression" else "left"))
+        if node_type != "augmented_assignment":
+            self.bound.update(self.access.ref(target) for target in targets)
+        self.pending_bindings.append(targets)
+        # 目标在赋值结束时才绑定，这样右侧对同名变量的读取仍指向之前的绑定；增强赋值的目标同时也是一次读取。
+
+    def exit_assignment(self, node, depth: int) -> None:
+        targets = self.pending_bindings.pop()
+        scope = None
+        if self.access.type(node) == "named_expression":
+            scope = self.table.enclosing_scope(skip_comprehensions=True)
+        for target in targets:
+            self.bind(target, target, "variable", scope)
+        # 海象运算符绑定在最近的非推导式作用域。
+
+    def enter_for(self, node, depth: int) -> None:
+        for target in self.targets(self.field(node, "left")):
+            self.bind(target, target, "variable")
+
+    def enter_as_pattern(self, node, depth: int) -> None:
+        for target in self.targets(self.field(node, "alias")):
+            self.bind(target, target, "variable")
+        # with ... as x和except ... as x绑定别名。
+
+    def enter_import(self, node, depth: int) -> None:
+        access = self.access
+        for imported in access.fields(node, "name"):
+            if access.type(imported) == "aliased_import":
+                alias = self.field(imported, "alias")
+                if alias is not None:
+                    self.bind(alias, imported, "import")
+                dotted = self.field(imported, "name")
+            else:
+                dotted = imported
+                first = next(iter(access.children(dotted)), None)
+                if first is not None and access.type(first) == "identifier":
+                    self.bind(first, dotted, "import")
+            if dotted is not None:
+                self.bound.update(access.ref(child) for child in access.children(dotted))
+        # import a.b绑定a，import a.b as c和from ... import b as c绑定c；被导入路径中的标识符不是引用。
+
+        module_name = self.field(node, "module_name")
+        if module_name is not None:
+            self.bound.update(access.ref(child) for child in access.children(module_name))
+
+    def enter_declaration(self, node, depth: int) -> None:
+        access = self.access
+        nonlocal_ = access.type(node) == "nonlocal_statement"
+        for child in access.children(node):
+            if access.type(child) == "identifier":
+                self.bound.add(access.ref(child))
+                name = access.text(child)
+                if name:
+                    self.table.declare(name, nonlocal_)
+
+    def enter_non_reference(self, node, depth: int) -> None:
+        name = self.field(node, "attribute" if self.access.type(node) == "attribute" else "name")
+        if name is not None:
+            self.bound.add(self.access.ref(name))
+        # 属性名和关键字参数名不是名称引用。
+
+    def enter_call(self, node, depth: int) -> None:
+        function = self.field(node, "function")
+        if function is not None and self.access.type(function) == "identifier":
+            self.calls.add(self.access.ref(function))
+
+
+class LexicalScopeResolver(ScopeResolver):
+    """
+    Resolves names to their bindings from the node kinds of a LanguageSpec.
+
+    A generic, lexically scoped approximation for languages without a
+    dedicated resolver: every spec.scopes node opens a scope, functions and
+    classes bind their name in the enclosing scope, and parameters,
+    declarators and imports bind theirs as the walk meets them. Class
+    bodies are hidden from their methods unless class_members_in_scope is
+    set (as for Java methods calling each other).
+    """
+    # 根据LanguageSpec中的节点类型将名称解析到其绑定。
+    # 是没有专用解析器的语言的通用词法作用域近似：spec.scopes中的每个节点创建作用域，函数和类在外层作用域绑定其名称，
+    # 参数、变量声明和导入在遍历到时绑定各自的名称。除非设置了class_members_in_scope（如Java方法互相调用），类体对其方法不可见。
+
+    def __init__(self, access, spec: LanguageSpec):
+        super().__init__(access)
+        self.spec = spec
+        self.class_scope = FUNCTION_SCOPE if spec.class_members_in_scope else CLASS_SCOPE
+
+    def register(self, walker: TreeWalker) -> None:
+        spec = self.spec
+        definitions = spec.functions | spec.classes
+        walker.on_enter(definitions, self.enter_definition)
+        walker.on_enter(spec.scopes - definitions, self.enter_scope)
+        walker.on_enter(spec.declarators, self.enter_declarator)
+        walker.on_enter(spec.imports, self.enter_import)
+        walker.on_enter(spec.members.keys(), self.enter_member)
+        walker.on_enter(spec.calls.keys(), self.enter_call)
+        walker.on_enter(spec.identifiers, self.enter_identifier)
+        walker.on_exit(spec.scopes, self.exit_scope)
+
+    def is_identifier(self, node) -> bool:
+        return node is not None and self.access.type(node) in self.spec.identifiers
+
+    def enter_definition(self, node, depth: int) -> None:
+        is_class = self.access.type(node) in self.spec.classes
+        name = self.field(node, "name")
+        if self.is_identifier(name):
+            self.bind(name, node, "class" if is_class else "function")
+        if is_class:
+            self.table.enter_scope(self.class_scope)
+            return
+        self.table.enter_scope(FUNCTION_SCOPE)
+        self.bind_parameters(node)
+        # 定义的名称绑定在外层作用域（方法名等属性名除外），参数绑定在函数自身的作用域。
+
+    def enter_scope(self, node, depth: int) -> None:
+        self.table.enter_scope(FUNCTION_SCOPE)
+        self.bind_parameters(node)
+
+    def bind_parameters(self, node) -> None:
+        access = self.access
+        parameters = self.field(node, "parameters") or self.field(node, "parameter")
+        if parameters is None:
+            return
+        if self.is_identifier(parameters):
+            self.bind(parameters, parameters, "variable")
+            return
+        # 单个不带括号的参数（如x => x + 1）。
+        for parameter in access.children(parameters):
+            node_type = access.type(parameter)
+            if node_type not in self.spec.parameters:
+                continue
+            name_field = self.spec.parameters[node_type]
+            if name_field is not None:
+                parameter = self.field(parameter, name_field)
+            if self.is_identifier(parameter):
+                self.bind(parameter, parameter, "variable")
+        # 按描述中的参数类型找到参数名；解构等其他形式的参数不绑定。
+
+    def enter_declarator(self, node, depth: int) -> None:
+        name = self.field(node, "name")
+        if not self.is_identifier(name):
+            return
+        value = self.field(node, "value")
+        if value is not None and self.access.type(value) in self.spec.scopes:
+            self.bind(name, value, "function")
+        else:
+            self.bind(name, name, "variable")
+        # 以函数表达式或箭头函数初始化的变量按函数绑定，其调用成为调用边。
+
+    def enter_import(self, node, depth: int) -> None:
+        access = self.access
+        spec = self.spec
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            node_type = access.type(current)
+            if node_type in spec.identifiers:
+                self.bound.add(access.ref(current))
+            elif node_type in spec.import_bindings:
+                name = self.imported_name(current)
+                if name is not None:
+                    self.bind(name, current, "import")
+            stack.extend(access.children(current))
+        # 导入语句中的标识符都不是引用；每个导入绑定部分绑定其最后一个标识符（别名优先于原名）。
+
+    def imported_name(self, node):
+        """Identifier bound by an import part: its last identifier child, searched along a trailing dotted name."""
+        # 导入部分绑定的标识符：其最后一个标识符子节点；没有时沿末尾的限定名称向下查找（import a.b.C绑定C，import a.b.*不绑定）。
+        access = self.access
+        spec = self.spec
+        while node is not None:
+            children = access.children(node)
+            names = [child for child in children if access.type(child) in spec.identifiers]
+            if names:
+                return names[-1]
+            parts = [child for child in children if access.type(child).isidentifier()]
+            node = parts[-1] if parts and access.type(parts[-1]) in spec.qualified_names else None
+        return None
+
+    def enter_member(self, node, depth: int) -> None:
+        member = self.field(node, self.spec.members[self.access.type(node)])
+        if member is not None:
+            self.bound.add(self.access.ref(member))
+        # 成员名不是名称引用。
+
+    def enter_call(self, node, depth: int) -> None:
+        callee = self.field(node, self.spec.calls[self.access.type(node)])
+        if not self.is_identifier(callee):
+            return
+        if self.field(node, "object") is not None:
+            self.bound.add(self.access.ref(callee))
+        else:
+            self.calls.add(self.access.ref(callee))
+        # 带对象的调用（如obj.f()）调用的是成员，不是名称引用。
+
+
+# Dedicated name resolvers by language; other languages with a spec use LexicalScopeResolver
+SCOPE_RESOLVERS = {
+    "python": PythonScopeResolver
+}
+# 按语言索引的专用名称解析器；其他有描述的语言使用LexicalScopeResolver。
+
+
+def make_scope_resolver(access, language: str) -> Optional[ScopeResolver]:
+    """
+    Create the name resolver of a language.
+
+    Args:
+        access: Node accessor (visitors.NodeAccess or visitors.DictNodeAccess)
+        language: Normalized language identifier
+
+    Returns:
+        The resolver, or None if the language has no spec
+    """
+    # 创建语言的名称解析器；语言没有描述时返回None。
+    resolver_class = SCOPE_RESOLVERS.get(language)
+    if resolver_class is not None:
+        return resolver_class(access)
+    spec = LANGUAGE_SPECS.get(language)
+    if spec is None:
+        return None
+    return LexicalScopeResolver(access, spec)
@@ -8,23 +8,20 @@ capabilities through the Model Context Protocol.
 # 本模块通过Model Context Protocol定义了提供代码结构和语义分析能力的工具。
 
 from typing import Dict, List, Optional, Union, Any
-import os
 import json
-import importlib
-from tree_sitter import Parser, Node
-
-# Try to import language modules
-LANGUAGE_MODULES = {
-    "python": "tree_sitter_python",
-    "javascript": "tree_sitter_javascript",
-    "java": "tree_sitter_java",
-}
-# 支持的语言模块映射表。
-
-# Path to the parsers availability marker
-PARSERS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "parsers")
-PARSERS_AVAILABLE_FILE = os.path.join(PARSERS_DIR, "parsers_available.txt")
-# 解析器目录及可用性标记文件路径。
+from tree_sitter import Node
+from .parser_pool import parser_pool
+from .serialization import Projection, cursor_to_dict, cursor_to_columnar
+from .tree_store import tree_store, find_node_by_handle
+from .codecs import encode_response
+from .visitors import TreeWalker
+from .asg_model import CompactASG, check_asg_options, compact_asg_from_ast, add_edges_by_id
+from .language_detection import language_detector
+from .languages import FUNCTION, CLASS, IMPORT, LanguagePlugin, get_language_plugin
+from .grammars import (
+    LANGUAGE_MODULES, PARSERS_DIR, PARSERS_AVAILABLE_FILE,
+    languages, init_parsers, get_language, available_languages
+)
 
 # Language identifiers mapping
 LANGUAGE_MAP = {
@@ -46,44 +43,6 @@ LANGUAGE_MAP = {
 }
 # 语言标识符映射表，支持多种常见缩写。
 
-# Initialize parser and languages
-languages = {}
-# 用于存储已初始化的语言解析器。
-
-def init_parsers():
-    """Initialize the tree-sitter parsers."""
-    # 初始化tree-sitter解析器。
-    global languages
-    
-    # Check if parsers are marked as available
-    if not os.path.exists(PARSERS_AVAILABLE_FILE):
-        return False
-    
-    try:
-        # Check which language modules are available
-        available_languages = []
-        for lang_name, module_name in LANGUAGE_MODULES.items():
-            try:
-                module = importlib.import_module(module_name)
-                from tree_sitter import Language
-                languages[lang_name] = Language(module.language())
-                available_languages.append(lang_name)
-            except ImportError:
-                print(f"Module {module_name} not found. Some language support may be limited.")
-            except Exception as e:
-                print(f"Error initializing {lang_name} language: {e}")
-        # 动态导入各语言的tree-sitter模块，初始化解析器。
-        if available_languages:
-            print(f"Successfully initialized parsers for: {', '.join(available_languages)}")
-            return True
-        else:
-            return False
-            
-    except Exception as e:
-        print(f"Error initializing parsers: {e}")
-        return False
-    # 若初始化失败则返回False。
-
 def node_to_dict(node: Node, source_bytes: bytes, include_children: bool = True) -> Dict:
     """Convert a tree-sitter Node to a dictionary representation."""
     # 将tree-sitter的Node节点转换为字典结构，便于序列化和后续处理。
@@ -108,73 +67,81 @@ def node_to_dict(node: Node, source_bytes: bytes, include_children: bool = True)
     # 递归处理所有子节点。
     return result
 
+# Available AST serializers, selectable by name
+SERIALIZERS = {
+    "cursor": cursor_to_dict,
+    "recursive": node_to_dict,
+}
+# 可按名称选择的AST序列化器：cursor为基于TreeCursor的迭代实现，recursive为原递归实现。
+
+# Available output formats for ASTs and ASGs
+OUTPUT_FORMATS = ("dict", "columnar")
+# AST和ASG可用的输出格式：dict为每节点一个字典，columnar为列式（数组结构）表示。
+
 def create_field_edges(node: Dict, parent_id: Optional[str] = None) -> List[Dict]:
     """Create field edges for the ASG (connecting nodes with their named fields)."""
     # 为ASG创建字段边，将节点与其命名字段连接。
     edges = []
-    node_id = f"{node['type']}_{node['start_byte']}_{node['end_byte']}"
-    
-    if parent_id:
-        edges.append({
-            "source": parent_id,
-            "target": node_id,
-            "type": "contains"
-        })
-    
-    if "children" in node:
-        for child in node.get("children", []):
-            edges.extend(create_field_edges(child, node_id))
-    # 递归处理所有子节点。
+    stack = [(node, parent_id)]
+    while stack:
+        node, parent_id = stack.pop()
+        node_id = f"{node['type']}_{node['start_byte']}_{node['end_byte']}"
+        
+        if parent_id:
+            edge = {
+                "source": parent_id,
+                "target": node_id,
+                "type": "contains"
+            }
+            if "field" in node:
+                edge["field"] = node["field"]
+            edges.append(edge)
+        
+        children = node.get("children")
+        if children:
+            stack.extend((child, node_id) for child in reversed(children))
+    # 用显式栈按先序处理所有子节点，每个节点的ID只生成一次，避免递归时逐层拼接边列表。
     return edges
 
-def detect_language(code: str, filename: Optional[str] = None) -> str:
-    """Detect the programming language from code content and/or filename."""
-    # 根据文件名或代码内容简单推断编程语言。
-    if filename:
-        ext = filename.split('.')[-1].lower()
-        if ext in LANGUAGE_MAP:
-            return LANGUAGE_MAP[ext]
-    
-    # Simple heuristics for language detection
-    if "def " in code and ":" in code and "import " in code:
-        return "python"
-    elif "func " in code and "{" in code and "}" in code and "package " in code:
-        return "go"
-    elif "fn " in code and "let " in code and "->" in code:
-        return "rust"
-    elif "const " in code and "function" in code and "=>" in code:
-        return "typescript"
-    elif "function" in code and "var " in code and ";" in code:
-        return "javascript"
-    elif "class " in code and "public " in code and "void " in code:
-        return "java"
-    elif "int " in code and "#include" in code:
-        return "c"
-    elif "std::" in code or "template<" in code:
-        return "cpp"
-    
-    # Default to Python if we can't detect
-    return "python"
-    # 默认返回python。
+def detect_language(code: str, filename: Optional[str] = None, verify: Optional[bool] = None) -> str:
+    """
+    Detect the programming language from code content and/or filename.
+    
+    Only a bounded window of the code is examined and results are cached,
+    so repeated calls on the same buffer are cheap. See language_detection
+    for details.
+    
+    Args:
+        code: Source code
+        filename: Source file name (optional)
+        verify: Trial-parse policy: True always, False never, None (default)
+               only when the content scores are ambiguous
+        
+    Returns:
+        The detected language identifier
+    """
+    # 根据文件名或代码内容推断编程语言，只查看代码的有界窗口，结果会被缓存。
+    # 只在已安装的语法之间打分。
+    return language_detector.detect(code, filename, available_languages(), verify)
 
-def parse_code_to_ast(code: str, language: Optional[str] = None, filename: Optional[str] = None, include_children: bool = True) -> Dict:
+def parse_code_to_tree(code: str, language: Optional[str] = None, filename: Optional[str] = None) -> Dict:
     """
-    Parse code into an Abstract Syntax Tree (AST) using tree-sitter.
+    Parse code into a native tree-sitter Tree without converting it.
     
     Args:
         code: Source code to parse
         language: Programming language identifier (optional)
         filename: Source file name (optional, used for language detection)
-        include_children: Whether to include child nodes in the result
         
     Returns:
-        Dictionary representation of the AST
+        Dictionary with the normalized language, the Tree ("tree") and the
+        UTF-8 source ("source_bytes"), or an error
     """
-    # 使用tree-sitter将代码解析为AST。
-    # Initialize parsers if not done already
-    if not languages and not init_parsers():
+    # 将代码解析为tree-sitter原生语法树，不做字典转换。
+    # Check that the parsers are available (grammars are loaded on first use)
+    if not init_parsers():
         return {"error": "Tree-sitter language parsers not available. Run build_parsers.py first."}
-    # 若未初始化解析器则先初始化。
+    # 检查解析器是否可用，语法在首次使用时才加载。
     
     # Detect language if not provided
     if not language:
@@ -185,110 +152,237 @@ def parse_code_to_ast(code: str, language: Optional[str] = None, filename: Optio
     language = LANGUAGE_MAP.get(language.lower(), language.lower())
     # 规范化语言标识符。
     
-    # Check if language is supported
-    if language not in languages:
+    # Check if language is supported, loading its grammar on first use
+    grammar = get_language(language)
+    if grammar is None:
         return {"error": f"Unsupported language: {language}"}
-    # 检查语言是否受支持。
+    # 检查语言是否受支持，首次使用时加载其语法。
     
     try:
-        # Create a parser and set the language
-        parser = Parser()
-        parser.language = languages[language]
-        # 创建解析器并设置语言。
-        
-        # Parse the code
+        # Parse the code with a pooled parser for this language
         source_bytes = bytes(code, 'utf-8')
-        tree = parser.parse(source_bytes)
-        # 解析代码为语法树。
+        with parser_pool.parser(language, grammar) as parser:
+            tree = parser.parse(source_bytes)
+        # 从解析器池借出解析器，将代码解析为语法树。
+    except Exception as e:
+        return {"error": f"Error parsing code: {e}"}
+    
+    return {
+        "language": language,
+        "tree": tree,
+        "source_bytes": source_bytes
+    }
+
+def parse_code_to_ast(
+    code: str,
+    language: Optional[str] = None,
+    filename: Optional[str] = None,
+    include_children: bool = True,
+    serializer: str = "cursor",
+    text_mode: str = "full",
+    positions: str = "both",
+    max_depth: Optional[int] = None,
+    output_format: str = "dict",
+    named_only: bool = False,
+    keep_tree: bool = False
+) -> Dict:
+    """
+    Parse code into an Abstract Syntax Tree (AST) using tree-sitter.
+    
+    When max_depth is given, nodes at that depth are returned as stubs with
+    a handle, and the native tree is kept in memory so the stubs can be
+    expanded later with expand_ast_node.
+    
+    With output_format='columnar' the AST is returned as parallel arrays
+    with interned node types (see serialization.cursor_to_columnar).
+    
+    With named_only, anonymous nodes (punctuation, keywords) are dropped and
+    each child carries its tree-sitter field name when it has one.
+    
+    Args:
+        code: Source code to parse
+        language: Programming language identifier (optional)
+        filename: Source file name (optional, used for language detection)
+        include_children: Whether to include child nodes in the result
+        serializer: AST serializer to use ('cursor' or 'recursive')
+        text_mode: Node text to include ('full', 'none', 'leaves-only' or 'truncated:N')
+        positions: Position fields to include ('both', 'bytes' or 'points')
+        max_depth: Depth at which to stop and emit stub nodes (optional)
+        output_format: 'dict' (nested dictionaries) or 'columnar'
+        named_only: Whether to include only named nodes, with field names
+        keep_tree: Whether to keep the native tree in memory even without max_depth
         
+    Returns:
+        Dictionary representation of the AST (with a code_hash when max_depth
+        is set or keep_tree is true)
+    """
+    # 使用tree-sitter将代码解析为AST。指定max_depth时返回带句柄的存根节点，并在内存中保留语法树以便后续展开。
+    if serializer not in SERIALIZERS:
+        return {"error": f"Unknown serializer: {serializer}"}
+    if output_format not in OUTPUT_FORMATS:
+        return {"error": f"Unknown format: {output_format}"}
+    if max_depth is not None and max_depth < 0:
+        return {"error": "max_depth must be a non-negative integer"}
+    # 检查序列化器、输出格式和深度限制。
+    
+    try:
+        projection = Projection(text_mode, positions)
+    except ValueError as e:
+        return {"error": str(e)}
+    # 解析投影选项。
+    
+    uses_cursor_options = (
+        not projection.is_default or max_depth is not None or named_only or output_format != "dict"
+    )
+    if serializer != "cursor" and uses_cursor_options:
+        return {"error": "Projection, max_depth, named_only and the columnar format require the 'cursor' serializer"}
+    if output_format == "columnar" and (max_depth is not None or not include_children):
+        return {"error": "The columnar format requires the full tree"}
+    # 投影、深度限制、仅具名节点和列式格式仅支持cursor序列化器；列式格式需要完整语法树。
+    
+    parsed = parse_code_to_tree(code, language, filename)
+    if "error" in parsed:
+        return parsed
+    language = parsed["language"]
+    tree = parsed["tree"]
+    source_bytes = parsed["source_bytes"]
+    # 解析为原生语法树。
+    
+    try:
         # Convert to dictionary
         root_node = tree.root_node
-        ast = node_to_dict(root_node, source_bytes, include_children)
-        # 转换为字典结构。
+        if output_format == "columnar":
+            return {
+                "language": language,
+                "ast": cursor_to_columnar(root_node, source_bytes, projection, named_only)
+            }
+        # 列式输出。
         
-        return {
+        if uses_cursor_options:
+            ast = cursor_to_dict(root_node, source_bytes, include_children, projection, max_depth, named_only)
+        else:
+            ast = SERIALIZERS[serializer](root_node, source_bytes, include_children)
+        # 使用所选序列化器和选项转换为字典结构。
+        
+        result = {
             "language": language,
             "ast": ast
         }
+        if max_depth is not None or keep_tree:
+            result["code_hash"] = tree_store.put(tree, source_bytes, language)
+        # 限制深度（或要求保留语法树）时保存语法树，并返回用于展开存根节点和读取源码片段的代码哈希。
+        return result
     except Exception as e:
-        return {"error": f"Error parsing code: {e}"}
+        return {"error": f"Error converting AST: {e}"}
     # 捕获异常并返回错误信息。
 
-def create_asg_from_ast(ast_data: Dict) -> Dict:
+def expand_ast_node(
+    code_hash: str,
+    handle: str,
+    max_depth: Optional[int] = 2,
+    text_mode: str = "full",
+    positions: str = "both",
+    named_only: bool = False
+) -> Dict:
     """
-    Create an Abstract Semantic Graph (ASG) from an AST.
+    Expand a stub node from a depth-limited AST.
     
-    This is a simplified version that extracts some basic semantic information.
-    A production version would have more sophisticated analysis.
+    Args:
+        code_hash: Code hash returned by parse_code_to_ast with max_depth
+        handle: Handle of the stub node to expand
+        max_depth: Depth below the expanded node at which to stop again (None for no limit)
+        text_mode: Node text to include ('full', 'none', 'leaves-only' or 'truncated:N')
+        positions: Position fields to include ('both', 'bytes' or 'points')
+        named_only: Whether to include only named nodes, with field names
+        
+    Returns:
+        Dictionary with the subtree rooted at the stub node
+    """
+    # 展开限制深度AST中的存根节点，返回以该节点为根的子树（可再次限制深度）。
+    stored = tree_store.get(code_hash)
+    if stored is None:
+        return {"error": f"No parsed tree found for {code_hash}. Parse the code with max_depth first."}
+    # 语法树不在内存中时提示需先解析。
+    
+    node = find_node_by_handle(stored.tree.root_node, handle)
+    if node is None:
+        return {"error": f"Node with handle {handle} not found"}
+    # 根据句柄查找节点。
+    
+    try:
+        projection = Projection(text_mode, positions)
+    except ValueError as e:
+        return {"error": str(e)}
+    if max_depth is not None and max_depth < 0:
+        return {"error": "max_depth must be a non-negative integer"}
+    
+    return {
+        "language": stored.language,
+        "code_hash": code_hash,
+        "ast": cursor_to_dict(node, stored.source_bytes, True, projection, max_depth, named_only)
+    }
+
+def build_asg(ast_data: Dict, text_mode: str = "full") -> Union[CompactASG, Dict]:
+    """
+    Build an Abstract Semantic Graph (ASG) from an AST in the compact internal model.
     
     Args:
         ast_data: AST data from parse_code_to_ast
+        text_mode: Node text to keep: 'full' (default) or 'spans' (only
+                  identifiers and literals; parse with keep_tree so the
+                  other texts can be read via source://)
         
     Returns:
-        Dictionary representation of the ASG
+        The CompactASG, or the error dictionary if ast_data is an error
     """
-    # 从AST生成ASG（抽象语义图），本实现为简化版。
+    # 从AST构建紧凑内部模型表示的ASG；输入为错误时原样返回错误字典。
     if "error" in ast_data:
         return ast_data
+    error = check_asg_options(text_mode)
+    if error:
+        return {"error": error}
     
     ast = ast_data["ast"]
     language = ast_data["language"]
     
-    # Extract nodes and edges from the AST
-    nodes = []
-    edges = []
-    
-    def extract_nodes(node, parent_id=None):
-        node_id = f"{node['type']}_{node['start_byte']}_{node['end_byte']}"
-        
-        # Add the node
-        nodes.append({
-            "id": node_id,
-            "type": node["type"],
-            "text": node["text"],
-            "start_byte": node["start_byte"],
-            "end_byte": node["end_byte"],
-            "start_line": node["start_point"]["row"],
-            "start_col": node["start_point"]["column"],
-            "end_line": node["end_point"]["row"],
-            "end_col": node["end_point"]["column"]
-        })
-        # 添加节点信息。
-        
-        # Add edge to parent if exists
-        if parent_id:
-            edges.append({
-                "source": parent_id,
-                "target": node_id,
-                "type": "contains"
-            })
-        # 如有父节点则添加包含关系边。
-        
-        # Process children
-        if "children" in node:
-            for child in node["children"]:
-                extract_nodes(child, node_id)
-        # 递归处理所有子节点。
-        
-        return node_id
-    
-    # Start extraction from the root
-    root_id = extract_nodes(ast)
-    # 从根节点开始提取。
+    # Extract nodes and containment edges from the AST
+    asg, index_of = compact_asg_from_ast(ast, language, text_mode, ast_data.get("code_hash"))
+    # 提取节点和包含边。
     
     # Add semantic edges based on language-specific rules
-    if language == "python":
-        add_python_semantic_edges(ast, edges)
-    elif language in ["javascript", "typescript"]:
-        add_js_ts_semantic_edges(ast, edges)
-    # 按语言类型添加语义边。
+    semantic_edges = []
+    add_semantic_edges = SEMANTIC_EDGE_BUILDERS.get(language)
+    if add_semantic_edges is not None:
+        add_semantic_edges(ast, semantic_edges)
+    add_edges_by_id(asg, index_of, semantic_edges)
+    # 按语言查表添加语义边。
+    
+    return asg
+
+def create_asg_from_ast(ast_data: Dict, text_mode: str = "full", containment: str = "edges") -> Dict:
+    """
+    Create an Abstract Semantic Graph (ASG) from an AST.
     
-    return {
-        "language": language,
-        "nodes": nodes,
-        "edges": edges,
-        "root": root_id
-    }
+    This is a simplified version that extracts some basic semantic information.
+    A production version would have more sophisticated analysis.
+    
+    Args:
+        ast_data: AST data from parse_code_to_ast
+        text_mode: Node text to keep: 'full' (default) or 'spans'
+        containment: 'edges' (default, one "contains" edge per child node) or
+                    'parent' (a parent index on each node; edges are only semantic)
+        
+    Returns:
+        Dictionary representation of the ASG
+    """
+    # 从AST生成ASG（抽象语义图），本实现为简化版。内部使用紧凑模型，只在返回时转换为字典格式。
+    error = check_asg_options(text_mode, containment)
+    if error:
+        return {"error": error}
+    asg = build_asg(ast_data, text_mode)
+    if isinstance(asg, dict):
+        return asg
+    return asg.to_dict(containment=containment)
     # 返回ASG结构。
 
 def add_python_semantic_edges(ast: Dict, edges: List[Dict]):
@@ -381,15 +475,27 @@ def add_python_semantic_edges(ast: Dict, edges: List[Dict]):
     # Start reference analysis from the root
     find_references(ast)
 
-def add_js_ts_semantic_edges(ast: Dict, edges: List[Dict]):
-    """Add JavaScript/TypeScript-specific semantic edges to the ASG."""
-    # 为ASG添加JS/TS特有的语义边。
-    # Similar to Python version but adapted for JS/TS syntax
-    # This is also a simplified implementation for demo purposes
-    
-    # Functionality similar to the Python version would go here
-    # Since this is a demo, we're keeping it simple
-    pass
+# Simplified semantic edge builders by language (see enhanced_tools for the full analysis)
+SEMANTIC_EDGE_BUILDERS = {
+    "python": add_python_semantic_edges
+}
+# 按语言索引的简化版语义边构建函数（完整分析见enhanced_tools）。
+
+def empty_code_structure(language: str, code: str) -> Dict:
+    """Create the analyze_code_structure result before any analysis has run."""
+    # 创建尚未进行分析时的analyze_code_structure结果。
+    return {
+        "language": language,
+        "code_length": len(code),
+        "functions": [],
+        "classes": [],
+        "imports": [],
+        "complexity_metrics": {
+            "max_nesting_level": 0,
+            "total_nodes": 0
+        }
+    }
+    # 结构信息，包括函数、类、导入、复杂度等。
 
 def analyze_code_structure(code: str, language: Optional[str] = None, filename: Optional[str] = None) -> Dict:
     """
@@ -403,166 +509,160 @@ def analyze_code_structure(code: str, language: Optional[str] = None, filename:
     Returns:
         Dictionary with code structure analysis
     """
-    # 分析代码结构并给出洞见。
-    # Parse code to AST
-    ast_data = parse_code_to_ast(code, language, filename)
-    if "error" in ast_data:
-        return ast_data
+    # 分析代码结构并给出洞见。直接在原生语法树上分析，不构建字典形式的AST。
+    # Parse code to a native tree
+    parsed = parse_code_to_tree(code, language, filename)
+    if "error" in parsed:
+        return parsed
     
-    # Perform analysis based on the AST
-    language = ast_data["language"]
-    ast = ast_data["ast"]
+    # Perform analysis based on the syntax tree
+    language = parsed["language"]
+    root = parsed["tree"].root_node
+    source_bytes = parsed["source_bytes"]
     
     # Collect structure information
-    structure = {
-        "language": language,
-        "code_length": len(code),
-        "functions": [],
-        "classes": [],
-        "imports": [],
-        "complexity_metrics": {
-            "max_nesting_level": 0,
-            "total_nodes": 0
-        }
-    }
-    # 结构信息收集，包括函数、类、导入、复杂度等。
+    structure = empty_code_structure(language, code)
     
-    # Calculate metrics based on language
-    if language == "python":
-        analyze_python_structure(ast, structure)
-    elif language in ["javascript", "typescript"]:
-        analyze_js_ts_structure(ast, structure)
-    elif language == "go":
-        analyze_go_structure(ast, structure)
-    # Add more language analyzers as needed
+    # Calculate metrics from the language's plugin (languages without one only get the basic fields)
+    plugin = get_language_plugin(language)
+    if plugin is not None:
+        analyze_structure(root, source_bytes, plugin, structure)
     
     return structure
 
-def analyze_python_structure(ast: Dict, structure: Dict):
-    """Analyze Python code structure."""
-    # 分析Python代码结构，提取函数、类、导入、复杂度等信息。
-    # Track functions
-    functions = []
-    classes = []
-    imports = []
-    
-    def count_nodes(node):
-        count = 1  # Count this node
-        for child in node.get("children", []):
-            count += count_nodes(child)
-        return count
-    # 递归统计AST节点总数。
+def node_text(node: Node, source_bytes: bytes) -> str:
+    """Get the source text of a native tree-sitter node."""
+    # 获取原生tree-sitter节点对应的源码文本。
+    return source_bytes[node.start_byte:node.end_byte].decode('utf-8')
+
+class StructureVisitor:
+    """
+    Collects functions, classes, imports and nesting depth during a TreeWalker walk.
     
-    def find_max_nesting(node, current_depth=0):
-        max_depth = current_depth
+    The node kinds come from the language's plugin, and nodes are classified
+    by their kind id in the plugin's flag table.
+    """
+    # 在TreeWalker遍历过程中收集函数、类、导入和嵌套深度。
+    # 节点类型来自语言插件，按插件标志表中的类型ID对节点分类。只为需要报告的名称截取文本。
+    
+    def __init__(self, plugin: LanguagePlugin, source_bytes: bytes):
+        self.spec = plugin.spec
+        self.flags = plugin.flags
+        self.source_bytes = source_bytes
+        self.functions = []
+        self.classes = []
+        self.imports = []
+        self.nesting = 0
+        self.max_nesting = 0
+    
+    def register(self, walker: TreeWalker) -> None:
+        spec = self.spec
+        walker.on_enter(spec.functions | spec.classes | spec.imports, self.enter_definition)
+        walker.on_enter(spec.control_flow, self.enter_nesting)
+        walker.on_exit(spec.control_flow, self.exit_nesting)
+    
+    def enter_definition(self, node: Node, depth: int) -> None:
+        flags = self.flags[node.kind_id]
+        if flags & FUNCTION:
+            self.enter_function(node)
+        if flags & CLASS:
+            self.enter_class(node)
+        if flags & IMPORT:
+            self.enter_import(node)
+    
+    def enter_function(self, node: Node) -> None:
+        # Extract function name
+        name_node = node.child_by_field_name("name")
+        name = node_text(name_node, self.source_bytes) if name_node else ""
         
-        # Increase depth for nesting structures
-        if node["type"] in ["if_statement", "for_statement", "while_statement", "try_statement", "with_statement"]:
-            current_depth += 1
-            max_depth = current_depth
+        # Get function parameters
+        params = []
+        params_node = node.child_by_field_name("parameters")
+        if params_node:
+            for param_child in params_node.named_children:
+                if param_child.type not in self.spec.parameters:
+                    continue
+                name_field = self.spec.parameters[param_child.type]
+                param_name = param_child.child_by_field_name(name_field) if name_field else param_child
+                if param_name is not None:
+                    params.append(node_text(param_name, self.source_bytes))
         
-        # Check children
-        for child in node.get("children", []):
-            child_max = find_max_nesting(child, current_depth)
-            max_depth = max(max_depth, child_max)
-            
-        return max_depth
-    # 递归查找最大嵌套层级。
+        self.functions.append({
+            "name": name,
+            "location": {
+                "start_line": node.start_point[0] + 1,
+                "end_line": node.end_point[0] + 1
+            },
+            "parameters": params
+        })
     
-    def extract_structures(node):
-        if node["type"] == "function_definition":
-            # Extract function name
-            name = ""
-            for child in node.get("children", []):
-                if child["type"] == "identifier":
-                    name = child["text"]
-                    break
-            
-            # Get function parameters
-            params = []
-            for child in node.get("children", []):
-                if child["type"] == "parameters":
-                    for param_child in child.get("children", []):
-                        if param_child["type"] == "identifier":
-                            params.append(param_child["text"])
-            
-            functions.append({
-                "name": name,
-                "location": {
-                    "start_line": node["start_point"]["row"] + 1,
-                    "end_line": node["end_point"]["row"] + 1
-                },
-                "parameters": params
-            })
-            
-        elif node["type"] == "class_definition":
-            # Extract class name
-            name = ""
-            for child in node.get("children", []):
-                if child["type"] == "identifier":
-                    name = child["text"]
-                    break
-                    
-            classes.append({
-                "name": name,
-                "location": {
-                    "start_line": node["start_point"]["row"] + 1,
-                    "end_line": node["end_point"]["row"] + 1
-                }
-            })
-            
-        elif node["type"] == "import_statement" or node["type"] == "import_from_statement":
-            # Get imported module names
-            module_names = []
-            for child in node.get("children", []):
-                if child["type"] == "dotted_name":
-                    module_names.append(child["text"])
-                    
-            imports.append({
-                "module": ".".join(module_names),
-                "line": node["start_point"]["row"] + 1
-            })
+    def enter_class(self, node: Node) -> None:
+        # Extract class name
+        name_node = node.child_by_field_name("name")
+        name = node_text(name_node, self.source_bytes) if name_node else ""
         
-        # Process children
-        for child in node.get("children", []):
-            extract_structures(child)
-    # 递归提取结构信息。
-    
-    # Process the AST
-    extract_structures(ast)
-    
-    # Count total nodes
-    total_nodes = count_nodes(ast)
+        self.classes.append({
+            "name": name,
+            "location": {
+                "start_line": node.start_point[0] + 1,
+                "end_line": node.end_point[0] + 1
+            }
+        })
     
-    # Find maximum nesting level
-    max_nesting = find_max_nesting(ast)
+    def enter_import(self, node: Node) -> None:
+        # Get imported module names
+        module_names = []
+        for child in node.named_children:
+            if child.type in self.spec.import_names:
+                module_names.append(node_text(child, self.source_bytes).strip("'\"`"))
+        
+        self.imports.append({
+            "module": ".".join(module_names),
+            "line": node.start_point[0] + 1
+        })
     
-    # Update structure
-    structure["functions"] = functions
-    structure["classes"] = classes
-    structure["imports"] = imports
-    structure["complexity_metrics"]["total_nodes"] = total_nodes
-    structure["complexity_metrics"]["max_nesting_level"] = max_nesting
-
-def analyze_js_ts_structure(ast: Dict, structure: Dict):
-    """Analyze JavaScript/TypeScript code structure."""
-    # 分析JS/TS代码结构，方法类似Python。
-    # Similar implementation as the Python version but adapted for JS/TS
-    # Since this is a demo, we're keeping it simplified
-    pass
+    def enter_nesting(self, node: Node, depth: int) -> None:
+        self.nesting += 1
+        if self.nesting > self.max_nesting:
+            self.max_nesting = self.nesting
+    
+    def exit_nesting(self, node: Node, depth: int) -> None:
+        self.nesting -= 1
+    # 进入控制流节点时层级加一并更新最大值，离开时减一。
+    
+    def update_structure(self, root: Node, structure: Dict) -> None:
+        """Store the collected information in an analyze_code_structure result."""
+        # 将收集到的信息写入analyze_code_structure的结果。
+        structure["functions"] = self.functions
+        structure["classes"] = self.classes
+        structure["imports"] = self.imports
+        # Count total nodes (tree-sitter keeps this count on every node)
+        structure["complexity_metrics"]["total_nodes"] = root.descendant_count
+        structure["complexity_metrics"]["max_nesting_level"] = self.max_nesting
 
-def analyze_go_structure(ast: Dict, structure: Dict):
-    """Analyze Go code structure."""
-    # 分析Go代码结构，方法类似Python。
-    # Similar implementation as the Python version but adapted for Go
-    # Since this is a demo, we're keeping it simplified
-    pass
+def analyze_structure(root: Node, source_bytes: bytes, plugin: LanguagePlugin, structure: Dict):
+    """Analyze code structure on the native syntax tree in a single walk."""
+    # 在原生语法树上单遍分析代码结构，提取函数、类、导入、复杂度等信息。
+    visitor = StructureVisitor(plugin, source_bytes)
+    TreeWalker().add(visitor).walk(root)
+    visitor.update_structure(root, structure)
 
 def register_tools(mcp_server):
     """Register all tools with the MCP server."""
     # 向MCP服务器注册所有工具。
     @mcp_server.tool()
-    def parse_to_ast(code: str, language: Optional[str] = None, filename: Optional[str] = None) -> Dict:
+    def parse_to_ast(
+        code: str,
+        language: Optional[str] = None,
+        filename: Optional[str] = None,
+        serializer: str = "cursor",
+        text_mode: str = "full",
+        positions: str = "both",
+        max_depth: Optional[int] = None,
+        format: str = "dict",
+        encoding: str = "json",
+        named_only: bool = False
+    ) -> Dict:
         """
         Parse code into an Abstract Syntax Tree (AST).
         
@@ -575,15 +675,75 @@ def register_tools(mcp_server):
             language: The programming language (e.g., 'python', 'javascript')
                      If not provided, the tool will attempt to detect it
             filename: Optional filename to help with language detection
+            serializer: AST serializer to use: 'cursor' (iterative, default)
+                       or 'recursive' (original implementation)
+            text_mode: Node text to include: 'full' (default), 'none',
+                      'leaves-only' or 'truncated:N' (first N characters)
+            positions: Position fields to include: 'both' (default),
+                      'bytes' or 'points'
+            max_depth: Optional depth limit. Nodes at this depth are returned
+                      as stubs with a handle that expand_ast_subtree accepts
+            format: 'dict' (default, nested node dictionaries) or 'columnar'
+                   (parallel arrays with interned node types and texts)
+            encoding: Response encoding: 'json' (default), or 'msgpack'/'cbor'
+                     to receive {"encoding", "data"} with base64 binary data
+            named_only: If true, drop anonymous nodes (punctuation, keywords)
+                       and label children with their field names
             
         Returns:
             A dictionary containing the AST and language information
+            (plus a code_hash for expanding stubs when max_depth is set)
         """
-        # 解析代码为AST，返回语法结构信息。
-        return parse_code_to_ast(code, language, filename)
+        # 解析代码为AST，返回语法结构信息。可通过投影选项减少文本和位置字段，或限制深度。
+        return encode_response(parse_code_to_ast(
+            code, language, filename,
+            serializer=serializer, text_mode=text_mode, positions=positions,
+            max_depth=max_depth, output_format=format, named_only=named_only
+        ), encoding)
     
     @mcp_server.tool()
-    def generate_asg(code: str, language: Optional[str] = None, filename: Optional[str] = None) -> Dict:
+    def expand_ast_subtree(
+        code_hash: str,
+        handle: str,
+        max_depth: Optional[int] = 2,
+        text_mode: str = "full",
+        positions: str = "both",
+        named_only: bool = False
+    ) -> Dict:
+        """
+        Expand a stub node from a depth-limited AST.
+        
+        Use this after parse_to_ast with max_depth to fetch the children of
+        a stub node without re-sending or re-parsing the code.
+        
+        Args:
+            code_hash: The code_hash returned by parse_to_ast
+            handle: The handle of the stub node to expand
+            max_depth: Depth limit below the expanded node (default 2, null for no limit)
+            text_mode: Node text to include: 'full' (default), 'none',
+                      'leaves-only' or 'truncated:N' (first N characters)
+            positions: Position fields to include: 'both' (default),
+                      'bytes' or 'points'
+            named_only: If true, drop anonymous nodes and label children
+                       with their field names
+            
+        Returns:
+            A dictionary containing the expanded subtree
+        """
+        # 展开限制深度AST中的存根节点。
+        return expand_ast_node(code_hash, handle, max_depth, text_mode, positions, named_only)
+    
+    @mcp_server.tool()
+    def generate_asg(
+        code: str,
+        language: Optional[str] = None,
+        filename: Optional[str] = None,
+        format: str = "dict",
+        encoding: str = "json",
+        named_only: bool = False,
+        text_mode: str = "full",
+        containment: str = "edges"
+    ) -> Dict:
         """
         Generate an Abstract Semantic Graph (ASG) from code.
         
@@ -596,13 +756,40 @@ def register_tools(mcp_server):
             language: The programming language (e.g., 'python', 'javascript')
                      If not provided, the tool will attempt to detect it
             filename: Optional filename to help with language detection
+            format: 'dict' (default, one dictionary per node and edge) or
+                   'columnar' (parallel arrays with interned types)
+            encoding: Response encoding: 'json' (default), or 'msgpack'/'cbor'
+                     to receive {"encoding", "data"} with base64 binary data
+            named_only: If true, drop anonymous nodes (punctuation, keywords)
+                       and label containment edges with field names
+            text_mode: 'full' (default, every node carries its text) or 'spans'
+                      (only identifiers and literals carry text; read other
+                      text via source://{code_hash}/{start}-{end})
+            containment: 'edges' (default, one "contains" edge per child node)
+                        or 'parent' (each node carries its parent's index and
+                        field; edges only hold semantic relations)
             
         Returns:
             A dictionary containing the ASG nodes, edges, and metadata
         """
-        # 生成ASG，包含语法和语义关系。
-        ast_data = parse_code_to_ast(code, language, filename)
-        return create_asg_from_ast(ast_data)
+        # 生成ASG，包含语法和语义关系；可选列式输出、二进制编码和仅具名节点。
+        if format not in OUTPUT_FORMATS:
+            return {"error": f"Unknown format: {format}"}
+        error = check_asg_options(text_mode, containment)
+        if error:
+            return {"error": error}
+        ast_data = parse_code_to_ast(
+            code, language, filename, named_only=named_only, keep_tree=text_mode == "spans"
+        )
+        asg = build_asg(ast_data, text_mode)
+        if isinstance(asg, dict):
+            return asg
+        # 构建紧凑模型的ASG，出错时直接返回错误。
+        if format == "columnar":
+            asg_data = asg.to_columnar(containment)
+        else:
+            asg_data = asg.to_dict(containment=containment)
+        return encode_response(asg_data, encoding)
     
     @mcp_server.tool()
     def analyze_code(code: str, language: Optional[str] = None, filename: Optional[str] = None) -> Dict:
@@ -633,8 +820,8 @@ def register_tools(mcp_server):
             A list of programming language identifiers that can be parsed
         """
         # 获取支持的编程语言列表。
-        # Initialize parsers if not done already
-        if not languages and not init_parsers():
+        # Grammars are listed without loading them
+        if not init_parsers():
             return []
         
-        return list(languages.keys())
+        return available_languages()
@@ -0,0 +1,446 @@
+"""
+Structural diff of syntax trees.
+
+Computes an edit script between two versions of a syntax tree in the style
+of GumTree (Falleri et al., "Fine-grained and accurate source code
+differencing"): identical subtrees are first matched top-down by a
+structural hash, the remaining nodes are matched bottom-up from the
+matches of their children, and the unmatched children of matched nodes
+are finally paired by kind. The script lists the inserted, deleted,
+updated and moved nodes with their spans only, so its size follows the
+change rather than the file.
+"""
+# 语法树的结构化差异模块。
+# 以GumTree（Falleri等，"Fine-grained and accurate source code differencing"）的方式计算两个版本语法树之间的编辑脚本：
+# 先自顶向下按结构哈希匹配相同的子树，再根据子节点的匹配自底向上匹配其余节点，最后按类型配对已匹配节点的未匹配子节点。
+# 脚本只列出插入、删除、更新和移动的节点及其范围，大小与变更成正比，而不是与文件大小成正比。
+
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Dict, List, Tuple
+from tree_sitter import Node
+
+# Subtrees lower than this are not matched by their hash alone: single tokens are too ambiguous
+MIN_HEIGHT = 2
+# Minimum Dice similarity (share of nodes under matched children) for a bottom-up match
+MIN_DICE = 0.5
+# 低于该高度的子树不单凭哈希匹配，单个词法单元过于模糊；自底向上匹配所需的最小Dice相似度（已匹配子节点下的节点占比）。
+
+
+class FlatTree:
+    """
+    A syntax tree flattened in preorder, with the per-node data the matcher needs.
+
+    Nodes are numbered in preorder, so the subtree of node i is the range
+    i to i + sizes[i] - 1. Leaves are labelled with their text; the hash
+    of a node covers its kind, its label and the hashes of its children,
+    so equal hashes mean identical subtrees. positions[i] is the index of
+    node i among its parent's children.
+    """
+    # 按先序展开的语法树，包含匹配所需的逐节点数据。节点按先序编号，节点i的子树即编号i到i + sizes[i] - 1。
+    # 叶节点以其文本为标签；节点的哈希涵盖类型、标签和子节点的哈希，哈希相同即子树相同。positions[i]为节点i在其父节点子节点中的序号。
+
+    __slots__ = ("nodes", "kinds", "parents", "children", "positions", "sizes", "heights", "hashes", "labels")
+
+    def __init__(self, root: Node, source_bytes: bytes):
+        nodes = [root]
+        parents = [-1]
+        cursor = root.walk()
+        stack = [0]  # Indexes of the nodes on the path to the cursor
+        while True:
+            if not cursor.goto_first_child():
+                while True:
+                    stack.pop()
+                    if not stack or cursor.goto_next_sibling():
+                        break
+                    cursor.goto_parent()
+                if not stack:
+                    break
+            stack.append(len(nodes))
+            parents.append(stack[-2])
+            nodes.append(cursor.node)
+        # 用TreeCursor按先序遍历，记录每个节点及其父节点编号。
+
+        count = len(nodes)
+        children = [[] for _ in range(count)]
+        positions = [0] * count
+        for index in range(1, count):
+            siblings = children[parents[index]]
+            positions[index] = len(siblings)
+            siblings.append(index)
+        kinds = [node.kind_id for node in nodes]
+        sizes = [1] * count
+        heights = [1] * count
+        hashes = [0] * count
+        labels = [b""] * count
+        for index in range(count - 1, -1, -1):
+            kids = children[index]
+            if kids:
+                sizes[index] = 1 + sum(sizes[child] for child in kids)
+                heights[index] = 1 + max(heights[child] for child in kids)
+                hashes[index] = hash((kinds[index], tuple(hashes[child] for child in kids)))
+            else:
+                node = nodes[index]
+                labels[index] = source_bytes[node.start_byte:node.end_byte]
+                hashes[index] = hash((kinds[index], labels[index]))
+        # 按编号逆序（子节点先于父节点）计算子树大小、高度和结构哈希。
+
+        self.nodes = nodes
+        self.kinds = kinds
+        self.parents = parents
+        self.children = children
+        self.positions = positions
+        self.sizes = sizes
+        self.heights = heights
+        self.hashes = hashes
+        self.labels = labels
+
+
+class TreeMatcher:
+    """Match the nodes of two flattened trees in GumTree's phases."""
+    # 按GumTree的各阶段匹配两棵展开后语法树的节点。
+
+    def __init__(self, old: FlatTree, new: FlatTree):
+        self.old = old
+        self.new = new
+        self.old_to_new = [-1] * len(old.nodes)
+        self.new_to_old = [-1] * len(new.nodes)
+
+    def link(self, old_index: int, new_index: int) -> None:
+        """Record a matched pair of nodes."""
+        # 记录一对匹配的节点。
+        self.old_to_new[old_index] = new_index
+        self.new_to_old[new_index] = old_index
+
+    def match(self) -> None:
+        """Run the top-down, bottom-up and recovery phases."""
+        # 依次执行自顶向下、自底向上和恢复三个阶段。
+        self.match_top_down()
+        self.match_bottom_up()
+        self.recover()
+
+    def match_top_down(self) -> None:
+        """
+        Match identical subtrees by hash, largest first.
+
+        New subtrees are considered in order of decreasing height (in
+        preorder within a height), so a subtree is matched before any
+        subtree inside it or lower than it elsewhere in the file. When
+        several old subtrees have the same hash, the first unmatched one in
+        source order is taken.
+        """
+        # 按哈希匹配相同的子树，大的优先：按高度递减（同一高度内按先序）考虑新语法树的子树，
+        # 因此子树先于其内部的子树以及文件中其他更低的子树被匹配。多个旧子树哈希相同时，按源码顺序取第一个未匹配的。
+        old, new = self.old, self.new
+        old_to_new, new_to_old = self.old_to_new, self.new_to_old
+        candidates = defaultdict(list)  # Maps hash -> old subtree roots
+        for index in range(len(old.nodes) - 1, -1, -1):
+            if old.heights[index] >= MIN_HEIGHT:
+                candidates[old.hashes[index]].append(index)
+        # 逆序加入，使列表末尾是源码中靠前的子树，可直接从末尾弹出。
+
+        by_height = [[] for _ in range(max(new.heights) + 1)]
+        for index in range(len(new.nodes)):
+            if new.heights[index] >= MIN_HEIGHT and new.hashes[index] in candidates:
+                by_height[new.heights[index]].append(index)
+        # 按高度分桶，桶内保持先序。
+
+        for height in range(len(by_height) - 1, MIN_HEIGHT - 1, -1):
+            for index in by_height[height]:
+                if new_to_old[index] != -1:
+                    continue
+                roots = candidates[new.hashes[index]]
+                while roots and old_to_new[roots[-1]] != -1:
+                    roots.pop()
+                if not roots:
+                    continue
+                chosen = roots.pop()
+                for offset in range(new.sizes[index]):
+                    old_to_new[chosen + offset] = index + offset
+                    new_to_old[index + offset] = chosen + offset
+            # 已匹配的子树都不低于当前子树，因此未匹配的新旧子树内部都没有已匹配的节点，可以整体匹配；
+            # 已匹配（如作为更大子树的一部分）的候选直接丢弃。相同子树的先序编号一一对应。
+
+    def match_bottom_up(self) -> None:
+        """
+        Match the remaining inner nodes from the matches of their children.
+
+        In postorder, each unmatched new node votes for the parents of the
+        old partners of its children, weighted by the size of each child's
+        subtree. The best unmatched old node of the same kind is matched
+        when its Dice similarity reaches MIN_DICE. The roots are always
+        matched when they have the same kind.
+        """
+        # 根据子节点的匹配情况匹配其余内部节点：按后序，每个未匹配的新节点为其子节点所匹配旧节点的父节点投票，
+        # 以子节点的子树大小为权重；得票最多、类型相同且未匹配的旧节点在Dice相似度达到MIN_DICE时被匹配。根节点类型相同时总是匹配。
+        old, new = self.old, self.new
+        old_to_new, new_to_old = self.old_to_new, self.new_to_old
+        for index in range(len(new.nodes) - 1, 0, -1):
+            if new_to_old[index] != -1 or not new.children[index]:
+                continue
+            kind = new.kinds[index]
+            votes = defaultdict(int)
+            for child in new.children[index]:
+                partner = new_to_old[child]
+                if partner != -1:
+                    parent = old.parents[partner]
+                    if parent >= 0 and old_to_new[parent] == -1 and old.kinds[parent] == kind:
+                        votes[parent] += new.sizes[child]
+            if not votes:
+                continue
+            best = max(votes, key=votes.get)
+            if 2 * votes[best] >= MIN_DICE * (new.sizes[index] + old.sizes[best] - 2):
+                self.link(best, index)
+        if new_to_old[0] == -1 and old_to_new[0] == -1 and old.kinds[0] == new.kinds[0]:
+            self.link(0, 0)
+
+    def recover(self) -> None:
+        """
+        Pair the unmatched children of matched nodes.
+
+        Walking the new tree in preorder, the unmatched children of each
+        matched node are paired in order with the unmatched children of its
+        partner, first those with the same hash, then those of the same
+        kind. Pairs found here are walked later, so recovery descends
+        through nodes whose contents changed.
+        """
+        # 配对已匹配节点的未匹配子节点：按先序遍历新语法树，将每个已匹配节点的未匹配子节点与其对应节点的未匹配子节点按顺序配对，
+        # 先配对哈希相同的，再配对类型相同的。此处配对的节点随后也会被遍历，因此恢复会深入内容发生变化的节点。
+        old, new = self.old, self.new
+        old_to_new, new_to_old = self.old_to_new, self.new_to_old
+        for index in range(len(new.nodes)):
+            partner = new_to_old[index]
+            if partner == -1 or not new.children[index]:
+                continue
+            new_children = [child for child in new.children[index] if new_to_old[child] == -1]
+            old_children = [child for child in old.children[partner] if old_to_new[child] == -1]
+            if not new_children or not old_children:
+                continue
+            for key in (old.hashes, old.kinds):
+                new_key = new.hashes if key is old.hashes else new.kinds
+                available = defaultdict(list)
+                for child in reversed(old_children):
+                    if old_to_new[child] == -1:
+                        available[key[child]].append(child)
+                for child in new_children:
+                    if new_to_old[child] != -1:
+                        continue
+                    same = available.get(new_key[child])
+                    if same:
+                        old_child = same.pop()
+                        if key is old.hashes:
+                            for offset in range(new.sizes[child]):
+                                if old_to_new[old_child + offset] == -1 and new_to_old[child + offset] == -1:
+                                    self.link(old_child + offset, child + offset)
+                        else:
+                            self.link(old_child, child)
+            # 哈希相同的子节点整棵子树逐个节点匹配，跳过两侧已匹配的节点（如前面阶段匹配到别处的内部子树），使两个映射保持互逆；
+            # 类型相同的只匹配该节点，其子节点在遍历到它时再配对。
+
+
+def node_span(node: Node) -> Dict:
+    """Get the byte and point range of a node."""
+    # 获取节点的字节和行列范围。
+    return {
+        "start_byte": node.start_byte,
+        "end_byte": node.end_byte,
+        "start_point": {"row": node.start_point[0], "column": node.start_point[1]},
+        "end_point": {"row": node.end_point[0], "column": node.end_point[1]}
+    }
+
+
+def node_id(node: Node) -> str:
+    """Get the ID of a node, in the type_startByte_endByte format."""
+    # 获取节点ID，格式为type_startByte_endByte。
+    return f"{node.type}_{node.start_byte}_{node.end_byte}"
+
+
+def moved_children(matcher: TreeMatcher, new_index: int) -> List[int]:
+    """
+    Find the children of a matched node that changed order among their siblings.
+
+    The children kept in place are a longest run of children whose
+    partners appear in the same order under the old node; the others moved.
+    """
+    # 找出已匹配节点中在兄弟节点间改变了顺序的子节点：保留原位的是对应节点在旧节点下顺序一致的最长子序列，其余视为移动。
+    old, new = matcher.old, matcher.new
+    old_parent = matcher.new_to_old[new_index]
+    kept = [
+        child for child in new.children[new_index]
+        if matcher.new_to_old[child] != -1 and old.parents[matcher.new_to_old[child]] == old_parent
+    ]
+    positions = [matcher.new_to_old[child] for child in kept]
+    if positions == sorted(positions):
+        return []
+    # 对应节点顺序不变时没有移动。
+
+    tails, tail_indexes = [], []
+    previous = [-1] * len(positions)
+    for index, position in enumerate(positions):
+        length = bisect_left(tails, position)
+        if length == len(tails):
+            tails.append(position)
+            tail_indexes.append(index)
+        else:
+            tails[length] = position
+            tail_indexes[length] = index
+        previous[index] = tail_indexes[length - 1] if length else -1
+    in_order = set()
+    index = tail_indexes[-1]
+    while index != -1:
+        in_order.add(index)
+        index = previous[index]
+    return [kept[index] for index in range(len(kept)) if index not in in_order]
+    # 最长递增子序列中的子节点保持原位。
+
+
+def edit_script(matcher: TreeMatcher, named_only: bool = False) -> List[Dict]:
+    """
+    Derive the edit script from the matching of two trees.
+
+    Only the roots of inserted and deleted subtrees are listed, with the
+    number of nodes they hold. With named_only, a change to an anonymous
+    node (an operator or keyword) is reported as an update of its nearest
+    named ancestor.
+
+    Returns:
+        List of actions in new-tree order (deletions last, in old-tree
+        order): {"action": "insert" | "delete" | "update" | "move",
+        "type", "old"/"new" spans, ...}
+    """
+    # 根据两棵语法树的匹配推导编辑脚本：只列出被插入和被删除子树的根节点及其节点数。
+    # 使用named_only时，对匿名节点（运算符或关键字）的修改报告为其最近具名祖先的更新。
+    old, new = matcher.old, matcher.new
+    old_to_new, new_to_old = matcher.old_to_new, matcher.new_to_old
+    actions = []
+    updated = set()  # New nodes already reported as updated
+
+    def named_update(index: int) -> None:
+        # 将匿名节点上的修改归于其最近的已匹配具名祖先（新语法树中），每个祖先只报告一次。
+        while index >= 0 and not (new.nodes[index].is_named and new_to_old[index] != -1):
+            index = new.parents[index]
+        if index >= 0 and index not in updated:
+            updated.add(index)
+            actions.append(update_action(old.nodes[new_to_old[index]], new.nodes[index]))
+
+    moved = set()
+    for index in range(len(new.nodes)):
+        if new.children[index] and new_to_old[index] != -1:
+            moved.update(moved_children(matcher, index))
+    # 找出在同一父节点下改变顺序的子节点。
+
+    for index in range(len(new.nodes)):
+        node = new.nodes[index]
+        parent = new.parents[index]
+        partner = new_to_old[index]
+        if partner == -1:
+            if parent < 0:
+                actions.append({"action": "insert", "type": node.type, "new": node_span(node), "size": new.sizes[index]})
+            elif new_to_old[parent] != -1:
+                if named_only and not node.is_named:
+                    named_update(parent)
+                else:
+                    actions.append({
+                        "action": "insert",
+                        "type": node.type,
+                        "new": node_span(node),
+                        "parent": node_id(new.nodes[parent]),
+                        "position": new.positions[index],
+                        "size": new.sizes[index]
+                    })
+            continue
+        # 未匹配且父节点已匹配的新节点是被插入子树的根。
+
+        if parent >= 0 and (old.parents[partner] != new_to_old[parent] or index in moved):
+            if named_only and not node.is_named:
+                named_update(parent)
+            else:
+                actions.append({
+                    "action": "move",
+                    "type": node.type,
+                    "old": node_span(old.nodes[partner]),
+                    "new": node_span(node),
+                    "parent": node_id(new.nodes[parent]),
+                    "position": new.positions[index]
+                })
+        # 父节点的对应关系改变或在兄弟节点间改变顺序的节点被移动。
+
+        if old.labels[partner] != new.labels[index]:
+            if named_only and not node.is_named:
+                named_update(parent)
+            elif index not in updated:
+                updated.add(index)
+                actions.append(update_action(old.nodes[partner], node))
+        # 标签（叶节点文本）改变的节点被更新。
+
+    for index in range(len(old.nodes)):
+        parent = old.parents[index]
+        if old_to_new[index] == -1 and (parent < 0 or old_to_new[parent] != -1):
+            node = old.nodes[index]
+            if named_only and not node.is_named:
+                if parent >= 0:
+                    named_update(old_to_new[parent])
+                continue
+            actions.append({
+                "action": "delete",
+                "type": node.type,
+                "old": node_span(node),
+                "size": old.sizes[index]
+            })
+    # 未匹配且父节点已匹配的旧节点是被删除子树的根。
+    return actions
+
+
+def update_action(old_node: Node, new_node: Node) -> Dict:
+    """Describe the update of a matched node, with the old and new text of leaves."""
+    # 描述已匹配节点的更新，叶节点附带新旧文本。
+    action = {
+        "action": "update",
+        "type": new_node.type,
+        "old": node_span(old_node),
+        "new": node_span(new_node)
+    }
+    if old_node.child_count == 0 and new_node.child_count == 0:
+        action["old_text"] = old_node.text.decode("utf-8", "replace")
+        action["new_text"] = new_node.text.decode("utf-8", "replace")
+    return action
+
+
+def diff_trees(
+    old_root: Node,
+    old_source: bytes,
+    new_root: Node,
+    new_source: bytes,
+    named_only: bool = False
+) -> Tuple[List[Dict], Dict]:
+    """
+    Compute the structural edit script between two syntax trees.
+
+    Args:
+        old_root: Root node of the old tree
+        old_source: UTF-8 source of the old tree
+        new_root: Root node of the new tree
+        new_source: UTF-8 source of the new tree
+        named_only: Whether to report only named nodes
+
+    Returns:
+        The edit script (see edit_script) and a summary with the node
+        counts, the number of matched nodes and the number of actions by kind
+    """
+    # 计算两棵语法树之间的结构化编辑脚本，返回脚本和概要（节点数、匹配节点数和按类型统计的动作数）。
+    old = FlatTree(old_root, old_source)
+    new = FlatTree(new_root, new_source)
+    matcher = TreeMatcher(old, new)
+    matcher.match()
+    actions = edit_script(matcher, named_only)
+
+    counts = {"insert": 0, "delete": 0, "update": 0, "move": 0}
+    for action in actions:
+        counts[action["action"]] += 1
+    summary = {
+        "old_node_count": len(old.nodes),
+        "new_node_count": len(new.nodes),
+        "matched": len(new.nodes) - matcher.new_to_old.count(-1),
+        "actions": counts
+    }
+    return actions, summary
@@ -0,0 +1,122 @@
+"""
+In-memory store of parsed trees for the MCP server.
+
+Tools that return partial results (such as depth-limited ASTs) keep the
+native tree-sitter tree here, keyed by the hash of the source code, so
+that follow-up requests can expand parts of it without parsing again.
+"""
+# MCP服务器的语法树内存存储模块。
+# 返回部分结果的工具（如限制深度的AST）将tree-sitter原生语法树按源码哈希保存在这里，
+# 以便后续请求无需重新解析即可展开其中的部分内容。
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional
+from tree_sitter import Node, Tree
+
+# Maximum number of trees kept in memory
+DEFAULT_MAX_TREES = 32
+# 内存中最多保留的语法树数量。
+
+
+def get_source_hash(source_bytes: bytes) -> str:
+    """Generate the cache key for a source buffer (same as resources.get_code_hash)."""
+    # 生成源码的缓存键，与resources.get_code_hash结果一致。
+    return hashlib.md5(source_bytes).hexdigest()
+
+
+def get_node_handle(node: Node) -> str:
+    """Get the stable handle of a node, in the type_startByte_endByte ID format."""
+    # 获取节点的稳定句柄，格式与节点ID相同：type_startByte_endByte。
+    return f"{node.type}_{node.start_byte}_{node.end_byte}"
+
+
+def find_node_by_handle(root: Node, handle: str) -> Optional[Node]:
+    """
+    Find the node identified by a handle from get_node_handle.
+
+    Args:
+        root: Root node of the tree to search
+        handle: Node handle in the type_startByte_endByte format
+
+    Returns:
+        The matching node, or None if the handle does not match any node
+    """
+    # 根据get_node_handle生成的句柄查找节点。
+    # 先定位覆盖该字节范围的最小节点，再沿父节点向上查找类型匹配且范围相同的节点。
+    try:
+        node_type, start, end = handle.rsplit("_", 2)
+        start_byte, end_byte = int(start), int(end)
+    except ValueError:
+        return None
+
+    node = root.descendant_for_byte_range(start_byte, end_byte)
+    while node is not None and node.start_byte == start_byte and node.end_byte == end_byte:
+        if node.type == node_type:
+            return node
+        node = node.parent
+    return None
+
+
+class StoredTree:
+    """A parsed tree together with the source and language it came from."""
+    # 已解析的语法树及其对应的源码和语言。
+
+    __slots__ = ("tree", "source_bytes", "language")
+
+    def __init__(self, tree: Tree, source_bytes: bytes, language: str):
+        self.tree = tree
+        self.source_bytes = source_bytes
+        self.language = language
+
+
+class TreeStore:
+    """Thread-safe LRU store of parsed trees keyed by source hash."""
+    # 以源码哈希为键、线程安全的LRU语法树存储。
+
+    def __init__(self, max_trees: int = DEFAULT_MAX_TREES):
+        self.max_trees = max_trees
+        self._lock = threading.Lock()
+        self._trees = OrderedDict()  # Maps source hash -> StoredTree
+
+    def put(self, tree: Tree, source_bytes: bytes, language: str) -> str:
+        """
+        Store a tree and return the hash it is stored under.
+
+        Args:
+            tree: The parsed tree
+            source_bytes: The UTF-8 encoded source the tree was parsed from
+            language: Normalized language identifier
+
+        Returns:
+            The source hash used as the key
+        """
+        # 保存语法树并返回其键（源码哈希）；超过容量时淘汰最久未使用的语法树。
+        code_hash = get_source_hash(source_bytes)
+        with self._lock:
+            self._trees[code_hash] = StoredTree(tree, source_bytes, language)
+            self._trees.move_to_end(code_hash)
+            while len(self._trees) > self.max_trees:
+                self._trees.popitem(last=False)
+        return code_hash
+
+    def get(self, code_hash: str) -> Optional[StoredTree]:
+        """Get a stored tree by source hash, or None if it is not in memory."""
+        # 按源码哈希获取语法树，不在内存中时返回None。
+        with self._lock:
+            stored = self._trees.get(code_hash)
+            if stored is not None:
+                self._trees.move_to_end(code_hash)
+            return stored
+
+    def clear(self) -> None:
+        """Remove all stored trees."""
+        # 清空所有语法树。
+        with self._lock:
+            self._trees.clear()
+
+
+# Shared tree store used by the tools and resources
+tree_store = TreeStore()
+# 工具和资源共用的语法树存储。
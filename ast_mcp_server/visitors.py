@@ -0,0 +1,283 @@
+"""
+Single-pass visitor framework for syntax tree analyses.
+
+Analyses register enter/exit callbacks for the node types they care about
+on a TreeWalker, and one iterative TreeCursor walk dispatches every node to
+all of them. Running several analyses together (for example structure
+analysis plus ASG construction) therefore costs one traversal, and adding
+a new metric adds a callback instead of another pass over the tree.
+
+Callbacks are registered by node type name, but native nodes are
+dispatched on their numeric kind id: the callbacks of each kind are
+looked up by name the first time the kind is met in a walk, and every
+other node of that kind costs one list index.
+"""
+# 语法树分析的单遍访问者框架。
+# 各项分析在TreeWalker上为关心的节点类型注册进入/离开回调，
+# 一次基于TreeCursor的迭代遍历即可将每个节点分发给所有分析。
+# 因此多项分析（如结构分析加ASG构建）一起运行只需遍历一次，新增指标只需增加回调而不是再遍历一遍。
+# 回调按节点类型名称注册，但原生节点按数字类型ID分发：每种类型在一次遍历中首次出现时按名称查找回调，之后同类节点只需一次列表索引。
+
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+from tree_sitter import Node
+
+from .serialization import goto_first_child, goto_next_sibling
+
+# Callback signature: callback(node, depth), where the walk root has depth 0
+Callback = Callable[[Node, int], None]
+# 回调签名：callback(节点, 深度)，遍历起点的深度为0。
+
+# Kind ids below this limit are dispatched through a list; larger ones (ERROR is 65535) by name
+KIND_TABLE_LIMIT = 4096
+# 小于该值的类型ID通过列表分发；更大的ID（ERROR为65535）按名称分发。
+
+
+class TreeWalker:
+    """
+    Walk a syntax tree once and dispatch each node to registered callbacks.
+
+    Callbacks registered for a node type run when the walk enters (preorder)
+    or leaves (postorder) a node of that type; callbacks registered with
+    node_types=None run for every node. Callbacks for the same node run in
+    registration order. While a callback runs, field_name holds the field
+    name of the node being entered (None if it has none).
+    """
+    # 遍历语法树一次，并将每个节点分发给已注册的回调。
+    # 为某节点类型注册的回调在进入（先序）或离开（后序）该类型节点时执行；node_types为None的回调对所有节点执行。
+    # 同一节点上的回调按注册顺序执行。回调执行期间，field_name为正在进入的节点的字段名（没有时为None）。
+
+    def __init__(self, named_only: bool = False):
+        self.named_only = named_only
+        self.field_name: Optional[str] = None
+        self._enter: List[Tuple[Optional[frozenset], Callback]] = []
+        self._exit: List[Tuple[Optional[frozenset], Callback]] = []
+        self._enter_dispatch: Dict[str, List[Callback]] = {}  # Maps node type -> enter callbacks
+        self._exit_dispatch: Dict[str, List[Callback]] = {}   # Maps node type -> exit callbacks
+
+    @staticmethod
+    def _type_set(node_types: Union[str, Iterable[str], None]) -> Optional[frozenset]:
+        if node_types is None:
+            return None
+        if isinstance(node_types, str):
+            return frozenset((node_types,))
+        return frozenset(node_types)
+
+    def on_enter(self, node_types: Union[str, Iterable[str], None], callback: Callback) -> None:
+        """
+        Register a callback run when the walk enters a node.
+
+        Args:
+            node_types: A node type, an iterable of node types, or None for every node
+            callback: Function called as callback(node, depth)
+        """
+        # 注册进入节点时执行的回调。
+        self._enter.append((self._type_set(node_types), callback))
+        self._enter_dispatch.clear()
+
+    def on_exit(self, node_types: Union[str, Iterable[str], None], callback: Callback) -> None:
+        """
+        Register a callback run when the walk leaves a node (after its children).
+
+        Args:
+            node_types: A node type, an iterable of node types, or None for every node
+            callback: Function called as callback(node, depth)
+        """
+        # 注册离开节点（处理完其子节点后）时执行的回调。
+        self._exit.append((self._type_set(node_types), callback))
+        self._exit_dispatch.clear()
+
+    def add(self, visitor) -> "TreeWalker":
+        """Register a visitor, i.e. any object with a register(walker) method."""
+        # 注册访问者，即任何带有register(walker)方法的对象。
+        visitor.register(self)
+        return self
+
+    @staticmethod
+    def _callbacks(dispatch: Dict[str, List[Callback]], registrations, node_type: str) -> List[Callback]:
+        callbacks = dispatch.get(node_type)
+        if callbacks is None:
+            callbacks = dispatch[node_type] = [
+                callback for node_types, callback in registrations
+                if node_types is None or node_type in node_types
+            ]
+        return callbacks
+    # 按节点类型查找回调列表，首次遇到某类型时计算并缓存，之后为一次字典查找。
+
+    @classmethod
+    def _kind_callbacks(cls, table: List, dispatch: Dict[str, List[Callback]], registrations, node: Node) -> List[Callback]:
+        callbacks = cls._callbacks(dispatch, registrations, node.type)
+        kind_id = node.kind_id
+        if kind_id < KIND_TABLE_LIMIT:
+            if kind_id >= len(table):
+                table.extend([None] * (kind_id + 1 - len(table)))
+            table[kind_id] = callbacks
+        return callbacks
+    # 按名称查找某类型ID的回调列表并存入按类型ID索引的表中。
+
+    def walk(self, root: Node) -> None:
+        """
+        Walk the subtree under root once, calling the registered callbacks.
+
+        Args:
+            root: Root node of the walk (depth 0)
+        """
+        # 对root下的子树执行一次遍历，调用已注册的回调。
+        named_only = self.named_only
+        enter_dispatch, exit_dispatch = self._enter_dispatch, self._exit_dispatch
+        enter, leave = self._enter, self._exit
+        kind_callbacks = self._kind_callbacks
+        enter_kinds: List[Optional[List[Callback]]] = []  # Maps kind id -> enter callbacks
+        exit_kinds: List[Optional[List[Callback]]] = []   # Maps kind id -> exit callbacks
+        # 类型ID只在同一语法内有意义，因此按类型ID索引的表每次遍历重新填充。
+
+        cursor = root.walk()
+        stack = [root]  # Nodes entered but not left yet
+        depth = 0
+        self.field_name = None
+        for callback in kind_callbacks(enter_kinds, enter_dispatch, enter, root):
+            callback(root, 0)
+        # 进入根节点。
+
+        while True:
+            if goto_first_child(cursor, named_only):
+                depth += 1
+            else:
+                while True:
+                    node = stack.pop()
+                    try:
+                        node_callbacks = exit_kinds[node.kind_id]
+                    except IndexError:
+                        node_callbacks = None
+                    if node_callbacks is None:
+                        node_callbacks = kind_callbacks(exit_kinds, exit_dispatch, leave, node)
+                    for callback in node_callbacks:
+                        callback(node, depth)
+                    if depth == 0:
+                        return
+                    if goto_next_sibling(cursor, named_only):
+                        break
+                    cursor.goto_parent()
+                    depth -= 1
+            # 没有子节点时依次离开节点，直到找到下一个兄弟节点；离开根节点后结束。
+
+            node = cursor.node
+            stack.append(node)
+            self.field_name = cursor.field_name
+            try:
+                node_callbacks = enter_kinds[node.kind_id]
+            except IndexError:
+                node_callbacks = None
+            if node_callbacks is None:
+                node_callbacks = kind_callbacks(enter_kinds, enter_dispatch, enter, node)
+            for callback in node_callbacks:
+                callback(node, depth)
+            # 进入下一个节点：按类型ID索引查找回调，该类型首次出现时才按名称查找。
+
+
+class DictTreeWalker(TreeWalker):
+    """
+    TreeWalker over the dictionary ASTs produced by parse_code_to_ast.
+
+    Dispatches to the same callbacks as TreeWalker, so visitors written
+    against a node accessor (see NodeAccess and DictNodeAccess) run on both
+    native trees and serialized ASTs. field_name is taken from the nodes'
+    "field" keys, which are present for ASTs serialized with named_only.
+    """
+    # 遍历parse_code_to_ast生成的字典AST的TreeWalker。
+    # 与TreeWalker分发到相同的回调，因此基于节点访问器编写的访问者可同时用于原生语法树和序列化后的AST。
+    # field_name取自节点的"field"键（使用named_only序列化的AST才有）。
+
+    def walk(self, root: Dict) -> None:
+        """
+        Walk the dictionary AST under root once, calling the registered callbacks.
+
+        Args:
+            root: Root node of the walk (depth 0)
+        """
+        # 对root下的字典AST执行一次遍历，调用已注册的回调。
+        enter_dispatch, exit_dispatch = self._enter_dispatch, self._exit_dispatch
+        enter, leave = self._enter, self._exit
+        callbacks = self._callbacks
+
+        self.field_name = None
+        for callback in callbacks(enter_dispatch, enter, root["type"]):
+            callback(root, 0)
+        stack = [(root, iter(root.get("children", ())))]  # Nodes entered but not left yet
+        while stack:
+            node, children = stack[-1]
+            child = next(children, None)
+            if child is None:
+                stack.pop()
+                for callback in callbacks(exit_dispatch, leave, node["type"]):
+                    callback(node, len(stack))
+                continue
+            # 子节点处理完后离开节点。
+
+            self.field_name = child.get("field")
+            for callback in callbacks(enter_dispatch, enter, child["type"]):
+                callback(child, len(stack))
+            stack.append((child, iter(child.get("children", ()))))
+            # 进入下一个子节点。
+
+
+class NodeAccess:
+    """
+    Reads native tree-sitter nodes for visitors that also run on dictionary ASTs.
+
+    A node's handle is its tree-sitter node.id.
+    """
+    # 为同时支持字典AST的访问者读取原生tree-sitter节点。节点句柄为tree-sitter的node.id。
+
+    def __init__(self, text: Callable[[int, int], str]):
+        self.text_of = text  # Maps (start_byte, end_byte) -> source text
+
+    def type(self, node: Node) -> str:
+        return node.type
+
+    def children(self, node: Node) -> List[Node]:
+        return node.children
+
+    def fields(self, node: Node, name: str) -> List[Node]:
+        return node.children_by_field_name(name)
+
+    def text(self, node: Node) -> Optional[str]:
+        return self.text_of(node.start_byte, node.end_byte)
+
+    def ref(self, node: Node) -> int:
+        return node.id
+
+
+class DictNodeAccess:
+    """
+    Reads dictionary AST nodes for visitors that also run on native trees.
+
+    A node's handle is its public ID ('{type}_{start_byte}_{end_byte}').
+    Field children are found by their "field" keys; for ASTs serialized
+    without field names, an optional positional(node_type, children, name)
+    function finds them instead.
+    """
+    # 为同时支持原生语法树的访问者读取字典AST节点。节点句柄为公开节点ID。
+    # 通过"field"键查找字段子节点；未带字段名序列化的AST可改用按位置查找的函数。
+
+    def __init__(self, positional: Optional[Callable[[str, List[Dict], str], List[Dict]]] = None):
+        self.positional = positional
+
+    def type(self, node: Dict) -> str:
+        return node["type"]
+
+    def children(self, node: Dict) -> List[Dict]:
+        return node.get("children", [])
+
+    def fields(self, node: Dict, name: str) -> List[Dict]:
+        children = node.get("children", [])
+        found = [child for child in children if child.get("field") == name]
+        if not found and self.positional is not None and not any("field" in child for child in children):
+            found = self.positional(node["type"], children, name)
+        return found
+    # 没有任何子节点带字段名时按位置查找。
+
+    def text(self, node: Dict) -> Optional[str]:
+        return node.get("text")
+
+    def ref(self, node: Dict) -> str:
+        return f"{node['type']}_{node['start_byte']}_{node['end_byte']}"
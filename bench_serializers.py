@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+"""
+Benchmark for the AST serializers.
+
+Compares the recursive node_to_dict serializer with the iterative,
+cursor-based serializer on generated Python files of 10k to 100k lines,
+reporting wall time and peak Python memory for each.
+"""
+# AST序列化器基准测试脚本。
+# 在1万到10万行的生成Python文件上，比较递归的node_to_dict与基于游标的迭代序列化器，
+# 报告各自的耗时和Python峰值内存。
+
+import sys
+import time
+import tracemalloc
+
+from tree_sitter import Language, Parser
+import tree_sitter_python
+
+from ast_mcp_server.tools import SERIALIZERS
+
+LINE_COUNTS = [10_000, 50_000, 100_000]
+# 需要测试的文件行数。
+
+FUNCTION_TEMPLATE = '''
+class Item{i}:
+    """Generated class {i}."""
+
+    def __init__(self, value):
+        self.value = value
+
+    def compute(self, factor):
+        total = 0
+        for j in range(factor):
+            if j % 2 == 0:
+                total += self.value * j
+            else:
+                total -= j
+        return total
+
+
+def helper_{i}(items):
+    return [item.compute({i}) for item in items if item.value > {i}]
+'''
+# 生成代码所用的模板，每个实例约20行。
+
+
+def generate_source(line_count: int) -> bytes:
+    """Generate a Python source file with roughly the given number of lines."""
+    # 生成大约指定行数的Python源码。
+    lines_per_block = FUNCTION_TEMPLATE.count("\n")
+    blocks = [FUNCTION_TEMPLATE.format(i=i) for i in range(line_count // lines_per_block + 1)]
+    return "".join(blocks).encode("utf-8")
+
+
+def measure(serializer, root_node, source_bytes):
+    """Run a serializer once and return (seconds, peak bytes)."""
+    # 运行一次序列化器，返回耗时（秒）和峰值内存（字节）。
+    tracemalloc.start()
+    start = time.perf_counter()
+    serializer(root_node, source_bytes, True)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    sys.setrecursionlimit(100_000)
+    # 提高递归上限，使递归实现也能处理较深的输入。
+
+    parser = Parser(Language(tree_sitter_python.language()))
+    print(f"{'lines':>8} {'serializer':>10} {'time (s)':>10} {'peak (MiB)':>11}")
+    for line_count in LINE_COUNTS:
+        source_bytes = generate_source(line_count)
+        tree = parser.parse(source_bytes)
+        for name in ("recursive", "cursor"):
+            elapsed, peak = measure(SERIALIZERS[name], tree.root_node, source_bytes)
+            print(f"{line_count:>8} {name:>10} {elapsed:>10.3f} {peak / 2**20:>11.1f}")
+    # 对每种文件大小分别测量两种序列化器。
+
+
+if __name__ == "__main__":
+    main()
@@ -21,11 +21,17 @@ LANGUAGE_MODULES = {
     "python": "tree_sitter_python",
     "java": "tree_sitter_java",
     "javascript": "tree_sitter_javascript",
+    "typescript": "tree_sitter_typescript",
 }
 # 需要使用的语言模块映射表。
 
+# Grammar functions for modules that export several grammars (default: language)
+LANGUAGE_FUNCTIONS = {
+    "typescript": "language_typescript",
+}
+# 导出多个语法的模块中对应语言的函数名（默认为language）。
+
 # Additional languages to install if needed (commented out until needed)
-# "typescript": "tree_sitter_typescript",
 # "go": "tree_sitter_go",
 # "rust": "tree_sitter_rust",
 # "c": "tree_sitter_c",
@@ -64,7 +70,7 @@ def setup_languages():
             module = importlib.import_module(module_name)
             
             # Get the language object
-            lang = Language(module.language())
+            lang = Language(getattr(module, LANGUAGE_FUNCTIONS.get(lang_name, "language"))())
             languages[lang_name] = lang
             print(f"Successfully loaded {lang_name} language")
         except Exception as e:
@@ -11,21 +11,34 @@ incremental parsing, and performance optimizations for large codebases.
 # 该服务器通过MCP协议提供代码结构和语义分析能力，支持AI助手理解和推理代码。
 # 包含作用域增强、增量解析、大型代码库性能优化等特性。
 
-import os
 import sys
-import json
-import hashlib
-import tempfile
-from mcp.server.fastmcp import FastMCP
 from typing import Dict, List, Optional, Tuple
 
-# Import our tools and resources
-from ast_mcp_server.tools import register_tools
-from ast_mcp_server.resources import register_resources, cache_resource, get_code_hash, CACHE_DIR
+# Report the cold-start import time breakdown without starting the server
+if __name__ == "__main__" and "--measure-startup" in sys.argv:
+    from ast_mcp_server.startup import main as measure_startup_main
+    sys.exit(measure_startup_main(sys.argv[1:]))
+# 使用--measure-startup时只报告冷启动导入耗时分布，不启动服务器；此时尚未导入任何重量级模块。
+
+from mcp.server.fastmcp import FastMCP
+
+# Import our tools and resources. Grammars, binary codecs and the cache
+# directory are only set up when a tool first needs them.
+from ast_mcp_server.tools import register_tools, parse_code_to_ast, create_asg_from_ast, analyze_code_structure
+from ast_mcp_server.queries import register_query_tools
+from ast_mcp_server.resources import (
+    register_resources, cache_resource, get_code_hash, load_cached_resource,
+    AST_VIEW_DEFAULTS, ASG_VIEW_DEFAULTS, view_name, view_resource_type, view_uri, load_view
+)
+# 导入工具和资源。语法、二进制编解码器和缓存目录都在工具首次需要时才初始化。
 
 # Import our enhanced tools if they exist
 try:
-    from ast_mcp_server.enhanced_tools import register_enhanced_tools
+    from ast_mcp_server.enhanced_tools import (
+        register_enhanced_tools, parse_code_to_ast_incremental, create_enhanced_asg, diff_code
+    )
+    from ast_mcp_server.asg_index import register_graph_tools
+    from ast_mcp_server.sessions import register_session_tools, document_sessions
     ENHANCED_TOOLS_AVAILABLE = True
 except ImportError:
     ENHANCED_TOOLS_AVAILABLE = False
@@ -33,34 +46,39 @@ except ImportError:
 # Initialize the MCP server
 mcp = FastMCP(
     "AstAnalyzer",
-    version="0.2.0",
-    description="Code structure and semantic analysis using AST/ASG with enhanced features"
+    instructions="Code structure and semantic analysis using AST/ASG with enhanced features"
 )
-# 初始化MCP服务器，指定名称、版本和描述。
+# 初始化MCP服务器，指定名称和说明。
 
 # Register tools with the server
 register_tools(mcp)
-# 注册基础工具。
+register_query_tools(mcp)
+# 注册基础工具和查询工具。
 
 # Register enhanced tools if available
 if ENHANCED_TOOLS_AVAILABLE:
     register_enhanced_tools(mcp)
-# 若有增强工具则注册。
+    register_graph_tools(mcp)
+    register_session_tools(mcp)
+# 若有增强工具则注册，包括基于增强版ASG的图索引查询工具和文档会话工具。
 
 # Register resources with the server
 register_resources(mcp)
 # 注册资源。
 
-# Cache for storing previous ASTs for incremental parsing
-AST_CACHE = {}
-# 用于存储增量解析时的AST缓存。
-
 # Add custom handlers for tool operations
 # These ensure that results are cached for resource access
 # 添加自定义工具操作，确保结果可被资源访问缓存。
 
 @mcp.tool()
-def parse_and_cache(code: str, language: Optional[str] = None, filename: Optional[str] = None) -> Dict:
+def parse_and_cache(
+    code: str,
+    language: Optional[str] = None,
+    filename: Optional[str] = None,
+    text_mode: str = "full",
+    positions: str = "both",
+    max_depth: Optional[int] = None
+) -> Dict:
     """
     Parse code into an AST and cache it for resource access.
     
@@ -72,35 +90,52 @@ def parse_and_cache(code: str, language: Optional[str] = None, filename: Optiona
         code: Source code to parse
         language: Programming language (optional, will be auto-detected if not provided)
         filename: Source filename (optional, helps with language detection)
+        text_mode: Node text to include: 'full' (default), 'none',
+                  'leaves-only' or 'truncated:N' (first N characters)
+        positions: Position fields to include: 'both' (default), 'bytes' or 'points'
+        max_depth: Optional depth limit. Nodes at this depth are returned as stubs
+                  that can be expanded via ast://{code_hash}/subtree/{handle}
         
     Returns:
         Dictionary with AST data and resource URI
     """
-    from ast_mcp_server.tools import parse_code_to_ast
-    
     # Generate a hash for the code
     code_hash = get_code_hash(code)
     # 生成代码哈希。
     
     # Parse the code to AST
-    ast_data = parse_code_to_ast(code, language, filename)
-    # 解析代码为AST。
+    ast_data = parse_code_to_ast(
+        code, language, filename,
+        text_mode=text_mode, positions=positions, max_depth=max_depth
+    )
+    # 按投影和深度选项解析代码为AST。
     
     # Cache the result
     if "error" not in ast_data:
-        cache_resource(code, "ast", ast_data)
-        # 缓存AST结果。
+        view = view_name(AST_VIEW_DEFAULTS, text_mode=text_mode, positions=positions, max_depth=max_depth)
+        cache_resource(code, view_resource_type("ast", view), ast_data)
+        # 缓存AST结果。投影或限制深度的AST按选项单独缓存，ast://{code_hash}始终是完整AST。
+        
+        if max_depth is not None:
+            cache_resource(code, "source", {"language": ast_data["language"], "code": code})
+        # 限制深度时同时缓存源码，以便语法树被移出内存后仍能展开存根节点。
         
         # Return the AST with a resource URI
         return {
             "ast": ast_data,
-            "resource_uri": f"ast://{code_hash}"
+            "resource_uri": view_uri("ast", code_hash, view)
         }
     else:
         return ast_data
 
 @mcp.tool()
-def generate_and_cache_asg(code: str, language: Optional[str] = None, filename: Optional[str] = None) -> Dict:
+def generate_and_cache_asg(
+    code: str,
+    language: Optional[str] = None,
+    filename: Optional[str] = None,
+    text_mode: str = "full",
+    containment: str = "edges"
+) -> Dict:
     """
     Generate an ASG from code and cache it for resource access.
     
@@ -112,36 +147,43 @@ def generate_and_cache_asg(code: str, language: Optional[str] = None, filename:
         code: Source code to analyze
         language: Programming language (optional, will be auto-detected if not provided)
         filename: Source filename (optional, helps with language detection)
+        text_mode: 'full' (default) or 'spans' (only identifiers and literals
+                  carry text; read other text via source://{code_hash}/{start}-{end})
+        containment: 'edges' (default) or 'parent' (each node carries its
+                    parent's index instead of "contains" edges)
         
     Returns:
         Dictionary with ASG data and resource URI
     """
-    from ast_mcp_server.tools import parse_code_to_ast, create_asg_from_ast
-    
     # Generate a hash for the code
     code_hash = get_code_hash(code)
     # 生成代码哈希。
     
     # Parse to AST first
-    ast_data = parse_code_to_ast(code, language, filename)
+    ast_data = parse_code_to_ast(code, language, filename, keep_tree=text_mode == "spans")
     # 先解析为AST。
     
     if "error" in ast_data:
         return ast_data
     
     # Generate ASG
-    asg_data = create_asg_from_ast(ast_data)
+    asg_data = create_asg_from_ast(ast_data, text_mode, containment)
+    if "error" in asg_data:
+        return asg_data
     # 生成ASG。
     
     # Cache both results
+    view = view_name(ASG_VIEW_DEFAULTS, text_mode=text_mode, containment=containment)
     cache_resource(code, "ast", ast_data)
-    cache_resource(code, "asg", asg_data)
-    # 缓存AST和ASG。
+    cache_resource(code, view_resource_type("asg", view), asg_data)
+    if text_mode == "spans":
+        cache_resource(code, "source", {"language": ast_data["language"], "code": code})
+    # 缓存AST和ASG（非默认输出选项的ASG按选项单独缓存）；spans模式下同时缓存源码，供source://资源读取节点文本。
     
     # Return the ASG with a resource URI
     return {
         "asg": asg_data,
-        "resource_uri": f"asg://{code_hash}"
+        "resource_uri": view_uri("asg", code_hash, view)
     }
 
 @mcp.tool()
@@ -161,8 +203,6 @@ def analyze_and_cache(code: str, language: Optional[str] = None, filename: Optio
     Returns:
         Dictionary with analysis data and resource URI
     """
-    from ast_mcp_server.tools import analyze_code_structure
-    
     # Generate a hash for the code
     code_hash = get_code_hash(code)
     # 生成代码哈希。
@@ -191,7 +231,9 @@ if ENHANCED_TOOLS_AVAILABLE:
         code: str, 
         language: Optional[str] = None,
         filename: Optional[str] = None,
-        code_id: Optional[str] = None  # Optional identifier for the code (e.g. file path)
+        code_id: Optional[str] = None,  # Optional identifier for the code (e.g. file path)
+        text_mode: str = "full",
+        positions: str = "both"
     ) -> Dict:
         """
         Parse code into an AST incrementally and cache it for resource access.
@@ -204,49 +246,41 @@ if ENHANCED_TOOLS_AVAILABLE:
             code: Source code to parse
             language: Programming language (optional, will be auto-detected if not provided)
             filename: Source filename (optional, helps with language detection)
-            code_id: Optional identifier for the code (e.g. file path)
+            code_id: Optional identifier for the code (e.g. file path); the
+                    server keeps a document session for it, so the next
+                    version is parsed incrementally from this one
+            text_mode: Node text to include: 'full' (default), 'none',
+                      'leaves-only' or 'truncated:N' (first N characters)
+            positions: Position fields to include: 'both' (default), 'bytes' or 'points'
             
         Returns:
             Dictionary with AST data and resource URI
         """
-        from ast_mcp_server.enhanced_tools import parse_code_to_ast_incremental
-        
         # Generate a hash for the code
         code_hash = get_code_hash(code)
         # 生成代码哈希。
         
-        # Use file path as cache key if provided, otherwise use hash
-        cache_key = code_id if code_id else code_hash
-        # 使用文件路径作为缓存key，否则用哈希。
+        # With a code_id, the document's session holds the previous version
+        incremental = code_id is not None and document_sessions.get(code_id) is not None
+        # 指定code_id时，文档会话中保存着上一版本的语法树和源码。
         
-        # Check if we have a previous version in cache
-        old_code = None
-        if cache_key in AST_CACHE:
-            old_code = AST_CACHE["code"]
-        # 检查是否有旧版本缓存。
-        
-        # Parse the code to AST, potentially using incremental parsing
-        ast_data = parse_code_to_ast_incremental(code, language, filename)
-        # 增量解析代码为AST。
-        
-        # Cache the current code for future incremental parsing
-        AST_CACHE[cache_key] = {
-            "code": code,
-            "ast_data": ast_data,
-            "language": ast_data.get("language")
-        }
-        # 缓存当前代码和AST。
+        # Parse the code to AST, incrementally from the session's tree when there is one
+        ast_data = parse_code_to_ast_incremental(
+            code, language, filename, text_mode=text_mode, positions=positions, code_id=code_id
+        )
+        # 按投影选项解析代码为AST；有会话时基于会话中的语法树增量解析，并将会话更新到当前代码。
         
         # Cache the result for resource access
         if "error" not in ast_data:
-            cache_resource(code, "ast", ast_data)
-            # 缓存AST。
+            view = view_name(AST_VIEW_DEFAULTS, text_mode=text_mode, positions=positions)
+            cache_resource(code, view_resource_type("ast", view), ast_data)
+            # 缓存AST；投影后的AST按选项单独缓存，ast://{code_hash}始终是完整AST。
             
             # Return the AST with a resource URI
             return {
                 "ast": ast_data,
-                "resource_uri": f"ast://{code_hash}",
-                "incremental": old_code is not None
+                "resource_uri": view_uri("ast", code_hash, view),
+                "incremental": incremental
             }
         else:
             return ast_data
@@ -255,7 +289,9 @@ if ENHANCED_TOOLS_AVAILABLE:
     def generate_and_cache_enhanced_asg(
         code: str, 
         language: Optional[str] = None,
-        filename: Optional[str] = None
+        filename: Optional[str] = None,
+        text_mode: str = "full",
+        containment: str = "edges"
     ) -> Dict:
         """
         Generate an enhanced ASG from code and cache it for resource access.
@@ -268,12 +304,14 @@ if ENHANCED_TOOLS_AVAILABLE:
             code: Source code to analyze
             language: Programming language (optional, will be auto-detected if not provided)
             filename: Source filename (optional, helps with language detection)
+            text_mode: 'full' (default) or 'spans' (only identifiers and literals
+                      carry text; read other text via source://{code_hash}/{start}-{end})
+            containment: 'edges' (default) or 'parent' (each node carries its
+                        parent's index instead of "contains" edges)
             
         Returns:
             Dictionary with enhanced ASG data and resource URI
         """
-        from ast_mcp_server.enhanced_tools import parse_code_to_ast_incremental, create_enhanced_asg_from_ast
-        
         # Generate a hash for the code
         code_hash = get_code_hash(code)
         # 生成代码哈希。
@@ -285,19 +323,26 @@ if ENHANCED_TOOLS_AVAILABLE:
         if "error" in ast_data:
             return ast_data
         
-        # Generate enhanced ASG
-        asg_data = create_enhanced_asg_from_ast(ast_data)
-        # 生成增强版ASG。
+        # Generate enhanced ASG from the native tree
+        asg_data = create_enhanced_asg(
+            code, ast_data["language"], filename, text_mode=text_mode, containment=containment
+        )
+        if "error" in asg_data:
+            return asg_data
+        # 从原生语法树生成增强版ASG：字段名在原生节点上直接可得，所有语言都能得到完整的语义边。
         
         # Cache both results
+        view = view_name(ASG_VIEW_DEFAULTS, text_mode=text_mode, containment=containment)
         cache_resource(code, "ast", ast_data)
-        cache_resource(code, "enhanced_asg", asg_data)
-        # 缓存AST和增强ASG。
+        cache_resource(code, view_resource_type("enhanced_asg", view), asg_data)
+        if text_mode == "spans":
+            cache_resource(code, "source", {"language": ast_data["language"], "code": code})
+        # 缓存AST和增强ASG（非默认输出选项的ASG按选项单独缓存）；spans模式下同时缓存源码，供source://资源读取节点文本。
         
         # Return the ASG with a resource URI
         return {
             "asg": asg_data,
-            "resource_uri": f"enhanced_asg://{code_hash}"
+            "resource_uri": view_uri("enhanced_asg", code_hash, view)
         }
 
     @mcp.tool()
@@ -310,8 +355,9 @@ if ENHANCED_TOOLS_AVAILABLE:
         """
         Generate an AST diff between old and new code versions and cache it.
         
-        This tool compares two versions of code and returns only the changed AST nodes,
-        which is much more efficient for large files with small changes.
+        This tool compares two versions of code and returns a structural edit script
+        (inserted, deleted, updated and moved nodes with their spans), whose size
+        follows the change rather than the file.
         
         Args:
             old_code: Previous version of the code
@@ -322,15 +368,13 @@ if ENHANCED_TOOLS_AVAILABLE:
         Returns:
             Dictionary with diff data and resource URIs
         """
-        from ast_mcp_server.enhanced_tools import diff_ast
-        
         # Generate hashes for both code versions
         old_hash = get_code_hash(old_code)
         new_hash = get_code_hash(new_code)
         # 生成旧代码和新代码的哈希。
         
         # Generate the diff
-        diff_data = diff_ast(old_code, new_code, language, filename)
+        diff_data = diff_code(old_code, new_code, language, filename)
         # 生成AST差异。
         
         if "error" in diff_data:
@@ -363,14 +407,13 @@ if ENHANCED_TOOLS_AVAILABLE:
         Returns:
             The cached diff data
         """
-        cache_path = os.path.join(CACHE_DIR, f"{diff_hash}_diff.json")
+        try:
+            data = load_cached_resource(diff_hash, "diff")
+        except Exception as e:
+            return {"error": f"Error reading cached diff: {e}"}
         
-        if os.path.exists(cache_path):
-            try:
-                with open(cache_path, 'r') as f:
-                    return json.load(f)
-            except Exception as e:
-                return {"error": f"Error reading cached diff: {e}"}
+        if data is not None:
+            return data
         
         return {"error": "Diff not found. Please use ast_diff_and_cache tool first."}
 
@@ -387,24 +430,47 @@ if ENHANCED_TOOLS_AVAILABLE:
         Returns:
             The cached enhanced ASG data
         """
-        from ast_mcp_server.resources import get_cache_path
+        try:
+            data = load_cached_resource(code_hash, "enhanced_asg")
+        except Exception as e:
+            return {"error": f"Error reading cached enhanced ASG: {e}"}
+        
+        if data is not None:
+            return data
+        
+        return {"error": "Enhanced ASG not found. Please use generate_and_cache_enhanced_asg tool first."}
+
+    @mcp.resource("enhanced_asg://{code_hash}/view/{view}")
+    def enhanced_asg_view_resource(code_hash: str, view: str) -> Dict:
+        """
+        Resource that provides an enhanced ASG cached with non-default output options.
+        
+        generate_and_cache_enhanced_asg returns this URI when called with
+        text_mode or containment; enhanced_asg://{code_hash} always holds
+        the default graph.
         
-        cache_path = get_cache_path(code_hash, "enhanced_asg")
+        Args:
+            code_hash: Hash of the code to retrieve enhanced ASG for
+            view: Name of the output options, as in the returned URI
+            
+        Returns:
+            The cached enhanced ASG data
+        """
+        try:
+            data = load_view(code_hash, "enhanced_asg", view)
+        except Exception as e:
+            return {"error": f"Error reading cached enhanced ASG: {e}"}
         
-        if os.path.exists(cache_path):
-            try:
-                with open(cache_path, 'r') as f:
-                    return json.load(f)
-            except Exception as e:
-                return {"error": f"Error reading cached enhanced ASG: {e}"}
+        if data is not None:
+            return data
         
         return {"error": "Enhanced ASG not found. Please use generate_and_cache_enhanced_asg tool first."}
 
 if __name__ == "__main__":
     print("Starting server initialization...")
     
-    # Check if tree-sitter parsers are available
-    from ast_mcp_server.tools import init_parsers
+    # Check if tree-sitter parsers are available (grammars load on first use)
+    from ast_mcp_server.grammars import init_parsers, start_warm_up
     
     print("Checking for tree-sitter parsers...")
     if not init_parsers():
@@ -413,6 +479,9 @@ if __name__ == "__main__":
         print("Some functionality may be limited.")
     else:
         print("Tree-sitter parsers initialized successfully!")
+        # Optionally preload grammars listed in AST_MCP_WARMUP_LANGUAGES in the background
+        if start_warm_up():
+            print("Warming up grammars in the background...")
     
     # Report on enhanced tools availability
     if ENHANCED_TOOLS_AVAILABLE:
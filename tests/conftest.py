@@ -0,0 +1,27 @@
+"""Shared setup for the tests."""
+# 测试共用的准备工作。
+
+import os
+
+import pytest
+
+import build_parsers
+from ast_mcp_server.grammars import PARSERS_AVAILABLE_FILE
+
+
+@pytest.fixture(scope="session", autouse=True)
+def parsers_available():
+    """Write the marker build_parsers.py leaves behind, which the tools check before parsing."""
+    # 写入build_parsers.py生成的可用性标记文件，工具在解析前会检查该文件。
+    if not os.path.exists(PARSERS_AVAILABLE_FILE):
+        build_parsers.write_parser_info(build_parsers.setup_languages())
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    """Point the resource cache at a temporary directory."""
+    # 将资源缓存目录指向临时目录。
+    from ast_mcp_server import resources
+    monkeypatch.setattr(resources, "CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(resources, "_cache_dir_ready", False)
+    return tmp_path
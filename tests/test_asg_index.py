@@ -0,0 +1,99 @@
+"""Tests that update_asg gives the same graph as indexing the new code from scratch."""
+# 测试update_asg得到的图与从头索引新代码得到的图相同。
+
+import random
+
+import pytest
+
+from ast_mcp_server.asg_index import build_index, update_index
+from ast_mcp_server.tools import parse_code_to_tree
+
+SOURCE = '''import os
+
+LIMIT = 10
+
+
+def helper(value):
+    return value + LIMIT
+
+
+class Counter:
+    step = 1
+
+    def __init__(self):
+        self.count = 0
+
+    def bump(self, amount=1):
+        self.count += helper(amount)
+        return self.count
+
+
+def main():
+    counter = Counter()
+    for name in os.listdir("."):
+        counter.bump(len(name))
+    return counter
+'''
+
+
+def index_of(code, named_only=False):
+    parsed = parse_code_to_tree(code, "python")
+    return build_index(parsed["tree"], parsed["source_bytes"], "python", named_only)
+
+
+def snapshot(index):
+    """Describe an indexed ASG by node IDs, so graphs built in different ways can be compared."""
+    # 以节点ID描述已索引的ASG，以便比较以不同方式构建的图。
+    asg = index.asg
+    ids = [asg.node_id(node) for node in range(asg.node_count)]
+    return {
+        "nodes": ids,
+        "parents": [ids[parent] if parent >= 0 else None for parent in asg.parent],
+        "text": list(asg.text),
+        "edges": sorted(
+            (ids[source], ids[target], asg.edge_types[type_id])
+            for source, target, type_id in zip(asg.edge_source, asg.edge_target, asg.edge_type)
+        ),
+        "symbols": sorted((name, ids[node], kind) for name, (node, kind) in (asg.symbols or {}).items()),
+        "subtree_end": list(index.subtree_end),
+        "edge_counts": index.edge_counts,
+        "callees": [index.call_sites(node, "out") for node in range(asg.node_count)]
+    }
+
+
+def check_update(code, new_code, named_only=False):
+    updated, rebuilt = update_index(index_of(code, named_only), new_code)
+    assert snapshot(updated) == snapshot(index_of(new_code, named_only))
+    return rebuilt
+
+
+@pytest.mark.parametrize("named_only", [False, True])
+@pytest.mark.parametrize("old, new, incremental", [
+    ("return value + LIMIT", "return value - LIMIT", True),
+    ("        self.count += helper(amount)\n", "        amount = abs(amount)\n        self.count += helper(amount)\n", None),
+    ("        counter.bump(len(name))\n", "        counter.bump(helper(len(name)))\n", True),
+    ("def helper(value):", "def helper2(value):", False),
+    ("LIMIT = 10", "LIMIT = 11", False),
+    ("    return counter\n", "    return counter(\n", None),
+])
+def test_update_matches_fresh_index(old, new, incremental, named_only):
+    rebuilt = check_update(SOURCE, SOURCE.replace(old, new), named_only)
+    if incremental is not None:
+        assert (rebuilt is not None) == incremental
+
+
+def test_unchanged_code_keeps_index():
+    index = index_of(SOURCE)
+    updated, rebuilt = update_index(index, SOURCE)
+    assert updated is index
+    assert rebuilt["node_count"] == 0
+
+
+def test_random_edits_match_fresh_index():
+    rng = random.Random(7)
+    for trial in range(60):
+        position = rng.randrange(len(SOURCE))
+        inserted = rng.choice(["x", " zz", "(", ":", "\n", ""])
+        removed = rng.choice([0, 0, 1, 3])
+        new_code = SOURCE[:position] + inserted + SOURCE[position + removed:]
+        check_update(SOURCE, new_code, named_only=trial % 2 == 1)
@@ -0,0 +1,199 @@
+"""Tests for the compact ASG model and its public formats."""
+# 测试紧凑ASG模型及其公开格式。
+
+import pytest
+
+from ast_mcp_server.asg_model import CompactASG, check_asg_options, compact_asg_from_ast, inlines_text, parse_node_id
+from ast_mcp_server.enhanced_tools import create_enhanced_asg
+from ast_mcp_server.resources import cache_resource, get_code_hash, get_source_slice
+from ast_mcp_server.tree_store import tree_store
+from ast_mcp_server.tools import build_asg, parse_code_to_ast
+
+SOURCE = '''import os
+
+
+def walk(root="."):
+    for name in os.listdir(root):
+        yield os.path.join(root, name)
+'''
+
+UNICODE_SOURCE = 'greeting = "wörld \U0001F44B"\nprint(greeting.upper())\n'
+
+
+def public_id(node):
+    return f"{node['type']}_{node['start_byte']}_{node['end_byte']}"
+
+
+def dict_asg(ast):
+    """Build the nodes and containment edges of an ASG from a dictionary AST with string IDs."""
+    # 用字符串ID从字典AST构建ASG的节点和包含边。
+    nodes, edges = [], []
+    stack = [(ast, None)]
+    while stack:
+        node, parent = stack.pop()
+        nodes.append({
+            "id": public_id(node), "type": node["type"], "text": node["text"],
+            "start_byte": node["start_byte"], "end_byte": node["end_byte"],
+            "start_line": node["start_point"]["row"], "start_col": node["start_point"]["column"],
+            "end_line": node["end_point"]["row"], "end_col": node["end_point"]["column"]
+        })
+        if parent is not None:
+            edge = {"source": parent, "target": public_id(node), "type": "contains"}
+            if "field" in node:
+                edge["field"] = node["field"]
+            edges.append(edge)
+        stack.extend((child, public_id(node)) for child in reversed(node.get("children", [])))
+    return nodes, edges
+
+
+@pytest.mark.parametrize("node_id, expected", [
+    ("function_definition_10_42", ("function_definition", 10, 42)),
+    ("identifier_0_0", ("identifier", 0, 0)),
+    ("_0_1", ("", 0, 1)),
+    ("identifier_x_1", None),
+    ("identifier", None),
+    (None, None),
+])
+def test_parse_node_id(node_id, expected):
+    assert parse_node_id(node_id) == expected
+
+
+@pytest.mark.parametrize("named_only", [False, True])
+def test_compact_asg_matches_string_ids(named_only):
+    ast = parse_code_to_ast(SOURCE, "python", named_only=named_only)["ast"]
+    asg, index_of = compact_asg_from_ast(ast, "python")
+    nodes, edges = dict_asg(ast)
+    result = asg.to_dict(node_lookup=True)
+    assert result["nodes"] == nodes
+    assert result["edges"] == edges
+    assert result["root"] == nodes[0]["id"]
+    assert result["node_lookup"] == {node["id"]: index for index, node in enumerate(nodes)}
+    assert all(index_of[parse_node_id(node["id"])] == index for index, node in enumerate(nodes))
+    assert len(asg.node_types) == len({node["type"] for node in nodes})
+    # 整数节点ID与公开字符串ID一一对应，节点类型只驻留一次。
+
+
+def test_semantic_edges_and_subtrees():
+    asg = CompactASG("python")
+    module = asg.add_node("module", 0, 9, 0, 0, 1, 0, "x = 1\nx\n")
+    assignment = asg.add_node("assignment", 0, 5, 0, 0, 0, 5, "x = 1", module)
+    target = asg.add_node("identifier", 0, 1, 0, 0, 0, 1, "x", assignment, "left")
+    asg.add_node("integer", 4, 5, 0, 4, 0, 5, "1", assignment, "right")
+    use = asg.add_node("identifier", 6, 7, 1, 0, 1, 1, "x", module)
+    asg.add_edge(use, target, "references")
+    asg.add_edge(use, target, "references")
+    assert (asg.node_count, asg.edge_count, asg.edge_types) == (5, 2, ["references"])
+    assert [asg.subtree_end(index) for index in range(5)] == [5, 4, 3, 4, 5]
+    assert asg.node_id(use) == "identifier_6_7"
+
+    result = asg.to_dict(containment="parent")
+    assert [node["parent"] for node in result["nodes"]] == [None, 0, 1, 1, 0]
+    assert [node.get("field") for node in result["nodes"]] == [None, None, "left", "right", None]
+    assert result["edges"] == [{"source": "identifier_6_7", "target": "identifier_0_1", "type": "references"}] * 2
+    contains = [edge for edge in asg.to_dict()["edges"] if edge["type"] == "contains"]
+    assert [(edge["target"], edge.get("field")) for edge in contains] == [
+        ("assignment_0_5", None), ("identifier_0_1", "left"), ("integer_4_5", "right"), ("identifier_6_7", None)
+    ]
+
+
+def test_asg_options():
+    assert check_asg_options() is None
+    assert "text mode" in check_asg_options(text_mode="none")
+    assert "containment" in check_asg_options(containment="tree")
+    assert "error" in build_asg(parse_code_to_ast(SOURCE, "python"), text_mode="none")
+
+
+def test_node_resource(cache_dir):
+    server = pytest.importorskip("server")
+    resources = {template.uri_template: template.fn for template in server.mcp._resource_manager.list_templates()}
+    ast_data = parse_code_to_ast(SOURCE, "python")
+    cache_resource(SOURCE, "ast", ast_data)
+    node_resource = resources["ast://{code_hash}/node/{node_id}"]
+    call = ast_data["ast"]["children"][1]["children"][4]["children"][0]["children"][3]
+    assert call["type"] == "call" and call["text"] == "os.listdir(root)"
+    assert node_resource(get_code_hash(SOURCE), public_id(call)) == call
+    assert "error" in node_resource(get_code_hash(SOURCE), "call_0_1")
+    assert "error" in node_resource(get_code_hash(SOURCE), "not-an-id")
+
+
+def check_spans(spans, full, code_hash):
+    """Check that a 'spans' ASG keeps only identifier and literal text, and that source:// gives the rest."""
+    # 检查spans模式的ASG只保留标识符和字面量的文本，其余文本可通过source://读取。
+    assert spans["text_mode"] == "spans" and spans["code_hash"] == code_hash
+    assert spans["edges"] == full["edges"]
+    for node, full_node in zip(spans["nodes"], full["nodes"], strict=True):
+        if inlines_text(node["type"]):
+            assert node == full_node
+        else:
+            assert "text" not in node
+            assert get_source_slice(code_hash, node["start_byte"], node["end_byte"])["text"] == full_node["text"]
+            assert node == {key: value for key, value in full_node.items() if key != "text"}
+
+
+@pytest.mark.parametrize("code", [SOURCE, UNICODE_SOURCE])
+def test_spans_text_mode(code):
+    ast_data = parse_code_to_ast(code, "python", keep_tree=True)
+    spans = build_asg(ast_data, text_mode="spans").to_dict()
+    check_spans(spans, build_asg(ast_data).to_dict(), get_code_hash(code))
+    check_spans(create_enhanced_asg(code, "python", text_mode="spans"), create_enhanced_asg(code, "python"), get_code_hash(code))
+    # 基本ASG和增强版ASG都只保留标识符和字面量的文本。
+
+
+def test_source_slices_after_eviction(cache_dir):
+    server = pytest.importorskip("server")
+    tools = {tool.name: tool.fn for tool in server.mcp._tool_manager.list_tools()}
+    code_hash = get_code_hash(UNICODE_SOURCE)
+    result = tools["generate_and_cache_asg"](UNICODE_SOURCE, "python", text_mode="spans")
+    assert result["resource_uri"] == f"asg://{code_hash}/view/text_mode=spans"
+    tree_store.clear()
+    start = UNICODE_SOURCE.encode().index(b"\"")
+    end = UNICODE_SOURCE.encode().index(b"\n")
+    assert get_source_slice(code_hash, start, end)["text"] == '"wörld \U0001F44B"'
+    assert "error" in get_source_slice(code_hash, 5, 1000)
+    assert "error" in get_source_slice("0" * 32, 0, 1)
+    # 语法树被移出内存后从缓存的源码读取文本片段。
+
+
+def contains_edges(asg):
+    """Rebuild the "contains" edges of an ASG returned with containment='parent'."""
+    # 由containment='parent'的ASG重建contains边。
+    nodes = asg["nodes"]
+    edges = []
+    for node in nodes:
+        if node["parent"] is not None:
+            edge = {"source": nodes[node["parent"]]["id"], "target": node["id"], "type": "contains"}
+            if "field" in node:
+                edge["field"] = node["field"]
+            edges.append(edge)
+    return edges
+
+
+@pytest.mark.parametrize("named_only", [False, True])
+def test_parent_containment(named_only):
+    ast_data = parse_code_to_ast(SOURCE, "python", named_only=named_only)
+    asg = build_asg(ast_data)
+    edges_mode = asg.to_dict()
+    parent_mode = asg.to_dict(containment="parent")
+    assert parent_mode["containment"] == "parent"
+    assert all(edge["type"] != "contains" for edge in parent_mode["edges"])
+    assert contains_edges(parent_mode) + parent_mode["edges"] == edges_mode["edges"]
+    assert [
+        {key: value for key, value in node.items() if key not in ("parent", "field")} for node in parent_mode["nodes"]
+    ] == edges_mode["nodes"]
+    # 由父节点下标重建的包含边与contains边相同，节点的其余字段不变。
+
+    enhanced_edges = create_enhanced_asg(SOURCE, "python", named_only=named_only)
+    enhanced_parent = create_enhanced_asg(SOURCE, "python", named_only=named_only, containment="parent")
+    assert sorted(map(str, contains_edges(enhanced_parent) + enhanced_parent["edges"])) == sorted(map(str, enhanced_edges["edges"]))
+    assert "error" in create_enhanced_asg(SOURCE, "python", containment="nested")
+
+
+def test_parent_containment_is_cached_as_a_view(cache_dir):
+    server = pytest.importorskip("server")
+    tools = {tool.name: tool.fn for tool in server.mcp._tool_manager.list_tools()}
+    code_hash = get_code_hash(SOURCE)
+    result = tools["generate_and_cache_asg"](SOURCE, "python", containment="parent")
+    assert result["resource_uri"] == f"asg://{code_hash}/view/containment=parent"
+    resources = {template.uri_template: template.fn for template in server.mcp._resource_manager.list_templates()}
+    assert resources["asg://{code_hash}/view/{view}"](code_hash, "containment=parent") == result["asg"]
+    assert "error" in resources["asg://{code_hash}"](code_hash)
@@ -0,0 +1,79 @@
+"""Tests for the codecs used for cached resources and tool responses."""
+# 测试缓存资源和工具响应所用的编解码器。
+
+import base64
+
+import pytest
+
+from ast_mcp_server.codecs import CACHE_CODEC_ENV, CODECS, CborCodec, available_codecs, encode_response, get_codec
+from ast_mcp_server.resources import cache_resource, get_code_hash, load_cached_resource
+from ast_mcp_server.tools import build_asg, parse_code_to_ast
+
+SOURCE = 'def greet(name="wörld"):\n    return "\U0001F44B " + name\n'
+
+
+def payloads():
+    """Build an AST and an ASG in the dictionary and columnar formats."""
+    # 构建字典格式和列式格式的AST与ASG。
+    ast_data = parse_code_to_ast(SOURCE, "python")
+    asg = build_asg(ast_data)
+    return [
+        ast_data,
+        parse_code_to_ast(SOURCE, "python", output_format="columnar"),
+        asg.to_dict(node_lookup=True),
+        asg.to_columnar("parent")
+    ]
+
+
+@pytest.mark.parametrize("name", sorted(CODECS))
+def test_round_trip(name):
+    if name not in available_codecs():
+        pytest.skip(f"{CODECS[name].package} is not installed")
+    codec = get_codec(name)
+    for data in payloads():
+        payload = codec.dumps(data)
+        assert isinstance(payload, bytes)
+        assert codec.loads(payload) == data
+
+
+@pytest.mark.parametrize("name", sorted(CODECS))
+def test_encode_response(name):
+    if name not in available_codecs():
+        pytest.skip(f"{CODECS[name].package} is not installed")
+    data = payloads()[0]
+    response = encode_response(data, name)
+    if name == "json":
+        assert response is data
+    else:
+        assert response["encoding"] == name
+        assert CODECS[name].loads(base64.b64decode(response["data"])) == data
+
+
+def test_codec_errors(monkeypatch):
+    with pytest.raises(ValueError, match="Unknown codec"):
+        get_codec("yaml")
+    assert "error" in encode_response({"ast": {}}, "yaml")
+    error = {"error": "parse failed"}
+    assert encode_response(error, "msgpack") is error
+    monkeypatch.setattr(CborCodec, "available", staticmethod(lambda: False))
+    with pytest.raises(ValueError, match="'cbor2' package"):
+        get_codec("cbor")
+    assert "cbor" not in available_codecs()
+
+
+def test_default_codec(monkeypatch):
+    monkeypatch.delenv(CACHE_CODEC_ENV, raising=False)
+    assert get_codec() is CODECS[available_codecs()[0]]
+    monkeypatch.setenv(CACHE_CODEC_ENV, "JSON")
+    assert get_codec() is CODECS["json"]
+
+
+def test_cache_written_with_another_codec(cache_dir, monkeypatch):
+    data = payloads()[2]
+    monkeypatch.setenv(CACHE_CODEC_ENV, "json")
+    cache_resource(SOURCE, "asg", data)
+    assert [path.suffix for path in cache_dir.iterdir()] == [".json"]
+    for name in available_codecs():
+        monkeypatch.setenv(CACHE_CODEC_ENV, name)
+        assert load_cached_resource(get_code_hash(SOURCE), "asg") == data
+    # 切换编解码器后仍能读取之前写入的缓存。
@@ -0,0 +1,111 @@
+"""Tests that the columnar AST and ASG formats hold the same data as the dictionary formats."""
+# 测试列式AST和ASG格式与字典格式包含相同的数据。
+
+import pytest
+
+from ast_mcp_server.tools import build_asg, parse_code_to_ast
+
+SOURCE = '''import os
+
+
+class Walker:
+    """Walk the wörld. \U0001F30D"""
+
+    def walk(self, root="."):
+        for name in os.listdir(root):
+            if name.startswith("_"):
+                continue
+            yield os.path.join(root, name)
+
+
+def main():
+    return list(Walker().walk())
+'''
+
+
+def ast_from_columns(columns):
+    """Rebuild the nested dictionary AST from a columnar AST."""
+    # 由列式AST重建嵌套字典形式的AST。
+    nodes = []
+    for index in range(columns["node_count"]):
+        node = {"type": columns["node_types"][columns["type"][index]]}
+        if "start_byte" in columns:
+            node["start_byte"] = columns["start_byte"][index]
+            node["end_byte"] = columns["end_byte"][index]
+        if "start_row" in columns:
+            node["start_point"] = {"row": columns["start_row"][index], "column": columns["start_col"][index]}
+            node["end_point"] = {"row": columns["end_row"][index], "column": columns["end_col"][index]}
+        if "text" in columns and columns["text"][index] >= 0:
+            node["text"] = columns["texts"][columns["text"][index]]
+        if "field" in columns and columns["field"][index] >= 0:
+            node["field"] = columns["fields"][columns["field"][index]]
+        parent = columns["parent"][index]
+        if parent >= 0:
+            assert parent < index
+            nodes[parent].setdefault("children", []).append(node)
+        nodes.append(node)
+    return nodes[0]
+
+
+def asg_from_columns(columns):
+    """Rebuild the dictionary ASG (as from CompactASG.to_dict) from a columnar ASG."""
+    # 由列式ASG重建字典形式的ASG（与CompactASG.to_dict的输出相同）。
+    ids = []
+    nodes = []
+    for index in range(columns["node_count"]):
+        node_type = columns["node_types"][columns["type"][index]]
+        node_id = f"{node_type}_{columns['start_byte'][index]}_{columns['end_byte'][index]}"
+        node = {"id": node_id, "type": node_type}
+        text_id = columns["text"][index]
+        if text_id >= 0 or "text_mode" not in columns:
+            node["text"] = columns["texts"][text_id] if text_id >= 0 else None
+        for column in ("start_byte", "end_byte", "start_line", "start_col", "end_line", "end_col"):
+            node[column] = columns[column][index]
+        if columns.get("containment") == "parent":
+            parent = columns["parent"][index]
+            node["parent"] = parent if parent >= 0 else None
+            if "field" in columns and columns["field"][index] >= 0:
+                node["field"] = columns["fields"][columns["field"][index]]
+        ids.append(node_id)
+        nodes.append(node)
+    edges = []
+    for position, (source, target, type_id) in enumerate(
+        zip(columns["edge_source"], columns["edge_target"], columns["edge_type"])
+    ):
+        edge = {"source": ids[source], "target": ids[target], "type": columns["edge_types"][type_id]}
+        if "edge_field" in columns and columns["edge_field"][position] >= 0:
+            edge["field"] = columns["edge_fields"][columns["edge_field"][position]]
+        edges.append(edge)
+    result = {"language": columns["language"], "nodes": nodes, "edges": edges, "root": ids[columns["root"]]}
+    for key in ("containment", "text_mode", "code_hash"):
+        if key in columns:
+            result[key] = columns[key]
+    return result
+
+
+@pytest.mark.parametrize("text_mode", ["full", "none", "leaves-only", "truncated:4"])
+@pytest.mark.parametrize("positions", ["both", "bytes", "points"])
+@pytest.mark.parametrize("named_only", [False, True])
+def test_columnar_ast_matches_dict(text_mode, positions, named_only):
+    options = {"text_mode": text_mode, "positions": positions, "named_only": named_only}
+    nested = parse_code_to_ast(SOURCE, "python", **options)["ast"]
+    columns = parse_code_to_ast(SOURCE, "python", output_format="columnar", **options)["ast"]
+    assert columns["format"] == "columnar"
+    assert ast_from_columns(columns) == nested
+    assert len(set(columns["node_types"])) == len(columns["node_types"])
+    assert len(set(columns.get("texts", ()))) == len(columns.get("texts", ()))
+    # 节点类型和文本各只驻留一次。
+
+
+@pytest.mark.parametrize("text_mode", ["full", "spans"])
+@pytest.mark.parametrize("containment", ["edges", "parent"])
+@pytest.mark.parametrize("named_only", [False, True])
+def test_columnar_asg_matches_dict(text_mode, containment, named_only):
+    asg = build_asg(parse_code_to_ast(SOURCE, "python", named_only=named_only, keep_tree=True), text_mode)
+    assert asg_from_columns(asg.to_columnar(containment)) == asg.to_dict(containment=containment)
+
+
+def test_columnar_requires_full_tree():
+    assert "error" in parse_code_to_ast(SOURCE, "python", output_format="columnar", max_depth=1)
+    assert "error" in parse_code_to_ast(SOURCE, "python", output_format="columnar", include_children=False)
+    assert "error" in parse_code_to_ast(SOURCE, "python", output_format="rows")
@@ -0,0 +1,123 @@
+"""Tests for the edit derivation and position conversion used by incremental reparsing."""
+# 测试增量解析所用的编辑推导和位置转换。
+
+import random
+
+import pytest
+
+from ast_mcp_server.edits import LineIndex, apply_range_edit, diff_edits, edited_copy
+from ast_mcp_server.parser_pool import parser_pool
+from ast_mcp_server.tools import get_language
+
+SOURCE = '''def greet(name):
+    """Say hello. \U0001F600"""
+    message = "hello, " + name
+    print(message)
+    return message
+
+
+class Greeter:
+    def __init__(self, names):
+        self.names = list(names)
+
+    def run(self):
+        return [greet(name) for name in self.names]
+'''
+
+
+def parse(source, old_tree=None):
+    with parser_pool.parser("python", get_language("python")) as parser:
+        return parser.parse(source, old_tree) if old_tree is not None else parser.parse(source)
+
+
+def spans(tree):
+    """List every node of a tree with its type, byte range and points, in preorder."""
+    # 按先序列出语法树的每个节点及其类型、字节范围和位置。
+    result = []
+    cursor = tree.walk()
+    while True:
+        node = cursor.node
+        result.append((node.type, node.start_byte, node.end_byte, node.start_point, node.end_point))
+        if cursor.goto_first_child():
+            continue
+        while not cursor.goto_next_sibling():
+            if not cursor.goto_parent():
+                return result
+
+
+def apply_edits(old, new, edits):
+    """Replay edits from diff_edits on the old buffer, checking each one's points along the way."""
+    # 在旧缓冲区上依次重放diff_edits得到的编辑，同时检查每个编辑的位置。
+    source = old
+    for edit in edits:
+        lines = LineIndex(source)
+        assert lines.point(edit["start_byte"]) == edit["start_point"]
+        assert lines.point(edit["old_end_byte"]) == edit["old_end_point"]
+        replacement = new[edit["start_byte"]:edit["new_end_byte"]]
+        source = source[:edit["start_byte"]] + replacement + source[edit["old_end_byte"]:]
+        assert LineIndex(source).point(edit["new_end_byte"]) == edit["new_end_point"]
+    return source
+
+
+def mutate(rng, source):
+    """Make a few random insertions, deletions and line moves in a buffer."""
+    # 在缓冲区中随机插入、删除若干内容或移动行。
+    for _ in range(rng.randint(1, 4)):
+        position = rng.randrange(len(source) + 1)
+        choice = rng.randrange(4)
+        if choice == 0:
+            source = source[:position] + rng.choice([b"x", b" + 1", b"\n", b"(", "é".encode()]) + source[position:]
+        elif choice == 1:
+            source = source[:position] + source[position + rng.randint(1, 8):]
+        else:
+            lines = source.split(b"\n")
+            line = lines.pop(rng.randrange(len(lines)))
+            lines.insert(rng.randrange(len(lines) + 1), line)
+            source = b"\n".join(lines)
+    return source
+
+
+def test_diff_edits_of_equal_buffers():
+    assert diff_edits(SOURCE.encode(), SOURCE.encode()) == []
+
+
+@pytest.mark.parametrize("seed", range(8))
+def test_diff_edits_replay_and_reparse(seed):
+    rng = random.Random(seed)
+    old = SOURCE.encode()
+    old_tree = parse(old)
+    for _ in range(25):
+        new = mutate(rng, old)
+        edits = diff_edits(old, new)
+        assert apply_edits(old, new, edits) == new
+        incremental = parse(new, edited_copy(old_tree, edits))
+        assert spans(incremental) == spans(parse(new))
+        assert spans(old_tree) == spans(parse(old))
+        # 增量解析与完整解析结果相同，且旧语法树本身未被修改。
+
+
+def test_line_index_offset_counts_utf16_code_units():
+    source = "a\U0001F600béc\nsecond\n".encode()
+    lines = LineIndex(source)
+    assert lines.offset(source, 0, 1) == 1
+    assert lines.offset(source, 0, 3) == 5
+    assert lines.offset(source, 0, 4) == 6
+    assert lines.offset(source, 0, 5) == 8
+    assert lines.offset(source, 0, 6) == 9
+    assert lines.offset(source, 0, 2) == 1
+    # 表情符号占两个UTF-16码元、四个UTF-8字节；落在代理对中间的位置舍去半个字符。
+    assert lines.offset(source, 0, 2, "utf-32") == 5
+    assert lines.offset(source, 0, 5, "utf-8") == 5
+    assert lines.offset(source, 0, 99) == 9
+    assert lines.offset(source, 1, 3) == 13
+    assert lines.offset(source, 5, 0) == len(source)
+
+
+def test_apply_range_edit_keeps_line_index():
+    source = SOURCE.encode()
+    lines = LineIndex(source)
+    start = lines.offset(source, 1, 17)
+    end = lines.offset(source, 2, 4)
+    source, edit = apply_range_edit(source, lines, start, end, "\U0001F44B\"\"\"\n    x = 1\n    ".encode())
+    assert lines.starts == LineIndex(source).starts
+    assert edit["new_end_point"] == lines.point(edit["new_end_byte"])
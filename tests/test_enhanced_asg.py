@@ -0,0 +1,111 @@
+"""Tests that enhanced ASGs built from dictionary ASTs and from native trees agree."""
+# 测试由字典AST和由原生语法树构建的增强版ASG一致。
+
+import pytest
+
+from ast_mcp_server.enhanced_tools import create_enhanced_asg, create_enhanced_asg_from_ast
+from ast_mcp_server.grammars import available_languages
+from ast_mcp_server.tools import parse_code_to_ast
+
+SAMPLES = {
+    "javascript": '''import fs, { readFile as rf } from "fs";
+import * as path from "path";
+const LIMIT = 10;
+let helper = function (value) { return value + LIMIT; };
+const twice = x => helper(helper(x));
+const add = async (a, b = LIMIT) => a + b;
+function* gen(n) { for (let i = 0; i < n; i++) { yield i; } }
+class Counter {
+  constructor(start) { this.count = start; }
+  bump(amount) { this.count += twice(amount); return this.count; }
+}
+function main() {
+  const counter = new Counter(LIMIT);
+  for (const name of fs.readdirSync(".")) { counter.bump(name.length); }
+  rf(path.join("a", "b"));
+  try { main(); } catch (err) { console.log(err); }
+  return add(1, 2);
+}
+main();
+''',
+    "typescript": '''import { readFile } from "fs";
+const LIMIT: number = 10;
+interface Shape { area(): number; }
+abstract class Base { abstract size(): number; }
+class Counter extends Base implements Shape {
+  constructor(private start: number, public readonly step?: number) { super(); }
+  size(): number { return LIMIT; }
+  area(): number { return helper(this.start); }
+}
+function helper(value: number, scale: number = LIMIT): number { return value * scale; }
+const twice = (x: number): number => helper(helper(x));
+function main(): void {
+  const counter: Counter = new Counter(LIMIT);
+  readFile("a", (err, data) => { console.log(err, data, twice(1)); });
+  main();
+}
+''',
+    "java": '''import java.util.List;
+import java.util.*;
+public class Main {
+    private int count = 0;
+    private static final int LIMIT = 10;
+    public Main(int start) { this.count = start; helper(start); }
+    int helper(int value) { return value + LIMIT; }
+    static <T> T first(List<T> items) { return items.get(0); }
+    void run(String[] args) {
+        int total = helper(count);
+        for (String arg : args) { total += helper(arg.length()); }
+        for (int i = 0; i < total; i++) { this.count += i; }
+        Runnable r = () -> run(args);
+        java.util.function.Function<Integer, Integer> f = x -> helper(x);
+        try { r.run(); } catch (Exception e) { System.out.println(e); }
+        Main.<String>first(List.of("a"));
+        this.helper(total);
+    }
+    record Point(int x, int y) { int sum() { return x + y; } }
+    enum Color { RED; int code() { return helper(1); } }
+}
+''',
+    "python": '''import os
+from os import path as p
+LIMIT = 10
+def helper(value, scale=LIMIT):
+    return value * scale
+class C:
+    def m(self, *args, **kw):
+        return helper(len(args))
+def main():
+    f = lambda x: helper(x)
+    return [f(i) for i in os.listdir(p.curdir)]
+main()
+''',
+}
+
+
+def semantic_edges(asg):
+    return {(edge["source"], edge["target"], edge["type"]) for edge in asg["edges"] if edge["type"] != "contains"}
+
+
+@pytest.mark.parametrize("language", sorted(SAMPLES))
+def test_dict_ast_and_native_tree_give_the_same_edges(language):
+    if language not in available_languages():
+        pytest.skip(f"tree-sitter grammar for {language} is not installed")
+    code = SAMPLES[language]
+    native = create_enhanced_asg(code, language)
+    from_dict = create_enhanced_asg_from_ast(parse_code_to_ast(code, language))
+    edges = semantic_edges(native)
+    assert {edge_type for _, _, edge_type in edges} >= {"calls", "references"}
+    assert semantic_edges(from_dict) == edges
+    # 未带字段名的字典AST按位置查找字段，必须得到与原生语法树相同的调用和引用边。
+
+
+@pytest.mark.parametrize("language", sorted(SAMPLES))
+def test_cached_enhanced_asg_keeps_semantic_edges(language):
+    if language not in available_languages():
+        pytest.skip(f"tree-sitter grammar for {language} is not installed")
+    server = pytest.importorskip("server")
+    tools = {tool.name: tool.fn for tool in server.mcp._tool_manager.list_tools()}
+    code = SAMPLES[language]
+    result = tools["generate_and_cache_enhanced_asg"](code, language)
+    assert semantic_edges(result["asg"]) == semantic_edges(create_enhanced_asg(code, language))
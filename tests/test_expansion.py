@@ -0,0 +1,110 @@
+"""Tests for depth-limited ASTs and the expansion of their stub nodes."""
+# 测试限制深度的AST及其存根节点的展开。
+
+import pytest
+
+from ast_mcp_server.resources import get_subtree
+from ast_mcp_server.tools import expand_ast_node, parse_code_to_ast, parse_code_to_tree
+from ast_mcp_server.tree_store import TreeStore, find_node_by_handle, get_node_handle, tree_store
+
+SOURCE = '''import os
+
+
+class Walker:
+    def walk(self, root="."):
+        for name in os.listdir(root):
+            if name.startswith("_"):
+                continue
+            yield os.path.join(root, name)
+
+
+print(list(Walker().walk()))
+'''
+
+STUB_FIELDS = ("stub", "child_count", "handle")
+
+
+def expand(node, code_hash, max_depth, named_only):
+    """Replace every stub in a depth-limited AST by its expansion, expanding stubs found there in turn."""
+    # 将限制深度AST中的每个存根节点替换为其展开结果，并继续展开其中的存根节点。
+    if node.get("stub"):
+        expanded = expand_ast_node(code_hash, node["handle"], max_depth, named_only=named_only)["ast"]
+        assert len(expanded["children"]) == node["child_count"]
+        if "field" in node:
+            expanded = dict(expanded, field=node["field"])
+        # 展开的子树根节点没有父节点，因此字段名取自存根节点。
+        assert {key: value for key, value in node.items() if key not in STUB_FIELDS} == {
+            key: value for key, value in expanded.items() if key not in STUB_FIELDS + ("children",)
+        }
+        node = expanded
+    if "children" in node:
+        node = dict(node, children=[expand(child, code_hash, max_depth, named_only) for child in node["children"]])
+    return node
+
+
+def max_level(node):
+    return 1 + max((max_level(child) for child in node.get("children", ())), default=-1)
+
+
+@pytest.mark.parametrize("max_depth", [0, 1, 3])
+@pytest.mark.parametrize("named_only", [False, True])
+def test_expanding_stubs_rebuilds_full_ast(max_depth, named_only):
+    full = parse_code_to_ast(SOURCE, "python", named_only=named_only)["ast"]
+    limited = parse_code_to_ast(SOURCE, "python", max_depth=max_depth, named_only=named_only)
+    assert max_level(limited["ast"]) == max_depth
+    assert expand(limited["ast"], limited["code_hash"], max(max_depth, 1), named_only) == full
+    # 逐层展开存根节点得到的AST与完整AST相同。
+
+
+def test_expand_without_depth_limit():
+    limited = parse_code_to_ast(SOURCE, "python", max_depth=1)
+    stub = limited["ast"]["children"][1]
+    assert stub["stub"] and stub["type"] == "class_definition"
+    expanded = expand_ast_node(limited["code_hash"], stub["handle"], None)["ast"]
+    assert expanded == parse_code_to_ast(SOURCE, "python")["ast"]["children"][1]
+
+
+def test_handles_of_nodes_with_the_same_range():
+    parsed = parse_code_to_tree("f()\n", "python")
+    root = parsed["tree"].root_node
+    statement = root.children[0]
+    call = statement.children[0]
+    assert (statement.start_byte, statement.end_byte) == (call.start_byte, call.end_byte)
+    assert find_node_by_handle(root, get_node_handle(statement)) == statement
+    assert find_node_by_handle(root, get_node_handle(call)) == call
+    assert find_node_by_handle(root, "call_0_2") is None
+    assert find_node_by_handle(root, "not a handle") is None
+
+
+def test_expand_errors():
+    limited = parse_code_to_ast(SOURCE, "python", max_depth=1)
+    assert "error" in expand_ast_node("0" * 32, "module_0_1", 1)
+    assert "error" in expand_ast_node(limited["code_hash"], "class_definition_0_1", 1)
+    assert "error" in expand_ast_node(limited["code_hash"], limited["ast"]["children"][1]["handle"], -1)
+    assert "error" in parse_code_to_ast(SOURCE, "python", max_depth=-1)
+
+
+def test_tree_store_evicts_least_recently_used():
+    store = TreeStore(max_trees=2)
+    trees = {}
+    for code in ("a = 1\n", "b = 2\n", "c = 3\n"):
+        parsed = parse_code_to_tree(code, "python")
+        trees[code] = store.put(parsed["tree"], parsed["source_bytes"], "python")
+        if code == "b = 2\n":
+            store.get(trees["a = 1\n"])
+    assert store.get(trees["a = 1\n"]) is not None
+    assert store.get(trees["b = 2\n"]) is None
+    assert store.get(trees["c = 3\n"]).source_bytes == b"c = 3\n"
+
+
+def test_subtree_resource_after_eviction(cache_dir):
+    server = pytest.importorskip("server")
+    tools = {tool.name: tool.fn for tool in server.mcp._tool_manager.list_tools()}
+    result = tools["parse_and_cache"](SOURCE, "python", max_depth=1)
+    code_hash = result["ast"]["code_hash"]
+    handle = result["ast"]["ast"]["children"][1]["handle"]
+    expected = get_subtree(code_hash, handle)
+    tree_store.clear()
+    assert get_subtree(code_hash, handle) == expected
+    assert max_level(expected["ast"]) == 2
+    # 语法树被移出内存后，从缓存的源码重新解析并展开。
@@ -0,0 +1,79 @@
+"""Tests for lazy grammar loading."""
+# 测试语法的延迟加载。
+
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from ast_mcp_server import grammars
+from ast_mcp_server.parser_pool import parser_pool
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_python(code):
+    """Run code in a fresh interpreter from the repository root and return its output."""
+    # 在仓库根目录下用新解释器运行代码并返回其输出。
+    process = subprocess.run([sys.executable, "-c", code], cwd=REPO, capture_output=True, text=True)
+    assert process.returncode == 0, process.stderr
+    return process.stdout.split()
+
+
+def test_grammars_load_on_first_use():
+    loaded = run_python(
+        "import sys\n"
+        "from ast_mcp_server.tools import parse_code_to_ast\n"
+        "from ast_mcp_server import enhanced_tools, queries, sessions\n"
+        "grammar_modules = lambda: ','.join(sorted(name for name in sys.modules if name.startswith('tree_sitter_') and '.' not in name))\n"
+        "print(grammar_modules() or '-')\n"
+        "parse_code_to_ast('x = 1', 'python')\n"
+        "print(grammar_modules())\n"
+    )
+    assert loaded == ["-", "tree_sitter_python"]
+    # 导入时不加载任何语法，解析Python代码时只加载Python语法。
+
+
+def test_concurrent_first_use_loads_once(monkeypatch):
+    monkeypatch.setattr(grammars, "languages", {})
+    monkeypatch.setattr(grammars, "_language_locks", {})
+    imported = []
+    import_module = grammars.importlib.import_module
+    monkeypatch.setattr(grammars.importlib, "import_module", lambda name: imported.append(name) or import_module(name))
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(grammars.get_language("python"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert imported == ["tree_sitter_python"]
+    assert len(results) == 8 and all(result is results[0] for result in results)
+
+
+def test_unknown_and_broken_grammars(monkeypatch):
+    monkeypatch.setitem(grammars.LANGUAGE_MODULES, "broken", "no_such_grammar_module")
+    monkeypatch.setattr(grammars, "_failed", set())
+    assert grammars.get_language("cobol") is None
+    assert grammars.get_language("broken") is None
+    assert grammars._failed == {"broken"}
+    assert "broken" not in grammars.available_languages()
+    assert "python" in grammars.available_languages()
+
+
+def test_warm_up(monkeypatch):
+    parser_pool.clear()
+    assert grammars.warm_up(["python", "cobol"]) == ["python"]
+    assert len(parser_pool._idle["python"]) == 1
+    parser_pool.clear()
+
+    monkeypatch.setenv(grammars.WARM_UP_ENV, " Python, ,java ")
+    warmed = []
+    monkeypatch.setattr(grammars, "warm_up", warmed.append)
+    thread = grammars.start_warm_up()
+    thread.join()
+    assert thread.daemon and warmed == [["python", "java"]]
+    monkeypatch.setenv(grammars.WARM_UP_ENV, "")
+    assert grammars.start_warm_up() is None
+    # 后台预热线程读取环境变量中的语言列表；列表为空时不启动线程。
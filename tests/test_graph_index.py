@@ -0,0 +1,176 @@
+"""Tests for the ASG graph index against brute-force queries on the edge list."""
+# 以边列表上的暴力查询为参照测试ASG图索引。
+
+from collections import defaultdict, deque
+
+import pytest
+
+from ast_mcp_server.asg_index import CALL_EDGE_TYPES, DEFINITION_NODE_TYPES, asg_index_store, build_index
+from ast_mcp_server.asg_model import parse_node_id
+from ast_mcp_server.grammars import available_languages
+from ast_mcp_server.tools import parse_code_to_tree
+
+SAMPLES = {
+    "python": '''import os
+from json import dumps
+
+
+def leaf(value):
+    return dumps(value)
+
+
+def middle(value):
+    return leaf(value) + leaf(os.sep)
+
+
+class Runner:
+    def run(self, values):
+        return [middle(value) for value in values]
+
+    def again(self):
+        return self.run([]) or again_later()
+
+
+def again_later():
+    return Runner().again()
+
+
+print(middle(1))
+''',
+    "javascript": '''import { readFileSync } from "fs";
+function leaf(value) { return readFileSync(value); }
+function middle(value) { return leaf(value) + leaf("x"); }
+class Runner {
+  run(values) { return values.map(value => middle(value)); }
+}
+function again() { return again(); }
+console.log(middle(1));
+''',
+    "java": '''class Runner {
+    int leaf(int value) { return value; }
+    int middle(int value) { return leaf(value) + leaf(1); }
+    int run(int[] values) { int total = 0; for (int value : values) { total += middle(value); } return total; }
+    int again() { return again(); }
+}
+''',
+}
+
+
+def index_of(language):
+    if language not in available_languages():
+        pytest.skip(f"{language} grammar not installed")
+    parsed = parse_code_to_tree(SAMPLES[language], language)
+    return build_index(parsed["tree"], parsed["source_bytes"], language)
+
+
+def edge_list(index):
+    """List every edge of an indexed ASG, including containment, as (source, target, type)."""
+    # 列出已索引ASG的所有边（含包含关系），形式为(源, 目标, 类型)。
+    asg = index.asg
+    edges = [(asg.parent[node], node, "contains") for node in range(1, asg.node_count)]
+    edges.extend(
+        (source, target, asg.edge_types[type_id])
+        for source, target, type_id in zip(asg.edge_source, asg.edge_target, asg.edge_type)
+    )
+    return edges
+
+
+def enclosing_definition(index, node):
+    """Find the nearest definition containing a node by following parents."""
+    # 沿父节点查找包含某节点的最近定义。
+    asg = index.asg
+    node = asg.parent[node]
+    while node >= 0 and asg.node_types[asg.type[node]] not in DEFINITION_NODE_TYPES:
+        node = asg.parent[node]
+    return node if node >= 0 else None
+
+
+@pytest.mark.parametrize("language", sorted(SAMPLES))
+def test_adjacency(language):
+    index = index_of(language)
+    edges = edge_list(index)
+    assert sum(index.edge_counts.values()) == len(edges)
+    outgoing = defaultdict(list)
+    incoming = defaultdict(list)
+    for source, target, edge_type in edges:
+        outgoing[source, edge_type].append(target)
+        incoming[target, edge_type].append(source)
+    for node in range(index.asg.node_count):
+        for edge_type in index.edge_counts:
+            assert list(index.adjacent(node, edge_type, "out")) == outgoing[node, edge_type]
+            assert sorted(index.adjacent(node, edge_type, "in")) == sorted(incoming[node, edge_type])
+        assert list(index.children(node)) == outgoing[node, "contains"]
+        assert index.find_node(index.asg.node_id(node)) == index.find_node(str(node)) == node
+    assert index.find_node("module_1_2") is None and index.find_node(str(index.asg.node_count)) is None
+
+
+@pytest.mark.parametrize("language", sorted(SAMPLES))
+def test_neighbors(language):
+    index = index_of(language)
+    edges = edge_list(index)
+    for node in range(0, index.asg.node_count, 7):
+        reached, truncated = index.neighbors(node, direction="both", depth=2, limit=10 ** 6)
+        expected = set()
+        frontier = {node}
+        for _ in range(2):
+            frontier = {
+                other for source, target, _ in edges for current, other in ((source, target), (target, source))
+                if current in frontier and other != node
+            } - expected
+            expected |= frontier
+        assert {entry["index"] for entry in reached} == expected and not truncated
+        assert all(entry["depth"] in (1, 2) for entry in reached)
+        # 深度为2的双向邻域与在边列表上逐层扩展的结果相同。
+
+    reached, truncated = index.neighbors(index.asg.root, depth=3, limit=5)
+    assert len(reached) == 5 and truncated
+
+
+@pytest.mark.parametrize("language", sorted(SAMPLES))
+def test_call_sites_and_reachable(language):
+    index = index_of(language)
+    calls = [edge for edge in edge_list(index) if edge[2] in CALL_EDGE_TYPES]
+    assert calls
+    call_graph = defaultdict(set)
+    for site, callee, edge_type in calls:
+        if edge_type == "calls":
+            caller = enclosing_definition(index, site)
+            call_graph[index.asg.root if caller is None else caller].add(callee)
+    for node in range(index.asg.node_count):
+        end = index.subtree_end[node]
+        assert sorted(index.call_sites(node, "out")) == sorted(edge for edge in calls if node <= edge[0] < end)
+        assert sorted(index.call_sites(node, "in")) == sorted(edge for edge in calls if edge[1] == node)
+        # 子树内调用点发出的调用边和指向节点的调用边与暴力扫描结果相同。
+
+        reached, _ = index.reachable(node, limit=10 ** 6)
+        depths = {node: 0}
+        queue = deque([node])
+        while queue:
+            current = queue.popleft()
+            for callee in call_graph[current]:
+                if callee not in depths:
+                    depths[callee] = depths[current] + 1
+                    queue.append(callee)
+        del depths[node]
+        assert {entry["index"]: entry["depth"] for entry in reached} == depths
+
+
+def test_graph_tools():
+    server = pytest.importorskip("server")
+    tools = {tool.name: tool.fn for tool in server.mcp._tool_manager.list_tools()}
+    summary = tools["index_asg"](SAMPLES["python"], "python")
+    handle = summary["handle"]
+    index = asg_index_store.get(handle)
+    assert summary["node_count"] == index.asg.node_count
+    leaf = next(node for node in range(index.asg.node_count) if index.asg.text[node] == "leaf")
+    definition = index.enclosing_definition(leaf)
+    callers = tools["asg_callers"](handle, index.asg.node_id(definition))["callers"]
+    middle = SAMPLES["python"].index("def middle")
+    assert [parse_node_id(caller["caller"]["id"])[1] for caller in callers] == [middle, middle]
+    callees = tools["asg_callees"](handle, callers[0]["caller"]["id"])["callees"]
+    assert [callee["callee"]["index"] for callee in callees] == [definition, definition]
+    reachable = tools["asg_reachable"](handle, str(index.asg.root))["reachable"]
+    assert {entry["type"] for entry in reachable} == {"function_definition"}
+    assert "error" in tools["asg_neighbors"](handle, "0", direction="up")
+    assert "error" in tools["asg_neighbors"]("no-such-handle", "0")
+    assert "error" in tools["asg_callees"](handle, "call_0_1")
@@ -0,0 +1,143 @@
+"""Tests for language detection."""
+# 测试语言检测。
+
+import pytest
+
+from ast_mcp_server.grammars import available_languages
+from ast_mcp_server.language_detection import (
+    PREFIX_WINDOW, SUFFIX_WINDOW, LanguageDetector, get_window, language_from_modeline, language_from_shebang
+)
+
+SAMPLES = {
+    "python": '''from collections import OrderedDict
+
+
+class Cache:
+    def __init__(self, size=None):
+        self.items = OrderedDict()
+        self.size = size
+''',
+    "javascript": '''const fs = require("fs");
+function read(name) {
+  return fs.readFileSync(name, "utf8");
+}
+module.exports = { read };
+''',
+    "typescript": '''export interface Shape { area(): number; }
+export function area(shape: Shape): number {
+  const value: number = shape.area();
+  return value;
+}
+''',
+    "java": '''package demo;
+
+import java.util.List;
+
+public class Main {
+    public static void main(String[] args) { System.out.println(args.length); }
+}
+''',
+    "go": '''package main
+
+import "fmt"
+
+func main() {
+    name := "go"
+    fmt.Println(name)
+}
+''',
+    "rust": '''use std::collections::HashMap;
+
+fn main() {
+    let mut counts = HashMap::new();
+    counts.insert("a", 1);
+    println!("{:?}", counts);
+}
+''',
+    "cpp": '''#include <vector>
+using namespace std;
+
+int main() {
+    std::vector<int> items;
+    return 0;
+}
+''',
+}
+
+
+@pytest.mark.parametrize("language", sorted(SAMPLES))
+def test_detect_by_content(language):
+    detector = LanguageDetector()
+    assert detector.detect(SAMPLES[language], verify=False) == language
+
+
+@pytest.mark.parametrize("filename, language", [
+    ("main.PY", "python"), ("index.mjs", "javascript"), ("app.ts", "typescript"), ("Main.java", "java"), ("lib.rs", "rust")
+])
+def test_extension_wins(filename, language):
+    assert LanguageDetector().detect(SAMPLES["go"], filename) == language
+
+
+@pytest.mark.parametrize("line, language", [
+    ("#!/usr/bin/python3.11", "python"),
+    ("#!/usr/bin/env node", "javascript"),
+    ("#!/usr/bin/env -S deno run --allow-read", "typescript"),
+    ("#!/usr/bin/env FOO=1 python", "python"),
+    ("#!/bin/sh", None),
+])
+def test_shebang(line, language):
+    assert language_from_shebang(line + "\nx = 1\n") == language
+
+
+@pytest.mark.parametrize("line, language", [
+    ("# vim: set ft=python :", "python"),
+    ("// vi: filetype=javascript", "javascript"),
+    ("// -*- mode: C++; indent-tabs-mode: nil -*-", "cpp"),
+    ("# -*- python -*-", "python"),
+    ("# -*- coding: utf-8 -*-", None),
+])
+def test_modeline(line, language):
+    assert language_from_modeline(SAMPLES["go"] + line + "\n") == language
+
+
+def test_window_is_bounded():
+    middle = "x" * 10 + "\n"
+    code = SAMPLES["python"] + middle * 100000 + "print(None)\n"
+    window = get_window(code)
+    assert len(window) <= PREFIX_WINDOW + SUFFIX_WINDOW
+    assert window.startswith(SAMPLES["python"]) and window.endswith("print(None)\n")
+    assert LanguageDetector().detect(code, verify=False) == "python"
+    # 大文件只查看开头和结尾的完整行。
+
+
+def test_results_are_cached(monkeypatch):
+    detector = LanguageDetector(cache_size=2)
+    calls = []
+    detect_window = detector._detect_window
+    monkeypatch.setattr(detector, "_detect_window", lambda *args: calls.append(args[0]) or detect_window(*args))
+    for _ in range(3):
+        assert detector.detect(SAMPLES["java"], verify=False) == "java"
+    assert len(calls) == 1
+    detector.detect(SAMPLES["go"], verify=False)
+    detector.detect(SAMPLES["rust"], verify=False)
+    detector.detect(SAMPLES["java"], verify=False)
+    assert len(calls) == 4
+    # 缓存容量为2，最久未使用的结果被淘汰。
+
+
+def test_trial_parse_breaks_ties():
+    candidates = ["python", "javascript", "java"]
+    code = "String name = args[0];\nint count = name.length();\n"
+    assert LanguageDetector().detect(code, candidates=candidates, verify=False) == "javascript"
+    assert LanguageDetector().detect(code, candidates=candidates) == "java"
+    # 得分相同时，试解析错误最少的语言胜出。
+
+
+def test_trial_parse_confirms_typescript():
+    candidates = [language for language in ("javascript", "typescript") if language in available_languages()]
+    if len(candidates) < 2:
+        pytest.skip("javascript and typescript grammars are needed")
+    code = "let total = items.reduce((sum, item) => sum + item, 0);\n"
+    assert LanguageDetector().detect(code, candidates=candidates) == "javascript"
+    typed = "let total: number = items.reduce((sum, item) => sum + item, 0);\n"
+    assert LanguageDetector().detect(typed, candidates=candidates, verify=True) == "typescript"
@@ -0,0 +1,77 @@
+"""Tests for the table-driven language plugins."""
+# 测试表驱动的语言插件。
+
+import pytest
+
+from ast_mcp_server.grammars import available_languages
+from ast_mcp_server.languages import LANGUAGE_SPECS, LanguagePlugin, get_language_plugin
+from ast_mcp_server.serialization import iter_preorder
+from ast_mcp_server.tools import analyze_code_structure, parse_code_to_tree
+
+SAMPLES = {
+    "python": "def f(x):\n    if x:\n        return [y for y in x]\n",
+    "javascript": "class Box { put(item, key = 1) { if (key) { for (;;) { break; } } } }\n",
+    "typescript": "interface Shape { area(): number; }\nfunction f(x: number): number { if (x) { return x; } return 0; }\n",
+    "java": "class Box { void put(Object item, int n) { if (n > 0) { while (true) {} } } }\n",
+}
+
+
+def plugin_of(language):
+    if language not in available_languages():
+        pytest.skip(f"{language} grammar not installed")
+    return get_language_plugin(language)
+
+
+@pytest.mark.parametrize("language", sorted(LANGUAGE_SPECS))
+def test_flags_match_spec(language):
+    plugin = plugin_of(language)
+    categories = LanguagePlugin.categories(plugin.spec)
+    grammar = plugin.language
+    for kind_id in range(grammar.node_kind_count):
+        kind = grammar.node_kind_for_id(kind_id)
+        expected = 0
+        if grammar.node_kind_is_named(kind_id):
+            for flag, kinds in categories:
+                if kind in kinds:
+                    expected |= flag
+        assert plugin.flags[kind_id] == expected, kind
+    # 每个类型ID（包括别名类型的所有ID）的标志都与描述中按名称列出的类别一致；匿名类型不带标志。
+
+
+@pytest.mark.parametrize("language", sorted(SAMPLES))
+def test_classify_native_nodes(language):
+    plugin = plugin_of(language)
+    root = parse_code_to_tree(SAMPLES[language], language)["tree"].root_node
+    for node, _ in iter_preorder(root):
+        expected = 0
+        if node.is_named:
+            for flag, kinds in LanguagePlugin.categories(plugin.spec):
+                if node.type in kinds:
+                    expected |= flag
+        assert plugin.kind_flags(node) == expected
+
+
+def test_error_nodes_have_no_flags():
+    plugin = plugin_of("python")
+    root = parse_code_to_tree("def f(:\n    )))\n", "python")["tree"].root_node
+    errors = [node for node, _ in iter_preorder(root) if node.is_error]
+    assert errors and all(plugin.kind_flags(node) == 0 for node in errors)
+
+
+def test_plugins_are_resolved_once():
+    assert get_language_plugin("python") is plugin_of("python")
+    assert get_language_plugin("cobol") is None
+
+
+@pytest.mark.parametrize("language, functions, classes, nesting", [
+    ("javascript", [("put", ["item", "key"])], ["Box"], 2),
+    ("typescript", [("f", ["x"])], ["Shape"], 1),
+    ("java", [("put", ["item", "n"])], ["Box"], 2),
+])
+def test_structure_from_plugin(language, functions, classes, nesting):
+    plugin_of(language)
+    structure = analyze_code_structure(SAMPLES[language], language)
+    assert [(function["name"], function["parameters"]) for function in structure["functions"]] == functions
+    assert [cls["name"] for cls in structure["classes"]] == classes
+    assert structure["complexity_metrics"]["max_nesting_level"] == nesting
+    # 非Python语言的结构分析同样由语言描述驱动。
@@ -0,0 +1,85 @@
+"""Tests for the per-language parser pool."""
+# 测试按语言划分的解析器池。
+
+import threading
+
+import pytest
+from tree_sitter import Parser
+
+from ast_mcp_server.parser_pool import ParserPool
+from ast_mcp_server.tools import get_language
+
+CODE = b"def f(x):\n    return x + 1\n"
+
+
+@pytest.fixture
+def python():
+    return get_language("python")
+
+
+def test_thread_reuses_its_parser(python):
+    pool = ParserPool()
+    with pool.parser("python", python) as first:
+        pass
+    with pool.parser("python", python) as second:
+        assert second is first
+        with pool.parser("python", python) as nested:
+            assert nested is not first
+            # 线程本地解析器被占用时，嵌套借出得到另一个解析器。
+    with pool.parser("python", python) as third:
+        assert third is first
+
+
+def test_nested_parsers_return_to_shared_pool(python):
+    pool = ParserPool(max_size=1)
+    outer = pool.checkout("python", python)
+    inner = [pool.checkout("python", python) for _ in range(3)]
+    pool.checkin("python", outer)
+    for parser in inner:
+        pool.checkin("python", parser)
+    assert pool._idle["python"] == [inner[0]]
+    # 线程本地解析器已存在时，其余解析器放回共享池，超出max_size的被丢弃。
+    assert pool.checkout("python", python) is outer
+    assert pool.checkout("python", python) is inner[0]
+
+
+def test_parser_is_discarded_after_an_error(python):
+    pool = ParserPool()
+    with pytest.raises(RuntimeError):
+        with pool.parser("python", python) as failed:
+            raise RuntimeError("parse failed")
+    with pool.parser("python", python) as parser:
+        assert parser is not failed
+
+
+def test_prime_fills_shared_pool(python):
+    pool = ParserPool(max_size=2)
+    pool.prime("python", python, count=5)
+    assert len(pool._idle["python"]) == 2
+    pool.prime("python", python, count=1)
+    assert len(pool._idle["python"]) == 2
+    pool.clear()
+    assert not pool._idle
+
+
+def test_concurrent_parses(python):
+    pool = ParserPool()
+    expected = str(Parser(python).parse(CODE).root_node)
+    errors = []
+    used = set()
+
+    def worker():
+        for _ in range(50):
+            with pool.parser("python", python) as parser:
+                used.add(id(parser))
+                if str(parser.parse(CODE).root_node) != expected:
+                    errors.append(parser)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    assert len(used) <= len(threads)
+    # 每个线程复用自己的解析器，不会为每次解析新建解析器。
@@ -0,0 +1,94 @@
+"""Tests for position lookup on native trees."""
+# 测试原生语法树上的位置查找。
+
+import pytest
+
+from ast_mcp_server.positions import ancestors_of, describe_nodes, node_at_byte, node_at_point
+from ast_mcp_server.tools import parse_code_to_tree
+from ast_mcp_server.tree_diff import node_id
+
+SOURCE = '''import os
+
+
+class Walker:
+    """Walk a directory."""
+
+    def walk(self, root="."):
+        for name in os.listdir(root):
+            if name.startswith("_"):
+                continue
+            yield os.path.join(root, name)
+'''
+
+
+def parse(code):
+    parsed = parse_code_to_tree(code, "python")
+    return parsed["tree"].root_node, parsed["source_bytes"]
+
+
+def leaves(node):
+    """List the leaves of a tree in source order."""
+    # 按源码顺序列出语法树的叶节点。
+    if node.child_count == 0:
+        return [node]
+    return [leaf for child in node.children for leaf in leaves(child)]
+
+
+def parent_chain(node, named_only=False):
+    """List the ancestors of a node from the root down by following parent links."""
+    # 沿父节点链接列出节点从根节点向下的祖先。
+    chain = []
+    current = node.parent
+    while current is not None:
+        if current.is_named or not named_only:
+            chain.append(current)
+        current = current.parent
+    return chain[::-1]
+
+
+def named_self_or_ancestor(node):
+    while not node.is_named:
+        node = node.parent
+    return node
+
+
+@pytest.mark.parametrize("named_only", [False, True])
+def test_lookup_inside_every_token(named_only):
+    root, source = parse(SOURCE)
+    for leaf in leaves(root):
+        if leaf.end_byte - leaf.start_byte < 2:
+            continue
+        offset = leaf.start_byte + 1
+        expected = named_self_or_ancestor(leaf) if named_only else leaf
+        node = node_at_byte(root, offset, named_only)
+        assert node == expected
+        assert node_at_point(root, leaf.start_point[0], leaf.start_point[1] + 1, named_only) == expected
+        assert ancestors_of(root, node, named_only) == parent_chain(node, named_only)
+        # 在每个词法单元内部查找到的节点与按父链接推得的结果相同，祖先链也相同。
+
+
+def test_describe_nodes_shares_ancestors():
+    root, source = parse(SOURCE)
+    offsets = [SOURCE.index("listdir"), SOURCE.index("startswith"), SOURCE.index("listdir") + 2]
+    nodes = [node_at_byte(root, offset) for offset in offsets]
+    table, results = describe_nodes(root, source, nodes)
+    assert [entry["node"] for entry in results] == [node_id(node) for node in nodes]
+    assert [table[entry["node"]]["text"] for entry in results] == ["listdir", "startswith", "listdir"]
+    for node, entry in zip(nodes, results):
+        assert entry["ancestors"] == [node_id(ancestor) for ancestor in parent_chain(node)]
+        assert all("text" not in table[ancestor] for ancestor in entry["ancestors"])
+    assert results[0]["ancestors"] is results[2]["ancestors"]
+    # 同一节点的祖先链只计算一次，祖先只记录ID、类型和范围。
+    assert set(table) == {entry["node"] for entry in results} | {
+        ancestor for entry in results for ancestor in entry["ancestors"]
+    }
+
+
+def test_find_node_at_position_tool():
+    server = pytest.importorskip("server")
+    tools = {tool.name: tool.fn for tool in server.mcp._tool_manager.list_tools()}
+    line = SOURCE.splitlines().index('            if name.startswith("_"):')
+    result = tools["find_node_at_position"](SOURCE, line, 21, "python")
+    assert result["node"]["text"] == "startswith"
+    assert [ancestor["type"] for ancestor in result["ancestors"]][:3] == ["module", "class_definition", "block"]
+    assert "error" in tools["find_node_at_position"](SOURCE, 99, 0, "python")
@@ -0,0 +1,68 @@
+"""Tests for tree-sitter queries on code."""
+# 测试在代码上执行tree-sitter查询。
+
+import pytest
+
+from ast_mcp_server.queries import compile_query, query_code
+
+SOURCE = '''def first(items):
+    return items[0]
+
+
+class Box:
+    def get(self):
+        return first(self.items)
+
+    def put(self, item):
+        self.items.append(item)
+'''
+
+FUNCTION_NAMES = "(function_definition name: (identifier) @name parameters: (parameters) @params)"
+
+
+def test_query_returns_captures_in_source_order():
+    result = query_code(SOURCE, FUNCTION_NAMES, "python")
+    assert result["match_count"] == 3 and not result["truncated"]
+    names = [[(capture["name"], capture["text"]) for capture in match["captures"]] for match in result["matches"]]
+    assert names == [
+        [("name", "first"), ("params", "(items)")],
+        [("name", "get"), ("params", "(self)")],
+        [("name", "put"), ("params", "(self, item)")]
+    ]
+    capture = result["matches"][0]["captures"][0]
+    assert "children" not in capture
+    assert SOURCE.encode()[capture["start_byte"]:capture["end_byte"]] == b"first"
+    # 每个捕获只包含节点本身，不含子节点。
+
+
+def test_query_options():
+    result = query_code(SOURCE, FUNCTION_NAMES, "python", max_matches=2, text_mode="none", positions="points")
+    assert result["match_count"] == 2 and result["truncated"]
+    capture = result["matches"][1]["captures"][0]
+    assert set(capture) == {"type", "start_point", "end_point", "name"}
+    assert capture["start_point"] == {"row": 5, "column": 8}
+    assert "error" in query_code(SOURCE, FUNCTION_NAMES, "python", text_mode="some")
+
+
+def test_invalid_query():
+    assert "Invalid query" in query_code(SOURCE, "(function_definition", "python")["error"]
+    assert "Invalid query" in query_code(SOURCE, "(no_such_node) @x", "python")["error"]
+
+
+def test_compiled_queries_are_cached():
+    compile_query.cache_clear()
+    for _ in range(3):
+        query_code(SOURCE, FUNCTION_NAMES, "python")
+    query_code(SOURCE, "(call) @call", "python")
+    info = compile_query.cache_info()
+    assert (info.misses, info.hits) == (2, 2)
+    assert compile_query("python", FUNCTION_NAMES) is compile_query("python", FUNCTION_NAMES)
+    # 相同(语言, 模式)的查询只编译一次。
+
+
+def test_query_tool():
+    server = pytest.importorskip("server")
+    tools = {tool.name: tool.fn for tool in server.mcp._tool_manager.list_tools()}
+    result = tools["query_ast"](SOURCE, "(call function: (identifier) @callee)", filename="box.py")
+    assert result["language"] == "python"
+    assert [match["captures"][0]["text"] for match in result["matches"]] == ["first"]
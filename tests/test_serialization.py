@@ -0,0 +1,188 @@
+"""Tests for the cursor-based AST serializers."""
+# 测试基于游标的AST序列化器。
+
+import pytest
+
+from ast_mcp_server.enhanced_tools import create_enhanced_asg, create_enhanced_asg_from_ast
+from ast_mcp_server.grammars import available_languages
+from ast_mcp_server.resources import get_code_hash, load_cached_resource, load_view
+from ast_mcp_server.serialization import Projection, cursor_to_dict, iter_preorder
+from ast_mcp_server.tools import node_to_dict, parse_code_to_ast, parse_code_to_tree
+
+SAMPLES = {
+    "python": '''import os
+
+
+class Greeter:
+    """Say hello to the wörld. \U0001F44B"""
+
+    def greet(self, name: str = "x") -> str:
+        return f"hello, {name}" if name else None
+
+
+print(Greeter().greet(os.sep))
+''',
+    "javascript": '''const greet = (name = "wörld") => `hello, ${name}`;
+class Greeter { run(names) { return names.map(n => greet(n)); } }
+console.log(new Greeter().run(["a", "\U0001F44B"]));
+''',
+    "java": '''public class Greeter {
+    // Say hello to the wörld
+    static String greet(String name) { return "hello, " + name; }
+    public static void main(String[] args) { System.out.println(greet(args[0])); }
+}
+''',
+}
+
+
+def parse(code, language):
+    parsed = parse_code_to_tree(code, language)
+    return parsed["tree"].root_node, parsed["source_bytes"]
+
+
+def project(node, text_mode, positions):
+    """Apply a projection to a fully serialized AST by dropping or shortening its fields."""
+    # 对完整序列化的AST应用投影：删除或截断相应字段。
+    result = dict(node)
+    if positions == "bytes":
+        del result["start_point"], result["end_point"]
+    elif positions == "points":
+        del result["start_byte"], result["end_byte"]
+    if text_mode == "none" or (text_mode == "leaves-only" and "children" in node):
+        del result["text"]
+    elif text_mode.startswith("truncated:"):
+        result["text"] = result["text"][:int(text_mode.split(":")[1])]
+    if "children" in node:
+        result["children"] = [project(child, text_mode, positions) for child in node["children"]]
+    return result
+
+
+def named_tree(node, source, field=None):
+    """Serialize the named nodes of a native tree by recursion, with field names."""
+    # 递归序列化原生语法树中的具名节点，并附带字段名。
+    result = node_to_dict(node, source, include_children=False)
+    if field is not None:
+        result["field"] = field
+    children = [
+        named_tree(child, source, node.field_name_for_child(index))
+        for index, child in enumerate(node.children) if child.is_named
+    ]
+    if children:
+        result["children"] = children
+    return result
+
+
+def recursive_preorder(node, depth=0):
+    """List (node, depth) pairs of a subtree by recursion."""
+    # 递归列出子树的(节点, 深度)对。
+    pairs = [(node, depth)]
+    for child in node.children:
+        pairs.extend(recursive_preorder(child, depth + 1))
+    return pairs
+
+
+@pytest.mark.parametrize("language", sorted(SAMPLES))
+def test_cursor_serializer_matches_recursive(language):
+    if language not in available_languages():
+        pytest.skip(f"{language} grammar not installed")
+    root, source = parse(SAMPLES[language], language)
+    assert cursor_to_dict(root, source) == node_to_dict(root, source)
+    assert cursor_to_dict(root, source, include_children=False) == node_to_dict(root, source, include_children=False)
+    method = root.named_children[-1]
+    assert cursor_to_dict(method, source) == node_to_dict(method, source)
+    # 整棵树、不含子节点的根节点以及子树的序列化结果都与递归实现相同。
+
+
+@pytest.mark.parametrize("language", sorted(SAMPLES))
+def test_iter_preorder_matches_recursion(language):
+    if language not in available_languages():
+        pytest.skip(f"{language} grammar not installed")
+    root, _ = parse(SAMPLES[language], language)
+    assert list(iter_preorder(root)) == recursive_preorder(root)
+    subtree = root.named_children[-1]
+    assert list(iter_preorder(subtree)) == recursive_preorder(subtree)
+
+
+def test_serializer_option():
+    code = SAMPLES["python"]
+    cursor = parse_code_to_ast(code, "python")
+    recursive = parse_code_to_ast(code, "python", serializer="recursive")
+    assert cursor["ast"] == recursive["ast"]
+    assert "error" in parse_code_to_ast(code, "python", serializer="fastest")
+
+
+@pytest.mark.parametrize("language", sorted(SAMPLES))
+def test_named_only(language):
+    if language not in available_languages():
+        pytest.skip(f"{language} grammar not installed")
+    root, source = parse(SAMPLES[language], language)
+    assert parse_code_to_ast(SAMPLES[language], language, named_only=True)["ast"] == named_tree(root, source)
+    assert [node for node, _ in iter_preorder(root, named_only=True)] == [
+        node for node, _ in iter_preorder(root) if node.is_named
+    ]
+
+
+@pytest.mark.parametrize("language", sorted(SAMPLES))
+def test_named_only_keeps_semantic_edges(language):
+    if language not in available_languages():
+        pytest.skip(f"{language} grammar not installed")
+
+    def semantic_edges(asg):
+        return sorted((edge["source"], edge["target"], edge["type"]) for edge in asg["edges"] if edge["type"] != "contains")
+
+    code = SAMPLES[language]
+    expected = semantic_edges(create_enhanced_asg(code, language))
+    assert expected
+    assert semantic_edges(create_enhanced_asg(code, language, named_only=True)) == expected
+    assert semantic_edges(create_enhanced_asg_from_ast(parse_code_to_ast(code, language, named_only=True))) == expected
+    # 去掉匿名节点后，无论直接由语法树还是由字典AST构建，语义边都不变。
+
+
+def test_deep_input_does_not_recurse():
+    depth = 5000
+    code = "x = " + "(" * depth + "1" + ")" * depth + "\n"
+    root, source = parse(code, "python")
+    ast = cursor_to_dict(root, source)
+    deepest = 0
+    stack = [(ast, 0)]
+    while stack:
+        node, level = stack.pop()
+        deepest = max(deepest, level)
+        stack.extend((child, level + 1) for child in node.get("children", ()))
+    assert deepest == max(level for _, level in iter_preorder(root)) > depth
+
+
+@pytest.mark.parametrize("text_mode", ["full", "none", "leaves-only", "truncated:0", "truncated:3", "truncated:40"])
+@pytest.mark.parametrize("positions", ["both", "bytes", "points"])
+def test_projection(text_mode, positions):
+    code = SAMPLES["python"]
+    full = parse_code_to_ast(code, "python")["ast"]
+    projected = parse_code_to_ast(code, "python", text_mode=text_mode, positions=positions)["ast"]
+    assert projected == project(full, text_mode, positions)
+    # 非ASCII源码的截断按字符计，不会切开多字节字符。
+
+
+@pytest.mark.parametrize("text_mode, positions", [("partial", "both"), ("truncated:x", "both"), ("truncated:-1", "both"), ("full", "rows")])
+def test_invalid_projection(text_mode, positions):
+    with pytest.raises(ValueError):
+        Projection(text_mode, positions)
+    assert "error" in parse_code_to_ast("x = 1", "python", text_mode=text_mode, positions=positions)
+
+
+def test_projection_requires_cursor_serializer():
+    result = parse_code_to_ast("x = 1", "python", serializer="recursive", text_mode="none")
+    assert "error" in result
+
+
+def test_projected_ast_is_cached_as_a_view(cache_dir):
+    server = pytest.importorskip("server")
+    tools = {tool.name: tool.fn for tool in server.mcp._tool_manager.list_tools()}
+    code = SAMPLES["python"]
+    code_hash = get_code_hash(code)
+    projected = tools["parse_and_cache"](code, "python", text_mode="truncated:5", positions="bytes")
+    assert projected["resource_uri"] == f"ast://{code_hash}/view/text_mode=truncated.5,positions=bytes"
+    full = tools["parse_and_cache"](code, "python")
+    assert full["resource_uri"] == f"ast://{code_hash}"
+    assert load_view(code_hash, "ast", "text_mode=truncated.5,positions=bytes") == projected["ast"]
+    assert load_cached_resource(code_hash, "ast") == full["ast"]
+    # 投影后的AST单独缓存，不会覆盖完整AST。
@@ -0,0 +1,82 @@
+"""Tests for LSP-style edits on document sessions."""
+# 测试文档会话上的LSP风格编辑。
+
+import pytest
+
+from ast_mcp_server.sessions import document_sessions, edit_session, locate_positions, open_session
+from ast_mcp_server.tools import parse_code_to_tree
+
+SOURCE = '''def wave(name):
+    emoji = "\U0001F44B\U0001F30D"
+    return emoji + " " + name
+
+
+print(wave("wörld"))
+'''
+
+
+@pytest.fixture
+def code_id():
+    session, error = open_session("doc", SOURCE, "python")
+    assert error is None
+    yield session.code_id
+    document_sessions.pop(session.code_id)
+
+
+def position(line, character):
+    return {"line": line, "character": character}
+
+
+def edit(start, end, text):
+    return {"range": {"start": start, "end": end}, "text": text}
+
+
+def check_session(code_id, expected):
+    """Check that a session holds the expected source and the tree a fresh parse gives for it."""
+    # 检查会话的源码与预期相同，且语法树与完整解析的结果相同。
+    session = document_sessions.get(code_id)
+    assert session.source_bytes.decode("utf-8") == expected
+    fresh = parse_code_to_tree(expected, "python")["tree"]
+    assert str(session.tree.root_node) == str(fresh.root_node)
+    assert session.tree.root_node.end_point == fresh.root_node.end_point
+    assert session.line_index().starts == type(session.line_index())(session.source_bytes).starts
+
+
+def test_edits_after_astral_characters(code_id):
+    # 第1行中两个表情符号各占两个UTF-16码元，闭合引号位于第17个码元处。
+    result = edit_session(code_id, [edit(position(1, 17), position(1, 18), '" * 2')])
+    assert "error" not in result
+    check_session(code_id, SOURCE.replace('\U0001F30D"', '\U0001F30D" * 2'))
+
+
+def test_edits_apply_in_order(code_id):
+    edits = [
+        edit(position(1, 15), position(1, 17), "\U0001F600"),
+        edit(position(1, 17), position(1, 17), "!"),
+        edit(position(5, 11), position(5, 18), '"there"'),
+        edit(position(6, 0), position(6, 0), "x = 1\n")
+    ]
+    result = edit_session(code_id, edits)
+    assert "error" not in result
+    expected = SOURCE.replace("\U0001F30D", "\U0001F600!").replace('"wörld"', '"there"') + "x = 1\n"
+    check_session(code_id, expected)
+
+
+@pytest.mark.parametrize("encoding, character", [("utf-16", 15), ("utf-32", 14), ("utf-8", 17)])
+def test_position_encodings(code_id, encoding, character):
+    result = edit_session(code_id, [edit(position(1, character), position(1, character), "+")], encoding)
+    assert "error" not in result
+    check_session(code_id, SOURCE.replace("\U0001F44B", "\U0001F44B+"))
+
+
+def test_invalid_edit_leaves_session_unchanged(code_id):
+    result = edit_session(code_id, [edit(position(0, 0), position(0, 1), "x"), {"range": {"start": position(0, 0)}}])
+    assert "error" in result
+    check_session(code_id, SOURCE)
+
+
+
+def test_locate_after_astral_characters(code_id):
+    result = locate_positions(code_id, [position(2, 11), position(5, 13)])
+    nodes = [result["nodes"][entry["node"]] for entry in result["results"]]
+    assert [node["text"] for node in nodes] == ["emoji", "wörld"]
@@ -0,0 +1,60 @@
+"""Tests for the deferred work at server start and the cold-start measurement."""
+# 测试服务器启动时推迟的工作以及冷启动测量。
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+from ast_mcp_server.startup import format_report, main, measure_startup
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_server_import_defers_optional_work(tmp_path):
+    pytest.importorskip("mcp")
+    code = (
+        "import sys, server\n"
+        "print(','.join(sorted(name for name in sys.modules if name.split('.')[0] in "
+        "('msgpack', 'cbor2') or name.startswith('tree_sitter_'))) or '-')\n"
+    )
+    env = dict(os.environ, TMPDIR=str(tmp_path))
+    process = subprocess.run([sys.executable, "-c", code], cwd=REPO, env=env, capture_output=True, text=True)
+    assert process.returncode == 0, process.stderr
+    assert process.stdout.split() == ["-"]
+    assert list(tmp_path.iterdir()) == []
+    # 导入服务器时不导入语法和二进制编解码器，也不创建缓存目录。
+
+
+def test_measure_startup():
+    report = measure_startup("ast_mcp_server.tools")
+    assert "error" not in report
+    assert report["module"] == "ast_mcp_server.tools"
+    assert report["total_ms"] >= report["self_ms"] >= 0
+    modules = [entry["module"] for entry in report["imports"]]
+    assert "ast_mcp_server.serialization" in modules
+    assert [entry["ms"] for entry in report["imports"]] == sorted((entry["ms"] for entry in report["imports"]), reverse=True)
+    assert "error" in measure_startup("no_such_module_here")
+
+
+def test_format_report():
+    report = {
+        "module": "server", "total_ms": 10.0, "self_ms": 2.0,
+        "imports": [{"module": "mcp", "ms": 6.0}, {"module": "ast_mcp_server.tools", "ms": 2.0}]
+    }
+    lines = format_report(report, budget_ms=5).splitlines()
+    assert lines[0] == "Cold-start import time of server: 10.0 ms"
+    assert lines[1] == "Budget: 5.0 ms (OVER budget)"
+    assert lines[-3:] == [
+        "       6.0  60.0%  mcp",
+        "       2.0  20.0%  ast_mcp_server.tools",
+        "       2.0  20.0%  server (self)"
+    ]
+    assert "within budget" in format_report(report, budget_ms=10)
+
+
+def test_budget_exit_status(capsys):
+    assert main(["--measure-startup", "--module", "ast_mcp_server.codecs", "--budget-ms", "100000"]) == 0
+    assert main(["--measure-startup", "--module", "ast_mcp_server.codecs", "--budget-ms", "0"]) == 1
+    assert "OVER budget" in capsys.readouterr().out
@@ -0,0 +1,98 @@
+"""Tests for the code structure analysis on native trees."""
+# 测试在原生语法树上进行的代码结构分析。
+
+import glob
+import os
+
+import pytest
+
+from ast_mcp_server.tools import analyze_code_structure, parse_code_to_ast
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SOURCE = '''import os
+import os.path
+from collections import OrderedDict as Ordered
+
+
+class Walker:
+    def walk(self, root, *names, depth=1):
+        for name in os.listdir(root):
+            if name.startswith("_"):
+                while depth:
+                    depth -= 1
+            try:
+                with open(name) as f:
+                    yield f
+            except OSError:
+                pass
+
+
+def main(argv):
+    def inner(x):
+        return x
+    return inner(argv)
+'''
+
+NESTING_TYPES = ("if_statement", "for_statement", "while_statement", "try_statement", "with_statement")
+
+
+def analyze_dict_ast(ast):
+    """Analyze a Python dictionary AST the way analyze_code_structure did before it used native trees."""
+    # 按analyze_code_structure改用原生语法树之前的方式分析Python字典AST。
+    functions, classes, imports = [], [], []
+    total_nodes = 0
+    max_nesting = 0
+    stack = [(ast, 0)]
+    while stack:
+        node, nesting = stack.pop()
+        total_nodes += 1
+        if node["type"] in NESTING_TYPES:
+            nesting += 1
+            max_nesting = max(max_nesting, nesting)
+        children = node.get("children", [])
+        location = {"start_line": node["start_point"]["row"] + 1, "end_line": node["end_point"]["row"] + 1}
+        name = next((child["text"] for child in children if child["type"] == "identifier"), "")
+        if node["type"] == "function_definition":
+            params = [
+                param["text"]
+                for child in children if child["type"] == "parameters"
+                for param in child.get("children", []) if param["type"] == "identifier"
+            ]
+            functions.append({"name": name, "location": location, "parameters": params})
+        elif node["type"] == "class_definition":
+            classes.append({"name": name, "location": location})
+        elif node["type"] in ("import_statement", "import_from_statement"):
+            module = ".".join(child["text"] for child in children if child["type"] == "dotted_name")
+            imports.append({"module": module, "line": node["start_point"]["row"] + 1})
+        stack.extend((child, nesting) for child in reversed(children))
+    return {
+        "functions": functions,
+        "classes": classes,
+        "imports": imports,
+        "complexity_metrics": {"max_nesting_level": max_nesting, "total_nodes": total_nodes}
+    }
+
+
+def test_structure():
+    structure = analyze_code_structure(SOURCE, "python")
+    assert [(f["name"], f["parameters"]) for f in structure["functions"]] == [
+        ("walk", ["self", "root"]), ("main", ["argv"]), ("inner", ["x"])
+    ]
+    assert structure["classes"] == [{"name": "Walker", "location": {"start_line": 6, "end_line": 16}}]
+    assert structure["imports"] == [
+        {"module": "os", "line": 1}, {"module": "os.path", "line": 2}, {"module": "collections", "line": 3}
+    ]
+    assert structure["complexity_metrics"]["max_nesting_level"] == 3
+    assert structure["code_length"] == len(SOURCE)
+
+
+@pytest.mark.parametrize("path", sorted(glob.glob(os.path.join(REPO, "ast_mcp_server", "*.py"))) + [os.path.join(REPO, "server.py")])
+def test_structure_matches_dict_analysis(path):
+    with open(path, encoding="utf-8") as f:
+        code = f.read()
+    structure = analyze_code_structure(code, "python")
+    expected = analyze_dict_ast(parse_code_to_ast(code, "python")["ast"])
+    assert {key: structure[key] for key in expected} == expected
+    # 与基于字典AST的分析结果相同。
+
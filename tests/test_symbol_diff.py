@@ -0,0 +1,151 @@
+"""Tests for the symbol-level diff."""
+# 测试符号级差异。
+
+import pytest
+
+from ast_mcp_server.enhanced_tools import diff_code_symbols
+from ast_mcp_server.grammars import available_languages
+from ast_mcp_server.languages import get_language_plugin
+from ast_mcp_server.symbol_diff import HASH_BASE, HASH_MODULUS, DefinitionCollector, collect_definitions
+from ast_mcp_server.tools import parse_code_to_tree
+from ast_mcp_server.visitors import TreeWalker
+
+SOURCE = '''import os
+
+
+def helper(a, b):
+    return a + b
+
+
+class Box:
+    def put(self, item):
+        self.item = item
+
+    def get(self):
+        return self.item
+
+
+def main():
+    return helper(1, 2)
+'''
+
+
+def changes_of(old_code, new_code, language="python"):
+    """Map each changed definition name to its change kind."""
+    # 将每个变更的定义名映射到其变更类型。
+    result = diff_code_symbols(old_code, new_code, language)
+    assert "error" not in result
+    return {change["name"]: change["change"] for change in result["changes"]}, result["summary"]
+
+
+def test_identical_code_has_no_changes():
+    changes, summary = changes_of(SOURCE, SOURCE)
+    assert changes == {}
+    assert summary == {"added": 0, "removed": 0, "modified": 0, "moved": 0, "unchanged": 5}
+
+
+def test_whitespace_and_comments_are_not_modifications():
+    new = SOURCE.replace("return a + b", "# adds\n    return a  +  b  # sum").replace("class Box:", "class Box:  # box")
+    changes, summary = changes_of(SOURCE, new)
+    assert changes == {}
+    assert summary["unchanged"] == 5
+
+
+def test_body_change_modifies_only_the_innermost_definition():
+    changes, _ = changes_of(SOURCE, SOURCE.replace("self.item = item", "self.item = [item]"))
+    assert changes == {"Box.put": "modified"}
+    # 嵌套定义的变更只计入自身，外层类不算修改。
+
+
+def test_python_indentation_counts():
+    old = "def f(x):\n    if x:\n        a()\n    b()\n"
+    new = "def f(x):\n    if x:\n        a()\n        b()\n"
+    changes, _ = changes_of(old, new)
+    assert changes == {"f": "modified"}
+
+
+def test_added_and_removed():
+    new = SOURCE.replace("    def get(self):\n        return self.item\n", "    def size(self):\n        return 1\n")
+    changes, summary = changes_of(SOURCE, new)
+    assert changes == {"Box.size": "added", "Box.get": "removed"}
+    assert (summary["added"], summary["removed"]) == (1, 1)
+
+
+def test_renamed_definition_is_moved():
+    result = diff_code_symbols(SOURCE, SOURCE.replace("def helper", "def add").replace("return helper", "return add"), "python")
+    renamed = [change for change in result["changes"] if change.get("old_name")]
+    assert [(change["old_name"], change["name"], change["change"]) for change in renamed] == [("helper", "add", "moved")]
+    assert {change["name"] for change in result["changes"]} == {"add", "main"}
+    # 重命名按摘要配对为移动；调用处改变的main为修改。
+
+
+def test_reordered_definitions_are_moved():
+    old = "def a():\n    return 1\n\ndef b():\n    return 2\n\ndef c():\n    return 3\n"
+    new = "def c():\n    return 3\n\ndef a():\n    return 1\n\ndef b():\n    return 2\n"
+    result = diff_code_symbols(old, new, "python")
+    assert [(change["name"], change["change"]) for change in result["changes"]] == [("c", "moved")]
+    assert result["changes"][0]["old_location"]["start_line"] == 7
+    assert result["changes"][0]["new_location"]["start_line"] == 1
+    # 只有不在最长保序子序列中的定义被报告为移动。
+
+
+def test_decorators_belong_to_the_definition():
+    old = "@cache\ndef f():\n    return 1\n\ndef g():\n    return 2\n"
+    changes, _ = changes_of(old, old.replace("@cache", "@lru_cache"))
+    assert changes == {"f": "modified"}
+    changes, _ = changes_of(old, old.replace("@cache\n", ""))
+    assert changes == {"f": "modified"}
+
+
+def test_duplicate_names_pair_in_order():
+    old = "def f():\n    return 1\n\ndef f():\n    return 2\n"
+    changes, summary = changes_of(old, old.replace("return 2", "return 3"))
+    assert changes == {"f": "modified"}
+    assert summary["unchanged"] == 1
+
+
+@pytest.mark.parametrize("language,old,new,expected", [
+    ("javascript",
+     "function f(a) { return a; }\nclass Box { put(x) { this.x = x; } }\n",
+     "function f(a) { /* same */ return a; }\nclass Box { put(x) { this.x = [x]; } }\n",
+     {"Box.put": "modified"}),
+    ("java",
+     "class Box {\n  int get() { return 1; }\n  void put(int n) { }\n}\n",
+     "class Box {\n  // getter\n  int get() { return 1; }\n  void take(int n) { }\n}\n",
+     {"Box.take": "moved"}),
+])
+def test_other_languages(language, old, new, expected):
+    if language not in available_languages():
+        pytest.skip(f"{language} grammar is not installed")
+    changes, _ = changes_of(old, new, language)
+    assert changes == expected
+
+
+def test_unsupported_language_is_an_error():
+    assert "error" in diff_code_symbols("x = 1", "x = 2", "cobol")
+
+
+def test_digests_match_direct_hashing():
+    parsed = parse_code_to_tree(SOURCE, "python")
+    plugin = get_language_plugin("python")
+    collector = DefinitionCollector(plugin, parsed["source_bytes"])
+    TreeWalker().add(collector).walk(parsed["tree"].root_node)
+    collector.hash_definitions()
+    definitions = collector.definitions
+
+    for definition in definitions:
+        kept = set(range(definition.first, definition.last))
+        if definition.name_token is not None:
+            kept.discard(collector.token_starts.index(definition.name_token, definition.first))
+        for child_index in definition.children:
+            child = definitions[child_index]
+            kept.difference_update(range(child.first, child.last))
+        digest = 0
+        for index in sorted(kept):
+            digest = (digest * HASH_BASE + collector.tokens[index]) % HASH_MODULUS
+        assert definition.digest == digest, definition.name
+    # 前缀哈希拼接得到的摘要应等于直接对保留的词法单元计算的哈希。
+
+    assert [definition.digest for definition in collect_definitions(parsed["tree"].root_node, parsed["source_bytes"], plugin)] == [
+        definition.digest for definition in definitions
+    ]
@@ -0,0 +1,71 @@
+"""Tests for the Python name resolver behind the references and calls edges."""
+# 测试references和calls边所依据的Python名称解析器。
+
+import pytest
+
+from ast_mcp_server.symbols import make_scope_resolver
+from ast_mcp_server.tools import parse_code_to_tree
+from ast_mcp_server.visitors import NodeAccess, TreeWalker
+
+
+def resolve(code):
+    """
+    Resolve the names of some Python code.
+
+    Returns:
+        Maps (line, column) of each resolved reference -> (edge type,
+        (line, column) of the node it resolves to)
+    """
+    # 解析Python代码中的名称，返回每个已解析引用的位置到(边类型, 目标节点位置)的映射。
+    parsed = parse_code_to_tree(code, "python")
+    source_bytes = parsed["source_bytes"]
+    nodes = {}
+    stack = [parsed["tree"].root_node]
+    while stack:
+        node = stack.pop()
+        nodes[node.id] = node
+        stack.extend(node.children)
+    resolver = make_scope_resolver(NodeAccess(lambda start, end: source_bytes[start:end].decode("utf-8")), "python")
+    TreeWalker().add(resolver).walk(parsed["tree"].root_node)
+    return {
+        nodes[source].start_point: (edge_type, nodes[target].start_point)
+        for source, target, edge_type in resolver.edges()
+    }
+
+
+@pytest.mark.parametrize("code, expected", [
+    # Default values run in the enclosing scope, the body sees the parameter
+    ("x = 1\ndef f(x=x):\n    return x\n", {(1, 8): (0, 0), (2, 11): (1, 6)}),
+    ("y = 1\ng = lambda y=y: y\n", {(1, 13): (0, 0), (1, 16): (1, 11)}),
+    # Annotations and return annotations too, even when the body rebinds the name
+    (
+        "T = int\ndef f(a: T, b: T = 0) -> T:\n    T = 2\n    return a\n",
+        {(1, 9): (0, 0), (1, 15): (0, 0), (1, 25): (0, 0), (3, 11): (1, 6)}
+    ),
+    # Star parameters are bound in the function
+    ("def f(*args: int, **kw):\n    return args, kw\n", {(1, 11): (0, 7), (1, 17): (0, 20)}),
+    # Class bodies are visible to defaults but not to method bodies
+    (
+        "D = 0\nclass C:\n    D = 1\n    def m(self, d=D):\n        return d, D\n",
+        {(3, 18): (2, 4), (4, 15): (3, 16), (4, 18): (0, 0)}
+    ),
+    # Function bodies see later bindings of enclosing scopes
+    ("def f():\n    return z\nz = 1\n", {(1, 11): (2, 0)}),
+    # global declarations bind at module level
+    ("def f():\n    global g\n    g = 1\ndef h():\n    return g\n", {(4, 11): (2, 4)}),
+])
+def test_references(code, expected):
+    assert resolve(code) == {position: ("references", target) for position, target in expected.items()}
+
+
+def test_function_name_bound_after_its_signature():
+    code = "def f(x=f):\n    return f(x)\n"
+    assert resolve(code) == {(1, 11): ("calls", (0, 0)), (1, 13): ("references", (0, 6))}
+    # 默认值中的f在定义之前求值，不解析到函数本身；函数体中的递归调用解析到函数。
+
+
+def test_decorators_resolve_outside_the_function():
+    code = "d = 1\ndef outer():\n    @d\n    def h(d=d):\n        return d\n    return h\n"
+    resolved = resolve(code)
+    assert resolved[(2, 5)] == resolved[(3, 12)] == ("references", (0, 0))
+    assert resolved[(4, 15)] == ("references", (3, 10))
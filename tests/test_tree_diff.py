@@ -0,0 +1,140 @@
+"""Tests for the structural AST diff."""
+# 测试结构化AST差异。
+
+import random
+
+import pytest
+
+from ast_mcp_server.enhanced_tools import diff_code, generate_ast_diff
+from ast_mcp_server.tools import parse_code_to_tree
+from ast_mcp_server.tree_diff import FlatTree, TreeMatcher, diff_trees, edit_script
+
+SOURCE = '''def f(a, b):
+    total = a + b
+    if total > 10:
+        print("big")
+    return total
+
+
+def g():
+    return f(1, 2)
+'''
+
+
+def parse(code):
+    parsed = parse_code_to_tree(code, "python")
+    return parsed["tree"].root_node, parsed["source_bytes"]
+
+
+def match(old_code, new_code):
+    matcher = TreeMatcher(FlatTree(*parse(old_code)), FlatTree(*parse(new_code)))
+    matcher.match()
+    return matcher
+
+
+def summarize(actions):
+    """Reduce actions to (action, type, old start, new start) for comparison."""
+    # 将动作简化为(动作, 类型, 旧起点, 新起点)以便比较。
+    return [
+        (action["action"], action["type"], action.get("old", {}).get("start_byte"), action.get("new", {}).get("start_byte"))
+        for action in actions
+    ]
+
+
+def diff(old_code, new_code, named_only=False):
+    old_root, old_source = parse(old_code)
+    new_root, new_source = parse(new_code)
+    return diff_trees(old_root, old_source, new_root, new_source, named_only)
+
+
+def assert_inverse(matcher):
+    for new_index, old_index in enumerate(matcher.new_to_old):
+        if old_index != -1:
+            assert matcher.old_to_new[old_index] == new_index
+    for old_index, new_index in enumerate(matcher.old_to_new):
+        if new_index != -1:
+            assert matcher.new_to_old[new_index] == old_index
+
+
+def test_identical_trees_have_no_actions():
+    actions, summary = diff(SOURCE, SOURCE)
+    assert actions == []
+    assert summary["matched"] == summary["old_node_count"] == summary["new_node_count"]
+
+
+@pytest.mark.parametrize("old, new, expected", [
+    # A statement added before a definition that holds an identical call
+    (
+        "def f():\n    x = foo(1, 2)\n",
+        "y = foo(1, 2)\ndef f():\n    x = foo(1, 2)\n",
+        [("insert", "expression_statement", None, 0)]
+    ),
+    # A changed literal is an update of that leaf
+    (SOURCE, SOURCE.replace("> 10", "> 20"), [("update", "integer", SOURCE.index("10"), SOURCE.index("10"))]),
+    # A renamed function is an update of its name
+    (SOURCE, SOURCE.replace("def g", "def h"), [("update", "identifier", SOURCE.index("g()"), SOURCE.index("g()"))]),
+    # Swapped definitions: one of them moved
+    (
+        "def a():\n    return 1\n\n\ndef b():\n    return 2\n",
+        "def b():\n    return 2\n\n\ndef a():\n    return 1\n",
+        [("move", "function_definition", 24, 0)]
+    ),
+    # A replaced statement is an insert and a delete
+    (
+        SOURCE,
+        SOURCE.replace('print("big")', "pass"),
+        [("insert", "pass_statement", None, SOURCE.index("print")), ("delete", "expression_statement", SOURCE.index("print"), None)]
+    ),
+])
+def test_edit_scripts(old, new, expected):
+    matcher = match(old, new)
+    assert_inverse(matcher)
+    assert summarize(edit_script(matcher)) == expected
+
+
+def test_deleted_statement():
+    new = SOURCE.replace("    total = a + b\n", "")
+    actions, summary = diff(SOURCE, new)
+    assert summarize(actions) == [("delete", "expression_statement", SOURCE.index("total ="), None)]
+    assert summary["actions"]["delete"] == 1
+
+
+def test_named_only_reports_operator_change_on_its_parent():
+    actions, _ = diff(SOURCE, SOURCE.replace("a + b", "a - b"), named_only=True)
+    assert summarize(actions) == [("update", "binary_operator", SOURCE.index("a + b"), SOURCE.index("a + b"))]
+
+
+def test_random_edits_keep_matching_consistent():
+    rng = random.Random(5)
+    lines = SOURCE.split("\n")
+    for _ in range(60):
+        new_lines = list(lines)
+        for _ in range(rng.randint(1, 3)):
+            first = rng.randrange(len(new_lines))
+            second = rng.randrange(len(new_lines))
+            choice = rng.randrange(3)
+            if choice == 0:
+                new_lines[first], new_lines[second] = new_lines[second], new_lines[first]
+            elif choice == 1:
+                new_lines.insert(second, new_lines[first])
+            else:
+                del new_lines[first]
+        new = "\n".join(new_lines)
+        matcher = match(SOURCE, new)
+        assert_inverse(matcher)
+        for action in edit_script(matcher):
+            if action["action"] in ("insert", "move"):
+                assert action["parent"]
+
+
+def test_diff_code_matches_full_reparse():
+    new = SOURCE.replace("> 10", "> 20").replace("def g", "def h")
+    result = diff_code(SOURCE, new, "python")
+    assert result["language"] == "python"
+    assert result["summary"]["actions"]["update"] == 2
+    assert result["edit_script"] == diff(SOURCE, new)[0]
+
+    full = generate_ast_diff(parse_code_to_tree(SOURCE, "python"), parse_code_to_tree(new, "python"))
+    assert full["edit_script"] == result["edit_script"]
+    assert full["changed_ranges"] == result["changed_ranges"]
+    # 增量解析得到的变更范围应与对两份完整解析结果计算的一致。
@@ -0,0 +1,116 @@
+"""Tests for the single-pass visitor framework."""
+# 测试单遍访问者框架。
+
+import pytest
+
+from ast_mcp_server.grammars import available_languages
+from ast_mcp_server.tools import parse_code_to_ast, parse_code_to_tree
+from ast_mcp_server.visitors import DictNodeAccess, DictTreeWalker, NodeAccess, TreeWalker
+
+SAMPLES = {
+    "python": '''class Box:
+    def put(self, item, *, key=None):
+        if key:
+            self.items[key] = item
+        return [x for x in self.items]
+''',
+    "javascript": '''class Box {
+  put(item, key = null) { if (key) { this.items[key] = item; } return this.items.map(x => x); }
+}
+''',
+    "java": '''class Box {
+    void put(Object item, String key) { if (key != null) { items.put(key, item); } }
+}
+''',
+}
+
+
+def recursive_events(node, named_only, depth=0, field=None):
+    """List the enter/exit events of a walk by recursion, with each entered node's field name."""
+    # 递归列出遍历的进入/离开事件，以及每个进入节点的字段名。
+    events = [("enter", node.type, depth, field)]
+    for index, child in enumerate(node.children):
+        if child.is_named or not named_only:
+            events.extend(recursive_events(child, named_only, depth + 1, node.field_name_for_child(index)))
+    events.append(("exit", node.type, depth))
+    return events
+
+
+class Recorder:
+    """Visitor recording every event, or the events of some node types."""
+    # 记录所有事件（或部分节点类型的事件）的访问者。
+
+    def __init__(self, node_types=None):
+        self.node_types = node_types
+        self.events = []
+
+    def register(self, walker):
+        self.walker = walker
+        walker.on_enter(self.node_types, self.enter)
+        walker.on_exit(self.node_types, self.exit)
+
+    def enter(self, node, depth):
+        node_type = node["type"] if isinstance(node, dict) else node.type
+        self.events.append(("enter", node_type, depth, self.walker.field_name if depth else None))
+
+    def exit(self, node, depth):
+        node_type = node["type"] if isinstance(node, dict) else node.type
+        self.events.append(("exit", node_type, depth))
+
+
+@pytest.mark.parametrize("language", sorted(SAMPLES))
+@pytest.mark.parametrize("named_only", [False, True])
+def test_walk_matches_recursion(language, named_only):
+    if language not in available_languages():
+        pytest.skip(f"{language} grammar not installed")
+    root = parse_code_to_tree(SAMPLES[language], language)["tree"].root_node
+    everything = Recorder()
+    scopes = Recorder(["class_body", "block", "identifier"])
+    TreeWalker(named_only).add(everything).add(scopes).walk(root)
+    expected = recursive_events(root, named_only)
+    assert everything.events == expected
+    assert scopes.events == [event for event in expected if event[1] in scopes.node_types]
+    # 一次遍历同时分发给所有访问者，事件顺序与递归遍历相同。
+
+    subtree = root.named_children[0]
+    recorder = Recorder()
+    TreeWalker(named_only).add(recorder).walk(subtree)
+    assert recorder.events == recursive_events(subtree, named_only)
+
+
+@pytest.mark.parametrize("language", sorted(SAMPLES))
+def test_dict_walker_matches_native_walker(language):
+    if language not in available_languages():
+        pytest.skip(f"{language} grammar not installed")
+    root = parse_code_to_tree(SAMPLES[language], language)["tree"].root_node
+    native = Recorder()
+    TreeWalker(named_only=True).add(native).walk(root)
+    serialized = Recorder()
+    DictTreeWalker().add(serialized).walk(parse_code_to_ast(SAMPLES[language], language, named_only=True)["ast"])
+    assert serialized.events == native.events
+
+
+def test_callbacks_run_in_registration_order():
+    root = parse_code_to_tree(SAMPLES["python"], "python")["tree"].root_node
+    calls = []
+    walker = TreeWalker()
+    walker.on_enter("identifier", lambda node, depth: calls.append("first"))
+    walker.on_enter(None, lambda node, depth: calls.append("all") if node.type == "identifier" else None)
+    walker.on_enter(["identifier"], lambda node, depth: calls.append("last"))
+    walker.walk(root)
+    assert calls and calls == ["first", "all", "last"] * (len(calls) // 3)
+
+
+def test_node_access_agrees():
+    code = SAMPLES["python"]
+    parsed = parse_code_to_tree(code, "python")
+    source = parsed["source_bytes"]
+    native = NodeAccess(lambda start, end: source[start:end].decode())
+    serialized = DictNodeAccess()
+    function = parsed["tree"].root_node.named_children[0].child_by_field_name("body").named_children[0]
+    function_dict = parse_code_to_ast(code, "python", named_only=True)["ast"]["children"][0]["children"][1]["children"][0]
+    assert serialized.ref(function_dict) == f"{native.type(function)}_{function.start_byte}_{function.end_byte}"
+    for field in ("name", "parameters", "body", "return_type"):
+        assert [native.text(node) for node in native.fields(function, field)] == [
+            serialized.text(node) for node in serialized.fields(function_dict, field)
+        ]